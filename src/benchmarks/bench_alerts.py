@@ -0,0 +1,87 @@
+"""
+Low-stock alerts on a large catalog: what the stock_low triggers add to a
+stock write, reading the alert list, a notification poll, and re-checking
+everything after the global threshold changes.
+
+    python src/benchmarks/bench_alerts.py [products] [moves]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db import alerts
+from db.stock import move_stock, receive_delivery
+
+TRIGGERS = ("stock_low_ai", "stock_low_au", "stock_low_ad")
+
+
+def _moves(products, moves):
+    times = []
+    for k in range(moves):
+        t0 = time.perf_counter()
+        move_stock(1 + k * 7919 % products, "sell" if k % 3 else "receive", 1, allow_negative=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    moves = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        now = db.now_ms()
+        with db.write_conn() as c:
+            c.executemany("""
+                INSERT INTO product (id, sku, name, price_ttc_cents, created_at, updated_at)
+                VALUES (?, ?, ?, 1000, ?, ?)
+            """, [(i, f"SKU{i:07d}", f"Product {i}", now, now) for i in range(1, products + 1)])
+        receive_delivery([(i, 1 + i % 200) for i in range(1, products + 1)])   # 2.5% at or below 5
+        print(f"low rows      : {len(alerts.low_stock())} of {products}")
+
+        with_triggers = _moves(products, moves)
+        t0 = time.perf_counter()
+        for _ in range(100):
+            items = alerts.low_stock()
+        listed = (time.perf_counter() - t0) * 10
+        feed = alerts.LowStockAlerts()
+        feed.poll()
+        polls = []
+        for k in range(20):
+            move_stock(199 + 200 * k, "sell", 197)
+            t0 = time.perf_counter()
+            fresh = feed.poll()
+            polls.append((time.perf_counter() - t0) * 1000)
+        polled = statistics.median(polls)
+        t0 = time.perf_counter()
+        low = alerts.set_low_stock_threshold(20)
+        recheck = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        with db.read_conn() as c:
+            scanned = c.execute("SELECT COUNT(*) FROM stock_threshold WHERE qty <= threshold").fetchone()[0]
+        scan = (time.perf_counter() - t0) * 1000
+        report = alerts.check_low_stock()
+
+        with db.read_conn() as c:
+            sql = dict(c.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                                 f"AND name IN ({','.join('?' * len(TRIGGERS))})", TRIGGERS))
+        with db.write_conn() as c:
+            for name in TRIGGERS:
+                c.execute(f"DROP TRIGGER {name}")
+        without = _moves(products, moves)
+        with db.write_conn() as c:
+            for name in TRIGGERS:
+                c.execute(sql[name])
+
+        print(f"move_stock    : {with_triggers:.3f} ms with stock_low triggers, {without:.3f} ms without "
+              f"(median of {moves})")
+        print(f"list alerts   : {len(items)} rows in {listed:.3f} ms   (scan of every stock row: {scan:.1f} ms)")
+        print(f"poll          : {len(fresh)} new in {polled:.3f} ms (median of 20, one sale each)")
+        print(f"threshold 20  : {low} low after re-checking every row in {recheck:.1f} ms")
+        print(f"check         : {report.rows_checked} rows, {len(report.missing) + len(report.extra) + len(report.stale)} "
+              f"off, {report.elapsed_ms:.1f} ms")
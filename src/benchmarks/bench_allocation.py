@@ -0,0 +1,38 @@
+"""
+Counter payment benchmark: many small payments on a few active contracts,
+with the per-contract cache (default engine) and without it (capacity=0).
+
+    python src/benchmarks/bench_allocation.py [payments] [active_contracts]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.allocation import AllocationEngine
+from bench_payments import _contracts
+
+
+if __name__ == "__main__":
+    payments = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    active = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        _contracts(20_000)
+        plan = [(random.randint(1, active), random.choice((500, 1_000, 2_500))) for _ in range(payments)]
+
+        for label, capacity in (("no cache", 0), ("LRU cache", 512)):
+            engine = AllocationEngine(capacity=capacity)
+            start = time.perf_counter()
+            for contract_id, amount in plan[:payments // 2] if capacity == 0 else plan[payments // 2:]:
+                engine.apply(contract_id, amount)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<10}: {payments // 2} payments in {elapsed * 1000:7.0f} ms "
+                  f"({payments // 2 / elapsed:7.0f}/s), hits {engine.hits}, misses {engine.misses}, "
+                  f"stale {engine.stale}")
+        db.get_manager().close()
@@ -0,0 +1,71 @@
+"""
+Audit logging cost: one committed INSERT per event, events written at the
+mutation's own COMMIT (the default), durable events inserted at once, and
+standalone events batched by the background writer.
+
+    python src/benchmarks/bench_audit.py [events]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.audit import AuditWriter, _INSERT, _row
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        mgr = db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        now = db.now_ms()
+        with mgr.write() as c:
+            c.execute("INSERT INTO customer (full_name, created_at, updated_at) VALUES ('A', ?, ?)", (now, now))
+
+        def mutate(c, i):
+            c.execute("UPDATE customer SET notes = ?, version = version + 1 WHERE id = 1", (str(i),))
+
+        results = {}
+        start = time.perf_counter()
+        for i in range(events):
+            with mgr.write() as c:
+                mutate(c, i)
+        results["mutation only"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(events):
+            with mgr.write() as c:
+                mutate(c, i)
+            with mgr.write() as c:   # separate commit per audit event
+                c.execute(_INSERT, _row("update", "customer", 1, {"notes": str(i)}, None, None, None))
+        results["+ sync audit commit"] = time.perf_counter() - start
+
+        writer = AuditWriter(mgr)
+        start = time.perf_counter()
+        for i in range(events):
+            with mgr.write() as c:
+                mutate(c, i)
+                writer.record("update", "customer", 1, {"notes": str(i)})   # written before COMMIT
+        results["+ writer (at commit)"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(events):
+            with mgr.write() as c:
+                mutate(c, i)
+                writer.record("update", "customer", 1, {"notes": str(i)}, durable=True)
+        results["+ durable (in txn)"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(events):
+            writer.record("login", "user", i)                                # no mutation: buffered
+        writer.flush()
+        results["standalone, buffered"] = time.perf_counter() - start
+        writer.close()
+
+        for label, elapsed in results.items():
+            print(f"{label:<22}: {elapsed * 1000:7.0f} ms ({elapsed / events * 1e6:6.1f} µs/mutation)")
+        print(f"buffered batches: {writer.batches}")
+        mgr.close()
@@ -0,0 +1,58 @@
+"""
+Backup engine benchmark on a database padded with customers: a full first
+backup, a "typical day" (new rows plus edits to recent ones) and a day of
+edits scattered over the whole table, which touches the most chunks.
+
+    python src/benchmarks/bench_backup.py [customers] [changed_rows]
+"""
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.backup import backup, verify_backup
+
+
+def _pad(rows: int, start: int = 0):
+    now = db.now_ms()
+    with db.write_conn() as c:
+        c.executemany(
+            "INSERT INTO customer (full_name, notes, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((f"Customer {i}", f"Account opened at branch {i % 7}", now, now) for i in range(start, start + rows)),
+        )
+
+
+def _show(label, r):
+    print(f"{label:<13}: {r.db_bytes / 1e6:8.1f} MB in {r.elapsed_ms:7.0f} ms "
+          f"({r.throughput_mb_s:6.1f} MB/s), {r.new_chunks}/{r.chunks} chunks new, "
+          f"{r.bytes_written / 1e6:.2f} MB written")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        _pad(rows)
+        target = Path(tmp) / "backups"
+
+        _show("first backup", backup(target))
+
+        _pad(changed, start=rows)
+        with db.write_conn() as c:
+            c.executemany("UPDATE customer SET notes = 'Address changed' WHERE id = ?",
+                          [(random.randint(rows - changed * 50, rows),) for _ in range(changed)])
+        _show("typical day", backup(target))
+
+        with db.write_conn() as c:
+            c.executemany("UPDATE customer SET notes = 'Address changed' WHERE id = ?",
+                          [(random.randint(1, rows),) for _ in range(changed)])
+        daily = backup(target)
+        _show("scattered", daily)
+        check = verify_backup(daily.manifest)
+        print(f"verify       : {check.elapsed_ms:7.0f} ms, integrity_check={check.integrity[0]}")
+        db.get_manager().close()
@@ -0,0 +1,87 @@
+"""
+Per-branch screens while other branches grow: branch 1 keeps the same data,
+the rest of the chain gets 0x, 10x and 50x as much. Compares BranchRepository
+with the same lists filtered on branch through the older global indexes.
+
+    python src/benchmarks/bench_branches.py [contracts per branch]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.branches import BranchRepository
+
+# What the screens did before: branch as a plain filter on top of a global index
+_GLOBAL = {
+    "installments": """
+        SELECT i.id, ct.id, s.customer_id, i.number, i.due_date, i.due_cents - i.paid_cents
+        FROM installment i JOIN schedule sc ON sc.id = i.schedule_id
+        JOIN contract ct ON ct.id = sc.contract_id JOIN sale s ON s.id = ct.sale_id
+        WHERE i.status = 'overdue' AND s.branch_id = 1 ORDER BY i.due_date, i.id LIMIT 200
+    """,
+    "payments": """
+        SELECT id, contract_id, installment_id, channel, amount_cents, received_at FROM payment
+        INDEXED BY idx_payment_status_time
+        WHERE status = 'succeeded' AND branch_id = 1 ORDER BY received_at DESC LIMIT 100
+    """,
+}
+
+
+def _seed(first_id: int, n: int, branch_id: int):
+    now = db.now_ms()
+    ids = range(first_id, first_id + n)   # every branch spans the same dates, interleaved
+    with db.write_conn() as c:
+        c.executemany("""
+            INSERT INTO sale (id, branch_id, type, status, total_cents, created_at, updated_at)
+            VALUES (?, ?, 'instalment', 'completed', 120000, ?, ?)
+        """, [(i, branch_id, now, now) for i in ids])
+        c.executemany("INSERT INTO offer (id, term_months, total_repay_cents, created_at, updated_at) VALUES (?, 12, 120000, ?, ?)",
+                      [(i, now, now) for i in ids])
+        c.executemany("INSERT INTO contract (id, sale_id, offer_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                      [(i, i, i, now, now) for i in ids])
+        c.executemany("""
+            INSERT INTO schedule (id, contract_id, installments_count, start_date, generated_at, created_at, updated_at)
+            VALUES (?, ?, 12, ?, ?, ?, ?)
+        """, [(i, i, now, now, now, now) for i in ids])
+        c.executemany("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents, status,
+                                     created_at, updated_at)
+            VALUES (?, ?, ?, 10000, 10000, ?, ?, ?)
+        """, ((i, k, now + k * 2_592_000_000 + i - first_id, "overdue" if k <= 2 else "upcoming", now, now)
+           for i in ids for k in range(1, 13)))
+        c.executemany("""
+            INSERT INTO payment (branch_id, contract_id, channel, amount_cents, received_at, created_at, updated_at)
+            VALUES (?, ?, 'cash', 10000, ?, ?, ?)
+        """, [(branch_id, i, now - (i - first_id) * 1000, now, now) for i in ids])
+
+
+def _ms(fn, repeat: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    per_branch = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        _seed(1, per_branch, 1)
+        repo = BranchRepository(1)
+        others = 0
+        for factor in (0, 10, 50):
+            while others < factor * per_branch:
+                _seed(1 + per_branch + others, per_branch, 2 + others // per_branch)
+                others += per_branch
+            with db.write_conn() as c:
+                c.execute("ANALYZE")
+            with db.read_conn() as c:
+                old_inst = _ms(lambda: c.execute(_GLOBAL["installments"]).fetchall())
+                old_pay = _ms(lambda: c.execute(_GLOBAL["payments"]).fetchall())
+            print(f"others {factor:>2}x  installments {_ms(repo.installments):6.2f} ms (global {old_inst:7.2f})  "
+                  f"payments {_ms(repo.payments):5.2f} ms (global {old_pay:6.2f})")
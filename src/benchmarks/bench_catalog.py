@@ -0,0 +1,59 @@
+"""
+Product catalog cache: first load, a refresh with nothing new, and a
+refresh after a handful of edits, on a large catalog.
+
+    python src/benchmarks/bench_catalog.py [products] [edits]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.catalog import Catalog
+
+BRANDS = ("Samsung", "LG", "Sony", "Condor", "Iris", "Brandt", "Haier", "TCL")
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        now = db.now_ms()
+        with db.write_conn() as c:
+            c.executemany("""
+                INSERT INTO product (id, sku, name, brand, category, barcode, price_ttc_cents, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(i, f"SKU{i:07d}", f"Product {i}", BRANDS[i % len(BRANDS)], f"Category {i % 40}",
+                   f"613{i:010d}", 1_000 + i, now, now) for i in range(1, products + 1)])
+
+        catalog = Catalog()
+        tracemalloc.start()
+        catalog.refresh()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        change = catalog.reload()   # timed without tracemalloc
+        print(f"first load    : {len(catalog)} products in {change.elapsed_ms:8.1f} ms "
+              f"({memory / len(catalog):.0f} B/product incl. indexes)")
+
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            catalog.refresh()
+        print(f"no-op refresh : {(time.perf_counter() - t0) * 1000:8.1f} us each")   # ms for 1000 = us each
+
+        with db.write_conn() as c:
+            c.executemany("UPDATE product SET price_ttc_cents = price_ttc_cents + 1, version = version + 1, "
+                          "updated_at = ? WHERE id = ?", [(now, i) for i in range(1, products, products // edits)])
+        change = catalog.refresh()
+        print(f"after {edits} edits: {len(change.updated)} updated in {change.elapsed_ms:8.2f} ms")
+
+        codes = [f"613{i % products + 1:010d}" for i in range(100_000)]
+        t0 = time.perf_counter()
+        for code in codes:
+            catalog.by_barcode(code)
+        print(f"barcode lookup: {(time.perf_counter() - t0) * 10:8.3f} us each")
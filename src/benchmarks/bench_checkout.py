@@ -0,0 +1,91 @@
+"""
+Several counters completing sales at the same time against one WAL
+database. "processes": each counter is its own process with its own
+connections, like separate POS stations sharing the file (SQLite's busy
+handler arbitrates the write lock). "threads": counters share one app's
+ConnectionManager (its write lock queues them). Reports checkout latency
+percentiles against a budget, and how much was spent waiting for the lock.
+
+    python src/benchmarks/bench_checkout.py [counters] [sales per counter] [budget ms] [processes|threads]
+"""
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.checkout import CartLine, Financing, checkout
+from db.stock import receive_delivery
+
+PRODUCTS = 2_000
+
+
+def _counter(path: str, counter: int, sales: int, results, shared: bool = False):
+    manager = db.get_manager() if shared else db.configure(path)
+    rng = random.Random(counter)
+    rows = []
+    for k in range(sales):
+        lines = [CartLine(rng.randint(1, PRODUCTS), rng.randint(1, 2)) for _ in range(rng.randint(1, 5))]
+        financed = k % 4 == 0
+        r = checkout(lines, branch_id=1 + counter % 3, down_payment_cents=1_000 if financed else 0,
+                     financing=Financing(12) if financed else None,
+                     idempotency_key=f"c{counter}:{k}", manager=manager)
+        rows.append((r.elapsed_ms, r.wait_ms, r.locked_ms))
+    if not shared:
+        manager.close()
+    results.put(rows)
+
+
+def _pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+if __name__ == "__main__":
+    counters = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    sales = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    budget = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    mode = sys.argv[4] if len(sys.argv) > 4 else "processes"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "app.db")
+        db.configure(path)
+        db.init_db()
+        now = db.now_ms()
+        with db.write_conn() as c:
+            c.executemany("""
+                INSERT INTO product (id, sku, name, price_ttc_cents, tax_rate_bp, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 1900, ?, ?)
+            """, [(i, f"SKU{i:06d}", f"Product {i}", 1_000 + i * 10, now, now) for i in range(1, PRODUCTS + 1)])
+        for branch in (1, 2, 3):
+            receive_delivery([(i, 10_000) for i in range(1, PRODUCTS + 1)], branch_id=branch)
+
+        if mode == "threads":
+            results = queue.Queue()
+            procs = [threading.Thread(target=_counter, args=(path, n, sales, results, True))
+                     for n in range(counters)]
+        else:
+            db.get_manager().close()
+            results = multiprocessing.Queue()
+            procs = [multiprocessing.Process(target=_counter, args=(path, n, sales, results))
+                     for n in range(counters)]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+        rows = [row for _ in procs for row in results.get()]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - started
+
+        total, wait, locked = zip(*rows)
+        print(f"{counters} counters ({mode}) x {sales} sales: {len(rows) / wall:,.0f} sales/s overall")
+        for label, values in (("checkout", total), ("lock wait", wait), ("lock held", locked)):
+            print(f"{label:<10}: p50 {_pct(values, 0.5):6.2f} ms  p95 {_pct(values, 0.95):6.2f} ms  "
+                  f"p99 {_pct(values, 0.99):6.2f} ms  max {max(values):7.2f} ms")
+        over = sum(1 for t in total if t > budget)
+        print(f"over {budget:g} ms budget: {over} of {len(rows)} ({100 * over / len(rows):.2f}%)")
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: pooled ConnectionManager vs. opening a connection per call.
+
+    python src/benchmarks/bench_connection.py [ops]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.inventory import add_supplier
+
+ROW = ("ACME", "acme@example.com", 555000, None, "", "Algiers")
+
+
+def _open_per_call(path):
+    # The pattern get_conn() used before the pool: connect + pragma every time
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+def bench_open_per_call(path: Path, ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        with _open_per_call(path) as c:
+            c.execute("INSERT INTO suppliers (name, email, phone1, phone2, social, address)"
+                      " VALUES (?, ?, ?, ?, ?, ?)", ROW)
+        c.close()
+        with _open_per_call(path) as c:
+            c.execute("SELECT id, name FROM suppliers ORDER BY id DESC LIMIT 50").fetchall()
+        c.close()
+    return ops / (time.perf_counter() - start)
+
+
+def bench_pooled(path: Path, ops: int) -> float:
+    db.configure(path)
+    db.init_db()
+    start = time.perf_counter()
+    for _ in range(ops):
+        add_supplier(*ROW)
+        with db.read_conn() as c:
+            c.execute("SELECT id, name FROM suppliers ORDER BY id DESC LIMIT 50").fetchall()
+    return ops / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "legacy.db"
+        with sqlite3.connect(legacy) as c:
+            c.execute("CREATE TABLE suppliers (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,"
+                      " email TEXT, phone1 INTEGER, phone2 INTEGER, social TEXT, address TEXT)")
+        c.close()
+        baseline = bench_open_per_call(legacy, ops)
+        pooled = bench_pooled(Path(tmp) / "pooled.db", ops)
+        db.get_manager().close()
+
+    print(f"open-per-call : {baseline:10.0f} ops/s")
+    print(f"pooled        : {pooled:10.0f} ops/s  ({pooled / baseline:.1f}x)")
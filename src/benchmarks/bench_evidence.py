@@ -0,0 +1,48 @@
+"""
+Contract evidence: sealing (hash only), re-verifying every stored hash, and
+rendering PDFs + evidence packs in a process pool (needs reportlab).
+
+    python src/benchmarks/bench_evidence.py [contracts] [rendered] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db import evidence
+from db.attachments import AttachmentStore
+from bench_payments import _contracts
+
+
+if __name__ == "__main__":
+    contracts = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rendered = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        _contracts(contracts)
+
+        t0 = time.perf_counter()
+        sealed = evidence.seal_contracts()
+        print(f"seal          : {sealed} contracts in {(time.perf_counter() - t0) * 1000:7.1f} ms")
+
+        report = evidence.verify_contracts()
+        print(f"verify        : {report.checked} contracts in {report.elapsed_ms:7.1f} ms "
+              f"({report.per_second:,.0f}/s, {len(report.mismatched)} mismatched)")
+
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            print("render        : skipped (reportlab not installed)")
+            sys.exit(0)
+        store = AttachmentStore(Path(tmp) / "attachments")
+        for n in (0, workers):
+            ids = list(range(1 + (rendered if n else 0), 1 + rendered * (2 if n else 1)))
+            report = evidence.generate_evidence(ids, workers=n, store=store)
+            print(f"render x{n or 1:<3}   : {report.generated} docs in {report.elapsed_ms:8.1f} ms "
+                  f"({report.per_second:,.0f}/s, p50 {report.percentile_ms(0.5):.1f} ms, "
+                  f"p95 {report.percentile_ms(0.95):.1f} ms per doc)")
@@ -0,0 +1,69 @@
+"""
+Export benchmark: stream a year of payments to CSV, XLSX and PDF and
+report rows/sec and the peak RSS of the exporting process (a format whose
+library is missing is listed as such). Every export
+runs in a fresh child process so peak RSS is not inherited.
+
+    python src/benchmarks/bench_export.py [payments] [formats...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # points to .../src
+sys.path.append(SRC)
+import db
+from db.export import available_formats
+
+CHILD = r"""
+import json, resource, sys
+sys.path.insert(0, sys.argv[1])
+import db
+from db.export import export_report
+# mmap off: mapped database pages would show up in RSS (page cache, not export memory)
+db.configure(sys.argv[2], mmap_bytes=0)
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+r = export_report("payments", sys.argv[3])
+print(json.dumps({"rows": r.rows, "rows_per_s": r.rows_per_s, "mb": r.bytes / 1e6,
+                  "baseline_kib": baseline,
+                  "peak_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def _pad(rows: int):
+    year_ms = 365 * 86_400_000
+    start = db.now_ms() - year_ms
+    now = db.now_ms()
+    channels = ("cash", "tpe_card", "qr_a2a", "bank_transfer")
+    with db.write_conn() as c:
+        c.executemany("""
+            INSERT INTO payment (branch_id, contract_id, channel, provider_ref, amount_cents,
+                                 received_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ((1 + i % 3, i // 12, channels[i % 4], f"REF{i:010d}", 1_000 + i % 90_000,
+               start + i * year_ms // rows, now, now) for i in range(rows)))
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    formats = sys.argv[2:] or ["csv", "xlsx", "pdf"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.db"
+        db.configure(path)
+        db.init_db()
+        _pad(rows)
+        db.get_manager().close()
+
+        print(f"{'format':<6} {'rows':>10} {'rows/s':>10} {'file MB':>8} {'peak RSS MB':>12} {'after import':>13}")
+        for fmt in formats:
+            if fmt not in available_formats():
+                print(f"{fmt:<6} {'not installed':>10}")
+                continue
+            out = subprocess.run([sys.executable, "-c", CHILD, SRC, str(path), str(Path(tmp) / f"payments.{fmt}")],
+                                 capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout)
+            print(f"{fmt:<6} {r['rows']:>10} {r['rows_per_s']:>10.0f} {r['mb']:>8.1f} "
+                  f"{r['peak_kib'] / 1024:>12.1f} {r['baseline_kib'] / 1024:>13.1f}")
@@ -0,0 +1,50 @@
+"""
+Startup benchmark for the schema migrator: cold (empty file) vs. warm
+(schema already current) init_db() on a database padded with customers.
+
+    python src/benchmarks/bench_migrate.py [customers]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+
+
+def _pad(rows: int):
+    now = db.now_ms()
+    with db.write_conn() as c:
+        c.executemany(
+            "INSERT INTO customer (full_name, created_at, updated_at) VALUES (?, ?, ?)",
+            ((f"Customer {i}", now, now) for i in range(rows)),
+        )
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.db"
+        db.configure(path)
+        cold = _timed(db.init_db)
+        _pad(rows)
+
+        warm = []
+        for _ in range(20):
+            db.configure(path)   # fresh process-like start: new connections, cold caches
+            warm.append(_timed(db.init_db))
+        db.get_manager().close()
+        size_mb = path.stat().st_size / 1e6
+
+    print(f"database      : {rows} customers, {size_mb:.1f} MB")
+    print(f"cold init_db  : {cold:8.2f} ms")
+    print(f"warm init_db  : {statistics.median(warm):8.2f} ms median, {max(warm):.2f} ms max")
@@ -0,0 +1,69 @@
+"""
+Payment ingestion benchmark: an end-of-day file of bank transfers against
+contracts with 12 open installments each, then the same file replayed
+(every key already stored), then a second file with the sync change-log
+triggers quiet (as while applying a peer's changes) to show their cost.
+
+    python src/benchmarks/bench_payments.py [payments] [contracts] [batch_size]
+"""
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.payments import PaymentIn, ingest_payments
+
+
+def _contracts(n: int):
+    now = db.now_ms()
+    with db.write_conn() as c:
+        c.executemany("""
+            INSERT INTO sale (id, type, status, total_cents, created_at, updated_at)
+            VALUES (?, 'instalment', 'completed', 120000, ?, ?)
+        """, [(i, now, now) for i in range(1, n + 1)])
+        c.executemany("INSERT INTO offer (id, term_months, total_repay_cents, created_at, updated_at) VALUES (?, 12, 120000, ?, ?)",
+                      [(i, now, now) for i in range(1, n + 1)])
+        c.executemany("INSERT INTO contract (id, sale_id, offer_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                      [(i, i, i, now, now) for i in range(1, n + 1)])
+        c.executemany("""
+            INSERT INTO schedule (id, contract_id, installments_count, start_date, generated_at, created_at, updated_at)
+            VALUES (?, ?, 12, ?, ?, ?, ?)
+        """, [(i, i, now, now, now, now) for i in range(1, n + 1)])
+        c.executemany("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents, status,
+                                     created_at, updated_at)
+            VALUES (?, ?, ?, 10000, 10000, 'due', ?, ?)
+        """, ((i, k, now + k, now, now) for i in range(1, n + 1) for k in range(1, 13)))
+
+
+if __name__ == "__main__":
+    payments = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    contracts = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        _contracts(contracts)
+        now = db.now_ms()
+        batch = [PaymentIn(f"BT-{i:08d}", random.choice((5_000, 10_000, 15_000)), "bank_transfer",
+                           now + i, random.randint(1, contracts)) for i in range(payments)]
+
+        for label in ("first ingest", "replay"):
+            r = ingest_payments(batch, batch_size=batch_size)
+            print(f"{label:<13}: {r.received} payments in {r.elapsed_ms:7.0f} ms "
+                  f"({r.per_second:8.0f}/s), inserted {r.inserted}, duplicates {r.duplicates}, "
+                  f"installments updated {r.installments_updated}")
+        logged = ingest_payments([PaymentIn(f"BT2-{p.idempotency_key}", p.amount_cents, p.channel, p.received_at,
+                                            p.contract_id) for p in batch[: payments // 2]], batch_size=batch_size)
+        with db.write_conn() as c:
+            c.execute("UPDATE sync_state SET applying = 'bench'")
+        quiet = ingest_payments([PaymentIn(f"BT3-{p.idempotency_key}", p.amount_cents, p.channel, p.received_at,
+                                           p.contract_id) for p in batch[payments // 2:]], batch_size=batch_size)
+        with db.write_conn() as c:
+            c.execute("UPDATE sync_state SET applying = NULL")
+        print(f"change log   : {logged.per_second:8.0f}/s logged, {quiet.per_second:8.0f}/s with the sync "
+              f"triggers quiet ({payments // 2} new payments each)")
+        db.get_manager().close()
@@ -0,0 +1,85 @@
+"""
+Barcode scans: replays recorded-style keystroke streams (scanner bursts
+mixed with typing) through the burst detector into a sale cart, and times
+terminator-to-cart-updated per scan, against one SQL lookup per scan.
+
+    python src/benchmarks/bench_scan.py [scans] [products]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.catalog import Catalog
+from db.scan import BurstDetector, SaleCart
+
+
+def _keystrokes(codes, rng):
+    """(char, t_ms) for each scan at 2-8 ms per key, with some human typing in between."""
+    t = 0.0
+    for code in codes:
+        t += rng.uniform(300, 3000)
+        if rng.random() < 0.1:
+            for ch in "qty 2":
+                t += rng.uniform(80, 250)
+                yield ch, t
+            t += rng.uniform(300, 1000)
+        for ch in code + "\r":
+            t += rng.uniform(2, 8)
+            yield ch, t
+
+
+def _pct(values, q):
+    return sorted(values)[min(len(values) - 1, int(q * len(values)))]
+
+
+if __name__ == "__main__":
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        now = db.now_ms()
+        with db.write_conn() as c:
+            c.executemany("""
+                INSERT INTO product (id, sku, name, barcode, price_ttc_cents, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(i, f"SKU{i:07d}", f"Product {i}", f"613{i:010d}", 1_000 + i, now, now)
+                  for i in range(1, products + 1)])
+        catalog = Catalog()
+        catalog.refresh()
+
+        codes = [f"613{rng.randint(1, products):010d}" if rng.random() < 0.99 else "9990000000000"
+                 for _ in range(scans)]
+        keys = list(_keystrokes(codes, rng))
+        detector, cart = BurstDetector(), SaleCart(catalog)
+        latencies, found = [], 0
+        t0 = time.perf_counter()
+        for ch, t in keys:
+            started = time.perf_counter()
+            code = detector.feed(ch, t)
+            if code is not None:
+                found += cart.scan(code).product is not None
+                latencies.append((time.perf_counter() - started) * 1e6)
+                if len(cart) >= 20:
+                    cart.clear()
+        total = time.perf_counter() - t0
+        print(f"detector+cache: {len(latencies)} scans ({found} known) from {len(keys)} keys in {total * 1000:.1f} ms; "
+              f"per scan p50 {statistics.median(latencies):.1f} us, p99 {_pct(latencies, 0.99):.1f} us, "
+              f"max {max(latencies):.1f} us")
+
+        sql = []
+        with db.read_conn() as c:
+            for code in codes:
+                started = time.perf_counter()
+                c.execute("SELECT id, price_ttc_cents FROM product WHERE barcode = ? AND is_active = 1",
+                          (code,)).fetchone()
+                sql.append((time.perf_counter() - started) * 1e6)
+        print(f"SQL per scan  : p50 {statistics.median(sql):.1f} us, p99 {_pct(sql, 0.99):.1f} us "
+              f"(pooled reader, idx_product_barcode)")
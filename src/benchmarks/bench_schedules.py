@@ -0,0 +1,69 @@
+"""
+Schedule generation benchmark: amortize 100k contracts (math only), then
+regenerate all of their installments in the database after a fee change.
+
+    python src/benchmarks/bench_schedules.py [contracts]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db import schedules
+from db.schedules import amortize, amortize_batch, regenerate_schedules
+
+
+def _plans(n: int):
+    rnd = random.Random(42)
+    return [(rnd.randint(50_000, 30_000_000), rnd.choice([3, 6, 12, 18, 24, 36, 48, 60]),
+             rnd.choice([0, 900, 1500, 2400]), rnd.randint(0, 50_000)) for _ in range(n)]
+
+
+def _seed(n: int, plans):
+    now = db.now_ms()
+    with db.write_conn() as c:
+        c.executemany("""
+            INSERT INTO sale (id, type, status, total_cents, created_at, updated_at)
+            VALUES (?, 'instalment', 'completed', ?, ?, ?)
+        """, ((i, p[0], now, now) for i, p in enumerate(plans, 1)))
+        c.executemany("""
+            INSERT INTO offer (id, term_months, apr_bp, fees_cents, total_repay_cents, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 0, ?, ?)
+        """, ((i, p[1], p[2], p[3], now, now) for i, p in enumerate(plans, 1)))
+        c.executemany("INSERT INTO contract (id, sale_id, offer_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                      ((i, i, i, now, now) for i in range(1, n + 1)))
+        c.executemany("""
+            INSERT INTO schedule (id, contract_id, installments_count, start_date, generated_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, ((i, i, p[1], now, now, now, now) for i, p in enumerate(plans, 1)))
+
+
+def _rate(label: str, count: int, seconds: float):
+    print(f"{label:<32}{seconds:8.2f} s  {count / seconds:12.0f} schedules/s")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    plans = _plans(n)
+
+    start = time.perf_counter()
+    [amortize(*p) for p in plans]
+    _rate("amortize() per contract", n, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    amortize_batch(*zip(*plans))
+    _rate(f"amortize_batch() ({'numpy' if schedules.np is not None else 'pure Python'})",
+          n, time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        _seed(n, plans)
+        report = regenerate_schedules(fee_percent=15.0)
+        _rate("regenerate_schedules() + DB", report.regenerated, report.elapsed_ms / 1000)
+        print(f"installments written: {report.installments_written}")
+        db.get_manager().close()
@@ -0,0 +1,86 @@
+"""
+Startup benchmark for HomePage: launches the app in fresh processes and
+records import time, window construction and time to first paint.
+
+The first launch is reported as "cold" (nothing in the OS file cache from
+this run yet); the rest are "warm". Runs headless by default.
+
+    python src/benchmarks/bench_startup.py [launches]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Runs inside the child process; all times are wall-clock seconds since spawn
+CHILD = r"""
+import sys, time, json
+spawn = float(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+import db
+db.configure(sys.argv[3])   # a throwaway database, set up as __main__ does
+db.init_db()
+from PySide6.QtCore import QObject, QEvent, QTimer
+from PySide6.QtWidgets import QApplication
+
+app = QApplication([])
+t_app = time.time()
+from my_project.main import HomePage
+t_import = time.time()
+
+class FirstPaint(QObject):
+    at = None
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.at is None:
+            self.at = time.time()
+            QTimer.singleShot(0, app.quit)
+        return False
+
+first_paint = FirstPaint()
+app.installEventFilter(first_paint)
+window = HomePage()
+t_built = time.time()
+window.show()
+QTimer.singleShot(15000, app.quit)
+app.exec()
+print(json.dumps({
+    "qapp": t_app - spawn,
+    "import": t_import - spawn,
+    "built": t_built - spawn,
+    "first_paint": (first_paint.at or float("nan")) - spawn,
+    "heavy_modules": [m for m in ("PIL", "reportlab", "openpyxl") if m in sys.modules],
+}))
+"""
+
+
+def launch() -> dict:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, repr(time.time()), os.path.join(ROOT, "src"),
+             os.path.join(tmp, "app.db")],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _row(label: str, runs):
+    cols = [statistics.median(r[k] for r in runs) * 1000 for k in ("qapp", "import", "built", "first_paint")]
+    print(f"{label:<6}" + "".join(f"{c:12.1f}" for c in cols))
+
+
+if __name__ == "__main__":
+    launches = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    runs = [launch() for _ in range(max(2, launches))]
+    print(f"{'ms':<6}{'QApp':>12}{'imports':>12}{'HomePage':>12}{'1st paint':>12}")
+    _row("cold", runs[:1])
+    _row("warm", runs[1:])
+    heavy = sorted({m for r in runs for m in r["heavy_modules"]})
+    if heavy:
+        print("WARNING: loaded before first paint:", ", ".join(heavy))
@@ -0,0 +1,59 @@
+"""
+Delta sync between a head office and a branch: the first full sync, then a
+typical day (1% of installments paid, a few new contracts), compared with
+copying the whole database file.
+
+    python src/benchmarks/bench_sync.py [contracts]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db import sync
+from db.connection import ConnectionManager
+from db.migrate import migrate
+from bench_payments import _contracts
+
+
+def _report(label, r):
+    print(f"{label:<14}: {r.changes:8,} changes, {r.frames:5} frames, {r.bytes / 1e6:7.2f} MB, "
+          f"{r.elapsed_ms:7.0f} ms ({r.changes / (r.elapsed_ms / 1000) if r.elapsed_ms else 0:7.0f}/s)")
+
+
+if __name__ == "__main__":
+    contracts = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        hq = db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        start = time.perf_counter()
+        _contracts(contracts)
+        print(f"seed {contracts} contracts (change capture on): {(time.perf_counter() - start) * 1000:.0f} ms")
+        branch = ConnectionManager(Path(tmp) / "branch.db")
+        migrate(branch)
+        peer = sync.LocalPeer(branch)
+
+        session = sync.sync(peer)
+        _report("initial push", session.pushed)
+
+        now = db.now_ms()
+        with hq.write() as c:
+            c.execute("""
+                UPDATE installment SET paid_cents = due_cents, status = 'paid', paid_at = ?, updated_at = ?,
+                                       version = version + 1
+                WHERE id % 100 = 0
+            """, (now, now))
+        with branch.write() as c:
+            c.executemany("INSERT INTO customer (branch_id, full_name, created_at, updated_at) VALUES (2, ?, ?, ?)",
+                          [(f"Walk-in {i}", now, now) for i in range(200)])
+        session = sync.sync(peer)
+        _report("daily pull", session.pulled)
+        _report("daily push", session.pushed)
+
+        branch.close()
+        hq.close()   # last connection out checkpoints the WAL into app.db
+        size = (Path(tmp) / "app.db").stat().st_size
+        print(f"whole app.db  : {size / 1e6:7.2f} MB")
@@ -0,0 +1,82 @@
+"""
+Taxonomy filter on a large catalog: "Electronics > TV > Samsung" through
+taxon_member against a LIKE scan of the free-text columns, plus the cost
+the count triggers add to stock writes.
+
+    python src/benchmarks/bench_taxonomy.py [products]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db import taxonomy
+from db.stock import move_stock, receive_delivery
+
+ROOTS = ("Electronics", "Appliances", "Furniture", "Phones", "Computers", "Kitchen", "Garden", "Toys")
+CHILDREN = ("TV", "Audio", "Cables", "Accessories", "Lighting", "Storage")
+LEAVES = ("Basic", "Premium", "Pro", "Outlet")
+BRANDS = ("Samsung", "LG", "Sony", "Condor", "Iris", "Brandt", "Haier", "TCL", "Philips", "Bosch")
+
+
+def _timed(fn, runs=50):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return result, statistics.median(times)
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(Path(tmp) / "app.db")
+        db.init_db()
+        now = db.now_ms()
+        leaves = [f"{r} > {ch} > {leaf}" for r in ROOTS for ch in CHILDREN for leaf in LEAVES]
+        leaf_ids = [taxonomy.add_taxon("category", path) for path in leaves]
+        brand_ids = [taxonomy.add_taxon("brand", b) for b in BRANDS]
+
+        t0 = time.perf_counter()
+        with db.write_conn() as c:
+            c.executemany("""
+                INSERT INTO product (id, sku, name, brand, category, price_ttc_cents, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 1000, ?, ?)
+            """, [(i, f"SKU{i:07d}", f"Product {i}", BRANDS[i % len(BRANDS)], leaves[i * 7 % len(leaves)],
+                   now, now) for i in range(1, products + 1)])
+            c.executemany("INSERT INTO product_taxon (product_id, taxon_id) VALUES (?, ?)",
+                          [(i, t) for i in range(1, products + 1)
+                           for t in (leaf_ids[i * 7 % len(leaves)], brand_ids[i % len(BRANDS)])])
+        print(f"seed          : {products} products, {2 * products} links in {time.perf_counter() - t0:.1f} s")
+        receive_delivery([(i, 1 + i % 9) for i in range(1, products + 1)])
+
+        ids, ms = _timed(lambda: taxonomy.filter_products("Electronics > TV > Samsung", limit=100))
+        print(f"taxonomy page : {len(ids)} ids in {ms:.3f} ms  (median of 50)")
+        n, ms = _timed(lambda: taxonomy.node("category", "Electronics > TV"))
+        print(f"node counts   : {n.products} products, {n.stock_qty} units in {ms:.3f} ms")
+        with db.read_conn() as c:
+            rows, ms = _timed(lambda: c.execute("""
+                SELECT id FROM product WHERE is_active = 1 AND brand = 'Samsung'
+                  AND (category = 'Electronics > TV' OR category LIKE 'Electronics > TV > %')
+                ORDER BY id LIMIT 100
+            """).fetchall(), runs=10)
+            print(f"string scan   : {len(rows)} ids in {ms:.3f} ms  (median of 10)")
+            total, ms = _timed(lambda: c.execute("""
+                SELECT COUNT(*), SUM(s.qty) FROM product p JOIN stock s ON s.product_id = p.id
+                WHERE p.is_active = 1 AND (p.category = 'Electronics > TV' OR p.category LIKE 'Electronics > TV > %')
+            """).fetchone(), runs=10)
+            print(f"string count  : {total[0]} products, {total[1]} units in {ms:.3f} ms")
+
+        for label, product_id in (("linked", 1), ("unlinked", None)):
+            if product_id is None:
+                with db.write_conn() as c:
+                    product_id = c.execute("INSERT INTO product (sku, name, price_ttc_cents, created_at, updated_at) "
+                                           "VALUES ('bare', 'Bare', 1, ?, ?)", (now, now)).lastrowid
+            _, ms = _timed(lambda: move_stock(product_id, "receive", 1), runs=200)
+            print(f"move_stock    : {ms:.3f} ms per call ({label} product)")
+        print(f"check         : {taxonomy.check_taxonomy().drift == []} drift-free")
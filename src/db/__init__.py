@@ -0,0 +1,51 @@
+import threading
+import time
+from pathlib import Path
+
+from .connection import ConnectionManager
+
+_DB = Path("app.db")
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> ConnectionManager:
+    """Shared connection manager for the app database (opened lazily)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager(_DB)
+    return _manager
+
+
+def configure(path, **options) -> ConnectionManager:
+    """Point the shared manager at another database file (benchmarks, tools)."""
+    global _DB, _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+        _DB = Path(path)
+        _manager = ConnectionManager(_DB, **options)
+    return _manager
+
+
+def read_conn():
+    """``with read_conn() as c:`` -> pooled read-only connection for this thread."""
+    return get_manager().read()
+
+
+def write_conn():
+    """``with write_conn() as c:`` -> the writer, inside one transaction."""
+    return get_manager().write()
+
+
+def now_ms() -> int:
+    # Timestamps in the schema are Unix milliseconds
+    return int(time.time() * 1000)
+
+
+def init_db():
+    """Apply any pending schema migrations (no DDL when already current)."""
+    from .migrate import migrate
+    return migrate()
@@ -0,0 +1,161 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from . import get_manager, now_ms, records
+
+DEFAULT_COOLDOWN_MS = 4 * 60 * 60 * 1000
+
+_ITEMS = """
+    SELECT l.product_id, l.branch_id, p.sku, p.name, l.qty, l.threshold, l.since
+    FROM stock_low l JOIN product p ON p.id = l.product_id
+"""
+# Same statements as the stock_low triggers in migrations/0013_low_stock.sql, over every row
+_RECHECK = (
+    """
+    INSERT INTO stock_low (product_id, branch_id, qty, threshold, since)
+      SELECT product_id, branch_id, qty, threshold, ? FROM stock_threshold WHERE qty <= threshold
+      ON CONFLICT (product_id, branch_id) DO UPDATE SET qty = excluded.qty, threshold = excluded.threshold
+    """,
+    """
+    DELETE FROM stock_low WHERE NOT EXISTS (
+      SELECT 1 FROM stock_threshold t WHERE t.product_id = stock_low.product_id
+        AND t.branch_id = stock_low.branch_id AND t.qty <= t.threshold)
+    """,
+)
+
+
+@dataclass
+class LowStockItem:
+    product_id: int
+    branch_id: int
+    sku: str
+    name: str
+    qty: int
+    threshold: int
+    since: int           # epoch ms the row went low
+
+
+@dataclass
+class LowStockCheckReport:
+    rows_checked: int = 0
+    missing: List[Tuple[int, int]] = field(default_factory=list)   # (product, branch) low but not listed
+    extra: List[Tuple[int, int]] = field(default_factory=list)     # listed but not low
+    stale: List[Tuple[int, int]] = field(default_factory=list)     # listed with an old qty or threshold
+    fixed: bool = False
+    elapsed_ms: float = 0.0
+
+
+def low_stock(branch_id: Optional[int] = None, manager=None) -> List[LowStockItem]:
+    """Everything currently at or below its threshold, emptiest first. Reads stock_low only."""
+    manager = manager or get_manager()
+    where, params = ("WHERE l.branch_id = ?", (branch_id,)) if branch_id is not None else ("", ())
+    with manager.read() as c:
+        return [LowStockItem(*r) for r in c.execute(f"{_ITEMS} {where} ORDER BY l.qty, p.sku", params)]
+
+
+def get_low_stock_threshold(manager=None) -> int:
+    manager = manager or get_manager()
+    with manager.read() as c:
+        return int(c.execute("SELECT value FROM app_meta WHERE key = 'low_stock_threshold'").fetchone()[0])
+
+
+def set_low_stock_threshold(threshold: int, manager=None) -> int:
+    """
+    Change the global threshold (Settings > Inventory) and re-check every
+    stock row against it. A no-op when unchanged. Returns the number of
+    rows now low.
+    """
+    manager = manager or get_manager()
+    with manager.write() as c:
+        current = c.execute("SELECT value FROM app_meta WHERE key = 'low_stock_threshold'").fetchone()
+        if current is None or int(current[0]) != int(threshold):
+            c.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES ('low_stock_threshold', ?)",
+                      (str(int(threshold)),))
+            ts = now_ms()
+            c.execute(_RECHECK[0], (ts,))
+            c.execute(_RECHECK[1])
+        return c.execute("SELECT COUNT(*) FROM stock_low").fetchone()[0]
+
+
+def set_product_threshold(product_id: int, threshold: Optional[int], manager=None) -> int:
+    """
+    Override the threshold for one product (None: back to the global one,
+    negative: never alert). Its stock rows are re-checked by trigger.
+    Returns the product's new version.
+    """
+    manager = manager or get_manager()
+    with manager.write() as c:
+        row = c.execute("SELECT version FROM product WHERE id = ?", (product_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown product {product_id}")
+        return records.update("product", product_id, row[0], manager=manager, low_stock_threshold=threshold)
+
+
+def check_low_stock(fix: bool = False, manager=None) -> LowStockCheckReport:
+    """Compare stock_low with a fresh evaluation of every stock row; ``fix`` re-checks everything."""
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = LowStockCheckReport()
+    with manager.read() as c:
+        listed = {(p, b): (q, t) for p, b, q, t in c.execute(
+            "SELECT product_id, branch_id, qty, threshold FROM stock_low")}
+        expected = {(p, b): (q, t) for p, b, q, t in c.execute(
+            "SELECT product_id, branch_id, qty, threshold FROM stock_threshold WHERE qty <= threshold")}
+        report.rows_checked = c.execute("SELECT COUNT(*) FROM stock").fetchone()[0]
+    report.missing = sorted(expected.keys() - listed.keys())
+    report.extra = sorted(listed.keys() - expected.keys())
+    report.stale = sorted(k for k in listed.keys() & expected.keys() if listed[k] != expected[k])
+    if fix and (report.missing or report.extra or report.stale):
+        with manager.write() as c:
+            c.execute(_RECHECK[0], (now_ms(),))
+            c.execute(_RECHECK[1])
+        report.fixed = True
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+class LowStockAlerts:
+    """
+    Turns the low-stock set into notifications without spamming.
+
+    Each ``poll()`` returns the rows that went low since the previous one
+    (a range read on stock_low.since), so a caller polling every minute
+    sends at most one batch per minute. A row that stays low is reported
+    once, however often it is sold down further; one that is restocked and
+    goes low again within ``cooldown_ms`` of its last report stays quiet.
+    The first poll reports everything currently low.
+    """
+
+    def __init__(self, cooldown_ms: int = DEFAULT_COOLDOWN_MS, manager=None):
+        self.manager = manager or get_manager()
+        self.cooldown_ms = cooldown_ms
+        self._watermark = 0                                   # highest since seen
+        self._episodes: Dict[Tuple[int, int], int] = {}       # (product, branch) -> since already handled
+        self._notified: Dict[Tuple[int, int], int] = {}       # (product, branch) -> last report (ms)
+        self._pruned_at = 0
+
+    def poll(self, now: Optional[int] = None) -> List[LowStockItem]:
+        now = now if now is not None else now_ms()
+        with self.manager.read() as c:
+            # >=: rows from another commit may share the last millisecond
+            rows = [LowStockItem(*r) for r in c.execute(
+                f"{_ITEMS} WHERE l.since >= ? ORDER BY l.since, p.sku", (self._watermark,))]
+        fresh = []
+        for item in rows:
+            key = (item.product_id, item.branch_id)
+            self._watermark = max(self._watermark, item.since)
+            if self._episodes.get(key) == item.since:
+                continue
+            self._episodes[key] = item.since
+            last = self._notified.get(key)
+            if last is not None and now - last < self.cooldown_ms:
+                continue
+            self._notified[key] = now
+            fresh.append(item)
+        if len(self._episodes) > len(rows):
+            self._episodes = {k: s for k, s in self._episodes.items() if s >= self._watermark}
+        if now - self._pruned_at >= self.cooldown_ms:
+            self._notified = {k: t for k, t in self._notified.items() if now - t < self.cooldown_ms}
+            self._pruned_at = now
+        return fresh
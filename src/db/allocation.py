@@ -0,0 +1,251 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from . import audit, get_manager, now_ms
+from .payments import CHANNELS, OPEN_STATUSES
+from .records import _record
+
+
+@dataclass
+class AllocationLine:
+    installment_id: int
+    number: int
+    fees_cents: int
+    interest_cents: int
+    principal_cents: int
+    paid_after: int
+    status_after: str
+
+    @property
+    def total(self) -> int:
+        return self.fees_cents + self.interest_cents + self.principal_cents
+
+
+@dataclass
+class Allocation:
+    contract_id: int
+    amount_cents: int
+    lines: List[AllocationLine] = field(default_factory=list)
+    carry_over_cents: int = 0          # left after every open installment was covered
+    payment_id: Optional[int] = None
+    duplicate: bool = False            # idempotency key already recorded; nothing applied
+    from_cache: bool = False
+
+    @property
+    def applied_cents(self) -> int:
+        return sum(line.total for line in self.lines)
+
+    @property
+    def fees_cents(self) -> int:
+        return sum(line.fees_cents for line in self.lines)
+
+    @property
+    def interest_cents(self) -> int:
+        return sum(line.interest_cents for line in self.lines)
+
+    @property
+    def principal_cents(self) -> int:
+        return sum(line.principal_cents for line in self.lines)
+
+
+class _Stale(Exception):
+    """A cached installment no longer matches its row version."""
+
+
+# Cached open installment: [id, number, due, paid, principal, interest, fees, status, version]
+_ID, _NUMBER, _DUE, _PAID, _PRINCIPAL, _INTEREST, _FEES, _STATUS, _VERSION = range(9)
+
+
+def _split(rows: List[list], amount: int):
+    """
+    Spread ``amount`` over ``rows`` oldest first. Inside one installment money
+    goes to fees, then interest, then principal; what is already paid is
+    assumed to have followed the same order, so the split is derived from
+    paid_cents alone. Returns (lines, carry_over).
+    """
+    lines = []
+    for row in rows:
+        if not amount:
+            break
+        paid = row[_PAID]
+        remaining = row[_DUE] - paid
+        if remaining <= 0:
+            continue
+        part = min(amount, remaining)
+        amount -= part
+        split = []
+        before, take = paid, part
+        for size in (row[_FEES], row[_INTEREST], row[_PRINCIPAL]):
+            covered = min(before, size)           # already paid of this component
+            before -= covered
+            portion = min(take, size - covered)
+            take -= portion
+            split.append(portion)
+        split[2] += take                          # rounding: due may exceed the sum of the parts
+        status = "paid" if paid + part >= row[_DUE] else row[_STATUS]
+        lines.append(AllocationLine(row[_ID], row[_NUMBER], split[0], split[1], split[2], paid + part, status))
+    return lines, amount
+
+
+class AllocationEngine:
+    """
+    Allocates payments across a contract's open installments, keeping the
+    open rows of recently used contracts in an LRU cache.
+
+    Each cached row carries its ``version``. Writes are conditional
+    (``WHERE id = ? AND version = ?``), so a change made elsewhere (status
+    refresh, regeneration, bulk ingestion) fails the write, the transaction
+    rolls back and the contract is reloaded once inside the retry. A warm
+    payment therefore costs no schedule query at all.
+
+    :param capacity: contracts kept in memory (0 disables the cache)
+    """
+
+    def __init__(self, manager=None, capacity: int = 512):
+        self.manager = manager
+        self.capacity = capacity
+        self._cache: "OrderedDict[int, List[list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bound = None   # manager the cached rows came from
+        self.hits = self.misses = self.stale = 0
+
+    # ---------- Public API ----------
+    def preview(self, contract_id: int, amount_cents: int) -> Allocation:
+        """Breakdown of a payment without writing anything."""
+        manager = self._manager()
+        rows, cached = self._rows(contract_id)
+        if rows is None:
+            with manager.read() as c:
+                rows = _load(c, contract_id)
+        lines, carry = _split([list(r) for r in rows], amount_cents)
+        return Allocation(contract_id, amount_cents, lines, carry, from_cache=cached)
+
+    def apply(self, contract_id: int, amount_cents: int, channel: str = "cash",
+              received_at: Optional[int] = None, idempotency_key: Optional[str] = None,
+              branch_id: int = 1, provider_ref: Optional[str] = None) -> Allocation:
+        """
+        Record a succeeded payment and allocate it, in one transaction.
+        Replaying an ``idempotency_key`` returns ``duplicate=True`` and
+        changes nothing.
+        """
+        if amount_cents <= 0:
+            raise ValueError("amount_cents must be positive")
+        if channel not in CHANNELS:
+            raise ValueError(f"unknown channel {channel!r}")
+        manager = self._manager()
+        ts = now_ms()
+        received_at = received_at or ts
+
+        for attempt in range(2):
+            rows, cached = self._rows(contract_id) if attempt == 0 else (None, False)
+            try:
+                with manager.write() as c:
+                    if rows is None:
+                        rows = _load(c, contract_id)
+                    payment_id = c.execute("""
+                        INSERT INTO payment (branch_id, contract_id, channel, provider_ref, amount_cents,
+                                             status, received_at, idempotency_key, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, 'succeeded', ?, ?, ?, ?)
+                        ON CONFLICT(idempotency_key) DO NOTHING
+                        RETURNING id
+                    """, (branch_id, contract_id, channel, provider_ref, amount_cents, received_at,
+                          idempotency_key, ts, ts)).fetchone()
+                    if payment_id is None:
+                        return Allocation(contract_id, amount_cents, duplicate=True, from_cache=cached)
+                    payment_id = payment_id[0]
+
+                    work = [list(r) for r in rows]
+                    lines, carry = _split(work, amount_cents)
+                    by_id = {r[_ID]: r for r in work}
+                    cur = c.executemany("""
+                        UPDATE installment
+                        SET paid_cents = ?, status = ?, paid_at = ?, updated_at = ?, version = version + 1
+                        WHERE id = ? AND version = ?
+                    """, [(l.paid_after, l.status_after, received_at if l.status_after == "paid" else None,
+                           ts, l.installment_id, by_id[l.installment_id][_VERSION]) for l in lines])
+                    if cur.rowcount != len(lines):
+                        raise _Stale()
+                    if lines:
+                        c.execute("UPDATE payment SET installment_id = ? WHERE id = ?",
+                                  (lines[0].installment_id, payment_id))
+                    audit.record("create", "payment", payment_id,
+                                 {"contract_id": contract_id, "amount_cents": amount_cents, "channel": channel,
+                                  "installments": [l.installment_id for l in lines]}, manager=manager)
+            except _Stale:
+                self.stale += 1
+                _record("conflict", "installment", contract_id=contract_id)
+                _record("retry", "installment", contract_id=contract_id, attempt=attempt + 1)
+                self.invalidate(contract_id)
+                continue
+
+            for line in lines:
+                row = by_id[line.installment_id]
+                row[_PAID], row[_STATUS], row[_VERSION] = line.paid_after, line.status_after, row[_VERSION] + 1
+            self._store(contract_id, [r for r in work if r[_STATUS] in OPEN_STATUSES and r[_PAID] < r[_DUE]])
+            if lines:
+                _record("update", "installment", contract_id=contract_id, rows=len(lines))
+            return Allocation(contract_id, amount_cents, lines, carry, payment_id, from_cache=cached)
+        _record("gave_up", "installment", contract_id=contract_id, attempts=2)
+        raise RuntimeError(f"Contract {contract_id} kept changing during allocation")
+
+    def invalidate(self, contract_id: Optional[int] = None):
+        with self._lock:
+            if contract_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(contract_id, None)
+
+    # ---------- Internals ----------
+    def _manager(self):
+        manager = self.manager or get_manager()
+        if manager is not self._bound:   # db.configure() switched databases: ids mean something else now
+            self.invalidate()
+            self._bound = manager
+        return manager
+
+    def _rows(self, contract_id: int):
+        with self._lock:
+            rows = self._cache.get(contract_id)
+            if rows is None:
+                self.misses += 1
+                return None, False
+            self._cache.move_to_end(contract_id)
+            self.hits += 1
+            return rows, True
+
+    def _store(self, contract_id: int, rows: List[list]):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._cache[contract_id] = rows
+            self._cache.move_to_end(contract_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+
+def _load(c, contract_id: int) -> List[list]:
+    marks = ",".join("?" * len(OPEN_STATUSES))
+    return [list(r) for r in c.execute(f"""
+        SELECT i.id, i.number, i.due_cents, i.paid_cents, i.principal_cents, i.interest_cents,
+               i.fees_cents, i.status, i.version
+        FROM schedule sc
+        CROSS JOIN installment i ON i.schedule_id = sc.id
+        WHERE sc.contract_id = ? AND i.status IN ({marks}) AND i.paid_cents < i.due_cents
+        ORDER BY i.number
+    """, (contract_id,) + OPEN_STATUSES)]
+
+
+_engine: Optional[AllocationEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AllocationEngine:
+    """App-wide engine on the shared connection manager."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AllocationEngine()
+    return _engine
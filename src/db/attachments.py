@@ -0,0 +1,365 @@
+import hashlib
+import io
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from . import get_manager, now_ms
+
+CHUNK_SIZE = 1024 * 1024
+KEY_SIZE = 32                 # AES-256
+_IV_SIZE = 12                 # GCM nonce
+_TAG_SIZE = 16
+PHOTO_PREFIX = "attachment:"  # customer.photo_url = "attachment:<sha256>"
+
+
+class AttachmentError(RuntimeError):
+    """Missing, corrupted or unreadable attachment."""
+
+
+@dataclass
+class Attachment:
+    id: int
+    kind: str
+    sha256: str
+    size: int
+    path: str                      # blob path relative to the store root
+    iv: Optional[bytes] = None     # set when the blob is encrypted
+    deduplicated: bool = False     # put() found the same content already stored
+
+    @property
+    def encrypted(self) -> bool:
+        return self.iv is not None
+
+
+def default_store_dir() -> Path:
+    return get_manager().path.resolve().parent / "attachments"
+
+
+def default_key_path() -> Path:
+    return get_manager().path.resolve().parent / "attachments.key"
+
+
+def create_key(path) -> bytes:
+    """Write a new random key to ``path`` (owner read/write only)."""
+    key = secrets.token_bytes(KEY_SIZE)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _kind(head: bytes) -> str:
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith((b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"BM")) or head[8:12] == b"WEBP":
+        return "image"
+    return "binary"
+
+
+def _cipher(key: bytes, iv: bytes, tag: Optional[bytes] = None):
+    # Optional dependency, only imported when a key is configured
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    return Cipher(algorithms.AES(key), modes.GCM(iv, tag))
+
+
+def _source(source):
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb")
+    return nullcontext(source)   # already an open binary file; the caller closes it
+
+
+class AttachmentStore:
+    """
+    Content-addressed files under ``root``: every distinct content is stored
+    once, as ``blobs/ab/cd/<sha256>``, with one ``attachment`` row. Storing
+    the same contract PDF or ID photo again returns the existing row.
+
+    Files are hashed (and encrypted, with a ``key``) ``chunk_size`` bytes at
+    a time while being copied to a temp file, never read whole. Encryption is
+    AES-256-GCM with a random nonce per blob (``attachment.encryption_iv``)
+    and the tag appended to the blob. Reads decrypt in chunks and check the
+    SHA-256 at the end, so a damaged blob raises instead of returning bad data.
+
+    Image thumbnails are made on first request and cached in ``thumbs/``
+    (encrypted too when the store is), so lists show photos without decoding
+    full-resolution images again; PIL is only imported on a cache miss.
+    """
+
+    def __init__(self, root=None, key: Optional[bytes] = None, manager=None, chunk_size: int = CHUNK_SIZE):
+        if key is not None and len(key) != KEY_SIZE:
+            raise ValueError(f"Attachment key must be {KEY_SIZE} bytes")
+        self.root = Path(root) if root else default_store_dir()
+        self.key = key
+        self.manager = manager
+        self.chunk_size = chunk_size
+
+    def _manager(self):
+        return self.manager or get_manager()
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / "blobs" / sha256[:2] / sha256[2:4] / sha256
+
+    # ---------- Writing ----------
+    def put(self, source: Union[str, os.PathLike, bytes, io.BufferedIOBase], kind: Optional[str] = None) -> Attachment:
+        """Store a file path, bytes or binary stream; returns its attachment row."""
+        (self.root / "tmp").mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root / "tmp")
+        iv = secrets.token_bytes(_IV_SIZE) if self.key else None
+        encryptor = _cipher(self.key, iv).encryptor() if self.key else None
+        digest = hashlib.sha256()
+        size, head = 0, b""
+        try:
+            with _source(source) as src, os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = src.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if not size:
+                        head = chunk[:16]
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(encryptor.update(chunk) if encryptor else chunk)
+                if encryptor:
+                    out.write(encryptor.finalize())
+                    out.write(encryptor.tag)
+                out.flush()
+                os.fsync(out.fileno())
+            sha = digest.hexdigest()
+            dest = self.blob_path(sha)
+            rel = dest.relative_to(self.root).as_posix()
+
+            # Under the write lock: two puts of the same content cannot both
+            # move their (differently encrypted) temp file into place.
+            with self._manager().write() as c:
+                row = c.execute("SELECT id, kind, size, encryption_iv FROM attachment WHERE sha256 = ?",
+                                (sha,)).fetchone()
+                if row and dest.exists():
+                    return Attachment(row[0], row[1], sha, row[2], rel,
+                                      bytes.fromhex(row[3]) if row[3] else None, deduplicated=True)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, dest)
+                iv_hex = iv.hex() if iv else None
+                if row:   # row survived but the blob was lost: this copy replaces it
+                    c.execute("UPDATE attachment SET path = ?, encryption_iv = ? WHERE id = ?", (rel, iv_hex, row[0]))
+                    return Attachment(row[0], row[1], sha, size, rel, iv)
+                kind = kind or _kind(head)
+                att_id = c.execute("""
+                    INSERT INTO attachment (kind, path, sha256, size, encryption_iv, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (kind, rel, sha, size, iv_hex, now_ms())).lastrowid
+                return Attachment(att_id, kind, sha, size, rel, iv)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    # ---------- Reading ----------
+    def get(self, attachment_id: int) -> Attachment:
+        return self._row("id", attachment_id)
+
+    def by_sha(self, sha256: str) -> Attachment:
+        return self._row("sha256", sha256)
+
+    def _row(self, column: str, value) -> Attachment:
+        with self._manager().read() as c:
+            row = c.execute(f"SELECT id, kind, sha256, size, path, encryption_iv FROM attachment WHERE {column} = ?",
+                            (value,)).fetchone()
+        if row is None:
+            raise AttachmentError(f"No attachment with {column} {value!r}")
+        return Attachment(*row[:5], bytes.fromhex(row[5]) if row[5] else None)
+
+    def iter_chunks(self, att: Union[int, Attachment]) -> Iterator[bytes]:
+        """Plain content in chunks; raises AttachmentError at the end if it does not hash right."""
+        att = att if isinstance(att, Attachment) else self.get(att)
+        path = self.root / att.path
+        digest = hashlib.sha256()
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            raise AttachmentError(f"Blob of attachment {att.id} is missing: {path}") from None
+        with f:
+            decryptor = None
+            remaining = os.fstat(f.fileno()).st_size
+            if att.encrypted:
+                if self.key is None:
+                    raise AttachmentError(f"Attachment {att.id} is encrypted and no key is configured")
+                remaining -= _TAG_SIZE
+                f.seek(remaining)
+                decryptor = _cipher(self.key, att.iv, f.read(_TAG_SIZE)).decryptor()
+                f.seek(0)
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                if decryptor:
+                    chunk = decryptor.update(chunk)
+                digest.update(chunk)
+                yield chunk
+            if decryptor:
+                try:
+                    decryptor.finalize()
+                except Exception as e:   # cryptography's InvalidTag
+                    raise AttachmentError(f"Attachment {att.id} failed authentication") from e
+        if digest.hexdigest() != att.sha256:
+            raise AttachmentError(f"Attachment {att.id} is corrupted (SHA-256 mismatch)")
+
+    def read_bytes(self, att: Union[int, Attachment]) -> bytes:
+        return b"".join(self.iter_chunks(att))
+
+    def export(self, att: Union[int, Attachment], dest) -> Path:
+        """Write the plain content to ``dest``; nothing is left behind if it fails verification."""
+        dest = Path(dest)
+        partial = dest.with_name(dest.name + ".partial")
+        try:
+            with open(partial, "wb") as out:
+                for chunk in self.iter_chunks(att):
+                    out.write(chunk)
+            os.replace(partial, dest)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        return dest
+
+    def verify(self, att: Union[int, Attachment]) -> bool:
+        try:
+            for _ in self.iter_chunks(att):
+                pass
+        except AttachmentError:
+            return False
+        return True
+
+    # ---------- Thumbnails ----------
+    def _seal(self, data: bytes) -> bytes:
+        if not self.key:
+            return data
+        iv = secrets.token_bytes(_IV_SIZE)
+        enc = _cipher(self.key, iv).encryptor()
+        return iv + enc.update(data) + enc.finalize() + enc.tag
+
+    def _unseal(self, data: bytes) -> bytes:
+        if not self.key:
+            return data
+        iv, body, tag = data[:_IV_SIZE], data[_IV_SIZE:-_TAG_SIZE], data[-_TAG_SIZE:]
+        dec = _cipher(self.key, iv, tag).decryptor()
+        return dec.update(body) + dec.finalize()
+
+    def thumbnail(self, att: Union[int, Attachment], size: int = 128) -> bytes:
+        """JPEG bytes of an image attachment, at most ``size`` px on each side."""
+        att = att if isinstance(att, Attachment) else self.get(att)
+        cache = self.root / "thumbs" / att.sha256[:2] / f"{att.sha256}-{size}.jpg"
+        try:
+            return self._unseal(cache.read_bytes())
+        except FileNotFoundError:
+            pass
+        if att.kind != "image":
+            raise AttachmentError(f"Attachment {att.id} is a {att.kind}, not an image")
+
+        from PIL import Image   # heavy import, only paid on a cache miss
+
+        source = io.BytesIO(self.read_bytes(att)) if att.encrypted else self.root / att.path
+        try:
+            with Image.open(source) as img:
+                img.draft("RGB", (size, size))   # JPEG: let the decoder scale down by up to 8x
+                img.thumbnail((size, size))
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=80)
+        except OSError as e:
+            raise AttachmentError(f"Attachment {att.id} is not a readable image: {e}") from e
+        data = buf.getvalue()
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_name(cache.name + ".tmp")
+        tmp.write_bytes(self._seal(data))
+        os.replace(tmp, cache)
+        return data
+
+    # ---------- Housekeeping ----------
+    def gc(self, tmp_max_age_s: float = 3600) -> int:
+        """
+        Delete blobs and thumbnails no attachment row refers to, and temp
+        files older than ``tmp_max_age_s`` (left by a crashed put(); younger
+        ones may belong to a put() still writing). The known hashes are read
+        and the blobs swept under the write lock, so a put() cannot move a
+        blob in and commit its row in between.
+        """
+        removed = 0
+        with self._manager().write() as c:
+            known = {r[0] for r in c.execute("SELECT sha256 FROM attachment")}
+            for folder, sha_of in (("blobs", lambda p: p.name), ("thumbs", lambda p: p.name.split("-")[0])):
+                for path in (self.root / folder).glob("*/**/*"):
+                    if path.is_file() and sha_of(path) not in known:
+                        path.unlink()
+                        removed += 1
+        cutoff = time.time() - tmp_max_age_s
+        for path in (self.root / "tmp").glob("*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass   # its put() finished meanwhile
+        return removed
+
+
+_store: Optional[AttachmentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> AttachmentStore:
+    """
+    App-wide store next to the database. Blobs are encrypted when
+    ``attachments.key`` exists there (see create_key); rows written
+    before that stay readable as plain blobs.
+    """
+    global _store
+    manager = get_manager()
+    with _store_lock:
+        if _store is None or _store.manager is not manager:
+            key_path = default_key_path()
+            key = key_path.read_bytes() if key_path.exists() else None
+            _store = AttachmentStore(default_store_dir(), key=key, manager=manager)
+        return _store
+
+
+# ------------------------------
+# Customer photos
+# ------------------------------
+def set_customer_photo(customer_id: int, source, store: Optional[AttachmentStore] = None) -> Attachment:
+    store = store or get_store()
+    att = store.put(source, kind="image")
+    with store._manager().write() as c:
+        c.execute("UPDATE customer SET photo_url = ?, updated_at = ?, version = version + 1 WHERE id = ?",
+                  (PHOTO_PREFIX + att.sha256, now_ms(), customer_id))
+    return att
+
+
+def customer_thumbnails(customer_ids: Iterable[int], size: int = 64,
+                        store: Optional[AttachmentStore] = None) -> Dict[int, bytes]:
+    """customer id -> JPEG thumbnail for those with a stored photo (broken ones are left out)."""
+    store = store or get_store()
+    ids = list(customer_ids)
+    if not ids:
+        return {}
+    with store._manager().read() as c:
+        rows = c.execute(f"""
+            SELECT c.id, a.id, a.kind, a.sha256, a.size, a.path, a.encryption_iv
+            FROM customer c JOIN attachment a ON a.sha256 = substr(c.photo_url, {len(PHOTO_PREFIX) + 1})
+            WHERE c.id IN ({",".join("?" * len(ids))}) AND c.photo_url LIKE '{PHOTO_PREFIX}%'
+        """, ids).fetchall()
+    out = {}
+    for customer_id, *att in rows:
+        try:
+            out[customer_id] = store.thumbnail(Attachment(*att[:5], bytes.fromhex(att[5]) if att[5] else None), size)
+        except AttachmentError:
+            continue
+    return out
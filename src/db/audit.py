@@ -0,0 +1,296 @@
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import get_manager, now_ms
+
+_COLUMNS = "id, actor_user_id, device_id, action, entity, entity_id, at, details_json"
+_INSERT = """
+    INSERT INTO audit_log (actor_user_id, device_id, action, entity, entity_id, at, details_json)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+# Same layout as the hot table so partitions can be queried with one SELECT
+_ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_log (
+  id INTEGER PRIMARY KEY,
+  actor_user_id INTEGER,
+  device_id TEXT,
+  action TEXT NOT NULL,
+  entity TEXT NOT NULL,
+  entity_id INTEGER,
+  at INTEGER NOT NULL,
+  details_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_audit_at ON audit_log(at);
+CREATE INDEX IF NOT EXISTS idx_audit_entity ON audit_log(entity, entity_id, at);
+"""
+
+
+def _row(action: str, entity: str, entity_id: Optional[int], details: Any,
+         actor_user_id: Optional[int], device_id: Optional[str], at: Optional[int]) -> tuple:
+    payload = None if details is None else json.dumps(details, separators=(",", ":"), default=str)
+    return actor_user_id, device_id, action, entity, entity_id, at or now_ms(), payload
+
+
+class AuditWriter:
+    """
+    Writes audit events without a commit of their own.
+
+    An event recorded inside ``write()`` is written just before that
+    transaction commits (``before_commit``), so it is exactly as durable as
+    the mutation it describes and disappears with it on rollback, at the
+    cost of one INSERT in a commit that happens anyway.
+
+    Standalone events (outside ``write()``, e.g. a login) go to an in-memory
+    buffer that a background thread writes with one ``executemany`` every
+    ``flush_interval`` seconds, or as soon as ``max_batch`` events are
+    waiting. They are durable once ``flush()`` returns; a crash loses at
+    most one interval of them.
+
+    ``durable=True`` inserts the event at once, into the caller's
+    transaction (or its own one outside ``write()``), so the caller can read
+    it back before committing.
+
+    :param device_id: stored on every event (e.g. the station name)
+    """
+
+    def __init__(self, manager=None, flush_interval: float = 1.0, max_batch: int = 500,
+                 device_id: Optional[str] = None):
+        self.manager = manager or get_manager()
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.device_id = device_id
+        self._buffer: List[tuple] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.inline = self.buffered = self.flushed = self.batches = self.failed_flushes = 0
+
+    # ---------- Public API ----------
+    def record(self, action: str, entity: str, entity_id: Optional[int] = None, details: Any = None,
+               actor_user_id: Optional[int] = None, at: Optional[int] = None, durable: bool = False):
+        row = _row(action, entity, entity_id, details, actor_user_id, self.device_id, at)
+        if durable:
+            with self.manager.write() as c:   # a savepoint when the caller is inside write()
+                c.execute(_INSERT, row)
+            self.inline += 1
+        elif self.manager.in_transaction():
+            self.manager.before_commit(lambda c: self._write_in_transaction(c, row))
+        else:
+            self._enqueue(row)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """
+        Write every buffered event now, in one transaction. Returns the number
+        written. On a database error the events stay buffered and it raises.
+        """
+        if self.manager.in_transaction():
+            raise RuntimeError("flush() inside write() would tie buffered events to that transaction")
+        with self._flush_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                with self.manager.write() as c:
+                    c.executemany(_INSERT, rows)
+            except sqlite3.Error:
+                with self._cond:
+                    self._buffer[:0] = rows   # keep order; retried on the next flush
+                    self.failed_flushes += 1
+                raise
+            self.flushed += len(rows)
+            self.batches += 1
+            return len(rows)
+
+    def close(self):
+        """Stop the background thread after a final flush."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    # ---------- Internals ----------
+    def _write_in_transaction(self, c, row: tuple):
+        c.execute(_INSERT, row)
+        self.inline += 1
+
+    def _enqueue(self, row: tuple):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Audit writer is closed")
+            self._buffer.append(row)
+            self.buffered += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.max_batch:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                closing = self._closed
+            if closing:
+                return   # close() does the final flush on its own thread
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass     # still buffered; the next tick tries again
+
+
+_writers: Dict[int, AuditWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(manager=None) -> AuditWriter:
+    """One writer per connection manager (the shared one by default)."""
+    manager = manager or get_manager()
+    with _writers_lock:
+        writer = _writers.get(id(manager))
+        if writer is None or writer.manager is not manager:
+            writer = _writers[id(manager)] = AuditWriter(manager)
+        return writer
+
+
+def record(action: str, entity: str, entity_id: Optional[int] = None, details: Any = None,
+           actor_user_id: Optional[int] = None, durable: bool = False, manager=None):
+    """Shortcut for ``get_writer(manager).record(...)``."""
+    get_writer(manager).record(action, entity, entity_id, details, actor_user_id, durable=durable)
+
+
+@atexit.register
+def _flush_all():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        try:
+            writer.close()
+        except (sqlite3.Error, RuntimeError):
+            pass   # database already gone (closed temp file, tests)
+
+
+# ------------------------------
+# Archival: one attached database per month
+# ------------------------------
+@dataclass
+class ArchiveReport:
+    rows: int = 0
+    partitions: List[Path] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+
+def default_archive_dir(manager=None) -> Path:
+    """``<db name>-audit/`` next to the database file."""
+    manager = manager or get_manager()
+    return manager.path.with_name(manager.path.stem + "-audit")
+
+
+def partitions(directory=None, manager=None) -> List[Path]:
+    directory = Path(directory) if directory else default_archive_dir(manager)
+    return sorted(directory.glob("audit-*.db")) if directory.is_dir() else []
+
+
+def _month_start(ms: int) -> datetime:
+    d = datetime.fromtimestamp(ms / 1000)
+    return datetime(d.year, d.month, 1)
+
+
+def _next_month(d: datetime) -> datetime:
+    return datetime(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def _copy_partition(hot: Path, part: Path, start: int, end: int, max_id: int):
+    # The partition is the main database and the hot file is attached read-only,
+    # so the only file written here is the partition; it is committed (and
+    # synced) before anything is deleted from the hot database. INSERT OR IGNORE
+    # on the original ids makes a rerun after a crash harmless.
+    conn = sqlite3.connect(part.resolve().as_uri(), uri=True, isolation_level=None)
+    try:
+        conn.executescript(_ARCHIVE_SCHEMA)
+        conn.execute("ATTACH DATABASE ? AS hot", (hot.resolve().as_uri() + "?mode=ro",))
+        conn.execute("BEGIN")
+        conn.execute(f"""
+            INSERT OR IGNORE INTO main.audit_log ({_COLUMNS})
+            SELECT {_COLUMNS} FROM hot.audit_log WHERE at >= ? AND at < ? AND id <= ?
+        """, (start, end, max_id))
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE hot")
+    finally:
+        conn.close()
+
+
+def archive(keep_days: int = 90, directory=None, manager=None) -> ArchiveReport:
+    """
+    Move audit rows older than ``keep_days`` out of the hot database into
+    monthly partitions ``audit-YYYY-MM.db`` (local time) under ``directory``,
+    so the table the app writes to stays small. Each month is copied and
+    committed in its partition first, then deleted from the hot table.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = ArchiveReport()
+    directory = Path(directory) if directory else default_archive_dir(manager)
+    cutoff = now_ms() - keep_days * 86_400_000
+    with manager.read() as c:
+        oldest, max_id = c.execute("SELECT MIN(at), MAX(id) FROM audit_log WHERE at < ?", (cutoff,)).fetchone()
+    if oldest is None:
+        return report
+
+    directory.mkdir(parents=True, exist_ok=True)
+    month = _month_start(oldest)
+    while int(month.timestamp() * 1000) < cutoff:
+        start = int(month.timestamp() * 1000)
+        following = _next_month(month)
+        end = min(int(following.timestamp() * 1000), cutoff)
+        with manager.read() as c:
+            present = c.execute("SELECT 1 FROM audit_log WHERE at >= ? AND at < ? AND id <= ? LIMIT 1",
+                                (start, end, max_id)).fetchone()
+        if present:
+            part = directory / f"audit-{month:%Y-%m}.db"
+            _copy_partition(manager.path, part, start, end, max_id)
+            with manager.write() as c:
+                report.rows += c.execute("DELETE FROM audit_log WHERE at >= ? AND at < ? AND id <= ?",
+                                         (start, end, max_id)).rowcount
+            report.partitions.append(part)
+        month = following
+
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def history(entity: str, entity_id: int, directory=None, manager=None) -> List[Dict[str, Any]]:
+    """Every event for one row, archived partitions included, oldest first."""
+    manager = manager or get_manager()
+    names = _COLUMNS.split(", ")
+    sql = f"SELECT {_COLUMNS} FROM audit_log WHERE entity = ? AND entity_id = ? ORDER BY at, id"
+    rows = []
+    for part in partitions(directory, manager):
+        conn = sqlite3.connect(part.resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            rows += conn.execute(sql, (entity, entity_id)).fetchall()
+        finally:
+            conn.close()
+    with manager.read() as c:
+        rows += c.execute(sql, (entity, entity_id)).fetchall()
+    out = [dict(zip(names, r)) for r in rows]
+    for event in out:
+        if event["details_json"] is not None:
+            event["details"] = json.loads(event["details_json"])
+    return out
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from . import get_manager, now_ms
+
+CHUNK_SIZE = 256 * 1024   # multiple of every SQLite page size, so pages never straddle chunks
+
+
+class BackupError(RuntimeError):
+    """A backup set is incomplete or does not match its manifest."""
+
+
+@dataclass
+class BackupReport:
+    manifest: Path
+    db_bytes: int = 0
+    chunks: int = 0
+    new_chunks: int = 0
+    bytes_written: int = 0   # compressed bytes of new chunks + manifest
+    elapsed_ms: float = 0.0
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.db_bytes / 1e6 / (self.elapsed_ms / 1000) if self.elapsed_ms else 0.0
+
+
+@dataclass
+class RestoreReport:
+    path: Path
+    db_bytes: int = 0
+    integrity: List[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.integrity == ["ok"]
+
+
+@dataclass
+class PruneReport:
+    kept: int = 0
+    removed_manifests: int = 0
+    removed_chunks: int = 0
+    bytes_freed: int = 0
+
+
+# ------------------------------
+# Layout: <backup_dir>/manifests/backup-<ms>.json + <backup_dir>/chunks/ab/<sha256>
+# ------------------------------
+def default_backup_dir() -> Path:
+    return get_manager().path.resolve().parent / "backups"
+
+
+def _chunk_path(root: Path, digest: str) -> Path:
+    return root / "chunks" / digest[:2] / digest
+
+
+def list_backups(backup_dir) -> List[Path]:
+    """Manifests in ``backup_dir``, oldest first."""
+    folder = Path(backup_dir) / "manifests"
+    return sorted(folder.glob("backup-*.json"), key=lambda p: int(p.stem.split("-")[1]))
+
+
+def _load(manifest) -> dict:
+    with open(manifest, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ------------------------------
+# Backup
+# ------------------------------
+def backup(backup_dir=None, pages_per_step: int = 256, sleep: float = 0.002,
+           chunk_size: int = CHUNK_SIZE, progress: Optional[Callable[[int, int], None]] = None,
+           manager=None) -> BackupReport:
+    """
+    Take a consistent copy with the online backup API and store it as
+    content-addressed, zlib-compressed chunks plus a JSON manifest.
+
+    The copy is made ``pages_per_step`` pages at a time with a short sleep in
+    between, from a read transaction held open for the whole run: the app
+    keeps writing (WAL) and the backup never restarts. The copy is then cut
+    into fixed ``chunk_size`` pieces; a chunk whose hash is already in the
+    store is not written again, so a daily backup of a mostly unchanged
+    database costs roughly the changed pages.
+
+    :param progress: ``progress(remaining_pages, total_pages)`` after each step
+    """
+    manager = manager or get_manager()
+    root = Path(backup_dir) if backup_dir else default_backup_dir()
+    started = time.perf_counter()
+    created = now_ms()
+    (root / "manifests").mkdir(parents=True, exist_ok=True)
+
+    fd, snapshot = tempfile.mkstemp(prefix="snapshot-", suffix=".db", dir=root)
+    os.close(fd)
+    try:
+        with manager.read() as src:
+            src.execute("BEGIN")
+            try:
+                src.execute("SELECT 1 FROM sqlite_master LIMIT 1")   # pin the read snapshot
+                page_size = src.execute("PRAGMA page_size").fetchone()[0]
+                dst = sqlite3.connect(snapshot)
+                try:
+                    src.backup(dst, pages=max(1, pages_per_step), sleep=sleep,
+                               progress=(lambda status, remaining, total: progress(remaining, total))
+                               if progress else None)
+                finally:
+                    dst.close()
+            finally:
+                src.execute("COMMIT")
+
+        if chunk_size % page_size:
+            raise ValueError(f"chunk_size must be a multiple of the page size ({page_size})")
+        report = BackupReport(manifest=root / "manifests" / f"backup-{created}.json")
+        whole = hashlib.sha256()
+        chunks = []
+        with open(snapshot, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                whole.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+                path = _chunk_path(root, digest)
+                if not path.exists():
+                    packed = zlib.compress(data, 6)
+                    _write_atomic(path, packed)
+                    report.new_chunks += 1
+                    report.bytes_written += len(packed)
+                report.db_bytes += len(data)
+
+        manifest = json.dumps({
+            "format": 1,
+            "created_at": created,
+            "source": str(manager.path),
+            "page_size": page_size,
+            "size": report.db_bytes,
+            "sha256": whole.hexdigest(),
+            "chunk_size": chunk_size,
+            "compression": "zlib",
+            "chunks": chunks,
+        }, indent=1).encode()
+        _write_atomic(report.manifest, manifest)   # written last: a manifest means a complete set
+        report.bytes_written += len(manifest)
+        report.chunks = len(chunks)
+    finally:
+        os.unlink(snapshot)
+
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+# ------------------------------
+# Restore & verification
+# ------------------------------
+def restore(manifest, dest, verify: bool = True) -> RestoreReport:
+    """
+    Rebuild the database described by ``manifest`` at ``dest``.
+
+    Every chunk and the whole file are checked against their SHA-256, and
+    with ``verify`` the result must pass ``PRAGMA integrity_check`` before it
+    replaces ``dest``. Raises BackupError on any mismatch.
+    """
+    started = time.perf_counter()
+    manifest = Path(manifest)
+    meta = _load(manifest)
+    root = manifest.parent.parent
+    dest = Path(dest)
+    partial = dest.with_name(dest.name + ".partial")
+    report = RestoreReport(path=dest)
+
+    whole = hashlib.sha256()
+    try:
+        with open(partial, "wb") as out:
+            for digest in meta["chunks"]:
+                try:
+                    data = zlib.decompress(_chunk_path(root, digest).read_bytes())
+                except (OSError, zlib.error) as e:
+                    raise BackupError(f"Chunk {digest} unreadable: {e}") from None
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise BackupError(f"Chunk {digest} does not match its hash")
+                whole.update(data)
+                out.write(data)
+                report.db_bytes += len(data)
+            out.flush()
+            os.fsync(out.fileno())
+        if report.db_bytes != meta["size"] or whole.hexdigest() != meta["sha256"]:
+            raise BackupError(f"{manifest.name}: restored file does not match the manifest")
+
+        if verify:
+            conn = sqlite3.connect(partial.resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                report.integrity = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+            finally:
+                conn.close()
+            if not report.ok:
+                raise BackupError(f"{manifest.name}: integrity_check failed: {report.integrity[:5]}")
+        os.replace(partial, dest)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def verify_backup(manifest) -> RestoreReport:
+    """Restore into a temporary file and run integrity_check; nothing is kept."""
+    with tempfile.TemporaryDirectory() as tmp:
+        return restore(manifest, Path(tmp) / "verify.db", verify=True)
+
+
+# ------------------------------
+# Retention
+# ------------------------------
+def prune(backup_dir, keep_daily: int = 7, keep_weekly: int = 4, keep_monthly: int = 6) -> PruneReport:
+    """
+    Keep the newest backup of each of the last ``keep_daily`` days,
+    ``keep_weekly`` ISO weeks and ``keep_monthly`` months; delete the other
+    manifests, then every chunk no remaining manifest refers to.
+    """
+    root = Path(backup_dir)
+    manifests = list_backups(root)
+    keep = set()
+    for limit, bucket in ((keep_daily, "%Y-%m-%d"), (keep_weekly, "%G-W%V"), (keep_monthly, "%Y-%m")):
+        seen = set()
+        for m in reversed(manifests):   # newest first
+            key = datetime.fromtimestamp(int(m.stem.split("-")[1]) / 1000).strftime(bucket)
+            if key not in seen and len(seen) < limit:
+                seen.add(key)
+                keep.add(m)
+
+    report = PruneReport(kept=len(keep))
+    for m in manifests:
+        if m not in keep:
+            m.unlink()
+            report.removed_manifests += 1
+
+    live = set()
+    for m in keep:
+        live.update(_load(m)["chunks"])
+    for path in (root / "chunks").glob("*/*"):
+        if path.name not in live:
+            report.bytes_freed += path.stat().st_size
+            path.unlink()
+            report.removed_chunks += 1
+    return report
+
+
+def backup_if_due(backup_dir=None, enabled: bool = True, interval_hours: float = 24,
+                  manager=None) -> Optional[BackupReport]:
+    """
+    Daily auto-backup (``AppSettings.auto_backup_daily`` / ``backup_dir``):
+    back up and prune when the newest backup is older than ``interval_hours``.
+    Returns None when nothing was due.
+    """
+    if not enabled:
+        return None
+    root = Path(backup_dir) if backup_dir else default_backup_dir()
+    existing = list_backups(root)
+    if existing:
+        last = int(existing[-1].stem.split("-")[1])
+        if now_ms() - last < interval_hours * 3_600_000:
+            return None
+    report = backup(root, manager=manager)
+    prune(root)
+    return report
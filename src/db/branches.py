@@ -0,0 +1,150 @@
+import re
+from typing import Dict, List, Tuple
+
+from . import get_manager
+
+MAX_TS = 2 ** 62   # "no upper bound" for millisecond timestamps
+
+# name -> (SQL, indexes the plan must use). Every statement filters on
+# ``branch_id = :branch`` through an index that leads with branch_id (or, for
+# installments, starts from the branch's sales), so a screen's cost depends on
+# its own branch's rows only. tests/test_db_branches.py checks each plan with
+# EXPLAIN QUERY PLAN. Lists are keyset-paginated on their ORDER BY columns.
+QUERIES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    # (id, full_name, arabic_full_name, branch_id), by name
+    "customers": ("""
+        SELECT id, full_name, arabic_full_name, branch_id FROM customer
+        WHERE branch_id = :branch AND (full_name, id) > (:after_name, :after_id)
+        ORDER BY full_name, id LIMIT :limit
+    """, ("idx_customer_branch_name",)),
+    # (id, customer_id, type, total_cents, down_payment_cents, completed_at), newest first
+    "sales": ("""
+        SELECT id, customer_id, type, total_cents, down_payment_cents, completed_at FROM sale
+        WHERE branch_id = :branch AND status = :status AND completed_at >= :since
+          AND (completed_at, id) < (:before, :before_id)
+        ORDER BY completed_at DESC, id DESC LIMIT :limit
+    """, ("idx_sale_branch_status",)),
+    # Same columns with created_at last: drafts and voids, whose completed_at may be NULL
+    "sales_by_created": ("""
+        SELECT id, customer_id, type, total_cents, down_payment_cents, created_at FROM sale
+        WHERE branch_id = :branch AND status = :status AND created_at >= :since
+          AND (created_at, id) < (:before, :before_id)
+        ORDER BY created_at DESC, id DESC LIMIT :limit
+    """, ("idx_sale_branch_status_created",)),
+    # (id, contract_id, installment_id, channel, amount_cents, received_at), newest first
+    "payments": ("""
+        SELECT id, contract_id, installment_id, channel, amount_cents, received_at FROM payment
+        WHERE branch_id = :branch AND status = :status AND received_at >= :since
+          AND (received_at, id) < (:before, :before_id)
+        ORDER BY received_at DESC, id DESC LIMIT :limit
+    """, ("idx_payment_branch_status_time",)),
+    # (product_id, sku, name, qty), by product id
+    "stock": ("""
+        SELECT s.product_id, p.sku, p.name, s.qty FROM stock s JOIN product p ON p.id = s.product_id
+        WHERE s.branch_id = :branch AND s.product_id > :after_id
+        ORDER BY s.product_id LIMIT :limit
+    """, ("idx_stock_branch_product",)),
+    # (id, product_id, movement, qty_delta, ref_entity, ref_id, at), newest first
+    "movements": ("""
+        SELECT id, product_id, movement, qty_delta, ref_entity, ref_id, at FROM stock_ledger
+        WHERE branch_id = :branch AND at >= :since AND (at, id) < (:before, :before_id)
+        ORDER BY at DESC, id DESC LIMIT :limit
+    """, ("idx_stock_ledger_branch_at",)),
+    # (installment id, contract_id, customer_id, number, due_date, remaining_cents), by due date.
+    # CROSS JOIN fixes the join order and INDEXED BY the first and last steps: with
+    # few branches ANALYZE rates branch_id as unselective, and left alone the planner
+    # scans every sale or uses the global idx_installment_due.
+    "installments": ("""
+        SELECT i.id, k.id, s.customer_id, i.number, i.due_date, i.due_cents - i.paid_cents
+        FROM sale s INDEXED BY idx_sale_branch_status
+        CROSS JOIN contract k ON k.sale_id = s.id
+        CROSS JOIN schedule sc ON sc.contract_id = k.id
+        CROSS JOIN installment i INDEXED BY idx_installment_schedule_status ON i.schedule_id = sc.id
+        WHERE s.branch_id = :branch AND i.status = :status AND (i.due_date, i.id) > (:after_due, :after_id)
+        ORDER BY i.due_date, i.id LIMIT :limit
+    """, ("idx_sale_branch_status", "idx_contract_sale", "idx_schedule_contract", "idx_installment_schedule_status")),
+}
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+
+
+class BranchRepository:
+    """
+    Read API for the per-branch screens. Every query it runs comes from
+    ``QUERIES`` and is bound to this repository's branch, so a caller cannot
+    forget the branch filter or fall back to a full-table scan.
+
+    List methods return at most ``limit`` rows; pass the sort key of the last
+    row back (``after=`` / ``before=``) to get the next page.
+
+    :param branch_id: branch every query is restricted to
+    """
+
+    def __init__(self, branch_id: int, manager=None):
+        if branch_id is None:
+            raise ValueError("branch_id is required")
+        self.branch_id = int(branch_id)
+        self.manager = manager
+
+    # ---------- Public API ----------
+    def customers(self, after: Tuple[str, int] = ("", 0), limit: int = 100) -> List[tuple]:
+        return self._run("customers", after_name=after[0], after_id=after[1], limit=limit)
+
+    def sales(self, status: str = "completed", since: int = 0, before: Tuple[int, int] = (MAX_TS, 0),
+              limit: int = 100) -> List[tuple]:
+        """
+        Completed sales are listed and paged by completed_at; drafts and
+        voids by created_at (a draft has no completed_at), which is then the
+        last column of each row and the key to pass back in ``before``.
+        """
+        name = "sales" if status == "completed" else "sales_by_created"
+        return self._run(name, status=status, since=since, before=before[0], before_id=before[1], limit=limit)
+
+    def payments(self, status: str = "succeeded", since: int = 0, before: Tuple[int, int] = (MAX_TS, 0),
+                 limit: int = 100) -> List[tuple]:
+        return self._run("payments", status=status, since=since, before=before[0], before_id=before[1],
+                         limit=limit)
+
+    def stock(self, after_id: int = 0, limit: int = 500) -> List[tuple]:
+        return self._run("stock", after_id=after_id, limit=limit)
+
+    def movements(self, since: int = 0, before: Tuple[int, int] = (MAX_TS, 0), limit: int = 200) -> List[tuple]:
+        return self._run("movements", since=since, before=before[0], before_id=before[1], limit=limit)
+
+    def installments(self, status: str = "overdue", after: Tuple[int, int] = (0, 0),
+                     limit: int = 200) -> List[tuple]:
+        return self._run("installments", status=status, after_due=after[0], after_id=after[1], limit=limit)
+
+    # ---------- Internals ----------
+    def _run(self, name: str, **params) -> List[tuple]:
+        sql, _ = QUERIES[name]
+        with (self.manager or get_manager()).read() as c:
+            return c.execute(sql, dict(params, branch=self.branch_id)).fetchall()
+
+
+def _placeholders(sql: str) -> Dict[str, int]:
+    return {name: 0 for name in re.findall(r":(\w+)", sql)}
+
+
+def explain(name: str, manager=None) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines for one of ``QUERIES``."""
+    sql, _ = QUERIES[name]
+    with (manager or get_manager()).read() as c:
+        return [row[3] for row in c.execute("EXPLAIN QUERY PLAN " + sql, _placeholders(sql))]
+
+
+def check_plans(manager=None) -> Dict[str, List[str]]:
+    """
+    Problems per query: a full-table scan, or an expected index the planner
+    did not use. An empty dict means every branch query is index-backed.
+    """
+    problems: Dict[str, List[str]] = {}
+    for name, (sql, indexes) in QUERIES.items():
+        plan = explain(name, manager)
+        found = [f"full scan of {m.group(1)}" for line in plan for m in [_FULL_SCAN.match(line)] if m]
+        found += [f"{index} not used" for index in indexes if not any(index in line for line in plan)]
+        if ":branch" not in sql:
+            found.append("no branch filter")
+        if found:
+            problems[name] = found
+    return problems
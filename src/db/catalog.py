@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from . import get_manager
+
+_COLUMNS = "id, sku, name, arabic_name, brand, category, barcode, price_ttc_cents, tax_rate_bp, version"
+_CHUNK = 500
+
+
+class ProductRecord:
+    """One active product. Records are replaced, never mutated, on refresh."""
+
+    __slots__ = ("id", "sku", "name", "arabic_name", "brand", "category", "barcode", "price_cents",
+                 "tax_rate_bp", "version")
+
+    def __init__(self, id, sku, name, arabic_name, brand, category, barcode, price_cents, tax_rate_bp, version):
+        self.id = id
+        self.sku = sku
+        self.name = name
+        self.arabic_name = arabic_name
+        self.brand = brand
+        self.category = category
+        self.barcode = barcode
+        self.price_cents = price_cents
+        self.tax_rate_bp = tax_rate_bp
+        self.version = version
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(id={self.id}, sku={self.sku!r}, name={self.name!r}, version={self.version})"
+
+
+@dataclass
+class CatalogChange:
+    added: List[int] = field(default_factory=list)
+    updated: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)    # deleted or deactivated
+    brands_changed: bool = False
+    categories_changed: bool = False
+    full_reload: bool = False
+    elapsed_ms: float = 0.0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed or self.full_reload)
+
+
+class Catalog:
+    """
+    In-process cache of active products, indexed by id, sku and barcode.
+
+    The first ``refresh()`` loads every active product (idx_product_active).
+    Later calls read only the products whose ``sync_change`` entry is newer
+    than the last one seen: the change-log triggers record every insert,
+    update and delete, including rows applied by a sync, whose
+    ``updated_at`` is the remote one and can be older than anything cached.
+    Rows are re-read and only replaced when their ``version`` moved, and a
+    refresh with nothing new is one index lookup.
+
+    Subscribers get a ``CatalogChange`` after each refresh that changed
+    something, on the refreshing thread.
+    """
+
+    def __init__(self, manager=None):
+        self.manager = manager or get_manager()
+        self._by_id: Dict[int, ProductRecord] = {}
+        self._by_sku: Dict[str, ProductRecord] = {}
+        self._by_barcode: Dict[str, ProductRecord] = {}
+        self._brands: Counter = Counter()
+        self._categories: Counter = Counter()
+        self._seq: Optional[int] = None      # last sync_change.seq applied; None = not loaded
+        self._lock = threading.Lock()        # guards the indexes
+        self._refresh_lock = threading.Lock()
+        self._subscribers: List[Callable[[CatalogChange], None]] = []
+
+    # ---------- Lookups ----------
+    def get(self, product_id: int) -> Optional[ProductRecord]:
+        return self._by_id.get(product_id)
+
+    def by_sku(self, sku: str) -> Optional[ProductRecord]:
+        return self._by_sku.get(sku)
+
+    def by_barcode(self, barcode: str) -> Optional[ProductRecord]:
+        return self._by_barcode.get(barcode)
+
+    def brands(self) -> List[str]:
+        with self._lock:
+            return sorted(self._brands)
+
+    def categories(self) -> List[str]:
+        with self._lock:
+            return sorted(self._categories)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[ProductRecord]:
+        with self._lock:
+            return iter(list(self._by_id.values()))
+
+    # ---------- Change notifications ----------
+    def subscribe(self, callback: Callable[[CatalogChange], None]) -> Callable[[], None]:
+        """Call ``callback(change)`` after every refresh that changed something. Returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    # ---------- Refresh ----------
+    def refresh(self) -> CatalogChange:
+        """Bring the cache up to date (loads everything the first time)."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            change = self._load() if self._seq is None else self._catch_up()
+            change.elapsed_ms = (time.perf_counter() - started) * 1000
+        if change:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for callback in subscribers:
+                callback(change)
+        return change
+
+    def reload(self) -> CatalogChange:
+        with self._refresh_lock:
+            self._seq = None
+        return self.refresh()
+
+    # ---------- Internals ----------
+    def _latest_seq(self, c) -> int:
+        return c.execute("SELECT IFNULL(MAX(seq), 0) FROM sync_change WHERE tbl = 'product'").fetchone()[0]
+
+    def _load(self) -> CatalogChange:
+        with self.manager.read() as c:
+            # Read the watermark first: a change committed in between is
+            # simply applied again by the next refresh.
+            seq = self._latest_seq(c)
+            rows = c.execute(f"SELECT {_COLUMNS} FROM product WHERE is_active = 1").fetchall()
+        with self._lock:
+            self._by_id, self._by_sku, self._by_barcode = {}, {}, {}
+            self._brands, self._categories = Counter(), Counter()
+            for row in rows:
+                self._put(ProductRecord(*row))
+            self._seq = seq
+        return CatalogChange(added=[r[0] for r in rows], brands_changed=True, categories_changed=True,
+                             full_reload=True)
+
+    def _catch_up(self) -> CatalogChange:
+        change = CatalogChange()
+        with self.manager.read() as c:
+            seq = self._latest_seq(c)
+            if seq == self._seq:
+                return change
+            ids = [r[0] for r in c.execute(
+                "SELECT row_id FROM sync_change WHERE tbl = 'product' AND seq > ?", (self._seq,))]
+            rows = {}
+            for k in range(0, len(ids), _CHUNK):
+                chunk = ids[k:k + _CHUNK]
+                for row in c.execute(f"""
+                    SELECT {_COLUMNS} FROM product WHERE is_active = 1 AND id IN ({",".join("?" * len(chunk))})
+                """, chunk):
+                    rows[row[0]] = row
+        with self._lock:
+            brands, categories = set(self._brands), set(self._categories)
+            for product_id in ids:
+                old, row = self._by_id.get(product_id), rows.get(product_id)
+                if row is None:
+                    if old is not None:
+                        self._drop(old)
+                        change.removed.append(product_id)
+                elif old is None:
+                    self._put(ProductRecord(*row))
+                    change.added.append(product_id)
+                elif old.version != row[-1]:
+                    self._drop(old)
+                    self._put(ProductRecord(*row))
+                    change.updated.append(product_id)
+            # combo boxes list distinct names, so only a new or vanished name matters
+            change.brands_changed = set(self._brands) != brands
+            change.categories_changed = set(self._categories) != categories
+            self._seq = seq
+        return change
+
+    def _put(self, rec: ProductRecord):
+        self._by_id[rec.id] = rec
+        self._by_sku[rec.sku] = rec
+        if rec.barcode:
+            self._by_barcode[rec.barcode] = rec
+        if rec.brand:
+            self._brands[rec.brand] += 1
+        if rec.category:
+            self._categories[rec.category] += 1
+
+    def _drop(self, rec: ProductRecord):
+        del self._by_id[rec.id]
+        if self._by_sku.get(rec.sku) is rec:
+            del self._by_sku[rec.sku]
+        if rec.barcode and self._by_barcode.get(rec.barcode) is rec:
+            del self._by_barcode[rec.barcode]
+        for counter, key in ((self._brands, rec.brand), (self._categories, rec.category)):
+            if key:
+                counter[key] -= 1
+                if counter[key] <= 0:
+                    del counter[key]
+
+
+_catalogs: Dict[int, Catalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(manager=None) -> Catalog:
+    """One catalog per connection manager (the shared one by default)."""
+    manager = manager or get_manager()
+    with _catalogs_lock:
+        catalog = _catalogs.get(id(manager))
+        if catalog is None or catalog.manager is not manager:
+            catalog = _catalogs[id(manager)] = Catalog(manager)
+        return catalog
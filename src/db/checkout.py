@@ -0,0 +1,205 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import audit, get_manager, now_ms
+from .payments import CHANNELS
+from .schedules import _INSERT_INSTALLMENT, _UPDATE_OFFER, _installment_rows, _offer_totals, amortize
+from .stock import _apply
+
+# Constant statement texts: sqlite3 keeps a per-connection cache of prepared
+# statements keyed on the SQL, so each of these is compiled once per writer.
+_INSERT_SALE = """
+    INSERT INTO sale (branch_id, customer_id, user_id, type, status, subtotal_cents, discount_cents, tax_cents,
+                      total_cents, down_payment_cents, completed_at, created_at, updated_at)
+    VALUES (?, ?, ?, ?, 'completed', ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_ITEM = """
+    INSERT INTO sale_item (sale_id, product_id, qty, unit_price_cents, line_total_cents, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_OFFER = """
+    INSERT INTO offer (term_months, apr_bp, total_repay_cents, fees_cents, insurance_cents, shown_at,
+                       accepted_at, created_at, updated_at)
+    VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_CONTRACT = "INSERT INTO contract (sale_id, offer_id, created_at, updated_at) VALUES (?, ?, ?, ?)"
+_INSERT_SCHEDULE = """
+    INSERT INTO schedule (contract_id, installments_count, start_date, generated_at, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_INSERT_PAYMENT = """
+    INSERT INTO payment (branch_id, sale_id, channel, amount_cents, status, received_at, idempotency_key,
+                         created_at, updated_at)
+    VALUES (?, ?, ?, ?, 'succeeded', ?, ?, ?, ?)
+"""
+
+
+class CheckoutError(ValueError):
+    """The cart cannot be completed (unknown product, insufficient stock, bad amounts)."""
+
+
+@dataclass
+class CartLine:
+    product_id: int
+    qty: int
+    unit_price_cents: Optional[int] = None   # None: the product's price_ttc_cents
+
+
+@dataclass
+class Financing:
+    term_months: int
+    apr_bp: int = 0
+    fees_cents: int = 0
+    insurance_cents: int = 0
+    start_ms: Optional[int] = None            # first due date is one month after this
+
+
+@dataclass
+class CheckoutResult:
+    sale_id: int
+    total_cents: int
+    payment_id: Optional[int] = None
+    contract_id: Optional[int] = None
+    replayed: bool = False          # idempotency key seen before: the earlier sale is returned
+    prepare_ms: float = 0.0         # pricing and schedule math, before the write lock
+    wait_ms: float = 0.0            # waiting for the write lock (other counters)
+    locked_ms: float = 0.0          # BEGIN IMMEDIATE .. COMMIT
+    elapsed_ms: float = 0.0
+
+
+def _prices(c, product_ids: Sequence[int]) -> Dict[int, Tuple[int, int, int]]:
+    """product id -> (price_ttc_cents, tax_rate_bp, is_active)."""
+    ids = sorted(set(product_ids))
+    rows = c.execute(f"""
+        SELECT id, price_ttc_cents, tax_rate_bp, is_active FROM product WHERE id IN ({",".join("?" * len(ids))})
+    """, ids).fetchall()
+    return {r[0]: r[1:] for r in rows}
+
+
+def _replayed(c, key: Optional[str]) -> Optional[CheckoutResult]:
+    if key is None:
+        return None
+    row = c.execute("""
+        SELECT p.sale_id, s.total_cents, p.id, k.id FROM payment p JOIN sale s ON s.id = p.sale_id
+        LEFT JOIN contract k ON k.sale_id = s.id
+        WHERE p.idempotency_key = ?
+    """, (key,)).fetchone()
+    return CheckoutResult(*row, replayed=True) if row else None
+
+
+def checkout(lines: Sequence[CartLine], branch_id: int = 1, customer_id: Optional[int] = None,
+             user_id: Optional[int] = None, channel: str = "cash", discount_cents: int = 0,
+             down_payment_cents: int = 0, financing: Optional[Financing] = None,
+             idempotency_key: Optional[str] = None, allow_negative_stock: bool = False,
+             manager=None) -> CheckoutResult:
+    """
+    Complete a sale in one transaction: the sale, its items, a 'sell' stock
+    movement and balance decrement per item, the payment, and for an
+    instalment sale the offer, contract, schedule and installments.
+
+    Prices, totals and the amortization plan are computed on a read
+    connection first; the ``BEGIN IMMEDIATE`` window only holds INSERTs and
+    ``executemany`` batches, so other counters wait as little as possible.
+
+    A cash sale is paid in full; an instalment sale pays ``down_payment_cents``
+    now (no payment row when it is 0) and finances the rest. With an
+    ``idempotency_key`` (stored on the payment) a retried checkout (e.g. after a timeout) returns the
+    sale that was already completed instead of selling twice.
+
+    Raises CheckoutError, with nothing written, when a product is unknown or
+    inactive, an amount is invalid, or stock would go negative.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    if not lines:
+        raise CheckoutError("Empty cart")
+    if channel not in CHANNELS:
+        raise CheckoutError(f"Unknown channel {channel!r}")
+    if any(line.qty <= 0 for line in lines):
+        raise CheckoutError("Quantities must be positive")
+
+    with manager.read() as c:
+        replay = _replayed(c, idempotency_key)
+        if replay:
+            return replay
+        prices = _prices(c, [line.product_id for line in lines])
+
+    items, subtotal, tax = [], 0, 0
+    for line in lines:
+        price, tax_bp, active = prices.get(line.product_id, (None, 0, 0))
+        if not active:
+            raise CheckoutError(f"Product {line.product_id} is unknown or inactive")
+        unit = price if line.unit_price_cents is None else line.unit_price_cents
+        total_line = unit * line.qty
+        items.append((line.product_id, line.qty, unit, total_line))
+        subtotal += total_line
+        tax += (total_line * tax_bp * 2 + 10_000 + tax_bp) // (2 * (10_000 + tax_bp))   # tax included in TTC
+    total = subtotal - discount_cents
+    if discount_cents < 0 or total < 0:
+        raise CheckoutError("Discount exceeds the sale total")
+
+    plan = None
+    if financing is None:
+        down_payment_cents, paid = 0, total
+    else:
+        if not 0 <= down_payment_cents < total:
+            raise CheckoutError("Down payment must be at least 0 and below the sale total")
+        paid = down_payment_cents
+        if idempotency_key is not None and not paid:
+            raise CheckoutError("idempotency_key is kept on the payment; a sale without one cannot use it")
+        try:
+            plan = amortize(total - down_payment_cents, financing.term_months, financing.apr_bp,
+                            financing.fees_cents, financing.insurance_cents)
+        except ValueError as e:
+            raise CheckoutError(str(e)) from None
+    prepared = time.perf_counter()
+
+    result = CheckoutResult(0, total, prepare_ms=(prepared - started) * 1000)
+    try:
+        with manager.write() as c:
+            locked = time.perf_counter()
+            replay = _replayed(c, idempotency_key)   # another counter may have won the race
+            if replay:
+                replay.prepare_ms = result.prepare_ms
+                result = replay
+            else:
+                _write_sale(c, result, items, branch_id, customer_id, user_id, channel, discount_cents, tax,
+                            down_payment_cents, paid, financing, plan, idempotency_key, allow_negative_stock)
+                audit.record("create", "sale", result.sale_id,
+                             {"items": len(items), "total_cents": total, "contract_id": result.contract_id},
+                             actor_user_id=user_id, manager=manager)
+    except ValueError as e:
+        raise CheckoutError(str(e)) from None
+    done = time.perf_counter()
+    result.wait_ms = (locked - prepared) * 1000
+    result.locked_ms = (done - locked) * 1000
+    result.elapsed_ms = (done - started) * 1000
+    return result
+
+
+def _write_sale(c, result: CheckoutResult, items: List[tuple], branch_id, customer_id, user_id, channel,
+                discount_cents, tax, down_payment_cents, paid, financing, plan, idempotency_key,
+                allow_negative_stock):
+    ts = now_ms()
+    subtotal = sum(item[3] for item in items)
+    result.sale_id = sale_id = c.execute(_INSERT_SALE, (
+        branch_id, customer_id, user_id, "cash" if plan is None else "instalment", subtotal, discount_cents,
+        tax, result.total_cents, down_payment_cents, ts, ts, ts)).lastrowid
+    c.executemany(_INSERT_ITEM, [(sale_id, p, q, unit, line, ts, ts) for p, q, unit, line in items])
+    _apply(c, [(p, branch_id, "sell", -q, "sale", sale_id, ts) for p, q, _, _ in items], allow_negative_stock, ts)
+
+    if plan is not None:
+        offer_id = c.execute(_INSERT_OFFER, (financing.term_months, financing.apr_bp, financing.fees_cents,
+                                             financing.insurance_cents, ts, ts, ts, ts)).lastrowid
+        c.execute(_UPDATE_OFFER, _offer_totals(offer_id, result.total_cents - down_payment_cents, plan,
+                                               financing.fees_cents, ts))
+        result.contract_id = c.execute(_INSERT_CONTRACT, (sale_id, offer_id, ts, ts)).lastrowid
+        start_ms = financing.start_ms or ts
+        schedule_id = c.execute(_INSERT_SCHEDULE, (result.contract_id, len(plan), start_ms, ts, ts, ts)).lastrowid
+        c.executemany(_INSERT_INSTALLMENT, _installment_rows(schedule_id, start_ms, plan, ts))
+
+    if paid:
+        # Linked to the sale only: a down payment is not money towards the installments
+        result.payment_id = c.execute(_INSERT_PAYMENT, (branch_id, sale_id, channel, paid, ts, idempotency_key,
+                                                        ts, ts)).lastrowid
@@ -0,0 +1,229 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .textnorm import name_fold
+
+
+class ConnectionManager:
+    """
+    Small SQLite connection pool: one writer and a few read-only connections.
+
+    Every connection is opened and tuned once (WAL, synchronous=NORMAL, page
+    cache, mmap) and then reused. Readers are handed out per thread for the
+    duration of a ``read()`` block, so UI-thread reads run on their own
+    connection and never queue behind a background ``write()``.
+
+    :param path: database file
+    :param readers: maximum number of read-only connections
+    :param cache_kib: page cache per connection, in KiB
+    :param mmap_bytes: memory-mapped I/O window per connection
+    :param busy_timeout_ms: how long to wait on a lock held by another process
+    :param checkout_timeout: seconds to wait for a free reader before raising TimeoutError
+    """
+
+    def __init__(self, path, readers: int = 4, cache_kib: int = 16_000,
+                 mmap_bytes: int = 256 * 1024 * 1024, busy_timeout_ms: int = 5000,
+                 checkout_timeout: float = 10.0):
+        self.path = Path(path)
+        self.max_readers = max(1, readers)
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+        self.busy_timeout_ms = busy_timeout_ms
+        self.checkout_timeout = checkout_timeout
+
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._writer_lock = threading.Lock()   # guards opening the writer only
+        self._open_lock = threading.Lock()     # guards the reader list
+        self._idle = queue.LifoQueue()   # LIFO keeps the warmest cache in use
+        self._readers = []
+        self._local = threading.local()
+
+    # ---------- Opening ----------
+    def _tune(self, conn: sqlite3.Connection) -> sqlite3.Connection:
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_kib)};")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)};")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)};")
+        conn.execute("PRAGMA temp_store = MEMORY;")
+        conn.create_function("name_fold", 1, name_fold, deterministic=True)
+        return conn
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    # isolation_level=None: transactions are managed explicitly in write()
+                    conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+                    conn.execute("PRAGMA journal_mode = WAL;")
+                    conn.execute("PRAGMA synchronous = NORMAL;")
+                    conn.execute("PRAGMA foreign_keys = ON;")
+                    self._writer = self._tune(conn)
+        return self._writer
+
+    def _open_reader(self) -> sqlite3.Connection:
+        uri = self.path.resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON;")
+        return self._tune(conn)
+
+    def _checkout_reader(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        self._writer_conn()  # opened outside _open_lock; readers need the WAL file
+        with self._open_lock:
+            if len(self._readers) < self.max_readers:
+                conn = self._open_reader()
+                self._readers.append(conn)
+                return conn
+        try:
+            # pool exhausted: wait for a reader to come back
+            return self._idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No read connection free after {self.checkout_timeout}s "
+                f"({self.max_readers} in use)"
+            ) from None
+
+    def _checkin_reader(self, conn: sqlite3.Connection):
+        with self._open_lock:
+            owned = any(r is conn for r in self._readers)
+        if owned:
+            self._idle.put(conn)
+        else:
+            conn.close()  # the pool was closed while this reader was checked out
+
+    # ---------- Public API ----------
+    @contextmanager
+    def read(self):
+        """
+        Yield a read-only connection bound to the calling thread.
+
+        Nested ``read()`` blocks reuse the same connection, and a thread that
+        is inside ``write()`` reads through the writer so it sees its own
+        uncommitted changes.
+        """
+        if getattr(self._local, "write_depth", 0):
+            yield self._writer
+            return
+        held = getattr(self._local, "reader", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._checkout_reader()
+        self._local.reader = conn
+        try:
+            yield conn
+        finally:
+            self._local.reader = None
+            self._checkin_reader(conn)
+
+    @contextmanager
+    def write(self):
+        """
+        Yield the writer inside a ``BEGIN IMMEDIATE`` transaction.
+
+        Commits on success and rolls back on error. Nested blocks become
+        savepoints of the outer transaction.
+        """
+        with self._write_lock:
+            conn = self._writer_conn()
+            depth = getattr(self._local, "write_depth", 0)
+            if depth:
+                name = f"sp_{depth}"
+                conn.execute(f"SAVEPOINT {name}")
+                self._local.write_depth = depth + 1
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute(f"ROLLBACK TO {name}")
+                    conn.execute(f"RELEASE {name}")
+                    # callbacks registered inside the savepoint are rolled back too
+                    self._local.on_commit = [cb for cb in self._local.on_commit if cb[0] <= depth]
+                    self._local.before_commit = [cb for cb in self._local.before_commit if cb[0] <= depth]
+                    raise
+                else:
+                    conn.execute(f"RELEASE {name}")
+                finally:
+                    self._local.write_depth = depth
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.write_depth = 1
+            self._local.on_commit = []
+            self._local.before_commit = []
+            try:
+                yield conn
+                for _, callback in self._local.before_commit:   # still inside the transaction
+                    callback(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                try:
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                self._local.write_depth = 0
+                callbacks, self._local.on_commit = self._local.on_commit, []
+                self._local.before_commit = []
+            for _, callback in callbacks:   # only reached once COMMIT succeeded
+                callback()
+
+    def before_commit(self, callback):
+        """
+        Run ``callback(conn)`` on the writer just before the calling thread's
+        current ``write()`` transaction commits, as part of it: what it
+        writes commits with the transaction, and an error rolls everything
+        back. Dropped with a rolled-back savepoint; outside ``write()`` it
+        runs at once in a transaction of its own.
+        """
+        depth = getattr(self._local, "write_depth", 0)
+        if not depth:
+            with self.write() as conn:
+                callback(conn)
+        else:
+            self._local.before_commit.append((depth, callback))
+
+    def after_commit(self, callback):
+        """
+        Run ``callback()`` once the calling thread's current ``write()``
+        transaction commits; it is dropped if the transaction (or the
+        savepoint it was registered in) rolls back. Outside ``write()`` it
+        runs immediately.
+        """
+        depth = getattr(self._local, "write_depth", 0)
+        if not depth:
+            callback()
+        else:
+            self._local.on_commit.append((depth, callback))
+
+    def in_transaction(self) -> bool:
+        """True while the calling thread is inside a ``write()`` block."""
+        return bool(getattr(self._local, "write_depth", 0))
+
+    def close(self):
+        """
+        Close idle readers and the writer.
+
+        Readers still checked out by other threads stay usable until their
+        ``read()`` block ends, then they are closed instead of returned. The
+        writer is closed only after any running ``write()`` has finished.
+        """
+        with self._open_lock:
+            self._readers.clear()
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+        with self._write_lock, self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
@@ -0,0 +1,141 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from . import get_manager
+from .textnorm import name_tokens
+
+# (id, full_name, arabic_full_name, branch_id)
+CustomerRow = Tuple[int, str, Optional[str], int]
+
+
+@dataclass
+class SearchPage:
+    rows: List[CustomerRow]
+    page: int
+    page_size: int
+    has_more: bool
+
+
+class CustomerSearch:
+    """
+    Search-as-you-type over fts_customers (prefix match, bm25 ranking).
+
+    Results for recent queries are kept in a small LRU cache keyed on the
+    normalized tokens. When the user keeps typing ("moh" -> "moha") and the
+    earlier result set was complete, the new results are filtered from it in
+    memory instead of hitting the database again. The cache is dropped when
+    app_meta.customer_rev changes (bumped by the customer triggers).
+
+    :param branch_id: restrict results to one branch (None = all branches)
+    :param page_size: rows per page
+    :param cache_size: number of queries kept
+    :param scan_limit: ranked rows fetched and cached per query
+    """
+
+    def __init__(self, manager=None, branch_id: Optional[int] = None, page_size: int = 50,
+                 cache_size: int = 64, scan_limit: int = 500):
+        self.manager = manager
+        self.branch_id = branch_id
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.scan_limit = max(scan_limit, page_size)
+        self._cache: "OrderedDict[tuple, Tuple[List[CustomerRow], bool]]" = OrderedDict()
+        self._rev = None
+        self._lock = threading.Lock()   # searches may run on worker threads
+        self.hits = self.misses = 0
+
+    # ---------- Public API ----------
+    def search(self, text: str, page: int = 0) -> SearchPage:
+        with self._lock:
+            return self._search(text, page)
+
+    def _search(self, text: str, page: int) -> SearchPage:
+        tokens = tuple(name_tokens(text))
+        if not tokens:
+            return SearchPage([], page, self.page_size, False)
+
+        manager = self.manager or get_manager()
+        with manager.read() as c:
+            self._check_rev(c)
+            rows, complete = self._lookup(tokens)
+            if rows is None:
+                self.misses += 1
+                rows = self._query(c, tokens, self.scan_limit + 1, 0)
+                complete = len(rows) <= self.scan_limit
+                rows = rows[:self.scan_limit]
+                self._store(tokens, rows, complete)
+            else:
+                self.hits += 1
+
+            start, end = page * self.page_size, (page + 1) * self.page_size
+            if end < len(rows) or complete:
+                return SearchPage(rows[start:end], page, self.page_size, end < len(rows))
+            # Deep page past the cached window: ask the database directly
+            deep = self._query(c, tokens, self.page_size + 1, start)
+        return SearchPage(deep[:self.page_size], page, self.page_size, len(deep) > self.page_size)
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._rev = None
+
+    # ---------- Internals ----------
+    def _check_rev(self, c):
+        row = c.execute("SELECT value FROM app_meta WHERE key = 'customer_rev'").fetchone()
+        rev = row[0] if row else None
+        if rev != self._rev:
+            self._cache.clear()
+            self._rev = rev
+
+    def _query(self, c, tokens, limit, offset) -> List[CustomerRow]:
+        match = " ".join(f'"{t}"*' for t in tokens)  # \w+ tokens never contain quotes
+        branch_sql = "AND c.branch_id = ?" if self.branch_id is not None else ""
+        params = (match,) + ((self.branch_id,) if self.branch_id is not None else ()) + (limit, offset)
+        return c.execute(f"""
+            SELECT c.id, c.full_name, c.arabic_full_name, c.branch_id
+            FROM fts_customers f
+            JOIN customer c ON c.id = f.rowid
+            WHERE fts_customers MATCH ? {branch_sql}
+            ORDER BY bm25(fts_customers)
+            LIMIT ? OFFSET ?
+        """, params).fetchall()
+
+    def _lookup(self, tokens):
+        hit = self._cache.get(tokens)
+        if hit is not None:
+            self._cache.move_to_end(tokens)
+            return hit
+        # Refine a complete result set of an earlier, shorter query
+        for key in reversed(self._cache):
+            rows, complete = self._cache[key]
+            if complete and _narrows(key, tokens):
+                refined = [r for r in rows if _matches(r, tokens)]
+                self._store(tokens, refined, True)
+                return refined, True
+        return None, False
+
+    def _store(self, tokens, rows, complete):
+        self._cache[tokens] = (rows, complete)
+        self._cache.move_to_end(tokens)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def _narrows(old: tuple, new: tuple) -> bool:
+    """True when every match of ``new`` is also a match of ``old``."""
+    if len(old) > len(new):
+        return False
+    return old[:-1] == new[:len(old) - 1] and new[len(old) - 1].startswith(old[-1])
+
+
+def _matches(row: CustomerRow, tokens) -> bool:
+    words = name_tokens(row[1]) + name_tokens(row[2])
+    return all(any(w.startswith(t) for w in words) for t in tokens)
+
+
+def search_customers(text: str, page: int = 0, page_size: int = 50,
+                     branch_id: Optional[int] = None) -> SearchPage:
+    """One-off search without a cache (the Customers page keeps a CustomerSearch)."""
+    return CustomerSearch(branch_id=branch_id, page_size=page_size, cache_size=1).search(text, page)
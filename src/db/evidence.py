@@ -0,0 +1,342 @@
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import get_manager, now_ms
+from .attachments import AttachmentStore, get_store
+
+HASH_VERSION = 1
+_CHUNK = 500
+_ZIP_DATE = (2000, 1, 1, 0, 0, 0)   # fixed: the same contract always packs to the same bytes
+
+# Only terms that are fixed once the contract is issued: payments change
+# paid_cents/status and signing changes contract.status, neither touches the hash.
+_CONTRACT_COLS = ("id", "sale_id", "offer_id", "created_at")
+_SALE_COLS = ("branch_id", "customer_id", "type", "total_cents", "down_payment_cents")
+_OFFER_COLS = ("term_months", "apr_bp", "total_cost_cents", "total_repay_cents", "fees_cents", "insurance_cents")
+_SCHEDULE_COLS = ("installments_count", "start_date")
+_INSTALLMENT_COLS = ("number", "due_date", "principal_cents", "interest_cents", "fees_cents", "due_cents")
+
+
+@dataclass
+class DocumentTiming:
+    contract_id: int
+    render_ms: float
+    pack_ms: float
+    store_ms: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.render_ms + self.pack_ms + self.store_ms
+
+
+@dataclass
+class EvidenceReport:
+    generated: int = 0
+    tampered: List[int] = field(default_factory=list)   # stored hash no longer matches the rows
+    timings: List[DocumentTiming] = field(default_factory=list)
+    workers: int = 0
+    elapsed_ms: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.generated / (self.elapsed_ms / 1000) if self.elapsed_ms else 0.0
+
+    def percentile_ms(self, q: float) -> float:
+        """Per-document total time at quantile ``q`` (0.5 = median)."""
+        if not self.timings:
+            return 0.0
+        ordered = sorted(t.total_ms for t in self.timings)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class VerifyReport:
+    checked: int = 0
+    unsealed: int = 0                                   # no immutable_hash yet
+    mismatched: List[int] = field(default_factory=list)
+    damaged_files: List[int] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatched and not self.damaged_files
+
+    @property
+    def per_second(self) -> float:
+        return self.checked / (self.elapsed_ms / 1000) if self.elapsed_ms else 0.0
+
+
+# ------------------------------
+# Canonical form and hash
+# ------------------------------
+def _payloads(c, contract_ids: Sequence[int]) -> Iterator[Tuple[int, Optional[str], dict]]:
+    """(contract id, stored hash, canonical payload) in chunks of a few bulk queries."""
+    for k in range(0, len(contract_ids), _CHUNK):
+        chunk = list(contract_ids[k:k + _CHUNK])
+        marks = ",".join("?" * len(chunk))
+        heads = c.execute(f"""
+            SELECT {", ".join("k." + col for col in _CONTRACT_COLS)}, k.immutable_hash,
+                   {", ".join("s." + col for col in _SALE_COLS)},
+                   {", ".join("o." + col for col in _OFFER_COLS)}
+            FROM contract k JOIN sale s ON s.id = k.sale_id JOIN offer o ON o.id = k.offer_id
+            WHERE k.id IN ({marks}) ORDER BY k.id
+        """, chunk).fetchall()
+        schedules: Dict[int, list] = {}
+        for row in c.execute(f"""
+            SELECT sc.contract_id, sc.id, {", ".join("sc." + col for col in _SCHEDULE_COLS)},
+                   {", ".join("i." + col for col in _INSTALLMENT_COLS)}
+            FROM schedule sc LEFT JOIN installment i ON i.schedule_id = sc.id
+            WHERE sc.contract_id IN ({marks}) ORDER BY sc.contract_id, sc.id, i.number
+        """, chunk):
+            contract_id, schedule_id = row[0], row[1]
+            entries = schedules.setdefault(contract_id, [])
+            if not entries or entries[-1][0] != schedule_id:
+                entries.append((schedule_id, dict(zip(_SCHEDULE_COLS, row[2:4])), []))
+            if row[4] is not None:
+                entries[-1][2].append(list(row[4:]))
+
+        n_contract, n_sale = len(_CONTRACT_COLS), len(_SALE_COLS)
+        for row in heads:
+            contract_id, stored = row[0], row[n_contract]
+            rest = row[n_contract + 1:]
+            payload = {
+                "v": HASH_VERSION,
+                "contract": dict(zip(_CONTRACT_COLS, row[:n_contract])),
+                "sale": dict(zip(_SALE_COLS, rest[:n_sale])),
+                "offer": dict(zip(_OFFER_COLS, rest[n_sale:])),
+                "schedules": [dict(terms, installments=[list(_INSTALLMENT_COLS), *lines])
+                              for _sid, terms, lines in schedules.get(contract_id, [])],
+            }
+            yield contract_id, stored, payload
+
+
+def canonical_bytes(payload: dict) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def contract_hash(payload: dict) -> str:
+    return hashlib.sha256(canonical_bytes(payload)).hexdigest()
+
+
+def load_payload(contract_id: int, manager=None) -> dict:
+    manager = manager or get_manager()
+    with manager.read() as c:
+        for _cid, _stored, payload in _payloads(c, [contract_id]):
+            return payload
+    raise KeyError(f"Contract {contract_id} not found")
+
+
+# ------------------------------
+# Rendering and packing (run in worker processes)
+# ------------------------------
+def _money(cents) -> str:
+    return f"{(cents or 0) / 100:,.2f} DZD"
+
+
+def _date(ms) -> str:
+    return datetime.fromtimestamp(ms / 1000).strftime("%Y-%m-%d") if ms else "-"
+
+
+def _render_pdf(payload: dict, digest: str) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    width, height = A4
+    margin, leading = 50, 14
+    buf = io.BytesIO()
+    # invariant: no creation date or random document id, so the bytes depend on the payload only
+    pdf = canvas.Canvas(buf, pagesize=A4, invariant=1, pageCompression=1)
+    contract, sale, offer = payload["contract"], payload["sale"], payload["offer"]
+
+    def footer():
+        pdf.setFont("Helvetica", 7)
+        pdf.drawString(margin, margin / 2, f"SHA-256 {digest}")
+
+    y = height - margin
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(margin, y, f"Instalment contract #{contract['id']}")
+    pdf.setFont("Helvetica", 10)
+    for line in (f"Issued {_date(contract['created_at'])} — branch {sale['branch_id']}, "
+                 f"customer #{sale['customer_id'] or '-'}",
+                 f"Sale total {_money(sale['total_cents'])}, down payment {_money(sale['down_payment_cents'])}",
+                 f"{offer['term_months']} months at {offer['apr_bp'] / 100:.2f}% APR, "
+                 f"fees {_money(offer['fees_cents'])}, insurance {_money(offer['insurance_cents'])}",
+                 f"Total to repay {_money(offer['total_repay_cents'])}"):
+        y -= 2 * leading if line.startswith("Issued") else leading
+        pdf.drawString(margin, y, line)
+
+    headers = ("No.", "Due date", "Principal", "Interest", "Fees", "Due")
+    col_x = [margin + i * (width - 2 * margin) / len(headers) for i in range(len(headers))]
+    for schedule in payload["schedules"]:
+        y -= 2 * leading
+        pdf.setFont("Helvetica-Bold", 9)
+        for x, h in zip(col_x, headers):
+            pdf.drawString(x, y, h)
+        pdf.setFont("Helvetica", 9)
+        for number, due_date, principal, interest, fees, due in schedule["installments"][1:]:
+            y -= leading
+            if y < margin:
+                footer()
+                pdf.showPage()
+                pdf.setFont("Helvetica", 9)
+                y = height - margin
+            for x, text in zip(col_x, (str(number), _date(due_date), _money(principal), _money(interest),
+                                       _money(fees), _money(due))):
+                pdf.drawString(x, y, text)
+    footer()
+    pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def _pack(contract_id: int, digest: str, payload_bytes: bytes, pdf: bytes) -> bytes:
+    files = {"contract.json": payload_bytes, "contract.pdf": pdf}
+    manifest = {
+        "contract_id": contract_id,
+        "hash_version": HASH_VERSION,
+        "immutable_hash": digest,
+        "files": {name: hashlib.sha256(data).hexdigest() for name, data in sorted(files.items())},
+    }
+    files["manifest.json"] = json.dumps(manifest, sort_keys=True, indent=2).encode("utf-8")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name in sorted(files):
+            z.writestr(zipfile.ZipInfo(name, _ZIP_DATE), files[name], zipfile.ZIP_DEFLATED)
+    return buf.getvalue()
+
+
+def _build(job: Tuple[int, dict]):
+    """Worker: hash, render and pack one contract. Touches no database."""
+    contract_id, payload = job
+    started = time.perf_counter()
+    payload_bytes = canonical_bytes(payload)
+    digest = hashlib.sha256(payload_bytes).hexdigest()
+    pdf = _render_pdf(payload, digest)
+    rendered = time.perf_counter()
+    pack = _pack(contract_id, digest, payload_bytes, pdf)
+    done = time.perf_counter()
+    return contract_id, digest, pdf, pack, (rendered - started) * 1000, (done - rendered) * 1000
+
+
+# ------------------------------
+# Pipeline
+# ------------------------------
+def pending_contracts(manager=None) -> List[int]:
+    """Contracts without an evidence pack yet."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        return [r[0] for r in c.execute("SELECT id FROM contract WHERE evidence_pack_id IS NULL ORDER BY id")]
+
+
+def generate_evidence(contract_ids: Optional[Sequence[int]] = None, workers: Optional[int] = None,
+                      store: Optional[AttachmentStore] = None,
+                      progress: Optional[Callable[[int, int], None]] = None, manager=None) -> EvidenceReport:
+    """
+    Hash, render (reportlab) and pack contracts, by default every one without
+    an evidence pack. PDFs are rendered in a pool of ``workers`` processes
+    (default: CPU count; 0 renders in this process). Only this process reads
+    and writes the database: workers get the canonical payload and return
+    bytes. The PDF and the pack (zip of the PDF, the canonical JSON and a
+    manifest of hashes) go to the attachment store and are linked from the
+    contract together with ``immutable_hash``.
+
+    A contract whose stored hash no longer matches its rows is listed in
+    ``tampered`` and left untouched.
+    """
+    manager = manager or get_manager()
+    store = store or get_store()
+    started = time.perf_counter()
+    ids = list(contract_ids) if contract_ids is not None else pending_contracts(manager)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    report = EvidenceReport(workers=workers)
+
+    def jobs():
+        with manager.read() as c:
+            payloads = list(_payloads(c, ids))
+        for contract_id, stored, payload in payloads:
+            if stored is not None and stored != contract_hash(payload):
+                report.tampered.append(contract_id)
+                continue
+            yield contract_id, payload
+
+    pool = ProcessPoolExecutor(workers) if workers else None
+    try:
+        results = pool.map(_build, jobs(), chunksize=8) if pool else map(_build, jobs())
+        for contract_id, digest, pdf, pack, render_ms, pack_ms in results:
+            stored_at = time.perf_counter()
+            pdf_att = store.put(pdf, kind="pdf")
+            pack_att = store.put(pack, kind="binary")
+            with manager.write() as c:
+                c.execute("""
+                    UPDATE contract
+                    SET immutable_hash = ?, pdf_attachment_id = ?, evidence_pack_id = ?, updated_at = ?,
+                        version = version + 1
+                    WHERE id = ?
+                """, (digest, pdf_att.id, pack_att.id, now_ms(), contract_id))
+            report.timings.append(DocumentTiming(contract_id, render_ms, pack_ms,
+                                                 (time.perf_counter() - stored_at) * 1000))
+            report.generated += 1
+            if progress:
+                progress(report.generated, len(ids))
+    finally:
+        if pool:
+            pool.shutdown()
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def seal_contracts(contract_ids: Optional[Sequence[int]] = None, manager=None) -> int:
+    """Store ``immutable_hash`` for contracts that have none (no PDF). Returns how many."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        ids = list(contract_ids) if contract_ids is not None else [
+            r[0] for r in c.execute("SELECT id FROM contract WHERE immutable_hash IS NULL ORDER BY id")]
+        updates = [(contract_hash(payload), now_ms(), cid) for cid, stored, payload in _payloads(c, ids)
+                   if stored is None]
+    with manager.write() as c:
+        c.executemany("""
+            UPDATE contract SET immutable_hash = ?, updated_at = ?, version = version + 1
+            WHERE id = ? AND immutable_hash IS NULL
+        """, updates)
+    return len(updates)
+
+
+def verify_contracts(contract_ids: Optional[Sequence[int]] = None, check_files: bool = False,
+                     store: Optional[AttachmentStore] = None, manager=None) -> VerifyReport:
+    """
+    Re-hash stored contracts from their rows and compare with
+    ``immutable_hash``. Rows are loaded a few hundred contracts per query
+    and no PDF is rendered, so thousands verify in well under a second.
+    ``check_files`` also re-reads each evidence pack and PDF blob.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = VerifyReport()
+    with manager.read() as c:
+        ids = list(contract_ids) if contract_ids is not None else [
+            r[0] for r in c.execute("SELECT id FROM contract ORDER BY id")]
+        for contract_id, stored, payload in _payloads(c, ids):
+            report.checked += 1
+            if stored is None:
+                report.unsealed += 1
+            elif stored != contract_hash(payload):
+                report.mismatched.append(contract_id)
+        files = c.execute(f"""
+            SELECT id, pdf_attachment_id, evidence_pack_id FROM contract
+            WHERE evidence_pack_id IS NOT NULL AND id IN ({",".join("?" * len(ids))})
+        """, ids).fetchall() if check_files and ids else []
+    if files:
+        store = store or get_store()
+        for contract_id, pdf_id, pack_id in files:
+            if not all(store.verify(a) for a in (pdf_id, pack_id) if a is not None):
+                report.damaged_files.append(contract_id)
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
@@ -0,0 +1,309 @@
+import csv
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import get_manager
+
+XLSX_MAX_ROWS = 1_048_575   # data rows per sheet (one row is the header)
+
+
+class ExportCancelled(Exception):
+    """Raised inside an export when ``should_cancel()`` returned True."""
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    title: str
+    columns: Tuple[Tuple[str, str], ...]   # (header, kind): kind is text | int | money | date
+    sql: str                               # named params :start and :end (Unix ms)
+    count_sql: str
+
+
+# Rows are read in id order with a range filter: one forward scan, no temp
+# B-tree to sort millions of rows before the first one comes out.
+REPORTS: Dict[str, ReportSpec] = {
+    "payments": ReportSpec(
+        title="Payments",
+        columns=(("Payment #", "int"), ("Received", "date"), ("Branch", "int"), ("Contract", "int"),
+                 ("Channel", "text"), ("Reference", "text"), ("Amount", "money"), ("Status", "text")),
+        sql="""
+            SELECT id, received_at, branch_id, contract_id, channel, provider_ref, amount_cents, status
+            FROM payment WHERE received_at BETWEEN :start AND :end ORDER BY id
+        """,
+        count_sql="SELECT COUNT(*) FROM payment WHERE received_at BETWEEN :start AND :end",
+    ),
+    "sales": ReportSpec(
+        title="Sales",
+        columns=(("Sale #", "int"), ("Completed", "date"), ("Branch", "int"), ("Customer", "int"),
+                 ("Type", "text"), ("Total", "money"), ("Down payment", "money")),
+        sql="""
+            SELECT id, completed_at, branch_id, customer_id, type, total_cents, down_payment_cents
+            FROM sale WHERE status = 'completed' AND completed_at BETWEEN :start AND :end ORDER BY id
+        """,
+        count_sql="""
+            SELECT COUNT(*) FROM sale WHERE status = 'completed' AND completed_at BETWEEN :start AND :end
+        """,
+    ),
+    "installments": ReportSpec(
+        title="Open installments",
+        columns=(("Installment #", "int"), ("Schedule", "int"), ("No.", "int"), ("Due", "date"),
+                 ("Due amount", "money"), ("Paid", "money"), ("Status", "text")),
+        sql="""
+            SELECT id, schedule_id, number, due_date, due_cents, paid_cents, status
+            FROM installment
+            WHERE status IN ('upcoming', 'due', 'overdue') AND due_date BETWEEN :start AND :end
+            ORDER BY id
+        """,
+        count_sql="""
+            SELECT COUNT(*) FROM installment
+            WHERE status IN ('upcoming', 'due', 'overdue') AND due_date BETWEEN :start AND :end
+        """,
+    ),
+}
+
+
+@dataclass
+class ExportReport:
+    path: Path
+    fmt: str
+    rows: int = 0
+    bytes: int = 0
+    elapsed_ms: float = 0.0
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / (self.elapsed_ms / 1000) if self.elapsed_ms else 0.0
+
+
+def _converter(kind: str) -> Callable:
+    if kind == "money":
+        return lambda v: None if v is None else v / 100
+    if kind == "date":
+        return lambda v: None if v is None else datetime.fromtimestamp(v / 1000)
+    return lambda v: v
+
+
+def stream_rows(sql: str, params=(), chunk_size: int = 5000, manager=None) -> Iterator[List[tuple]]:
+    """
+    Yield the result of ``sql`` in lists of at most ``chunk_size`` rows.
+    One pooled reader is held until the generator is exhausted or closed.
+    """
+    manager = manager or get_manager()
+    with manager.read() as c:
+        cur = c.execute(sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cur.close()
+
+
+# ------------------------------
+# Writers: consume chunks, call tick(n) after each one
+# ------------------------------
+def _write_csv(path: Path, spec: ReportSpec, rows: Iterator[list], tick):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:   # BOM: Excel opens it as UTF-8
+        out = csv.writer(f)
+        out.writerow([h for h, _ in spec.columns])
+        for chunk in rows:
+            out.writerows(chunk)
+            tick(len(chunk))
+
+
+def _write_xlsx(path: Path, spec: ReportSpec, rows: Iterator[list], tick):
+    from openpyxl import Workbook   # heavy import, only paid when exporting
+
+    wb = Workbook(write_only=True)   # rows are streamed to a temp file, not kept as cells
+    headers = [h for h, _ in spec.columns]
+    sheet, in_sheet, part = None, XLSX_MAX_ROWS, 0
+    for chunk in rows:
+        for row in chunk:
+            if in_sheet == XLSX_MAX_ROWS:
+                part += 1
+                sheet = wb.create_sheet(spec.title if part == 1 else f"{spec.title} ({part})")
+                sheet.append(headers)
+                in_sheet = 0
+            sheet.append(row)
+            in_sheet += 1
+        tick(len(chunk))
+    if sheet is None:
+        wb.create_sheet(spec.title).append(headers)
+    wb.save(path)
+
+
+class _PdfStream:
+    """
+    Minimal PDF 1.4 writer for text tables. Each page is compressed and
+    written out as soon as it is finished; only object offsets and page ids
+    stay in memory, and the page tree and xref table go last. Text uses the
+    two standard Helvetica fonts (not embedded), WinAnsi-encoded.
+    """
+    CATALOG, PAGES, FONT, BOLD = 1, 2, 3, 4
+
+    def __init__(self, f, width: float, height: float):
+        self.f = f
+        self.width, self.height = width, height
+        self.offsets: List[int] = [0] * 4
+        self.pages: List[int] = []
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for num, name in ((self.FONT, b"Helvetica"), (self.BOLD, b"Helvetica-Bold")):
+            self._obj(num, b"<< /Type /Font /Subtype /Type1 /BaseFont /" + name
+                      + b" /Encoding /WinAnsiEncoding >>")
+
+    @staticmethod
+    def text(value: str) -> bytes:
+        raw = value.encode("cp1252", "replace")
+        for char, escaped in ((b"\\", b"\\\\"), (b"(", b"\\("), (b")", b"\\)"), (b"\r", b"\\r"), (b"\n", b"\\n")):
+            raw = raw.replace(char, escaped)
+        return b"(" + raw + b")"
+
+    def _new_id(self) -> int:
+        self.offsets.append(0)
+        return len(self.offsets)
+
+    def _obj(self, num: int, body: bytes):
+        self.offsets[num - 1] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    def page(self, content: bytes):
+        data = zlib.compress(content)
+        stream_id = self._new_id()
+        self._obj(stream_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        page_id = self._new_id()
+        self._obj(page_id, b"<< /Type /Page /Parent %d 0 R /Contents %d 0 R >>" % (self.PAGES, stream_id))
+        self.pages.append(page_id)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % n for n in self.pages)
+        self._obj(self.PAGES, b"<< /Type /Pages /Count %d /Kids [%s] /MediaBox [0 0 %.2f %.2f] "
+                  b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>"
+                  % (len(self.pages), kids, self.width, self.height, self.FONT, self.BOLD))
+        self._obj(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        self.f.write(b"".join(b"%010d 00000 n \n" % o for o in self.offsets))
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (len(self.offsets) + 1, self.CATALOG, xref))
+
+
+def _write_pdf(path: Path, spec: ReportSpec, rows: Iterator[list], tick):
+    width, height = 841.89, 595.28   # A4 landscape, points
+    margin, leading, font_size = 36, 11, 8
+    col_w = (width - 2 * margin) / len(spec.columns)
+    max_chars = max(4, int(col_w / (font_size * 0.5)))
+    per_page = int((height - 2 * margin - 2 * leading) / leading)
+    text = _PdfStream.text
+
+    def draw(font: bytes, size: int, x: float, y: float, value: str) -> bytes:
+        return b"BT /%s %d Tf %.2f %.2f Td %s Tj ET\n" % (font, size, x, y, text(value))
+
+    def header(page: int) -> List[bytes]:
+        out = [draw(b"F2", font_size + 2, margin, height - margin, f"{spec.title} — page {page}")]
+        out += [draw(b"F2", font_size, margin + i * col_w, height - margin - 2 * leading, h)
+                for i, (h, _) in enumerate(spec.columns)]
+        return out
+
+    def cell(value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M")
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return str(value)[:max_chars]
+
+    with open(path, "wb") as f:
+        pdf = _PdfStream(f, width, height)
+        content, line = header(1), 0
+        for chunk in rows:
+            for row in chunk:
+                if line == per_page:   # page full: write it out, keep nothing of it but its offset
+                    pdf.page(b"".join(content))
+                    content, line = header(len(pdf.pages) + 1), 0
+                y = height - margin - (line + 3) * leading
+                content += [draw(b"F1", font_size, margin + i * col_w, y, cell(v))
+                            for i, v in enumerate(row) if v is not None]
+                line += 1
+            tick(len(chunk))
+        pdf.page(b"".join(content))
+        pdf.close()
+
+
+_WRITERS = {"csv": _write_csv, "xlsx": _write_xlsx, "pdf": _write_pdf}
+
+
+def export_report(name: str, path, fmt: Optional[str] = None, start_ms: int = 0,
+                  end_ms: Optional[int] = None, chunk_size: int = 5000,
+                  progress: Optional[Callable[[int, int], None]] = None,
+                  should_cancel: Optional[Callable[[], bool]] = None,
+                  manager=None) -> ExportReport:
+    """
+    Stream report ``name`` (see REPORTS) to ``path`` as csv, xlsx or pdf
+    (default: the file suffix), ``chunk_size`` rows at a time. All three run
+    in flat memory whatever the row count: CSV and PDF are written as they
+    go (a PDF keeps only object offsets), XLSX through a write-only workbook.
+
+    ``progress(done, total)`` is called after every chunk and
+    ``should_cancel()`` is checked there too; a cancelled or failed export
+    raises (ExportCancelled) and leaves no file behind. The file appears
+    under its final name only when complete.
+    """
+    spec = REPORTS.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown report {name!r}; choose from {sorted(REPORTS)}")
+    path = Path(path)
+    fmt = (fmt or path.suffix.lstrip(".")).lower()
+    writer = _WRITERS.get(fmt)
+    if writer is None:
+        raise ValueError(f"Unsupported export format {fmt!r}; choose from {sorted(_WRITERS)}")
+
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    params = {"start": start_ms, "end": end_ms if end_ms is not None else 2 ** 62}
+    with manager.read() as c:
+        total = c.execute(spec.count_sql, params).fetchone()[0]
+
+    report = ExportReport(path=path, fmt=fmt)
+    convert = [_converter(kind) for _, kind in spec.columns]
+
+    def converted():
+        for chunk in stream_rows(spec.sql, params, chunk_size, manager):
+            yield [tuple(f(v) for f, v in zip(convert, row)) for row in chunk]
+
+    def tick(n: int):
+        report.rows += n
+        if progress:
+            progress(report.rows, total)
+        if should_cancel and should_cancel():
+            raise ExportCancelled(f"Export of {name} cancelled after {report.rows} rows")
+
+    partial = path.with_name(path.name + ".partial")
+    rows = converted()
+    try:
+        writer(partial, spec, rows, tick)
+        os.replace(partial, path)
+    finally:
+        rows.close()   # hand the reader back now, even when cancelled mid-stream
+        if partial.exists():
+            partial.unlink()
+
+    report.bytes = path.stat().st_size
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def available_formats() -> List[str]:
+    """Formats whose libraries are installed (csv and pdf need none)."""
+    import importlib.util
+    found = ["csv", "pdf"]
+    if importlib.util.find_spec("openpyxl") is not None:
+        found.insert(1, "xlsx")
+    return found
@@ -0,0 +1,113 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from . import audit, get_manager, now_ms
+
+DAY_MS = 24 * 60 * 60 * 1000
+WATERMARK_KEY = "installment_status_through"
+
+
+@dataclass
+class StatusRunReport:
+    through: int                       # cutoff used (ms, start of the day after "today")
+    transitioned: Dict[str, int] = field(default_factory=dict)   # "upcoming->due": n
+    batches: int = 0
+    elapsed_ms: float = 0.0
+    skipped: bool = False              # watermark already covered this day
+
+    @property
+    def total(self) -> int:
+        return sum(self.transitioned.values())
+
+
+def _day_start_ms(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day).timestamp() * 1000)
+
+
+def _read_watermark(conn) -> int:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (WATERMARK_KEY,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _transition(manager, report, from_status, to_status, cutoff, batch_size):
+    """
+    Move rows with ``status = from_status AND due_date < cutoff`` in batches.
+
+    Every earlier run already moved the rows below its own cutoff, so this
+    range on idx_installment_due(status, due_date) only visits rows whose
+    due date crossed since the last run (plus any back-dated inserts).
+    """
+    moved = 0
+    while True:
+        with manager.write() as c:
+            cur = c.execute("""
+                UPDATE installment
+                SET status = ?, updated_at = ?, version = version + 1
+                WHERE id IN (
+                    SELECT id FROM installment
+                    WHERE status = ? AND due_date < ?
+                    LIMIT ?
+                )
+            """, (to_status, now_ms(), from_status, cutoff, batch_size))
+            n = cur.rowcount
+            if n:
+                audit.record("transition", "installment", None, {"from": from_status, "to": to_status,
+                                                                 "rows": n, "cutoff": cutoff}, manager=manager)
+        report.batches += 1
+        moved += n
+        if n < batch_size:
+            break
+    if moved:
+        report.transitioned[f"{from_status}->{to_status}"] = moved
+
+
+def refresh_statuses(today: Optional[date] = None, grace_days: int = 0,
+                     batch_size: int = 2000, force: bool = False, manager=None) -> StatusRunReport:
+    """
+    Advance installment statuses for ``today``.
+
+    - 'upcoming' -> 'due'     once the due date is today or earlier
+    - 'due'      -> 'overdue' once the due date is more than ``grace_days`` days past
+
+    'paid' and 'written_off' rows are never touched. The cutoff of the last
+    run is kept in app_meta, so a second run on the same day is a no-op
+    unless ``force`` is set. Each batch commits separately, keeping write
+    locks short.
+    """
+    manager = manager or get_manager()
+    today = today or date.today()
+    started = time.perf_counter()
+    due_cutoff = _day_start_ms(today + timedelta(days=1))
+    overdue_cutoff = _day_start_ms(today - timedelta(days=grace_days))
+    report = StatusRunReport(through=due_cutoff)
+
+    with manager.read() as c:
+        if not force and _read_watermark(c) >= due_cutoff:
+            report.skipped = True
+            report.elapsed_ms = (time.perf_counter() - started) * 1000
+            return report
+
+    _transition(manager, report, "upcoming", "due", due_cutoff, batch_size)
+    _transition(manager, report, "due", "overdue", overdue_cutoff, batch_size)
+
+    with manager.write() as c:
+        c.execute("INSERT OR REPLACE INTO app_meta(key, value) VALUES (?, ?)",
+                  (WATERMARK_KEY, str(due_cutoff)))
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def refresh_statuses_in_background(on_done: Optional[Callable[[StatusRunReport], None]] = None,
+                                   **kwargs) -> threading.Thread:
+    """Run refresh_statuses() on a daemon thread and hand the report to ``on_done``."""
+    def run():
+        report = refresh_statuses(**kwargs)
+        if on_done is not None:
+            on_done(report)
+
+    t = threading.Thread(target=run, name="installment-status", daemon=True)
+    t.start()
+    return t
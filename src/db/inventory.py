@@ -1,33 +1,27 @@
 import sqlite3
 from pathlib import Path
 
-from . import get_conn
-
-def _create_suppliers():
-    with get_conn() as c:
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS suppliers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT,
-            phone1 INTEGER,
-            phone2 INTEGER,
-            social TEXT,
-            address TEXT
-        );
-        """)
+from . import audit, read_conn, write_conn
 
 def add_supplier(name, email, phone1, phone2, social, address):
-    with get_conn() as c:
-        c.execute("""
+    with write_conn() as c:
+        supplier_id = c.execute("""
             INSERT INTO suppliers (name, email, phone1, phone2, social, address)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (name, email, phone1, phone2, social, address))
+        """, (name, email, phone1, phone2, social, address)).lastrowid
+        audit.record("create", "suppliers", supplier_id, {"name": name})
+    return supplier_id
 
 def list_suppliers():
-    with get_conn() as c:
+    with read_conn() as c:
         cur = c.execute("""
             SELECT id, name, email, phone1, phone2, social, address
             FROM suppliers ORDER BY id DESC
         """)
-        return cur.fetchall()
\ No newline at end of file
+        return cur.fetchall()
+
+def suppliers_pager(**kwargs):
+    """Keyset pager over suppliers, newest first (for LazyTableModel)."""
+    from .paging import KeysetPager
+    return KeysetPager("suppliers", ["id", "name", "email", "phone1", "phone2", "social", "address"],
+                       descending=True, **kwargs)
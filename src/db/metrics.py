@@ -0,0 +1,205 @@
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from . import get_manager
+
+OPEN_STATUSES = ("upcoming", "due", "overdue")
+
+# table -> (key columns, value columns, query computing the rollup from the raw tables).
+# Must group exactly like the triggers in migrations/0006_dashboard_metrics.sql.
+_SOURCES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...], str]] = {
+    "metric_sales_daily": (
+        ("day", "branch_id", "type"),
+        ("sales_count", "total_cents", "down_payment_cents"),
+        """
+        SELECT date(COALESCE(completed_at, created_at) / 1000, 'unixepoch', 'localtime'), branch_id, type,
+               COUNT(*), SUM(total_cents), SUM(down_payment_cents)
+        FROM sale WHERE status = 'completed' GROUP BY 1, 2, 3
+        """,
+    ),
+    "metric_collections_daily": (
+        ("day", "branch_id", "channel"),
+        ("payments_count", "amount_cents"),
+        """
+        SELECT date(received_at / 1000, 'unixepoch', 'localtime'), branch_id, channel,
+               COUNT(*), SUM(amount_cents)
+        FROM payment WHERE status = 'succeeded' GROUP BY 1, 2, 3
+        """,
+    ),
+    "metric_receivables": (
+        ("branch_id", "status"),
+        ("installments", "principal_cents", "due_cents", "paid_cents"),
+        """
+        SELECT IFNULL(s.branch_id, 0), i.status, COUNT(*), SUM(i.principal_cents),
+               SUM(i.due_cents), SUM(i.paid_cents)
+        FROM installment i
+        LEFT JOIN schedule sc ON sc.id = i.schedule_id
+        LEFT JOIN contract ct ON ct.id = sc.contract_id
+        LEFT JOIN sale s ON s.id = ct.sale_id
+        GROUP BY 1, 2
+        """,
+    ),
+}
+
+
+@dataclass
+class DashboardSummary:
+    start: str                      # first day of the period (YYYY-MM-DD)
+    end: str                        # last day, inclusive
+    sales_cents: int = 0
+    sales_count: int = 0
+    sales_by_type: Dict[str, int] = field(default_factory=dict)
+    collections_cents: int = 0
+    outstanding_cents: int = 0      # due - paid over open installments
+    open_installments: int = 0
+    overdue_count: int = 0
+    overdue_cents: int = 0
+    sales_trend: List[Tuple[str, int]] = field(default_factory=list)   # one row per day, gaps filled
+    elapsed_ms: float = 0.0
+
+
+@dataclass
+class MetricDrift:
+    table: str
+    key: tuple
+    recorded: tuple     # rollup values (zeros when the row is missing)
+    expected: tuple     # recomputed from the raw tables
+
+
+@dataclass
+class MetricsCheckReport:
+    rows_checked: int = 0
+    drift: List[MetricDrift] = field(default_factory=list)
+    fixed: bool = False
+    elapsed_ms: float = 0.0
+
+
+def _branch_filter(branch_id: Optional[int]) -> Tuple[str, tuple]:
+    return ("AND branch_id = ?", (branch_id,)) if branch_id is not None else ("", ())
+
+
+def dashboard_summary(days: int = 30, branch_id: Optional[int] = None, today: Optional[date] = None,
+                      manager=None) -> DashboardSummary:
+    """
+    Everything DashboardPage shows for the last ``days`` days, read from the
+    rollup tables only (a few hundred rows, whatever the history size).
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    today = today or date.today()
+    first = today - timedelta(days=days - 1)
+    summary = DashboardSummary(start=first.isoformat(), end=today.isoformat())
+    branch_sql, branch_params = _branch_filter(branch_id)
+    period = (summary.start, summary.end) + branch_params
+
+    with manager.read() as c:
+        per_day = {}
+        for day, type_, count, total in c.execute(f"""
+            SELECT day, type, SUM(sales_count), SUM(total_cents) FROM metric_sales_daily
+            WHERE day BETWEEN ? AND ? {branch_sql} GROUP BY day, type
+        """, period):
+            summary.sales_count += count
+            summary.sales_cents += total
+            summary.sales_by_type[type_] = summary.sales_by_type.get(type_, 0) + total
+            per_day[day] = per_day.get(day, 0) + total
+
+        summary.collections_cents = c.execute(f"""
+            SELECT IFNULL(SUM(amount_cents), 0) FROM metric_collections_daily
+            WHERE day BETWEEN ? AND ? {branch_sql}
+        """, period).fetchone()[0]
+
+        for status, count, due, paid in c.execute(f"""
+            SELECT status, SUM(installments), SUM(due_cents), SUM(paid_cents) FROM metric_receivables
+            WHERE status IN ({','.join('?' * len(OPEN_STATUSES))}) {branch_sql} GROUP BY status
+        """, OPEN_STATUSES + branch_params):
+            summary.open_installments += count
+            summary.outstanding_cents += due - paid
+            if status == "overdue":
+                summary.overdue_count = count
+                summary.overdue_cents = due - paid
+
+    summary.sales_trend = [
+        (d, per_day.get(d, 0))
+        for d in ((first + timedelta(days=k)).isoformat() for k in range(days))
+    ]
+    summary.elapsed_ms = (time.perf_counter() - started) * 1000
+    return summary
+
+
+def rebuild_metrics(manager=None) -> Dict[str, int]:
+    """Recompute every rollup table from the raw tables; returns rows per table."""
+    manager = manager or get_manager()
+    counts = {}
+    with manager.write() as c:
+        for table, (keys, values, query) in _SOURCES.items():
+            c.execute(f"DELETE FROM {table}")
+            c.execute(f"INSERT INTO {table} ({', '.join(keys + values)}) {query}")
+            counts[table] = c.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+
+def check_metrics(fix: bool = False, manager=None) -> MetricsCheckReport:
+    """
+    Compare every rollup row with a fresh aggregation of the raw tables.
+    Rows whose values are all zero count as missing. With ``fix`` and any
+    drift, the rollups are rebuilt. Scans history: maintenance use only.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = MetricsCheckReport()
+    with manager.read() as c:
+        for table, (keys, values, query) in _SOURCES.items():
+            n = len(keys)
+            recorded = {tuple(r[:n]): tuple(r[n:]) for r in c.execute(
+                f"SELECT {', '.join(keys + values)} FROM {table}"
+            ) if any(r[n:])}
+            expected = {tuple(r[:n]): tuple(r[n:]) for r in c.execute(query)}
+            zero = (0,) * len(values)
+            for key in sorted(recorded.keys() | expected.keys(), key=repr):
+                got, want = recorded.get(key, zero), expected.get(key, zero)
+                if got != want:
+                    report.drift.append(MetricDrift(table, key, got, want))
+            report.rows_checked += len(expected)
+
+    if fix and report.drift:
+        rebuild_metrics(manager)
+        report.fixed = True
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def snapshot_receivables(day: Optional[date] = None, manager=None) -> int:
+    """
+    Store today's open/overdue totals per branch in metric_receivables_daily
+    (replacing an earlier snapshot of the same day). Cheap: it reads the
+    rollup, not the installments. Returns the number of branches written.
+    """
+    manager = manager or get_manager()
+    day = (day or date.today()).isoformat()
+    marks = ",".join("?" * len(OPEN_STATUSES))
+    with manager.write() as c:
+        c.execute("DELETE FROM metric_receivables_daily WHERE day = ?", (day,))
+        return c.execute(f"""
+            INSERT INTO metric_receivables_daily
+                (day, branch_id, open_installments, outstanding_cents, overdue_count, overdue_cents)
+            SELECT ?, branch_id, SUM(installments), SUM(due_cents - paid_cents),
+                   SUM(CASE WHEN status = 'overdue' THEN installments ELSE 0 END),
+                   SUM(CASE WHEN status = 'overdue' THEN due_cents - paid_cents ELSE 0 END)
+            FROM metric_receivables WHERE status IN ({marks})
+            GROUP BY branch_id
+        """, (day,) + OPEN_STATUSES).rowcount
+
+
+def receivables_trend(days: int = 90, branch_id: Optional[int] = None, today: Optional[date] = None,
+                      manager=None) -> List[Tuple[str, int, int]]:
+    """(day, outstanding_cents, overdue_count) for the stored daily snapshots."""
+    manager = manager or get_manager()
+    today = today or date.today()
+    branch_sql, branch_params = _branch_filter(branch_id)
+    with manager.read() as c:
+        return c.execute(f"""
+            SELECT day, SUM(outstanding_cents), SUM(overdue_count) FROM metric_receivables_daily
+            WHERE day BETWEEN ? AND ? {branch_sql} GROUP BY day ORDER BY day
+        """, ((today - timedelta(days=days - 1)).isoformat(), today.isoformat()) + branch_params).fetchall()
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+from . import get_manager, now_ms
+
+# Version 1 is the base schema at the repository root; later versions live
+# next to this module as NNNN_<name>.sql and are applied in order.
+BASE_SCHEMA = Path(__file__).resolve().parents[2] / "sqlite_schema.sql"
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+_NAME_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def available_migrations():
+    """Return [(version, name, path)] sorted by version, without reading any file."""
+    found = [(1, "base_schema", BASE_SCHEMA)]
+    with os.scandir(MIGRATIONS_DIR) as it:
+        for entry in it:
+            m = _NAME_RE.match(entry.name)
+            if m and int(m.group(1)) > 1:
+                found.append((int(m.group(1)), m.group(2), Path(entry.path)))
+    found.sort()
+    return found
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = 'schema_version'").fetchone()
+    except sqlite3.OperationalError:  # fresh database: no app_meta yet
+        return 0
+    return int(row[0]) if row else 0
+
+
+def _checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+
+def _statements(sql: str):
+    """Split a script into complete statements (trigger bodies stay intact)."""
+    buf = ""
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            yield buf.strip()
+            buf = ""
+    rest = "\n".join(l for l in buf.splitlines() if not l.strip().startswith("--"))
+    if rest.strip():
+        raise ValueError("Migration script ends with an incomplete statement")
+
+
+def _apply(conn: sqlite3.Connection, version: int, name: str, sql: str):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at INTEGER NOT NULL
+        )
+    """)
+    for stmt in _statements(sql):
+        conn.execute(stmt)
+    conn.execute("INSERT OR REPLACE INTO app_meta(key, value) VALUES ('schema_version', ?)", (str(version),))
+    conn.execute("""
+        INSERT OR REPLACE INTO schema_migrations (version, name, checksum, applied_at)
+        VALUES (?, ?, ?, ?)
+    """, (version, name, _checksum(sql), now_ms()))
+
+
+def migrate(manager=None):
+    """
+    Bring the database up to the latest schema version.
+
+    The warm path (schema already current) is one indexed read of
+    ``app_meta`` and a directory listing, with no DDL. Each pending
+    migration runs in its own transaction. Returns the applied versions.
+    """
+    manager = manager or get_manager()
+    pending = available_migrations()
+    with manager.read() as c:
+        version = current_version(c)
+    pending = [m for m in pending if m[0] > version]
+    if not pending:
+        return []
+
+    applied = []
+    for number, name, path in pending:
+        sql = path.read_text(encoding="utf-8")
+        with manager.write() as c:
+            # Another process may have migrated while we waited for the lock
+            if current_version(c) >= number:
+                continue
+            _apply(c, number, name, sql)
+        applied.append(number)
+    return applied
+
+
+def verify(manager=None):
+    """Return [(version, name)] whose recorded checksum no longer matches the file."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        try:
+            recorded = dict(c.execute("SELECT version, checksum FROM schema_migrations"))
+        except sqlite3.OperationalError:
+            return []
+    drift = []
+    for number, name, path in available_migrations():
+        if number in recorded and recorded[number] != _checksum(path.read_text(encoding="utf-8")):
+            drift.append((number, name))
+    return drift
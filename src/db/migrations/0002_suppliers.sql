@@ -0,0 +1,10 @@
+-- Suppliers (previously created ad hoc by db.inventory._create_suppliers)
+CREATE TABLE IF NOT EXISTS suppliers (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL,
+  email TEXT,
+  phone1 INTEGER,
+  phone2 INTEGER,
+  social TEXT,
+  address TEXT
+);
@@ -0,0 +1,3 @@
+-- Installment lookups by schedule (regeneration, allocation) and schedule by contract
+CREATE INDEX IF NOT EXISTS idx_installment_schedule ON installment(schedule_id, number);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_schedule_contract ON schedule(contract_id);
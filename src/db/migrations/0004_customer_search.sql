@@ -0,0 +1,35 @@
+-- Customer search: rebuild fts_customers over normalized names.
+-- The index is contentless; rows are joined back to customer by rowid.
+-- name_fold() is registered by db.connection.ConnectionManager, so writes
+-- to customer must go through the app's connections.
+DROP TRIGGER IF EXISTS customer_ai;
+DROP TRIGGER IF EXISTS customer_ad;
+DROP TRIGGER IF EXISTS customer_au;
+DROP TABLE IF EXISTS fts_customers;
+
+CREATE VIRTUAL TABLE fts_customers USING fts5(
+  full_name, arabic_full_name, content='', tokenize='unicode61 remove_diacritics 2'
+);
+INSERT INTO fts_customers(rowid, full_name, arabic_full_name)
+  SELECT id, name_fold(full_name), name_fold(arabic_full_name) FROM customer;
+
+-- Bumped on every change that can alter search results; caches compare it
+INSERT OR IGNORE INTO app_meta(key, value) VALUES ('customer_rev', '0');
+
+CREATE TRIGGER customer_ai AFTER INSERT ON customer BEGIN
+  INSERT INTO fts_customers(rowid, full_name, arabic_full_name)
+    VALUES (new.id, name_fold(new.full_name), name_fold(new.arabic_full_name));
+  UPDATE app_meta SET value = value + 1 WHERE key = 'customer_rev';
+END;
+CREATE TRIGGER customer_ad AFTER DELETE ON customer BEGIN
+  INSERT INTO fts_customers(fts_customers, rowid, full_name, arabic_full_name)
+    VALUES ('delete', old.id, name_fold(old.full_name), name_fold(old.arabic_full_name));
+  UPDATE app_meta SET value = value + 1 WHERE key = 'customer_rev';
+END;
+CREATE TRIGGER customer_au AFTER UPDATE OF full_name, arabic_full_name, branch_id ON customer BEGIN
+  INSERT INTO fts_customers(fts_customers, rowid, full_name, arabic_full_name)
+    VALUES ('delete', old.id, name_fold(old.full_name), name_fold(old.arabic_full_name));
+  INSERT INTO fts_customers(rowid, full_name, arabic_full_name)
+    VALUES (new.id, name_fold(new.full_name), name_fold(new.arabic_full_name));
+  UPDATE app_meta SET value = value + 1 WHERE key = 'customer_rev';
+END;
@@ -0,0 +1,12 @@
+-- Periodic stock balance snapshots: "stock as of X" = latest snapshot <= X
+-- plus the ledger rows after it, instead of replaying the whole ledger.
+CREATE TABLE IF NOT EXISTS stock_snapshot (
+  product_id INTEGER NOT NULL,
+  branch_id INTEGER NOT NULL,
+  at INTEGER NOT NULL,
+  qty INTEGER NOT NULL,
+  created_at INTEGER NOT NULL,
+  PRIMARY KEY (product_id, branch_id, at),
+  FOREIGN KEY(product_id) REFERENCES product(id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_stock_snapshot_at ON stock_snapshot(at);
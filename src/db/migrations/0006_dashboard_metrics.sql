@@ -0,0 +1,193 @@
+-- Dashboard rollups, kept current by triggers so the dashboard reads a few
+-- hundred pre-aggregated rows instead of scanning sale/payment/installment.
+-- Every trigger subtracts the old row's contribution and adds the new one;
+-- db.metrics.rebuild_metrics() recomputes everything from the raw tables
+-- with the same grouping, and check_metrics() compares the two.
+-- Days are local calendar days of completed_at / received_at.
+CREATE TABLE IF NOT EXISTS metric_sales_daily (
+  day TEXT NOT NULL,
+  branch_id INTEGER NOT NULL,
+  type TEXT NOT NULL,
+  sales_count INTEGER NOT NULL DEFAULT 0,
+  total_cents INTEGER NOT NULL DEFAULT 0,
+  down_payment_cents INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, branch_id, type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS metric_collections_daily (
+  day TEXT NOT NULL,
+  branch_id INTEGER NOT NULL,
+  channel TEXT NOT NULL,
+  payments_count INTEGER NOT NULL DEFAULT 0,
+  amount_cents INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, branch_id, channel)
+) WITHOUT ROWID;
+
+-- Current receivables by branch and installment status
+CREATE TABLE IF NOT EXISTS metric_receivables (
+  branch_id INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  installments INTEGER NOT NULL DEFAULT 0,
+  principal_cents INTEGER NOT NULL DEFAULT 0,
+  due_cents INTEGER NOT NULL DEFAULT 0,
+  paid_cents INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (branch_id, status)
+) WITHOUT ROWID;
+
+-- End-of-day copies of metric_receivables for the outstanding trend
+CREATE TABLE IF NOT EXISTS metric_receivables_daily (
+  day TEXT NOT NULL,
+  branch_id INTEGER NOT NULL,
+  open_installments INTEGER NOT NULL,
+  outstanding_cents INTEGER NOT NULL,
+  overdue_count INTEGER NOT NULL,
+  overdue_cents INTEGER NOT NULL,
+  PRIMARY KEY (day, branch_id)
+) WITHOUT ROWID;
+
+-- ---------- Initial fill ----------
+DELETE FROM metric_sales_daily;
+INSERT INTO metric_sales_daily (day, branch_id, type, sales_count, total_cents, down_payment_cents)
+  SELECT date(COALESCE(completed_at, created_at) / 1000, 'unixepoch', 'localtime'), branch_id, type,
+         COUNT(*), SUM(total_cents), SUM(down_payment_cents)
+  FROM sale WHERE status = 'completed' GROUP BY 1, 2, 3;
+
+DELETE FROM metric_collections_daily;
+INSERT INTO metric_collections_daily (day, branch_id, channel, payments_count, amount_cents)
+  SELECT date(received_at / 1000, 'unixepoch', 'localtime'), branch_id, channel, COUNT(*), SUM(amount_cents)
+  FROM payment WHERE status = 'succeeded' GROUP BY 1, 2, 3;
+
+DELETE FROM metric_receivables;
+INSERT INTO metric_receivables (branch_id, status, installments, principal_cents, due_cents, paid_cents)
+  SELECT IFNULL(s.branch_id, 0), i.status, COUNT(*), SUM(i.principal_cents), SUM(i.due_cents), SUM(i.paid_cents)
+  FROM installment i
+  LEFT JOIN schedule sc ON sc.id = i.schedule_id
+  LEFT JOIN contract ct ON ct.id = sc.contract_id
+  LEFT JOIN sale s ON s.id = ct.sale_id
+  GROUP BY 1, 2;
+
+-- ---------- sale ----------
+DROP TRIGGER IF EXISTS metric_sale_ai;
+DROP TRIGGER IF EXISTS metric_sale_ad;
+DROP TRIGGER IF EXISTS metric_sale_au;
+CREATE TRIGGER metric_sale_ai AFTER INSERT ON sale WHEN new.status = 'completed' BEGIN
+  INSERT INTO metric_sales_daily (day, branch_id, type, sales_count, total_cents, down_payment_cents)
+    VALUES (date(COALESCE(new.completed_at, new.created_at) / 1000, 'unixepoch', 'localtime'),
+            new.branch_id, new.type, 1, new.total_cents, new.down_payment_cents)
+    ON CONFLICT (day, branch_id, type) DO UPDATE SET
+      sales_count = sales_count + excluded.sales_count,
+      total_cents = total_cents + excluded.total_cents,
+      down_payment_cents = down_payment_cents + excluded.down_payment_cents;
+END;
+CREATE TRIGGER metric_sale_ad AFTER DELETE ON sale WHEN old.status = 'completed' BEGIN
+  INSERT INTO metric_sales_daily (day, branch_id, type, sales_count, total_cents, down_payment_cents)
+    VALUES (date(COALESCE(old.completed_at, old.created_at) / 1000, 'unixepoch', 'localtime'),
+            old.branch_id, old.type, -1, -old.total_cents, -old.down_payment_cents)
+    ON CONFLICT (day, branch_id, type) DO UPDATE SET
+      sales_count = sales_count + excluded.sales_count,
+      total_cents = total_cents + excluded.total_cents,
+      down_payment_cents = down_payment_cents + excluded.down_payment_cents;
+END;
+CREATE TRIGGER metric_sale_au AFTER UPDATE OF status, type, branch_id, total_cents, down_payment_cents,
+                                             completed_at, created_at ON sale
+WHEN old.status = 'completed' OR new.status = 'completed' BEGIN
+  INSERT INTO metric_sales_daily (day, branch_id, type, sales_count, total_cents, down_payment_cents)
+    SELECT date(COALESCE(old.completed_at, old.created_at) / 1000, 'unixepoch', 'localtime'),
+           old.branch_id, old.type, -1, -old.total_cents, -old.down_payment_cents
+    WHERE old.status = 'completed'
+    ON CONFLICT (day, branch_id, type) DO UPDATE SET
+      sales_count = sales_count + excluded.sales_count,
+      total_cents = total_cents + excluded.total_cents,
+      down_payment_cents = down_payment_cents + excluded.down_payment_cents;
+  INSERT INTO metric_sales_daily (day, branch_id, type, sales_count, total_cents, down_payment_cents)
+    SELECT date(COALESCE(new.completed_at, new.created_at) / 1000, 'unixepoch', 'localtime'),
+           new.branch_id, new.type, 1, new.total_cents, new.down_payment_cents
+    WHERE new.status = 'completed'
+    ON CONFLICT (day, branch_id, type) DO UPDATE SET
+      sales_count = sales_count + excluded.sales_count,
+      total_cents = total_cents + excluded.total_cents,
+      down_payment_cents = down_payment_cents + excluded.down_payment_cents;
+END;
+
+-- ---------- payment ----------
+DROP TRIGGER IF EXISTS metric_payment_ai;
+DROP TRIGGER IF EXISTS metric_payment_ad;
+DROP TRIGGER IF EXISTS metric_payment_au;
+CREATE TRIGGER metric_payment_ai AFTER INSERT ON payment WHEN new.status = 'succeeded' BEGIN
+  INSERT INTO metric_collections_daily (day, branch_id, channel, payments_count, amount_cents)
+    VALUES (date(new.received_at / 1000, 'unixepoch', 'localtime'), new.branch_id, new.channel, 1, new.amount_cents)
+    ON CONFLICT (day, branch_id, channel) DO UPDATE SET
+      payments_count = payments_count + excluded.payments_count,
+      amount_cents = amount_cents + excluded.amount_cents;
+END;
+CREATE TRIGGER metric_payment_ad AFTER DELETE ON payment WHEN old.status = 'succeeded' BEGIN
+  INSERT INTO metric_collections_daily (day, branch_id, channel, payments_count, amount_cents)
+    VALUES (date(old.received_at / 1000, 'unixepoch', 'localtime'), old.branch_id, old.channel, -1, -old.amount_cents)
+    ON CONFLICT (day, branch_id, channel) DO UPDATE SET
+      payments_count = payments_count + excluded.payments_count,
+      amount_cents = amount_cents + excluded.amount_cents;
+END;
+CREATE TRIGGER metric_payment_au AFTER UPDATE OF status, branch_id, channel, amount_cents, received_at ON payment
+WHEN old.status = 'succeeded' OR new.status = 'succeeded' BEGIN
+  INSERT INTO metric_collections_daily (day, branch_id, channel, payments_count, amount_cents)
+    SELECT date(old.received_at / 1000, 'unixepoch', 'localtime'), old.branch_id, old.channel, -1, -old.amount_cents
+    WHERE old.status = 'succeeded'
+    ON CONFLICT (day, branch_id, channel) DO UPDATE SET
+      payments_count = payments_count + excluded.payments_count,
+      amount_cents = amount_cents + excluded.amount_cents;
+  INSERT INTO metric_collections_daily (day, branch_id, channel, payments_count, amount_cents)
+    SELECT date(new.received_at / 1000, 'unixepoch', 'localtime'), new.branch_id, new.channel, 1, new.amount_cents
+    WHERE new.status = 'succeeded'
+    ON CONFLICT (day, branch_id, channel) DO UPDATE SET
+      payments_count = payments_count + excluded.payments_count,
+      amount_cents = amount_cents + excluded.amount_cents;
+END;
+
+-- ---------- installment ----------
+-- The branch comes from the sale behind the schedule (three primary-key lookups)
+DROP TRIGGER IF EXISTS metric_installment_ai;
+DROP TRIGGER IF EXISTS metric_installment_ad;
+DROP TRIGGER IF EXISTS metric_installment_au;
+CREATE TRIGGER metric_installment_ai AFTER INSERT ON installment BEGIN
+  INSERT INTO metric_receivables (branch_id, status, installments, principal_cents, due_cents, paid_cents)
+    VALUES (IFNULL((SELECT s.branch_id FROM schedule sc JOIN contract ct ON ct.id = sc.contract_id
+                    JOIN sale s ON s.id = ct.sale_id WHERE sc.id = new.schedule_id), 0),
+            new.status, 1, new.principal_cents, new.due_cents, new.paid_cents)
+    ON CONFLICT (branch_id, status) DO UPDATE SET
+      installments = installments + excluded.installments,
+      principal_cents = principal_cents + excluded.principal_cents,
+      due_cents = due_cents + excluded.due_cents,
+      paid_cents = paid_cents + excluded.paid_cents;
+END;
+CREATE TRIGGER metric_installment_ad AFTER DELETE ON installment BEGIN
+  INSERT INTO metric_receivables (branch_id, status, installments, principal_cents, due_cents, paid_cents)
+    VALUES (IFNULL((SELECT s.branch_id FROM schedule sc JOIN contract ct ON ct.id = sc.contract_id
+                    JOIN sale s ON s.id = ct.sale_id WHERE sc.id = old.schedule_id), 0),
+            old.status, -1, -old.principal_cents, -old.due_cents, -old.paid_cents)
+    ON CONFLICT (branch_id, status) DO UPDATE SET
+      installments = installments + excluded.installments,
+      principal_cents = principal_cents + excluded.principal_cents,
+      due_cents = due_cents + excluded.due_cents,
+      paid_cents = paid_cents + excluded.paid_cents;
+END;
+CREATE TRIGGER metric_installment_au AFTER UPDATE OF status, principal_cents, due_cents, paid_cents, schedule_id
+ON installment BEGIN
+  INSERT INTO metric_receivables (branch_id, status, installments, principal_cents, due_cents, paid_cents)
+    VALUES (IFNULL((SELECT s.branch_id FROM schedule sc JOIN contract ct ON ct.id = sc.contract_id
+                    JOIN sale s ON s.id = ct.sale_id WHERE sc.id = old.schedule_id), 0),
+            old.status, -1, -old.principal_cents, -old.due_cents, -old.paid_cents)
+    ON CONFLICT (branch_id, status) DO UPDATE SET
+      installments = installments + excluded.installments,
+      principal_cents = principal_cents + excluded.principal_cents,
+      due_cents = due_cents + excluded.due_cents,
+      paid_cents = paid_cents + excluded.paid_cents;
+  INSERT INTO metric_receivables (branch_id, status, installments, principal_cents, due_cents, paid_cents)
+    VALUES (IFNULL((SELECT s.branch_id FROM schedule sc JOIN contract ct ON ct.id = sc.contract_id
+                    JOIN sale s ON s.id = ct.sale_id WHERE sc.id = new.schedule_id), 0),
+            new.status, 1, new.principal_cents, new.due_cents, new.paid_cents)
+    ON CONFLICT (branch_id, status) DO UPDATE SET
+      installments = installments + excluded.installments,
+      principal_cents = principal_cents + excluded.principal_cents,
+      due_cents = due_cents + excluded.due_cents,
+      paid_cents = paid_cents + excluded.paid_cents;
+END;
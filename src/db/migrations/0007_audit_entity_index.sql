@@ -0,0 +1,2 @@
+-- Per-entity history lookups (audit.history) without scanning the whole log
+CREATE INDEX IF NOT EXISTS idx_audit_entity ON audit_log(entity, entity_id, at);
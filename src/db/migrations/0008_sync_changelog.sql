@@ -0,0 +1,285 @@
+-- Change capture for delta sync (db.sync). Every insert, update and delete
+-- on a synced table leaves one row in sync_change; a newer change to the
+-- same row replaces the older entry, so the log holds the latest change per
+-- row and seq (AUTOINCREMENT: never reused) orders them. The triggers delete
+-- then insert: an INSERT OR REPLACE would take the conflict mode of an outer
+-- UPSERT (stock) and fail. Changes applied from a peer are logged by db.sync
+-- itself with their origin device and sequence; the triggers stay quiet
+-- while app_meta has a 'sync_applying' row.
+CREATE TABLE IF NOT EXISTS sync_change (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  tbl TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  op TEXT NOT NULL CHECK (op IN ('upsert','delete')),
+  origin TEXT,          -- device the change was made on; NULL = this one
+  origin_seq INTEGER,   -- seq on that device; NULL for local changes
+  UNIQUE (tbl, row_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sync_change_local ON sync_change(tbl, seq) WHERE origin IS NULL;
+CREATE INDEX IF NOT EXISTS idx_sync_change_origin ON sync_change(tbl, origin, origin_seq) WHERE origin IS NOT NULL;
+
+-- Rows created on another device get a local id; references travel as
+-- (origin device, id on that device) and are translated through this map.
+CREATE TABLE IF NOT EXISTS sync_identity (
+  tbl TEXT NOT NULL,
+  origin TEXT NOT NULL,
+  origin_id INTEGER NOT NULL,
+  local_id INTEGER NOT NULL,
+  PRIMARY KEY (tbl, origin, origin_id),
+  UNIQUE (tbl, local_id)
+) WITHOUT ROWID;
+
+
+-- customer
+CREATE TRIGGER IF NOT EXISTS sync_customer_ai AFTER INSERT ON customer
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'customer' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('customer', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_customer_au AFTER UPDATE ON customer
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'customer' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('customer', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_customer_ad AFTER DELETE ON customer
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'customer' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('customer', old.id, 'delete');
+END;
+
+-- contact_method
+CREATE TRIGGER IF NOT EXISTS sync_contact_method_ai AFTER INSERT ON contact_method
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'contact_method' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('contact_method', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_contact_method_au AFTER UPDATE ON contact_method
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'contact_method' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('contact_method', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_contact_method_ad AFTER DELETE ON contact_method
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'contact_method' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('contact_method', old.id, 'delete');
+END;
+
+-- product
+CREATE TRIGGER IF NOT EXISTS sync_product_ai AFTER INSERT ON product
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'product' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('product', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_product_au AFTER UPDATE ON product
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'product' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('product', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_product_ad AFTER DELETE ON product
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'product' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('product', old.id, 'delete');
+END;
+
+-- stock
+CREATE TRIGGER IF NOT EXISTS sync_stock_ai AFTER INSERT ON stock
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'stock' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('stock', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_stock_au AFTER UPDATE ON stock
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'stock' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('stock', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_stock_ad AFTER DELETE ON stock
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'stock' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('stock', old.id, 'delete');
+END;
+
+-- stock_ledger
+CREATE TRIGGER IF NOT EXISTS sync_stock_ledger_ai AFTER INSERT ON stock_ledger
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'stock_ledger' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('stock_ledger', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_stock_ledger_au AFTER UPDATE ON stock_ledger
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'stock_ledger' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('stock_ledger', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_stock_ledger_ad AFTER DELETE ON stock_ledger
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'stock_ledger' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('stock_ledger', old.id, 'delete');
+END;
+
+-- sale
+CREATE TRIGGER IF NOT EXISTS sync_sale_ai AFTER INSERT ON sale
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'sale' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('sale', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_sale_au AFTER UPDATE ON sale
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'sale' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('sale', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_sale_ad AFTER DELETE ON sale
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'sale' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('sale', old.id, 'delete');
+END;
+
+-- sale_item
+CREATE TRIGGER IF NOT EXISTS sync_sale_item_ai AFTER INSERT ON sale_item
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'sale_item' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('sale_item', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_sale_item_au AFTER UPDATE ON sale_item
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'sale_item' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('sale_item', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_sale_item_ad AFTER DELETE ON sale_item
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'sale_item' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('sale_item', old.id, 'delete');
+END;
+
+-- offer
+CREATE TRIGGER IF NOT EXISTS sync_offer_ai AFTER INSERT ON offer
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'offer' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('offer', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_offer_au AFTER UPDATE ON offer
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'offer' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('offer', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_offer_ad AFTER DELETE ON offer
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'offer' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('offer', old.id, 'delete');
+END;
+
+-- contract
+CREATE TRIGGER IF NOT EXISTS sync_contract_ai AFTER INSERT ON contract
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'contract' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('contract', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_contract_au AFTER UPDATE ON contract
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'contract' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('contract', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_contract_ad AFTER DELETE ON contract
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'contract' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('contract', old.id, 'delete');
+END;
+
+-- schedule
+CREATE TRIGGER IF NOT EXISTS sync_schedule_ai AFTER INSERT ON schedule
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'schedule' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('schedule', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_schedule_au AFTER UPDATE ON schedule
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'schedule' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('schedule', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_schedule_ad AFTER DELETE ON schedule
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'schedule' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('schedule', old.id, 'delete');
+END;
+
+-- installment
+CREATE TRIGGER IF NOT EXISTS sync_installment_ai AFTER INSERT ON installment
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'installment' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('installment', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_installment_au AFTER UPDATE ON installment
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'installment' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('installment', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_installment_ad AFTER DELETE ON installment
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'installment' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('installment', old.id, 'delete');
+END;
+
+-- payment
+CREATE TRIGGER IF NOT EXISTS sync_payment_ai AFTER INSERT ON payment
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'payment' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('payment', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_payment_au AFTER UPDATE ON payment
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'payment' AND row_id = new.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('payment', new.id, 'upsert');
+END;
+CREATE TRIGGER IF NOT EXISTS sync_payment_ad AFTER DELETE ON payment
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'sync_applying')
+BEGIN
+  DELETE FROM sync_change WHERE tbl = 'payment' AND row_id = old.id;
+  INSERT INTO sync_change (tbl, row_id, op) VALUES ('payment', old.id, 'delete');
+END;
+
+-- Existing rows are the first delta every peer receives (parents before children)
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'customer', id, 'upsert' FROM customer ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'contact_method', id, 'upsert' FROM contact_method ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'product', id, 'upsert' FROM product ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'stock', id, 'upsert' FROM stock ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'stock_ledger', id, 'upsert' FROM stock_ledger ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'sale', id, 'upsert' FROM sale ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'sale_item', id, 'upsert' FROM sale_item ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'offer', id, 'upsert' FROM offer ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'contract', id, 'upsert' FROM contract ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'schedule', id, 'upsert' FROM schedule ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'installment', id, 'upsert' FROM installment ORDER BY id;
+INSERT OR IGNORE INTO sync_change (tbl, row_id, op) SELECT 'payment', id, 'upsert' FROM payment ORDER BY id;
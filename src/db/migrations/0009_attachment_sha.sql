@@ -0,0 +1,3 @@
+-- Content-addressed attachments (db.attachments): one row and one blob per
+-- distinct content, found by its SHA-256.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_attachment_sha ON attachment(sha256);
@@ -0,0 +1,9 @@
+-- Branch-leading indexes for db.branches.BranchRepository: every per-branch
+-- screen reads a range that starts at branch_id, so its cost does not grow
+-- with other branches' rows. idx_contract_sale lets installment lists start
+-- from the branch's sales instead of the global idx_installment_due.
+CREATE INDEX IF NOT EXISTS idx_payment_branch_status_time ON payment(branch_id, status, received_at);
+CREATE INDEX IF NOT EXISTS idx_stock_branch_product ON stock(branch_id, product_id);
+CREATE INDEX IF NOT EXISTS idx_stock_ledger_branch_at ON stock_ledger(branch_id, at);
+CREATE INDEX IF NOT EXISTS idx_contract_sale ON contract(sale_id);
+CREATE INDEX IF NOT EXISTS idx_installment_schedule_status ON installment(schedule_id, status, due_date);
@@ -0,0 +1,8 @@
+-- Catalog fields for the New Product and sales screens (db.catalog).
+-- A barcode identifies at most one product; most products have none.
+ALTER TABLE product ADD COLUMN brand TEXT;
+ALTER TABLE product ADD COLUMN barcode TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_product_barcode ON product(barcode) WHERE barcode IS NOT NULL;
+-- The catalog cache follows one table's changes through the sync change log;
+-- idx_sync_change_local only covers local edits, this also covers applied ones.
+CREATE INDEX IF NOT EXISTS idx_sync_change_tbl_seq ON sync_change(tbl, seq);
@@ -0,0 +1,161 @@
+-- Brands, categories and tags as rows (db.taxonomy) instead of free text.
+-- Categories nest; taxon_closure holds every (ancestor, descendant) pair,
+-- a node being its own ancestor at depth 0, so a subtree is one index range.
+-- Products link to any number of taxa (product_taxon). taxon_member lists,
+-- per node, every product linked to it or to a node below it (refs = how
+-- many of the product's links lead there), and taxon_count keeps per node
+-- the number of active member products and their stock across branches.
+-- Filtering by "Electronics > TV" and "Samsung" is then a range read of
+-- taxon_member per node. Triggers keep members and counts current;
+-- db.taxonomy.rebuild_taxonomy() recomputes them from product_taxon and
+-- check_taxonomy() compares the two.
+-- product.brand / product.category stay as display text for the catalog
+-- cache and sync; db.taxonomy writes them along with the links.
+CREATE TABLE IF NOT EXISTS taxon (
+  id INTEGER PRIMARY KEY,
+  kind TEXT NOT NULL CHECK (kind IN ('brand','category','tag')),
+  name TEXT NOT NULL,
+  parent_id INTEGER REFERENCES taxon(id),    -- categories only
+  path TEXT NOT NULL,                        -- names from the root, joined with ' > '
+  created_at INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_taxon_kind_path ON taxon(kind, path COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_taxon_parent ON taxon(parent_id);
+
+CREATE TABLE IF NOT EXISTS taxon_closure (
+  ancestor_id INTEGER NOT NULL,
+  descendant_id INTEGER NOT NULL,
+  depth INTEGER NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_taxon_closure_descendant ON taxon_closure(descendant_id);
+
+CREATE TABLE IF NOT EXISTS product_taxon (
+  product_id INTEGER NOT NULL REFERENCES product(id),
+  taxon_id INTEGER NOT NULL REFERENCES taxon(id),
+  PRIMARY KEY (product_id, taxon_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_product_taxon_taxon ON product_taxon(taxon_id);
+
+CREATE TABLE IF NOT EXISTS taxon_member (
+  taxon_id INTEGER NOT NULL,
+  product_id INTEGER NOT NULL,
+  refs INTEGER NOT NULL,
+  PRIMARY KEY (taxon_id, product_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_taxon_member_product ON taxon_member(product_id);
+
+CREATE TABLE IF NOT EXISTS taxon_count (
+  taxon_id INTEGER PRIMARY KEY,
+  products INTEGER NOT NULL DEFAULT 0,      -- active products in the subtree
+  stock_qty INTEGER NOT NULL DEFAULT 0      -- their stock, all branches
+);
+
+-- ---------- taxon ----------
+DROP TRIGGER IF EXISTS taxon_ai;
+DROP TRIGGER IF EXISTS taxon_bd;
+DROP TRIGGER IF EXISTS taxon_ad;
+CREATE TRIGGER taxon_ai AFTER INSERT ON taxon BEGIN
+  INSERT INTO taxon_closure (ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, new.id, depth + 1 FROM taxon_closure WHERE descendant_id = new.parent_id
+    UNION ALL SELECT new.id, new.id, 0;
+  INSERT INTO taxon_count (taxon_id) VALUES (new.id);
+END;
+-- Unlink first, while the closure still says which ancestors to update
+CREATE TRIGGER taxon_bd BEFORE DELETE ON taxon BEGIN
+  DELETE FROM product_taxon WHERE taxon_id = old.id;
+END;
+CREATE TRIGGER taxon_ad AFTER DELETE ON taxon BEGIN
+  DELETE FROM taxon_member WHERE taxon_id = old.id;
+  DELETE FROM taxon_closure WHERE descendant_id = old.id OR ancestor_id = old.id;
+  DELETE FROM taxon_count WHERE taxon_id = old.id;
+END;
+
+-- ---------- product_taxon -> taxon_member ----------
+DROP TRIGGER IF EXISTS product_taxon_ai;
+DROP TRIGGER IF EXISTS product_taxon_ad;
+CREATE TRIGGER product_taxon_ai AFTER INSERT ON product_taxon BEGIN
+  INSERT INTO taxon_member (taxon_id, product_id, refs)
+    SELECT ancestor_id, new.product_id, 1 FROM taxon_closure WHERE descendant_id = new.taxon_id
+    ON CONFLICT (taxon_id, product_id) DO UPDATE SET refs = refs + 1;
+END;
+CREATE TRIGGER product_taxon_ad AFTER DELETE ON product_taxon BEGIN
+  UPDATE taxon_member SET refs = refs - 1
+    WHERE product_id = old.product_id
+      AND taxon_id IN (SELECT ancestor_id FROM taxon_closure WHERE descendant_id = old.taxon_id);
+  DELETE FROM taxon_member
+    WHERE product_id = old.product_id AND refs <= 0
+      AND taxon_id IN (SELECT ancestor_id FROM taxon_closure WHERE descendant_id = old.taxon_id);
+END;
+
+-- ---------- taxon_member -> taxon_count ----------
+DROP TRIGGER IF EXISTS taxon_member_ai;
+DROP TRIGGER IF EXISTS taxon_member_ad;
+CREATE TRIGGER taxon_member_ai AFTER INSERT ON taxon_member
+WHEN (SELECT is_active FROM product WHERE id = new.product_id) = 1 BEGIN
+  UPDATE taxon_count SET
+    products = products + 1,
+    stock_qty = stock_qty + (SELECT IFNULL(SUM(qty), 0) FROM stock WHERE product_id = new.product_id)
+  WHERE taxon_id = new.taxon_id;
+END;
+CREATE TRIGGER taxon_member_ad AFTER DELETE ON taxon_member
+WHEN (SELECT is_active FROM product WHERE id = old.product_id) = 1 BEGIN
+  UPDATE taxon_count SET
+    products = products - 1,
+    stock_qty = stock_qty - (SELECT IFNULL(SUM(qty), 0) FROM stock WHERE product_id = old.product_id)
+  WHERE taxon_id = old.taxon_id;
+END;
+
+-- ---------- product ----------
+DROP TRIGGER IF EXISTS taxon_product_au;
+DROP TRIGGER IF EXISTS taxon_product_bd;
+CREATE TRIGGER taxon_product_au AFTER UPDATE OF is_active ON product
+WHEN (new.is_active = 1) != (old.is_active = 1) BEGIN
+  UPDATE taxon_count SET
+    products = products + (new.is_active = 1) - (old.is_active = 1),
+    stock_qty = stock_qty + ((new.is_active = 1) - (old.is_active = 1))
+                            * (SELECT IFNULL(SUM(qty), 0) FROM stock WHERE product_id = new.id)
+  WHERE taxon_id IN (SELECT taxon_id FROM taxon_member WHERE product_id = new.id);
+END;
+-- Before, so the member triggers still see the product as active
+CREATE TRIGGER taxon_product_bd BEFORE DELETE ON product BEGIN
+  DELETE FROM product_taxon WHERE product_id = old.id;
+END;
+
+-- ---------- stock ----------
+DROP TRIGGER IF EXISTS taxon_stock_ai;
+DROP TRIGGER IF EXISTS taxon_stock_au;
+DROP TRIGGER IF EXISTS taxon_stock_ad;
+CREATE TRIGGER taxon_stock_ai AFTER INSERT ON stock
+WHEN new.qty != 0 AND (SELECT is_active FROM product WHERE id = new.product_id) = 1 BEGIN
+  UPDATE taxon_count SET stock_qty = stock_qty + new.qty
+  WHERE taxon_id IN (SELECT taxon_id FROM taxon_member WHERE product_id = new.product_id);
+END;
+CREATE TRIGGER taxon_stock_au AFTER UPDATE OF qty, product_id ON stock
+WHEN (new.qty != old.qty OR new.product_id != old.product_id) BEGIN
+  UPDATE taxon_count SET stock_qty = stock_qty - old.qty
+  WHERE taxon_id IN (SELECT taxon_id FROM taxon_member WHERE product_id = old.product_id)
+    AND (SELECT is_active FROM product WHERE id = old.product_id) = 1;
+  UPDATE taxon_count SET stock_qty = stock_qty + new.qty
+  WHERE taxon_id IN (SELECT taxon_id FROM taxon_member WHERE product_id = new.product_id)
+    AND (SELECT is_active FROM product WHERE id = new.product_id) = 1;
+END;
+CREATE TRIGGER taxon_stock_ad AFTER DELETE ON stock
+WHEN old.qty != 0 AND (SELECT is_active FROM product WHERE id = old.product_id) = 1 BEGIN
+  UPDATE taxon_count SET stock_qty = stock_qty - old.qty
+  WHERE taxon_id IN (SELECT taxon_id FROM taxon_member WHERE product_id = old.product_id);
+END;
+
+-- ---------- Initial fill from the free-text columns (flat: no hierarchy in the old data) ----------
+INSERT OR IGNORE INTO taxon (kind, name, path, created_at)
+  SELECT DISTINCT 'brand', trim(brand), trim(brand), CAST(strftime('%s', 'now') AS INTEGER) * 1000
+  FROM product WHERE trim(IFNULL(brand, '')) != '';
+INSERT OR IGNORE INTO taxon (kind, name, path, created_at)
+  SELECT DISTINCT 'category', trim(category), trim(category), CAST(strftime('%s', 'now') AS INTEGER) * 1000
+  FROM product WHERE trim(IFNULL(category, '')) != '';
+INSERT OR IGNORE INTO product_taxon (product_id, taxon_id)
+  SELECT p.id, t.id FROM product p
+  JOIN taxon t ON t.kind = 'brand' AND t.path = trim(p.brand) COLLATE NOCASE;
+INSERT OR IGNORE INTO product_taxon (product_id, taxon_id)
+  SELECT p.id, t.id FROM product p
+  JOIN taxon t ON t.kind = 'category' AND t.path = trim(p.category) COLLATE NOCASE;
@@ -0,0 +1,72 @@
+-- Low-stock alerts (db.alerts). stock_low holds the stock rows (product,
+-- branch) at or below their threshold, so listing alerts reads a handful
+-- of rows. Triggers re-check a row only when its qty changes, or all rows
+-- of a product when its threshold or is_active changes; a change of the
+-- global threshold re-checks everything from db.alerts. since is when the
+-- row went low and stays put while it remains low: notifications key on it.
+-- Threshold: product.low_stock_threshold when set (negative: never alert),
+-- else the global one in app_meta, copied there from Settings > Inventory.
+ALTER TABLE product ADD COLUMN low_stock_threshold INTEGER;
+INSERT OR IGNORE INTO app_meta (key, value) VALUES ('low_stock_threshold', '5');
+
+CREATE VIEW IF NOT EXISTS stock_threshold AS
+  SELECT s.product_id, s.branch_id, s.qty,
+         COALESCE(p.low_stock_threshold,
+                  (SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'low_stock_threshold')) AS threshold
+  FROM stock s JOIN product p ON p.id = s.product_id
+  WHERE p.is_active = 1;
+
+CREATE TABLE IF NOT EXISTS stock_low (
+  product_id INTEGER NOT NULL,
+  branch_id INTEGER NOT NULL,
+  qty INTEGER NOT NULL,
+  threshold INTEGER NOT NULL,
+  since INTEGER NOT NULL,       -- epoch ms
+  PRIMARY KEY (product_id, branch_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_stock_low_since ON stock_low(since);
+
+-- ---------- stock ----------
+DROP TRIGGER IF EXISTS stock_low_ai;
+DROP TRIGGER IF EXISTS stock_low_au;
+DROP TRIGGER IF EXISTS stock_low_ad;
+CREATE TRIGGER stock_low_ai AFTER INSERT ON stock BEGIN
+  INSERT INTO stock_low (product_id, branch_id, qty, threshold, since)
+    SELECT product_id, branch_id, qty, threshold, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)
+    FROM stock_threshold WHERE product_id = new.product_id AND branch_id = new.branch_id AND qty <= threshold
+    ON CONFLICT (product_id, branch_id) DO UPDATE SET qty = excluded.qty, threshold = excluded.threshold;
+END;
+CREATE TRIGGER stock_low_au AFTER UPDATE OF qty, product_id, branch_id ON stock
+WHEN new.qty != old.qty OR new.product_id != old.product_id OR new.branch_id != old.branch_id BEGIN
+  DELETE FROM stock_low WHERE product_id = old.product_id AND branch_id = old.branch_id
+    AND (old.product_id != new.product_id OR old.branch_id != new.branch_id);
+  INSERT INTO stock_low (product_id, branch_id, qty, threshold, since)
+    SELECT product_id, branch_id, qty, threshold, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)
+    FROM stock_threshold WHERE product_id = new.product_id AND branch_id = new.branch_id AND qty <= threshold
+    ON CONFLICT (product_id, branch_id) DO UPDATE SET qty = excluded.qty, threshold = excluded.threshold;
+  DELETE FROM stock_low WHERE product_id = new.product_id AND branch_id = new.branch_id
+    AND NOT EXISTS (SELECT 1 FROM stock_threshold WHERE product_id = new.product_id
+                    AND branch_id = new.branch_id AND qty <= threshold);
+END;
+CREATE TRIGGER stock_low_ad AFTER DELETE ON stock BEGIN
+  DELETE FROM stock_low WHERE product_id = old.product_id AND branch_id = old.branch_id;
+END;
+
+-- ---------- product ----------
+DROP TRIGGER IF EXISTS stock_low_product_au;
+CREATE TRIGGER stock_low_product_au AFTER UPDATE OF low_stock_threshold, is_active ON product
+WHEN new.low_stock_threshold IS NOT old.low_stock_threshold OR new.is_active IS NOT old.is_active BEGIN
+  INSERT INTO stock_low (product_id, branch_id, qty, threshold, since)
+    SELECT product_id, branch_id, qty, threshold, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)
+    FROM stock_threshold WHERE product_id = new.id AND qty <= threshold
+    ON CONFLICT (product_id, branch_id) DO UPDATE SET qty = excluded.qty, threshold = excluded.threshold;
+  DELETE FROM stock_low WHERE product_id = new.id
+    AND NOT EXISTS (SELECT 1 FROM stock_threshold t WHERE t.product_id = new.id
+                    AND t.branch_id = stock_low.branch_id AND t.qty <= t.threshold);
+END;
+
+-- ---------- Initial fill ----------
+DELETE FROM stock_low;
+INSERT INTO stock_low (product_id, branch_id, qty, threshold, since)
+  SELECT product_id, branch_id, qty, threshold, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)
+  FROM stock_threshold WHERE qty <= threshold;
@@ -0,0 +1,352 @@
+-- Cheaper change capture (db.sync). The 0008 triggers ran a DELETE and an
+-- INSERT per change, bumped sqlite_sequence (AUTOINCREMENT) and looked up
+-- app_meta for the 'sync_applying' flag, which roughly halved bulk write
+-- rates (payment ingest). Now:
+-- * sync_change is keyed on (tbl, row_id) (WITHOUT ROWID) and a change is
+--   one UPSERT that moves the row's seq forward; seq comes from the single
+--   sync_state row, so it still only ever grows and is never reused;
+-- * sync_state.applying replaces the app_meta flag: the WHEN clause reads
+--   the row the trigger body updates anyway;
+-- * idx_sync_change_local is dropped: idx_sync_change_tbl_seq (0011)
+--   serves the same range reads, and one index less is kept per change.
+CREATE TABLE IF NOT EXISTS sync_state (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  seq INTEGER NOT NULL,     -- last seq handed out
+  applying TEXT             -- device whose changes db.sync is applying; NULL = log local changes
+);
+INSERT OR IGNORE INTO sync_state (id, seq, applying)
+  SELECT 1, MAX(IFNULL((SELECT MAX(seq) FROM sync_change), 0),
+                IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'sync_change'), 0)),
+         NULL;
+DELETE FROM app_meta WHERE key = 'sync_applying';
+
+-- The triggers name sync_change, so they go before the table is swapped
+DROP TRIGGER IF EXISTS sync_customer_ai;
+DROP TRIGGER IF EXISTS sync_customer_au;
+DROP TRIGGER IF EXISTS sync_customer_ad;
+DROP TRIGGER IF EXISTS sync_contact_method_ai;
+DROP TRIGGER IF EXISTS sync_contact_method_au;
+DROP TRIGGER IF EXISTS sync_contact_method_ad;
+DROP TRIGGER IF EXISTS sync_product_ai;
+DROP TRIGGER IF EXISTS sync_product_au;
+DROP TRIGGER IF EXISTS sync_product_ad;
+DROP TRIGGER IF EXISTS sync_stock_ai;
+DROP TRIGGER IF EXISTS sync_stock_au;
+DROP TRIGGER IF EXISTS sync_stock_ad;
+DROP TRIGGER IF EXISTS sync_stock_ledger_ai;
+DROP TRIGGER IF EXISTS sync_stock_ledger_au;
+DROP TRIGGER IF EXISTS sync_stock_ledger_ad;
+DROP TRIGGER IF EXISTS sync_sale_ai;
+DROP TRIGGER IF EXISTS sync_sale_au;
+DROP TRIGGER IF EXISTS sync_sale_ad;
+DROP TRIGGER IF EXISTS sync_sale_item_ai;
+DROP TRIGGER IF EXISTS sync_sale_item_au;
+DROP TRIGGER IF EXISTS sync_sale_item_ad;
+DROP TRIGGER IF EXISTS sync_offer_ai;
+DROP TRIGGER IF EXISTS sync_offer_au;
+DROP TRIGGER IF EXISTS sync_offer_ad;
+DROP TRIGGER IF EXISTS sync_contract_ai;
+DROP TRIGGER IF EXISTS sync_contract_au;
+DROP TRIGGER IF EXISTS sync_contract_ad;
+DROP TRIGGER IF EXISTS sync_schedule_ai;
+DROP TRIGGER IF EXISTS sync_schedule_au;
+DROP TRIGGER IF EXISTS sync_schedule_ad;
+DROP TRIGGER IF EXISTS sync_installment_ai;
+DROP TRIGGER IF EXISTS sync_installment_au;
+DROP TRIGGER IF EXISTS sync_installment_ad;
+DROP TRIGGER IF EXISTS sync_payment_ai;
+DROP TRIGGER IF EXISTS sync_payment_au;
+DROP TRIGGER IF EXISTS sync_payment_ad;
+
+CREATE TABLE sync_change_new (
+  tbl TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  seq INTEGER NOT NULL,
+  op TEXT NOT NULL CHECK (op IN ('upsert','delete')),
+  origin TEXT,          -- device the change was made on; NULL = this one
+  origin_seq INTEGER,   -- seq on that device; NULL for local changes
+  PRIMARY KEY (tbl, row_id)
+) WITHOUT ROWID;
+INSERT INTO sync_change_new (tbl, row_id, seq, op, origin, origin_seq)
+  SELECT tbl, row_id, seq, op, origin, origin_seq FROM sync_change;
+DROP TABLE sync_change;
+DELETE FROM sqlite_sequence WHERE name = 'sync_change';
+ALTER TABLE sync_change_new RENAME TO sync_change;
+CREATE INDEX IF NOT EXISTS idx_sync_change_tbl_seq ON sync_change(tbl, seq);
+CREATE INDEX IF NOT EXISTS idx_sync_change_origin ON sync_change(tbl, origin, origin_seq) WHERE origin IS NOT NULL;
+
+-- customer
+CREATE TRIGGER sync_customer_ai AFTER INSERT ON customer
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'customer', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_customer_au AFTER UPDATE ON customer
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'customer', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_customer_ad AFTER DELETE ON customer
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'customer', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- contact_method
+CREATE TRIGGER sync_contact_method_ai AFTER INSERT ON contact_method
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'contact_method', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_contact_method_au AFTER UPDATE ON contact_method
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'contact_method', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_contact_method_ad AFTER DELETE ON contact_method
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'contact_method', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- product
+CREATE TRIGGER sync_product_ai AFTER INSERT ON product
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'product', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_product_au AFTER UPDATE ON product
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'product', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_product_ad AFTER DELETE ON product
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'product', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- stock
+CREATE TRIGGER sync_stock_ai AFTER INSERT ON stock
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'stock', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_stock_au AFTER UPDATE ON stock
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'stock', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_stock_ad AFTER DELETE ON stock
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'stock', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- stock_ledger
+CREATE TRIGGER sync_stock_ledger_ai AFTER INSERT ON stock_ledger
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'stock_ledger', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_stock_ledger_au AFTER UPDATE ON stock_ledger
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'stock_ledger', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_stock_ledger_ad AFTER DELETE ON stock_ledger
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'stock_ledger', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- sale
+CREATE TRIGGER sync_sale_ai AFTER INSERT ON sale
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'sale', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_sale_au AFTER UPDATE ON sale
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'sale', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_sale_ad AFTER DELETE ON sale
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'sale', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- sale_item
+CREATE TRIGGER sync_sale_item_ai AFTER INSERT ON sale_item
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'sale_item', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_sale_item_au AFTER UPDATE ON sale_item
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'sale_item', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_sale_item_ad AFTER DELETE ON sale_item
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'sale_item', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- offer
+CREATE TRIGGER sync_offer_ai AFTER INSERT ON offer
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'offer', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_offer_au AFTER UPDATE ON offer
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'offer', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_offer_ad AFTER DELETE ON offer
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'offer', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- contract
+CREATE TRIGGER sync_contract_ai AFTER INSERT ON contract
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'contract', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_contract_au AFTER UPDATE ON contract
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'contract', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_contract_ad AFTER DELETE ON contract
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'contract', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- schedule
+CREATE TRIGGER sync_schedule_ai AFTER INSERT ON schedule
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'schedule', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_schedule_au AFTER UPDATE ON schedule
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'schedule', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_schedule_ad AFTER DELETE ON schedule
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'schedule', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- installment
+CREATE TRIGGER sync_installment_ai AFTER INSERT ON installment
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'installment', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_installment_au AFTER UPDATE ON installment
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'installment', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_installment_ad AFTER DELETE ON installment
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'installment', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+
+-- payment
+CREATE TRIGGER sync_payment_ai AFTER INSERT ON payment
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'payment', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_payment_au AFTER UPDATE ON payment
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'payment', new.id, seq, 'upsert' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
+CREATE TRIGGER sync_payment_ad AFTER DELETE ON payment
+WHEN (SELECT applying FROM sync_state) IS NULL
+BEGIN
+  UPDATE sync_state SET seq = seq + 1;
+  INSERT INTO sync_change (tbl, row_id, seq, op) SELECT 'payment', old.id, seq, 'delete' FROM sync_state WHERE id = 1
+    ON CONFLICT (tbl, row_id) DO UPDATE SET seq = excluded.seq, op = excluded.op, origin = NULL, origin_seq = NULL;
+END;
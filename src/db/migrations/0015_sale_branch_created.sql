@@ -0,0 +1,3 @@
+-- Drafts (and voided drafts) have no completed_at, so the branch sales list
+-- pages them by created_at instead (db.branches QUERIES["sales_by_created"]).
+CREATE INDEX IF NOT EXISTS idx_sale_branch_status_created ON sale(branch_id, status, created_at);
@@ -0,0 +1,15 @@
+-- A negative threshold means "never alert" (db.alerts.set_product_threshold),
+-- but 0013 compared it like any other: stock sold below zero (-3 <= -1) was
+-- listed. The view now leaves those rows out, so the stock_low triggers,
+-- the re-checks in db.alerts and check_low_stock() all skip them.
+DROP VIEW IF EXISTS stock_threshold;
+CREATE VIEW stock_threshold AS
+  SELECT s.product_id, s.branch_id, s.qty,
+         COALESCE(p.low_stock_threshold,
+                  (SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'low_stock_threshold')) AS threshold
+  FROM stock s JOIN product p ON p.id = s.product_id
+  WHERE p.is_active = 1
+    AND COALESCE(p.low_stock_threshold,
+                 (SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'low_stock_threshold')) >= 0;
+
+DELETE FROM stock_low WHERE threshold < 0;
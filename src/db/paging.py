@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from . import get_manager
+
+
+class KeysetPager:
+    """
+    Windowed, keyset-paginated reader over one table.
+
+    Rows are fetched in blocks of ``block_size`` ordered by
+    ``(sort_column, id)`` with ``WHERE (sort_column, id) > (?, ?)``, so each
+    block is an index range scan no matter how deep the user has scrolled.
+    Only ``max_blocks`` blocks are kept in memory; evicted blocks are
+    re-read from their saved start key when they are needed again.
+
+    Sorting is limited to ``id`` and NOT NULL columns with a single-column
+    index, so ORDER BY never needs a temp B-tree.
+
+    :param table: table name (validated with PRAGMA table_info)
+    :param columns: columns returned for each row
+    :param where: optional SQL filter, e.g. "branch_id = ?"
+    :param params: parameters for ``where``
+    """
+
+    def __init__(self, table: str, columns: Sequence[str], sort_column: str = "id",
+                 descending: bool = False, where: str = "", params: Sequence = (),
+                 block_size: int = 200, max_blocks: int = 20, manager=None):
+        self.manager = manager or get_manager()
+        self.block_size = block_size
+        self.max_blocks = max(2, max_blocks)
+        self.where = where
+        self.params = tuple(params)
+
+        with self.manager.read() as c:
+            info = c.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+            if not info:
+                raise ValueError(f"Unknown table: {table}")
+            known = {row[1] for row in info}
+            not_null = {row[1] for row in info if row[3]}
+            indexed = set()
+            for idx in c.execute(f"PRAGMA index_list({_quote(table)})").fetchall():
+                cols = c.execute(f"PRAGMA index_info({_quote(idx[1])})").fetchall()
+                if len(cols) == 1:   # single-column index = (col, rowid) order for free
+                    indexed.add(cols[0][2])
+        unknown = [col for col in columns if col not in known]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table}: {unknown}")
+
+        self.table = table
+        self.columns = list(columns)
+        self._sortable = {"id"} | (indexed & not_null)
+        self.set_sort(sort_column, descending)
+
+    # ---------- Sorting ----------
+    def sortable_columns(self) -> set:
+        return set(self._sortable)
+
+    def set_sort(self, column: str, descending: bool = False):
+        if column not in self._sortable:
+            raise ValueError(f"{column!r} is not index-backed; sortable: {sorted(self._sortable)}")
+        self.sort_column = column
+        self.descending = descending
+        self.reset()
+
+    def reset(self):
+        self._blocks: "OrderedDict[int, List[tuple]]" = OrderedDict()
+        self._anchors: List[Optional[tuple]] = [None]   # start key of each block
+        self.loaded = 0
+        self.exhausted = False
+
+    # ---------- Reading ----------
+    def fetch_next_block(self) -> int:
+        """Append the next block (what QAbstractItemModel.fetchMore asks for)."""
+        if self.exhausted:
+            return 0
+        k = len(self._anchors) - 1
+        rows, keys = self._fetch(self._anchors[k])
+        if rows:
+            self._remember(k, rows)
+            self._anchors.append(keys[-1])
+            self.loaded += len(rows)
+        if len(rows) < self.block_size:
+            self.exhausted = True
+        return len(rows)
+
+    def row(self, i: int) -> Optional[tuple]:
+        if not 0 <= i < self.loaded:
+            return None
+        k, offset = divmod(i, self.block_size)
+        block = self._blocks.get(k)
+        if block is None:
+            block, _ = self._fetch(self._anchors[k])
+            self._remember(k, block)
+        else:
+            self._blocks.move_to_end(k)
+        return block[offset] if offset < len(block) else None
+
+    def count(self) -> int:
+        with self.manager.read() as c:
+            sql = f"SELECT COUNT(*) FROM {_quote(self.table)}"
+            if self.where:
+                sql += f" WHERE {self.where}"
+            return c.execute(sql, self.params).fetchone()[0]
+
+    # ---------- Internals ----------
+    def _remember(self, k: int, rows: List[tuple]):
+        self._blocks[k] = rows
+        self._blocks.move_to_end(k)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _fetch(self, after: Optional[tuple]) -> Tuple[List[tuple], List[tuple]]:
+        cmp, direction = ("<", "DESC") if self.descending else (">", "ASC")
+        sort = _quote(self.sort_column)
+        cols = ", ".join(_quote(c) for c in self.columns)
+        conditions, params = [], list(self.params)
+        if self.where:
+            conditions.append(f"({self.where})")
+        if after is not None:
+            if self.sort_column == "id":
+                conditions.append(f"id {cmp} ?")
+                params.append(after[1])
+            else:
+                conditions.append(f"({sort}, id) {cmp} (?, ?)")
+                params.extend(after)
+        sql = f"SELECT {cols}, {sort}, id FROM {_quote(self.table)}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        order = f"id {direction}" if self.sort_column == "id" else f"{sort} {direction}, id {direction}"
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(self.block_size)
+        with self.manager.read() as c:
+            raw = c.execute(sql, params).fetchall()
+        n = len(self.columns)
+        return [r[:n] for r in raw], [r[n:] for r in raw]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
@@ -0,0 +1,186 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from . import audit, get_manager, now_ms
+
+# Never set through update(): identity, bookkeeping handled here
+_PROTECTED = {"id", "version", "created_at", "updated_at"}
+
+
+class ConflictError(Exception):
+    """The row changed (or vanished) since it was read."""
+
+    def __init__(self, table: str, row_id: int, expected: int, actual: Optional[int]):
+        self.table, self.row_id, self.expected, self.actual = table, row_id, expected, actual
+        state = "was deleted" if actual is None else f"is at version {actual}"
+        super().__init__(f"{table} #{row_id}: expected version {expected}, row {state}")
+
+
+@dataclass
+class TableStats:
+    updates: int = 0
+    conflicts: int = 0
+    retries: int = 0
+    gave_up: int = 0
+
+    @property
+    def conflict_rate(self) -> float:
+        attempts = self.updates + self.conflicts
+        return self.conflicts / attempts if attempts else 0.0
+
+
+@dataclass
+class ConcurrencyStats:
+    tables: Dict[str, TableStats] = field(default_factory=dict)
+
+    def total(self) -> TableStats:
+        out = TableStats()
+        for s in self.tables.values():
+            out.updates += s.updates
+            out.conflicts += s.conflicts
+            out.retries += s.retries
+            out.gave_up += s.gave_up
+        return out
+
+
+# ------------------------------
+# Metrics hook
+# ------------------------------
+_stats = ConcurrencyStats()
+_stats_lock = threading.Lock()
+_hook: Optional[Callable[..., None]] = None
+
+
+def set_metrics_hook(hook: Optional[Callable[..., None]]):
+    """
+    ``hook(event, table, **info)`` is called for every "update", "conflict",
+    "retry" and "gave_up" event (e.g. to log or chart conflict rates).
+    Pass None to remove it. Exceptions from the hook are not caught.
+    """
+    global _hook
+    _hook = hook
+
+
+def stats(reset: bool = False) -> ConcurrencyStats:
+    """Copy of the per-table counters since start (or the last reset)."""
+    global _stats
+    with _stats_lock:
+        snapshot = ConcurrencyStats({t: TableStats(**vars(s)) for t, s in _stats.tables.items()})
+        if reset:
+            _stats = ConcurrencyStats()
+    return snapshot
+
+
+def _record(event: str, table: str, **info):
+    with _stats_lock:
+        s = _stats.tables.setdefault(table, TableStats())
+        attr = {"update": "updates", "conflict": "conflicts", "retry": "retries", "gave_up": "gave_up"}[event]
+        setattr(s, attr, getattr(s, attr) + 1)
+    if _hook is not None:
+        _hook(event, table, **info)
+
+
+# ------------------------------
+# Versioned tables
+# ------------------------------
+_columns: Dict[tuple, frozenset] = {}
+
+
+def _table_columns(c, manager, table: str) -> frozenset:
+    key = (id(manager), table)
+    cols = _columns.get(key)
+    if cols is None:
+        cols = frozenset(r[1] for r in c.execute(f'PRAGMA table_info("{table}")'))
+        if not {"id", "version"} <= cols:
+            raise ValueError(f"{table!r} is not a versioned table")
+        _columns[key] = cols
+    return cols
+
+
+def versioned_tables(manager=None) -> List[str]:
+    """Every table with both ``id`` and ``version`` columns."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        names = [r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+        return [n for n in names
+                if {"id", "version"} <= {r[1] for r in c.execute(f'PRAGMA table_info("{n}")')}]
+
+
+def get(table: str, row_id: int, manager=None) -> Optional[Dict[str, Any]]:
+    """The row as a dict (including ``version``), or None."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        _table_columns(c, manager, table)
+        cur = c.execute(f'SELECT * FROM "{table}" WHERE id = ?', (row_id,))
+        row = cur.fetchone()
+        return dict(zip((d[0] for d in cur.description), row)) if row else None
+
+
+def update(table: str, row_id: int, version: int, manager=None, **changes) -> int:
+    """
+    ``UPDATE table SET ..., version = version + 1 WHERE id = ? AND version = ?``.
+
+    Returns the new version. Raises ConflictError when the row is no longer
+    at ``version``. ``updated_at`` is set when the table has it. Runs in its
+    own short transaction, or as a savepoint inside the caller's ``write()``.
+    """
+    manager = manager or get_manager()
+    with manager.write() as c:
+        cols = _table_columns(c, manager, table)
+        bad = set(changes) - (cols - _PROTECTED)
+        if bad:
+            raise ValueError(f"Cannot update {sorted(bad)} on {table}")
+        sets = [f'"{k}" = ?' for k in changes]
+        params = list(changes.values())
+        if "updated_at" in cols:
+            sets.append("updated_at = ?")
+            params.append(now_ms())
+        sets.append("version = version + 1")
+        cur = c.execute(f'UPDATE "{table}" SET {", ".join(sets)} WHERE id = ? AND version = ?',
+                        params + [row_id, version])
+        if cur.rowcount != 1:
+            row = c.execute(f'SELECT version FROM "{table}" WHERE id = ?', (row_id,)).fetchone()
+            _record("conflict", table, row_id=row_id, expected=version, actual=row[0] if row else None)
+            raise ConflictError(table, row_id, version, row[0] if row else None)
+        audit.record("update", table, row_id, {"version": version + 1, "changes": changes}, manager=manager)
+    _record("update", table, row_id=row_id, version=version + 1)
+    return version + 1
+
+
+def delete(table: str, row_id: int, version: int, manager=None):
+    """Delete the row only if it is still at ``version``."""
+    manager = manager or get_manager()
+    with manager.write() as c:
+        _table_columns(c, manager, table)
+        if c.execute(f'DELETE FROM "{table}" WHERE id = ? AND version = ?', (row_id, version)).rowcount != 1:
+            row = c.execute(f'SELECT version FROM "{table}" WHERE id = ?', (row_id,)).fetchone()
+            _record("conflict", table, row_id=row_id, expected=version, actual=row[0] if row else None)
+            raise ConflictError(table, row_id, version, row[0] if row else None)
+        audit.record("delete", table, row_id, {"version": version}, manager=manager)
+    _record("update", table, row_id=row_id, version=None)
+
+
+def modify(table: str, row_id: int, change: Callable[[Dict[str, Any]], Dict[str, Any]],
+           attempts: int = 5, backoff: float = 0.005, manager=None) -> int:
+    """
+    Read-modify-write with retries: ``change(row)`` returns the columns to
+    set, computed from the current row. The read happens outside any write
+    transaction, so the write lock is only held for the final UPDATE; on a
+    conflict the row is re-read and ``change`` runs again (with jittered
+    backoff). Returns the new version; ConflictError after ``attempts``.
+    """
+    for attempt in range(1, attempts + 1):
+        row = get(table, row_id, manager)
+        if row is None:
+            raise KeyError(f"{table} #{row_id} not found")
+        try:
+            return update(table, row_id, row["version"], manager, **change(row))
+        except ConflictError:
+            if attempt == attempts:
+                _record("gave_up", table, row_id=row_id, attempts=attempts)
+                raise
+            _record("retry", table, row_id=row_id, attempt=attempt)
+            time.sleep(backoff * attempt * (0.5 + random.random()))
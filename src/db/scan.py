@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from .catalog import Catalog, ProductRecord, get_catalog
+from .checkout import CartLine, CheckoutResult, checkout
+
+TERMINATORS = ("\r", "\n", "\t")
+
+
+class BurstDetector:
+    """
+    Tells scanner input from typing by the time between keystrokes.
+
+    A USB scanner is a keyboard that types a whole code in a few
+    milliseconds per character, usually followed by Enter; people need
+    well over 50 ms per key. Characters closer than ``max_gap_ms`` form a
+    burst, and a burst of at least ``min_length`` characters ended by a
+    terminator (or by silence, see ``flush()``) is a scan.
+
+    Feed it ``(char, timestamp_ms)`` for every printable key; it holds no
+    Qt or clock state of its own, so the same code runs in tests and
+    benchmarks with synthetic timestamps.
+    """
+
+    def __init__(self, max_gap_ms: float = 35.0, min_length: int = 6, terminators: Sequence[str] = TERMINATORS):
+        self.max_gap_ms = max_gap_ms
+        self.min_length = min_length
+        self.terminators = tuple(terminators)
+        self._chars: List[str] = []
+        self._last: Optional[float] = None
+
+    @property
+    def pending(self) -> str:
+        return "".join(self._chars)
+
+    def in_burst(self, now_ms: float) -> bool:
+        """True if a key arriving at ``now_ms`` continues the current burst."""
+        return self._last is not None and now_ms - self._last <= self.max_gap_ms
+
+    def feed(self, char: str, now_ms: float) -> Optional[str]:
+        """Add one keystroke; returns the scanned code when it completes one."""
+        fast = self.in_burst(now_ms)
+        if char in self.terminators:
+            code = self.pending if fast and len(self._chars) >= self.min_length else None
+            self.reset()
+            return code
+        if not fast:
+            self._chars = []
+        self._chars.append(char)
+        self._last = now_ms
+        return None
+
+    def flush(self, now_ms: float) -> Optional[str]:
+        """For scanners configured without a terminator: a long enough burst followed by silence is a scan."""
+        if self._last is None or now_ms - self._last <= self.max_gap_ms:
+            return None
+        code = self.pending if len(self._chars) >= self.min_length else None
+        self.reset()
+        return code
+
+    def reset(self):
+        self._chars = []
+        self._last = None
+
+
+@dataclass
+class ScanResult:
+    code: str
+    product: Optional[ProductRecord]    # None: no product has this barcode or sku
+    qty: int = 0                        # quantity on the line after the scan
+    elapsed_us: float = 0.0
+
+
+class SaleCart:
+    """
+    The sale being rung up at a counter. ``scan(code)`` resolves the code
+    in the catalog cache (barcode first, then sku), with no SQL, and adds
+    one unit to the product's line; ``checkout()`` hands the lines to
+    ``db.checkout.checkout``.
+    """
+
+    def __init__(self, catalog: Optional[Catalog] = None):
+        self.catalog = catalog or get_catalog()
+        self._lines: "OrderedDict[int, List[int]]" = OrderedDict()   # product id -> [qty, unit price]
+        self.unknown: List[str] = []
+
+    def scan(self, code: str) -> ScanResult:
+        started = time.perf_counter()
+        product = self.catalog.by_barcode(code) or self.catalog.by_sku(code)
+        if product is None:
+            self.unknown.append(code)
+            return ScanResult(code, None, 0, (time.perf_counter() - started) * 1e6)
+        qty = self.add(product)
+        return ScanResult(code, product, qty, (time.perf_counter() - started) * 1e6)
+
+    def add(self, product: ProductRecord, qty: int = 1) -> int:
+        line = self._lines.get(product.id)
+        if line is None:
+            line = self._lines[product.id] = [0, product.price_cents]
+        line[0] += qty
+        return line[0]
+
+    def remove(self, product_id: int, qty: int = 1) -> int:
+        line = self._lines.get(product_id)
+        if line is None:
+            return 0
+        line[0] -= qty
+        if line[0] <= 0:
+            del self._lines[product_id]
+            return 0
+        return line[0]
+
+    def lines(self) -> List[CartLine]:
+        return [CartLine(product_id, qty, unit) for product_id, (qty, unit) in self._lines.items()]
+
+    @property
+    def total_cents(self) -> int:
+        return sum(qty * unit for qty, unit in self._lines.values())
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def clear(self):
+        self._lines.clear()
+        self.unknown = []
+
+    def checkout(self, **kwargs) -> CheckoutResult:
+        """Complete the sale (see ``db.checkout.checkout`` for the options) and start an empty one."""
+        result = checkout(self.lines(), manager=self.catalog.manager, **kwargs)
+        self.clear()
+        return result
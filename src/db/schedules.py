@@ -0,0 +1,267 @@
+import calendar
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from . import audit, get_manager, now_ms
+
+try:  # optional: batch mode falls back to plain Python without numpy
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# (principal_cents, interest_cents, fees_cents) for one installment
+Line = Tuple[int, int, int]
+
+
+# ------------------------------
+# Pure amortization math (integer centimes)
+# ------------------------------
+@lru_cache(maxsize=4096)
+def _annuity_factor(apr_bp: int, term: int) -> float:
+    r = apr_bp / 120_000  # monthly rate: basis points / 100 / 100 / 12
+    return r / (1 - (1 + r) ** -term) if r else 1 / term
+
+
+def _interest(balance: int, apr_bp: int) -> int:
+    # balance * apr_bp / 120000, rounded half up, in integers only
+    return (balance * apr_bp * 2 + 120_000) // 240_000
+
+
+def amortize(principal_cents: int, term_months: int, apr_bp: int = 0,
+             fees_cents: int = 0, insurance_cents: int = 0) -> List[Line]:
+    """
+    French (constant-payment) amortization in integer centimes.
+
+    Interest is computed on the remaining balance each month and rounded
+    half up; the last installment absorbs the rounding so principal parts
+    always sum to ``principal_cents``. Fees and insurance are spread evenly,
+    with leftover centimes on the first installments.
+    """
+    if not 3 <= term_months <= 60:
+        raise ValueError("term_months must be between 3 and 60")
+    payment = math.floor(principal_cents * _annuity_factor(apr_bp, term_months) + 0.5)
+    extra = fees_cents + insurance_cents
+    fee_base, fee_rem = divmod(extra, term_months)
+
+    lines = []
+    balance = principal_cents
+    for k in range(term_months):
+        interest = _interest(balance, apr_bp)
+        principal = balance if k == term_months - 1 else min(payment - interest, balance)
+        balance -= principal
+        lines.append((principal, interest, fee_base + (1 if k < fee_rem else 0)))
+    return lines
+
+
+def amortize_batch(principal: Sequence[int], term: Sequence[int], apr_bp: Sequence[int],
+                   extra: Sequence[int]) -> List[List[Line]]:
+    """
+    ``amortize()`` for many contracts at once (``extra`` = fees + insurance).
+
+    With numpy, contracts are grouped by term and each group is computed as
+    arrays, one vector step per month, instead of one Python loop per row.
+    Results are identical to ``amortize()``.
+    """
+    if np is None:
+        return [amortize(p, n, a, e) for p, n, a, e in zip(principal, term, apr_bp, extra)]
+
+    L = np.asarray(principal, dtype=np.int64)
+    N = np.asarray(term, dtype=np.int64)
+    A = np.asarray(apr_bp, dtype=np.int64)
+    E = np.asarray(extra, dtype=np.int64)
+    if len(N) and (N.min() < 3 or N.max() > 60):
+        raise ValueError("term_months must be between 3 and 60")
+
+    out: List[Optional[List[Line]]] = [None] * len(L)
+    for n in np.unique(N):
+        n = int(n)
+        idx = np.nonzero(N == n)[0]
+        apr = A[idx]
+        uniq, inv = np.unique(apr, return_inverse=True)
+        factor = np.array([_annuity_factor(int(a), n) for a in uniq])[inv]
+        payment = np.floor(L[idx] * factor + 0.5).astype(np.int64)
+
+        balance = L[idx].copy()
+        P = np.empty((len(idx), n), dtype=np.int64)
+        I = np.empty_like(P)
+        for k in range(n):
+            interest = (balance * apr * 2 + 120_000) // 240_000
+            part = balance if k == n - 1 else np.minimum(payment - interest, balance)
+            P[:, k] = part
+            I[:, k] = interest
+            balance = balance - part
+
+        fee_base, fee_rem = np.divmod(E[idx], n)
+        F = fee_base[:, None] + (np.arange(n)[None, :] < fee_rem[:, None])
+        rows = np.stack([P, I, F], axis=2).tolist()
+        for j, pos in enumerate(idx.tolist()):
+            out[pos] = [tuple(r) for r in rows[j]]
+    return out
+
+
+def fee_for(principal_cents: int, fee_percent: float) -> int:
+    """Percentage fee (AppSettings.installment_fee) in centimes, rounded half up."""
+    return math.floor(principal_cents * fee_percent / 100 + 0.5)
+
+
+@lru_cache(maxsize=8192)
+def due_dates(start_ms: int, term_months: int) -> Tuple[int, ...]:
+    """Monthly due dates after ``start_ms`` (clamped to the month's last day)."""
+    start = datetime.fromtimestamp(start_ms / 1000)
+    out = []
+    for k in range(1, term_months + 1):
+        y, m = divmod(start.month - 1 + k, 12)
+        year, month = start.year + y, m + 1
+        day = min(start.day, calendar.monthrange(year, month)[1])
+        out.append(int(start.replace(year=year, month=month, day=day).timestamp() * 1000))
+    return tuple(out)
+
+
+# ------------------------------
+# Persistence
+# ------------------------------
+_INSERT_INSTALLMENT = """
+    INSERT INTO installment (schedule_id, number, due_date, principal_cents, interest_cents,
+                             fees_cents, due_cents, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _installment_rows(schedule_id: int, start_ms: int, lines: List[Line], ts: int):
+    for number, (due, (p, i, f)) in enumerate(zip(due_dates(start_ms, len(lines)), lines), 1):
+        yield (schedule_id, number, due, p, i, f, p + i + f, ts, ts)
+
+
+def _financed_principal(c, contract_id: int):
+    row = c.execute("""
+        SELECT o.id, o.term_months, o.apr_bp, o.fees_cents, o.insurance_cents,
+               s.total_cents - s.down_payment_cents
+        FROM contract ct
+        JOIN offer o ON o.id = ct.offer_id
+        JOIN sale s ON s.id = ct.sale_id
+        WHERE ct.id = ?
+    """, (contract_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Contract {contract_id} not found")
+    return row
+
+
+def generate_schedule(contract_id: int, start_ms: Optional[int] = None, manager=None) -> int:
+    """
+    Create the schedule and all installments for a contract from its offer.
+
+    The financed principal is the sale total minus its down payment. The
+    offer's total_cost_cents / total_repay_cents are updated to match.
+    Returns the new schedule id.
+    """
+    manager = manager or get_manager()
+    ts = now_ms()
+    start_ms = start_ms or ts
+    with manager.write() as c:
+        if c.execute("SELECT 1 FROM schedule WHERE contract_id = ?", (contract_id,)).fetchone():
+            raise ValueError(f"Contract {contract_id} already has a schedule; use regenerate_schedules()")
+        offer_id, term, apr, fees, insurance, principal = _financed_principal(c, contract_id)
+        lines = amortize(principal, term, apr, fees, insurance)
+        schedule_id = c.execute("""
+            INSERT INTO schedule (contract_id, installments_count, start_date, generated_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (contract_id, term, start_ms, ts, ts, ts)).lastrowid
+        c.executemany(_INSERT_INSTALLMENT, _installment_rows(schedule_id, start_ms, lines, ts))
+        c.execute(_UPDATE_OFFER, _offer_totals(offer_id, principal, lines, fees, ts))
+        audit.record("create", "schedule", schedule_id, {"contract_id": contract_id, "installments": len(lines),
+                                                         "principal_cents": principal}, manager=manager)
+    return schedule_id
+
+
+_UPDATE_OFFER = """
+    UPDATE offer SET fees_cents = ?, total_cost_cents = ?, total_repay_cents = ?,
+                     updated_at = ?, version = version + 1
+    WHERE id = ?
+"""
+
+
+def _offer_totals(offer_id, principal, lines, fees, ts):
+    cost = sum(i + f for _, i, f in lines)
+    return (fees, cost, principal + cost, ts, offer_id)
+
+
+@dataclass
+class RegenerateReport:
+    regenerated: int = 0
+    skipped_with_payments: int = 0
+    installments_written: int = 0
+    elapsed_ms: float = 0.0
+
+
+def regenerate_schedules(contract_ids: Optional[Sequence[int]] = None, fee_percent: Optional[float] = None,
+                         chunk_size: int = 5000, manager=None) -> RegenerateReport:
+    """
+    Rebuild the installments of many contracts in one pass, e.g. after a fee
+    policy change: ``regenerate_schedules(fee_percent=settings.installment_fee)``.
+
+    Contracts that already received money (any paid installment or payment
+    row) are left alone and counted in ``skipped_with_payments``. The math
+    runs through ``amortize_batch()``; rows are written with executemany in
+    one transaction per ``chunk_size`` contracts.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = RegenerateReport()
+
+    where, params = "", ()
+    if contract_ids is not None:
+        ids = list(contract_ids)
+        where = f"AND ct.id IN ({','.join('?' * len(ids))})" if ids else "AND 0"
+        params = tuple(ids)
+    with manager.read() as c:
+        rows = c.execute(f"""
+            SELECT ct.id, sc.id, sc.start_date, o.id, o.term_months, o.apr_bp, o.fees_cents,
+                   o.insurance_cents, s.total_cents - s.down_payment_cents,
+                   EXISTS (SELECT 1 FROM installment i WHERE i.schedule_id = sc.id AND i.paid_cents > 0)
+                   OR EXISTS (SELECT 1 FROM payment p WHERE p.contract_id = ct.id)
+            FROM contract ct
+            JOIN schedule sc ON sc.contract_id = ct.id
+            JOIN offer o ON o.id = ct.offer_id
+            JOIN sale s ON s.id = ct.sale_id
+            WHERE ct.status != 'cancelled' {where}
+        """, params).fetchall()
+
+    todo = [r for r in rows if not r[9]]
+    report.skipped_with_payments = len(rows) - len(todo)
+
+    for start in range(0, len(todo), chunk_size):
+        chunk = todo[start:start + chunk_size]
+        principal = [r[8] for r in chunk]
+        fees = [fee_for(p, fee_percent) if fee_percent is not None else r[6]
+                for p, r in zip(principal, chunk)]
+        plans = amortize_batch(principal, [r[4] for r in chunk], [r[5] for r in chunk],
+                               [f + r[7] for f, r in zip(fees, chunk)])
+        ts = now_ms()
+        with manager.write() as c:
+            schedule_ids = [(r[1],) for r in chunk]
+            c.executemany("DELETE FROM installment WHERE schedule_id = ?", schedule_ids)
+            c.executemany(_INSERT_INSTALLMENT, (
+                row for r, lines in zip(chunk, plans)
+                for row in _installment_rows(r[1], r[2], lines, ts)
+            ))
+            c.executemany("""
+                UPDATE schedule SET installments_count = ?, generated_at = ?, updated_at = ?,
+                                    version = version + 1
+                WHERE id = ?
+            """, [(r[4], ts, ts, r[1]) for r in chunk])
+            c.executemany(_UPDATE_OFFER, [
+                _offer_totals(r[3], p, lines, f, ts)
+                for r, p, f, lines in zip(chunk, principal, fees, plans)
+            ])
+            # One event per chunk: the schedule rows carry generated_at and version
+            audit.record("regenerate", "schedule", None, {"schedules": [r[1] for r in chunk],
+                                                          "fee_percent": fee_percent}, manager=manager)
+        report.regenerated += len(chunk)
+        report.installments_written += sum(len(p) for p in plans)
+
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
@@ -0,0 +1,236 @@
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from . import audit, get_manager, now_ms
+
+MOVEMENTS = ("receive", "sell", "return", "adjust", "transfer_out", "transfer_in")
+_INBOUND = {"receive", "return", "transfer_in"}
+_OUTBOUND = {"sell", "transfer_out"}
+
+_INSERT_LEDGER = """
+    INSERT INTO stock_ledger (product_id, branch_id, movement, qty_delta, ref_entity, ref_id, at, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_STOCK = """
+    INSERT INTO stock (product_id, branch_id, qty, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(product_id, branch_id) DO UPDATE SET
+        qty = qty + excluded.qty,
+        updated_at = excluded.updated_at,
+        version = version + 1
+"""
+
+
+def _delta(movement: str, qty: int) -> int:
+    """Signed ledger delta: inbound/outbound take a positive qty, 'adjust' is signed."""
+    if movement not in MOVEMENTS:
+        raise ValueError(f"Unknown stock movement: {movement}")
+    if movement == "adjust":
+        if qty == 0:
+            raise ValueError("Adjustment of 0")
+        return qty
+    if qty <= 0:
+        raise ValueError(f"'{movement}' quantity must be positive")
+    return qty if movement in _INBOUND else -qty
+
+
+def _apply(c, moves: List[Tuple[int, int, str, int, Optional[str], Optional[int], int]],
+           allow_negative: bool, ts: int):
+    """Write ledger rows and the matching balance changes on an open write transaction."""
+    c.executemany(_INSERT_LEDGER, [m + (ts,) for m in moves])
+    per_key = defaultdict(int)
+    for product_id, branch_id, _, delta, _, _, _ in moves:
+        per_key[(product_id, branch_id)] += delta
+    c.executemany(_UPSERT_STOCK, [(p, b, d, ts, ts) for (p, b), d in per_key.items()])
+    if not allow_negative:
+        for (p, b), d in per_key.items():
+            if d < 0 and c.execute("SELECT qty FROM stock WHERE product_id = ? AND branch_id = ?",
+                                   (p, b)).fetchone()[0] < 0:
+                raise ValueError(f"Insufficient stock for product {p} at branch {b}")
+    return per_key
+
+
+def move_stock(product_id: int, movement: str, qty: int, branch_id: int = 1,
+               ref_entity: Optional[str] = None, ref_id: Optional[int] = None,
+               at: Optional[int] = None, allow_negative: bool = False, manager=None) -> int:
+    """
+    Record one movement: the ledger row and the stock balance change commit
+    together. Returns the new balance. Raises ValueError (and writes nothing)
+    if the balance would go negative and ``allow_negative`` is False.
+    """
+    manager = manager or get_manager()
+    ts = now_ms()
+    with manager.write() as c:
+        delta = _delta(movement, qty)
+        _apply(c, [(product_id, branch_id, movement, delta, ref_entity, ref_id, at or ts)], allow_negative, ts)
+        audit.record(movement, "stock", product_id, {"branch_id": branch_id, "qty_delta": delta,
+                                                     "ref": [ref_entity, ref_id]}, manager=manager)
+        return c.execute("SELECT qty FROM stock WHERE product_id = ? AND branch_id = ?",
+                         (product_id, branch_id)).fetchone()[0]
+
+
+def receive_delivery(lines: Iterable[Tuple[int, int]], branch_id: int = 1,
+                     ref_entity: str = "supplier_delivery", ref_id: Optional[int] = None,
+                     at: Optional[int] = None, manager=None) -> int:
+    """
+    Receive a whole supplier delivery ``[(product_id, qty), ...]`` in one
+    transaction (executemany for ledger rows and balances). Returns the
+    number of ledger rows written.
+    """
+    manager = manager or get_manager()
+    ts = now_ms()
+    moves = [(p, branch_id, "receive", _delta("receive", q), ref_entity, ref_id, at or ts) for p, q in lines]
+    if not moves:
+        return 0
+    with manager.write() as c:
+        _apply(c, moves, True, ts)
+        # One event per delivery: the ledger rows carry the per-line detail
+        audit.record("receive", "stock", None, {"branch_id": branch_id, "lines": len(moves),
+                                                "ref": [ref_entity, ref_id]}, manager=manager)
+    return len(moves)
+
+
+def transfer(product_id: int, qty: int, from_branch: int, to_branch: int,
+             ref_id: Optional[int] = None, manager=None):
+    """Move stock between branches as a transfer_out/transfer_in pair."""
+    manager = manager or get_manager()
+    ts = now_ms()
+    with manager.write() as c:
+        _apply(c, [
+            (product_id, from_branch, "transfer_out", _delta("transfer_out", qty), "transfer", ref_id, ts),
+            (product_id, to_branch, "transfer_in", _delta("transfer_in", qty), "transfer", ref_id, ts),
+        ], False, ts)
+        audit.record("transfer", "stock", product_id, {"qty": qty, "from": from_branch, "to": to_branch,
+                                                       "ref_id": ref_id}, manager=manager)
+
+
+# ------------------------------
+# Snapshots
+# ------------------------------
+def take_snapshot(at: Optional[int] = None, manager=None) -> int:
+    """
+    Snapshot every (product, branch) balance as of ``at``.
+
+    Each balance is the previous snapshot plus the ledger rows between the
+    two snapshot times, so the cost is proportional to the movements since
+    the last snapshot, not to the ledger size. Returns rows written.
+    """
+    manager = manager or get_manager()
+    ts = now_ms()
+    at = at or ts
+    with manager.write() as c:
+        prev = c.execute("SELECT MAX(at) FROM stock_snapshot WHERE at <= ?", (at,)).fetchone()[0]
+        if prev == at:
+            return 0
+        prev = prev if prev is not None else -1
+        cur = c.execute("""
+            INSERT INTO stock_snapshot (product_id, branch_id, at, qty, created_at)
+            SELECT k.product_id, k.branch_id, :at,
+                   COALESCE((SELECT s.qty FROM stock_snapshot s
+                             WHERE s.product_id = k.product_id AND s.branch_id = k.branch_id
+                               AND s.at = :prev), 0)
+                 + COALESCE((SELECT SUM(l.qty_delta) FROM stock_ledger l
+                             WHERE l.product_id = k.product_id AND l.branch_id = k.branch_id
+                               AND l.at > :prev AND l.at <= :at), 0),
+                   :ts
+            FROM stock k
+        """, {"at": at, "prev": prev, "ts": ts})
+        return cur.rowcount
+
+
+def snapshot_if_due(every_ms: int = 24 * 60 * 60 * 1000, manager=None) -> int:
+    """Take a snapshot when the latest one is older than ``every_ms`` (for a daily timer)."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        last = c.execute("SELECT MAX(at) FROM stock_snapshot").fetchone()[0]
+    if last is not None and now_ms() - last < every_ms:
+        return 0
+    return take_snapshot(manager=manager)
+
+
+def stock_as_of(product_id: int, at: int, branch_id: int = 1, manager=None) -> int:
+    """Balance at time ``at``: nearest snapshot at or before it + later ledger rows."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        snap = c.execute("""
+            SELECT at, qty FROM stock_snapshot
+            WHERE product_id = ? AND branch_id = ? AND at <= ?
+            ORDER BY at DESC LIMIT 1
+        """, (product_id, branch_id, at)).fetchone()
+        since, base = snap if snap else (-1, 0)
+        delta = c.execute("""
+            SELECT COALESCE(SUM(qty_delta), 0) FROM stock_ledger
+            WHERE product_id = ? AND branch_id = ? AND at > ? AND at <= ?
+        """, (product_id, branch_id, since, at)).fetchone()[0]
+    return base + delta
+
+
+# ------------------------------
+# Verification
+# ------------------------------
+@dataclass
+class StockDrift:
+    product_id: int
+    branch_id: int
+    recorded: int      # stock.qty (or snapshot qty)
+    from_ledger: int
+
+
+@dataclass
+class StockVerifyReport:
+    balances_checked: int = 0
+    balance_drift: List[StockDrift] = field(default_factory=list)
+    snapshot_drift: List[StockDrift] = field(default_factory=list)
+    fixed: int = 0
+    elapsed_ms: float = 0.0
+
+
+def verify_stock(fix: bool = False, check_snapshots: bool = True, manager=None) -> StockVerifyReport:
+    """
+    Rebuild balances from the full ledger and compare them with ``stock``
+    (and, optionally, the latest snapshot). With ``fix`` the stock rows are
+    rewritten from the ledger. Meant for maintenance runs, not the UI thread.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = StockVerifyReport()
+    with manager.read() as c:
+        rows = c.execute("""
+            SELECT k.product_id, k.branch_id, COALESCE(s.qty, 0), k.total
+            FROM (SELECT product_id, branch_id, SUM(qty_delta) AS total
+                  FROM stock_ledger GROUP BY product_id, branch_id) k
+            LEFT JOIN stock s ON s.product_id = k.product_id AND s.branch_id = k.branch_id
+            UNION ALL
+            SELECT s.product_id, s.branch_id, s.qty, 0 FROM stock s
+            WHERE NOT EXISTS (SELECT 1 FROM stock_ledger l
+                              WHERE l.product_id = s.product_id AND l.branch_id = s.branch_id)
+        """).fetchall()
+        report.balances_checked = len(rows)
+        report.balance_drift = [StockDrift(*r) for r in rows if r[2] != r[3]]
+
+        if check_snapshots:
+            last = c.execute("SELECT MAX(at) FROM stock_snapshot").fetchone()[0]
+            if last is not None:
+                snaps = c.execute("""
+                    SELECT s.product_id, s.branch_id, s.qty,
+                           COALESCE((SELECT SUM(l.qty_delta) FROM stock_ledger l
+                                     WHERE l.product_id = s.product_id AND l.branch_id = s.branch_id
+                                       AND l.at <= s.at), 0)
+                    FROM stock_snapshot s WHERE s.at = ?
+                """, (last,)).fetchall()
+                report.snapshot_drift = [StockDrift(*r) for r in snaps if r[2] != r[3]]
+
+    if fix and report.balance_drift:
+        ts = now_ms()
+        with manager.write() as c:
+            c.executemany("""
+                INSERT INTO stock (product_id, branch_id, qty, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(product_id, branch_id) DO UPDATE SET
+                    qty = excluded.qty, updated_at = excluded.updated_at, version = version + 1
+            """, [(d.product_id, d.branch_id, d.from_ledger, ts, ts) for d in report.balance_drift])
+        report.fixed = len(report.balance_drift)
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
@@ -0,0 +1,456 @@
+import json
+import os
+import struct
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from . import get_manager, now_ms
+
+# Synced tables in dependency order (parents first), with the columns that
+# hold ids of other synced rows. payment has no declared foreign keys, so
+# these are listed by hand rather than read from PRAGMA foreign_key_list.
+TABLES: Dict[str, Dict[str, str]] = {
+    "customer": {},
+    "contact_method": {"customer_id": "customer"},
+    "product": {},
+    "stock": {"product_id": "product"},
+    "stock_ledger": {"product_id": "product"},
+    "sale": {"customer_id": "customer"},
+    "sale_item": {"sale_id": "sale", "product_id": "product"},
+    "offer": {},
+    "contract": {"sale_id": "sale", "offer_id": "offer"},
+    "schedule": {"contract_id": "contract"},
+    "installment": {"schedule_id": "schedule"},
+    "payment": {"contract_id": "contract", "installment_id": "installment", "sale_id": "sale"},
+}
+# (table column, id column) pairs whose target table is named in the row itself
+_POLYMORPHIC = {"stock_ledger": ("ref_entity", "ref_id")}
+# A row arriving from another device that matches a local row on one of these
+# is the same thing created twice (same SKU, same payment reference): merge.
+NATURAL_KEYS = {
+    "product": ("sku",),
+    "stock": ("product_id", "branch_id"),
+    "payment": ("idempotency_key",),
+}
+FRAME_ROWS = 500
+_MAGIC = b"SYNCv1\n"
+
+
+class SyncError(RuntimeError):
+    """A change set could not be applied (nothing from it was kept)."""
+
+
+@dataclass
+class SyncReport:
+    frames: int = 0
+    bytes: int = 0                 # compressed payload size
+    changes: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0               # older than the local row, or already deleted here
+    elapsed_ms: float = 0.0
+    vector: Dict[str, int] = field(default_factory=dict)   # received vector after applying
+
+
+@dataclass
+class SyncSession:
+    pulled: SyncReport
+    pushed: SyncReport
+
+
+# ------------------------------
+# Device identity and checkpoints
+# ------------------------------
+def device_id(manager=None) -> str:
+    """This database's sync identity (created on first use)."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        row = c.execute("SELECT value FROM app_meta WHERE key = 'device_id'").fetchone()
+    if row:
+        return row[0]
+    with manager.write() as c:
+        c.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('device_id', ?)", (uuid.uuid4().hex,))
+        return c.execute("SELECT value FROM app_meta WHERE key = 'device_id'").fetchone()[0]
+
+
+def _checkpoint(c, peer: str) -> dict:
+    row = c.execute("SELECT vector_json FROM sync_checkpoint WHERE device_id = ?", (peer,)).fetchone()
+    return json.loads(row[0]) if row else {"received": {}, "sent": {}}
+
+
+def _merge(a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
+    out = dict(a)
+    for origin, seq in b.items():
+        out[origin] = max(out.get(origin, 0), seq)
+    return out
+
+
+def _save_checkpoint(c, peer: str, received=None, sent=None, pulled=False, pushed=False):
+    vectors = _checkpoint(c, peer)
+    if received:
+        vectors["received"] = _merge(vectors["received"], received)
+    if sent:
+        vectors["sent"] = _merge(vectors["sent"], sent)
+    ts = now_ms()
+    c.execute("""
+        INSERT INTO sync_checkpoint (device_id, vector_json, last_pull_at, last_push_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(device_id) DO UPDATE SET
+            vector_json = excluded.vector_json,
+            last_pull_at = COALESCE(excluded.last_pull_at, last_pull_at),
+            last_push_at = COALESCE(excluded.last_push_at, last_push_at)
+    """, (peer, json.dumps(vectors, sort_keys=True), ts if pulled else None, ts if pushed else None))
+
+
+def received_vector(peer: str, manager=None) -> Dict[str, int]:
+    """Highest sequence per origin device received from ``peer``."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        return _checkpoint(c, peer)["received"]
+
+
+# ------------------------------
+# Outgoing: changes since a version vector
+# ------------------------------
+def _columns(c, table: str) -> List[str]:
+    return [r[1] for r in c.execute(f'PRAGMA table_info("{table}")')]
+
+
+class _Identities:
+    """local id <-> (origin device, id on that device), cached for one change set."""
+
+    def __init__(self, c, me: str):
+        self.c, self.me = c, me
+        self._global: Dict[tuple, list] = {}
+        self._local: Dict[tuple, Optional[int]] = {}
+
+    def to_global(self, table: str, local_id: Optional[int]):
+        if local_id is None:
+            return None
+        key = (table, local_id)
+        ref = self._global.get(key)
+        if ref is None:
+            row = self.c.execute("SELECT origin, origin_id FROM sync_identity WHERE tbl = ? AND local_id = ?",
+                                 key).fetchone()
+            ref = self._global[key] = list(row) if row else [self.me, local_id]
+        return ref
+
+    def to_local(self, table: str, ref) -> Optional[int]:
+        if ref is None:
+            return None
+        origin, origin_id = ref
+        if origin == self.me:
+            return origin_id
+        key = (table, origin, origin_id)
+        if key not in self._local:
+            row = self.c.execute("SELECT local_id FROM sync_identity WHERE tbl = ? AND origin = ? AND origin_id = ?",
+                                 key).fetchone()
+            self._local[key] = row[0] if row else None
+        return self._local[key]
+
+    def bind(self, table: str, ref, local_id: int):
+        self.c.execute("INSERT OR REPLACE INTO sync_identity (tbl, origin, origin_id, local_id) VALUES (?, ?, ?, ?)",
+                       (table, ref[0], ref[1], local_id))
+        self._local[(table, ref[0], ref[1])] = local_id
+        self._global[(table, local_id)] = list(ref)
+
+
+def _pending(c, table: str, op: str, vector: Dict[str, int], me: str, exclude: Optional[str]):
+    """(seq, row_id, origin, origin_seq) of the table's changes the vector has not seen."""
+    if exclude != me:
+        for seq, row_id in c.execute("""
+            SELECT seq, row_id FROM sync_change
+            WHERE tbl = ? AND origin IS NULL AND seq > ? AND op = ? ORDER BY seq
+        """, (table, vector.get(me, 0), op)):
+            yield seq, row_id, me, seq
+    origins = [r[0] for r in c.execute(
+        "SELECT DISTINCT origin FROM sync_change WHERE tbl = ? AND origin IS NOT NULL", (table,))]
+    for origin in origins:
+        if origin == exclude:
+            continue
+        for seq, row_id, origin_seq in c.execute("""
+            SELECT seq, row_id, origin_seq FROM sync_change
+            WHERE tbl = ? AND origin = ? AND origin_seq > ? AND op = ? ORDER BY origin_seq
+        """, (table, origin, vector.get(origin, 0), op)):
+            yield seq, row_id, origin, origin_seq
+
+
+def _frame(table: str, columns: List[str], rows: list) -> bytes:
+    payload = json.dumps({"t": table, "cols": columns, "rows": rows}, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"), 6)
+
+
+def changes_since(vector: Dict[str, int], exclude: Optional[str] = None, frame_rows: int = FRAME_ROWS,
+                  manager=None) -> Iterator[bytes]:
+    """
+    Yield the changes ``vector`` has not seen as compressed frames of up to
+    ``frame_rows`` rows of one table. Changes that originated on ``exclude``
+    (the requesting device) are left out. Upserts come table by table,
+    parents first, then deletes children first. All frames are read from one
+    snapshot of the database.
+    """
+    manager = manager or get_manager()
+    me = device_id(manager)
+    with manager.read() as c:
+        c.execute("BEGIN")   # one snapshot for the whole change set
+        try:
+            ids = _Identities(c, me)
+            for op, tables in (("upsert", list(TABLES)), ("delete", list(reversed(TABLES)))):
+                for table in tables:
+                    refs = TABLES[table]
+                    columns = [col for col in _columns(c, table) if col != "id"]
+                    poly = _POLYMORPHIC.get(table)
+                    select = f'SELECT {", ".join(columns)} FROM "{table}" WHERE id = ?'
+                    rows = []
+                    for _seq, row_id, origin, origin_seq in _pending(c, table, op, vector, me, exclude):
+                        ref = ids.to_global(table, row_id)
+                        values = None
+                        if op == "upsert":
+                            found = c.execute(select, (row_id,)).fetchone()
+                            if found is None:
+                                continue   # deleted after logging; its delete entry replaced this one
+                            values = dict(zip(columns, found))
+                            for col, target in refs.items():
+                                values[col] = ids.to_global(target, values[col])
+                            if poly and values[poly[0]] in TABLES:
+                                values[poly[1]] = ids.to_global(values[poly[0]], values[poly[1]])
+                            values = [values[col] for col in columns]
+                        rows.append([op, origin, origin_seq, ref, values])
+                        if len(rows) >= frame_rows:
+                            yield _frame(table, columns, rows)
+                            rows = []
+                    if rows:
+                        yield _frame(table, columns, rows)
+        finally:
+            c.execute("COMMIT")
+
+
+# ------------------------------
+# Incoming: apply a change set
+# ------------------------------
+def _newer(incoming: tuple, current: tuple) -> bool:
+    # Last writer wins on (updated_at, version); ties go to the higher device
+    # id so both sides pick the same row.
+    return incoming > current
+
+
+def _apply_frame(c, frame: dict, ids: _Identities, me: str, report: SyncReport, seen: Dict[str, int]):
+    table = frame["t"]
+    if table not in TABLES:
+        raise SyncError(f"Unknown table {table!r} in change set")
+    local_cols = set(_columns(c, table))
+    columns = frame["cols"]
+    keep = [i for i, col in enumerate(columns) if col in local_cols]
+    names = [columns[i] for i in keep]
+    stamp = "updated_at" if "updated_at" in local_cols else "created_at"
+    has_version = "version" in local_cols
+    refs = TABLES[table]
+    poly = _POLYMORPHIC.get(table)
+    natural = NATURAL_KEYS.get(table)
+    assignments = ", ".join(f'"{col}" = ?' for col in names)
+
+    for op, origin, origin_seq, ref, values in frame["rows"]:
+        report.changes += 1
+        seen[origin] = max(seen.get(origin, 0), origin_seq)
+        local_id = ids.to_local(table, ref)
+
+        if op == "delete":
+            if local_id is not None and c.execute(f'DELETE FROM "{table}" WHERE id = ?', (local_id,)).rowcount:
+                report.deleted += 1
+                _log(c, table, local_id, op, origin, origin_seq)
+            else:
+                report.skipped += 1
+            continue
+
+        row = dict(zip(columns, values))
+        for col, target in refs.items():
+            if row.get(col) is not None:
+                translated = ids.to_local(target, row[col])
+                if translated is None:
+                    raise SyncError(f"{table} {ref} references unknown {target} {row[col]}")
+                row[col] = translated
+        if poly and row.get(poly[0]) in TABLES and row.get(poly[1]) is not None:
+            row[poly[1]] = ids.to_local(row[poly[0]], row[poly[1]])
+
+        if local_id is None and natural and all(row.get(k) is not None for k in natural):
+            found = c.execute(f'SELECT id FROM "{table}" WHERE ' + " AND ".join(f'"{k}" = ?' for k in natural),
+                              [row[k] for k in natural]).fetchone()
+            if found:
+                local_id = found[0]
+                ids.bind(table, ref, local_id)
+
+        params = [row[col] for col in names]
+        if local_id is None:
+            if ref[0] == me:
+                report.skipped += 1   # our own row, deleted here since
+                continue
+            local_id = c.execute(f'INSERT INTO "{table}" ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+                                 params).lastrowid
+            ids.bind(table, ref, local_id)
+            report.inserted += 1
+        else:
+            current = c.execute(f'SELECT {stamp}, {"version" if has_version else "0"} FROM "{table}" WHERE id = ?',
+                                (local_id,)).fetchone()
+            if current is None:
+                report.skipped += 1   # deleted here: the delete wins
+                continue
+            last = c.execute("SELECT origin FROM sync_change WHERE tbl = ? AND row_id = ?", (table, local_id)).fetchone()
+            current_origin = last[0] if last and last[0] else me
+            incoming = (row.get(stamp) or 0, row.get("version", 0) if has_version else 0, origin)
+            if not _newer(incoming, (current[0] or 0, current[1], current_origin)):
+                report.skipped += 1
+                continue
+            c.execute(f'UPDATE "{table}" SET {assignments} WHERE id = ?', params + [local_id])
+            report.updated += 1
+        _log(c, table, local_id, op, origin, origin_seq)
+
+
+def _log(c, table: str, row_id: int, op: str, origin: str, origin_seq: int):
+    # Relayed changes keep their origin, so a third device can tell what it has seen
+    c.execute("UPDATE sync_state SET seq = seq + 1")
+    c.execute("""
+        INSERT INTO sync_change (tbl, row_id, seq, op, origin, origin_seq)
+        SELECT ?, ?, seq, ?, ?, ? FROM sync_state WHERE id = 1
+        ON CONFLICT (tbl, row_id) DO UPDATE SET
+            seq = excluded.seq, op = excluded.op, origin = excluded.origin, origin_seq = excluded.origin_seq
+    """, (table, row_id, op, origin, origin_seq))
+
+
+def apply_changes(frames: Iterable[bytes], sender: str, manager=None) -> SyncReport:
+    """
+    Apply a change set from ``sender`` in one transaction and advance the
+    received vector for ``sender``. Newer rows (see ``_newer``) replace
+    local ones, older ones are skipped, deletes win. On any error nothing
+    is kept and the vector does not move, so the same delta comes again.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = SyncReport()
+    me = device_id(manager)
+    seen: Dict[str, int] = {}
+    with manager.write() as c:
+        c.execute("PRAGMA defer_foreign_keys = ON")   # checked at COMMIT; resets afterwards
+        c.execute("UPDATE sync_state SET applying = ?", (sender,))   # the change-log triggers stay quiet
+        ids = _Identities(c, me)
+        for data in frames:
+            report.frames += 1
+            report.bytes += len(data)
+            _apply_frame(c, json.loads(zlib.decompress(data)), ids, me, report, seen)
+        c.execute("UPDATE sync_state SET applying = NULL")
+        _save_checkpoint(c, sender, received=seen, pulled=True)
+        report.vector = _checkpoint(c, sender)["received"]
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+# ------------------------------
+# Peers
+# ------------------------------
+class LocalPeer:
+    """
+    A peer reachable as another database file (a second branch on the
+    network share, or a test). A socket transport would offer the same four
+    members and ship the frames unchanged.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.device_id = device_id(manager)
+
+    def received_vector(self, peer: str) -> Dict[str, int]:
+        return received_vector(peer, self.manager)
+
+    def changes_since(self, vector: Dict[str, int], exclude: Optional[str] = None) -> Iterator[bytes]:
+        return changes_since(vector, exclude, manager=self.manager)
+
+    def apply_changes(self, frames: Iterable[bytes], sender: str) -> SyncReport:
+        return apply_changes(frames, sender, self.manager)
+
+
+def sync(peer, manager=None) -> SyncSession:
+    """
+    Pull what ``peer`` has that we have not received, then push what it has
+    not received from us. Only deltas travel; each side keeps its own vectors
+    in sync_checkpoint. Meant for a star (branches syncing with one head
+    office) or pairs: relayed changes keep their origin and sequence.
+    """
+    manager = manager or get_manager()
+    me = device_id(manager)
+    pulled = apply_changes(peer.changes_since(received_vector(peer.device_id, manager), exclude=me),
+                           peer.device_id, manager)
+    their_view = peer.received_vector(me)
+    pushed = peer.apply_changes(changes_since(their_view, exclude=peer.device_id, manager=manager), me)
+    with manager.write() as c:
+        _save_checkpoint(c, peer.device_id, sent=_merge(their_view, pushed.vector), pushed=True)
+    return SyncSession(pulled, pushed)
+
+
+# ------------------------------
+# Bundles: change sets as files (USB stick, mail, shared folder)
+# ------------------------------
+def export_bundle(path, to_device: str, manager=None) -> SyncReport:
+    """
+    Write everything ``to_device`` has not confirmed receiving to ``path``.
+    The header carries our received vector for ``to_device``, which confirms
+    its earlier bundles when imported there.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = SyncReport()
+    with manager.read() as c:
+        vectors = _checkpoint(c, to_device)
+    header = {"device": device_id(manager), "to": to_device, "ack": vectors["received"], "at": now_ms()}
+    path = Path(path)
+    partial = path.with_name(path.name + ".partial")
+    try:
+        with open(partial, "wb") as f:
+            f.write(_MAGIC)
+            data = zlib.compress(json.dumps(header).encode("utf-8"))
+            f.write(struct.pack(">I", len(data)) + data)
+            for data in changes_since(vectors["sent"], exclude=to_device, manager=manager):
+                f.write(struct.pack(">I", len(data)) + data)
+                report.frames += 1
+                report.bytes += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def _read_frames(f) -> Iterator[bytes]:
+    while True:
+        size = f.read(4)
+        if not size:
+            return
+        if len(size) < 4:
+            raise SyncError("Truncated bundle")
+        length = struct.unpack(">I", size)[0]
+        data = f.read(length)
+        if len(data) < length:
+            raise SyncError("Truncated bundle")
+        yield data
+
+
+def import_bundle(path, manager=None) -> SyncReport:
+    """Apply a bundle written by export_bundle on another device."""
+    manager = manager or get_manager()
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise SyncError(f"{path} is not a sync bundle")
+        frames = _read_frames(f)
+        header = json.loads(zlib.decompress(next(frames)))
+        me = device_id(manager)
+        if header["to"] != me:
+            raise SyncError(f"Bundle is addressed to {header['to']}, this device is {me}")
+        report = apply_changes(frames, header["device"], manager)
+    with manager.write() as c:
+        _save_checkpoint(c, header["device"], sent=header["ack"])
+    return report
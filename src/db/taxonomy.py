@@ -0,0 +1,334 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import audit, get_manager, now_ms
+
+KINDS = ("brand", "category", "tag")
+SEPARATOR = " > "
+
+# Members and counts recomputed from the links; must match the triggers in
+# migrations/0012_taxonomy.sql.
+_MEMBERS = """
+    SELECT c.ancestor_id, l.product_id, COUNT(*) FROM product_taxon l
+    JOIN taxon_closure c ON c.descendant_id = l.taxon_id
+    GROUP BY 1, 2
+"""
+_COUNTS = f"""
+    WITH member (taxon_id, product_id, refs) AS ({_MEMBERS}),
+         qty AS (SELECT product_id, SUM(qty) AS qty FROM stock GROUP BY product_id)
+    SELECT t.id, COUNT(p.id), IFNULL(SUM(q.qty), 0) FROM taxon t
+    LEFT JOIN member m ON m.taxon_id = t.id
+    LEFT JOIN product p ON p.id = m.product_id AND p.is_active = 1
+    LEFT JOIN qty q ON q.product_id = p.id
+    GROUP BY t.id
+"""
+
+
+class TaxonomyError(ValueError):
+    """Unknown kind, empty or ambiguous name."""
+
+
+@dataclass
+class TaxonNode:
+    id: int
+    kind: str
+    name: str
+    parent_id: Optional[int]
+    path: str            # "Electronics > TV"; the name for brands and tags
+    depth: int
+    products: int        # active products linked here or below
+    stock_qty: int       # their stock over all branches
+
+
+@dataclass
+class TaxonDrift:
+    taxon_id: int
+    path: str
+    recorded: Tuple[int, int]     # (products, stock_qty)
+    expected: Tuple[int, int]
+
+
+@dataclass
+class TaxonomyCheckReport:
+    nodes_checked: int = 0
+    members_off: int = 0          # taxon_member rows missing, extra or with the wrong refs
+    drift: List[TaxonDrift] = field(default_factory=list)
+    fixed: bool = False
+    elapsed_ms: float = 0.0
+
+
+def split_path(path: str) -> List[str]:
+    """``"Electronics > TV"`` -> ``["Electronics", "TV"]``."""
+    return [name.strip() for name in path.split(">") if name.strip()]
+
+
+def parse_categories(text: str) -> List[str]:
+    """The New Product field: comma-separated names or paths."""
+    return [entry.strip() for entry in text.split(",") if entry.strip()]
+
+
+def _check_kind(kind: str):
+    if kind not in KINDS:
+        raise TaxonomyError(f"Unknown taxonomy kind: {kind}")
+
+
+def _find(c, kind: str, path: str) -> Optional[int]:
+    names = split_path(path) if kind == "category" else [path.strip()]
+    row = c.execute("SELECT id FROM taxon WHERE kind = ? AND path = ? COLLATE NOCASE",
+                    (kind, SEPARATOR.join(names))).fetchone()
+    return row[0] if row else None
+
+
+def _ensure(c, kind: str, path: str, ts: int) -> Tuple[int, bool]:
+    """Id of the taxon at ``path``, creating it (and missing parent categories). Returns (id, created)."""
+    names = split_path(path) if kind == "category" else [path.strip()]
+    if not names or not names[-1]:
+        raise TaxonomyError(f"Empty {kind} name")
+    parent_id, parent_path, created = None, "", False
+    for name in names:
+        full = parent_path + SEPARATOR + name if parent_path else name
+        row = c.execute("SELECT id, path FROM taxon WHERE kind = ? AND path = ? COLLATE NOCASE",
+                        (kind, full)).fetchone()
+        if row is None:
+            # the stored spelling of the parents wins
+            row = (c.execute("INSERT INTO taxon (kind, name, parent_id, path, created_at) VALUES (?, ?, ?, ?, ?)",
+                             (kind, name, parent_id, full, ts)).lastrowid, full)
+            created = True
+        parent_id, parent_path = row
+    return parent_id, created
+
+
+def _resolve_category(c, entry: str, ts: int) -> int:
+    """A path is taken as is; a bare name may also name an existing subcategory, if only one."""
+    if ">" not in entry:
+        rows = c.execute("SELECT id, path FROM taxon WHERE kind = 'category' AND name = ? COLLATE NOCASE",
+                         (entry.strip(),)).fetchall()
+        if len(rows) == 1:
+            return rows[0][0]
+        if len(rows) > 1:
+            raise TaxonomyError(f"'{entry.strip()}' is ambiguous ({', '.join(r[1] for r in rows)}); "
+                                f"give the full path")
+    return _ensure(c, "category", entry, ts)[0]
+
+
+def _write_text(c, product_ids: Iterable[int], ts: int):
+    """Keep product.brand / product.category (first category) in step with the links."""
+    for product_id in product_ids:
+        brand = c.execute("""
+            SELECT t.path FROM product_taxon l JOIN taxon t ON t.id = l.taxon_id
+            WHERE l.product_id = ? AND t.kind = 'brand' ORDER BY t.path LIMIT 1
+        """, (product_id,)).fetchone()
+        category = c.execute("""
+            SELECT t.path FROM product_taxon l JOIN taxon t ON t.id = l.taxon_id
+            WHERE l.product_id = ? AND t.kind = 'category' ORDER BY t.path LIMIT 1
+        """, (product_id,)).fetchone()
+        c.execute("""
+            UPDATE product SET brand = ?1, category = ?2, updated_at = ?3, version = version + 1
+            WHERE id = ?4 AND (brand IS NOT ?1 OR category IS NOT ?2)
+        """, (brand[0] if brand else None, category[0] if category else None, ts, product_id))
+
+
+# ---------- Taxa ----------
+def add_taxon(kind: str, path: str, manager=None) -> int:
+    """Create a brand, tag or category (``"Electronics > TV"`` creates missing parents). Idempotent."""
+    _check_kind(kind)
+    manager = manager or get_manager()
+    with manager.write() as c:
+        taxon_id, created = _ensure(c, kind, path, now_ms())
+        if created:
+            audit.record("create", "taxon", taxon_id, {"kind": kind, "path": path}, manager=manager)
+    return taxon_id
+
+
+def find_taxon(kind: str, path: str, manager=None) -> Optional[int]:
+    _check_kind(kind)
+    manager = manager or get_manager()
+    with manager.read() as c:
+        return _find(c, kind, path)
+
+
+def delete_taxon(taxon_id: int, manager=None) -> int:
+    """Delete a taxon with everything below it; its products are unlinked. Returns how many."""
+    manager = manager or get_manager()
+    with manager.write() as c:
+        subtree = [r[0] for r in c.execute(
+            "SELECT descendant_id FROM taxon_closure WHERE ancestor_id = ?", (taxon_id,))]
+        if not subtree:
+            return 0
+        marks = ",".join("?" * len(subtree))
+        products = [r[0] for r in c.execute(
+            f"SELECT DISTINCT product_id FROM product_taxon WHERE taxon_id IN ({marks})", subtree)]
+        # one statement, so a child never outlives its parent's foreign key check
+        c.execute(f"DELETE FROM taxon WHERE id IN ({marks})", subtree)
+        _write_text(c, products, now_ms())
+        audit.record("delete", "taxon", taxon_id, {"nodes": len(subtree), "products": len(products)},
+                     manager=manager)
+    return len(products)
+
+
+def taxa(kind: str, manager=None) -> List[TaxonNode]:
+    """Every taxon of a kind with its counts, parents before children."""
+    _check_kind(kind)
+    manager = manager or get_manager()
+    with manager.read() as c:
+        rows = c.execute("""
+            SELECT t.id, t.kind, t.name, t.parent_id, t.path, n.products, n.stock_qty
+            FROM taxon t JOIN taxon_count n ON n.taxon_id = t.id
+            WHERE t.kind = ? ORDER BY t.path COLLATE NOCASE
+        """, (kind,)).fetchall()
+    return [TaxonNode(i, k, name, parent, path, path.count(SEPARATOR) if k == "category" else 0, n, qty)
+            for i, k, name, parent, path, n, qty in rows]
+
+
+def node(kind: str, path: str, manager=None) -> Optional[TaxonNode]:
+    """One taxon and its counts (a single primary-key read once the id is known)."""
+    _check_kind(kind)
+    manager = manager or get_manager()
+    with manager.read() as c:
+        taxon_id = _find(c, kind, path)
+        if taxon_id is None:
+            return None
+        i, k, name, parent, full, n, qty = c.execute("""
+            SELECT t.id, t.kind, t.name, t.parent_id, t.path, n.products, n.stock_qty
+            FROM taxon t JOIN taxon_count n ON n.taxon_id = t.id WHERE t.id = ?
+        """, (taxon_id,)).fetchone()
+    return TaxonNode(i, k, name, parent, full, full.count(SEPARATOR) if k == "category" else 0, n, qty)
+
+
+# ---------- Products ----------
+def set_product_taxonomy(product_id: int, brand: Optional[str] = None, categories: Sequence[str] = (),
+                         tags: Sequence[str] = (), manager=None) -> Dict[str, List[str]]:
+    """
+    Replace a product's links, creating any brand, category or tag that does
+    not exist yet. ``categories`` takes paths or names (see
+    ``parse_categories``); a category listed together with one of its
+    subcategories is implied by it and not linked separately. Returns the
+    resulting links (``product_taxa``).
+    """
+    manager = manager or get_manager()
+    with manager.write() as c:
+        ts = now_ms()
+        wanted = set()
+        if brand and brand.strip():
+            wanted.add(_ensure(c, "brand", brand, ts)[0])
+        category_ids = {_resolve_category(c, entry, ts) for entry in categories}
+        if len(category_ids) > 1:
+            marks = ",".join("?" * len(category_ids))
+            category_ids -= {r[0] for r in c.execute(f"""
+                SELECT ancestor_id FROM taxon_closure
+                WHERE ancestor_id IN ({marks}) AND descendant_id IN ({marks}) AND depth > 0
+            """, [*category_ids, *category_ids])}
+        wanted |= category_ids
+        wanted |= {_ensure(c, "tag", tag, ts)[0] for tag in tags if tag.strip()}
+
+        current = {r[0] for r in c.execute("SELECT taxon_id FROM product_taxon WHERE product_id = ?",
+                                           (product_id,))}
+        c.executemany("DELETE FROM product_taxon WHERE product_id = ? AND taxon_id = ?",
+                      [(product_id, t) for t in current - wanted])
+        c.executemany("INSERT INTO product_taxon (product_id, taxon_id) VALUES (?, ?)",
+                      [(product_id, t) for t in wanted - current])
+        _write_text(c, [product_id], ts)
+        if current != wanted:
+            audit.record("update", "product", product_id, {"taxa": sorted(wanted)}, manager=manager)
+        return _product_taxa(c, product_id)
+
+
+def _product_taxa(c, product_id: int) -> Dict[str, List[str]]:
+    links: Dict[str, List[str]] = {kind: [] for kind in KINDS}
+    for kind, path in c.execute("""
+        SELECT t.kind, t.path FROM product_taxon l JOIN taxon t ON t.id = l.taxon_id
+        WHERE l.product_id = ? ORDER BY t.path COLLATE NOCASE
+    """, (product_id,)):
+        links[kind].append(path)
+    return links
+
+
+def product_taxa(product_id: int, manager=None) -> Dict[str, List[str]]:
+    """``{"brand": [...], "category": [...], "tag": [...]}`` as linked (not including parent categories)."""
+    manager = manager or get_manager()
+    with manager.read() as c:
+        return _product_taxa(c, product_id)
+
+
+def _filter_ids(c, path: Optional[str], brand: Optional[str], tags: Sequence[str]) -> Optional[List[int]]:
+    ids = []
+    if path:
+        category = _find(c, "category", path)
+        names = split_path(path)
+        if category is None and brand is None and len(names) > 1:
+            # "Electronics > TV > Samsung": the last step may be a brand
+            category, brand = _find(c, "category", SEPARATOR.join(names[:-1])), names[-1]
+        ids.append(category)
+    if brand:
+        ids.append(_find(c, "brand", brand))
+    ids.extend(_find(c, "tag", tag) for tag in tags)
+    return None if None in ids else ids
+
+
+def filter_products(path: Optional[str] = None, brand: Optional[str] = None, tags: Sequence[str] = (),
+                    after_id: int = 0, limit: int = 100, manager=None) -> List[int]:
+    """
+    Ids of active products in a category subtree and/or of a brand and/or
+    carrying every tag, ascending, one keyset page after ``after_id``.
+    ``path`` may end in a brand (``"Electronics > TV > Samsung"``). The node
+    with the fewest products drives the read; the others are primary-key
+    probes into taxon_member. Unknown names match nothing.
+    """
+    manager = manager or get_manager()
+    with manager.read() as c:
+        ids = _filter_ids(c, path, brand, tags)
+        if ids is None:
+            return []
+        if not ids:
+            raise TaxonomyError("Give a category, brand or tag to filter by")
+        ids.sort(key=lambda i: c.execute("SELECT products FROM taxon_count WHERE taxon_id = ?", (i,)).fetchone()[0])
+        probes = "".join(" AND EXISTS (SELECT 1 FROM taxon_member o WHERE o.taxon_id = ? AND o.product_id = m.product_id)"
+                         for _ in ids[1:])
+        return [r[0] for r in c.execute(f"""
+            SELECT m.product_id FROM taxon_member m
+            JOIN product p ON p.id = m.product_id AND p.is_active = 1
+            WHERE m.taxon_id = ? AND m.product_id > ?{probes}
+            ORDER BY m.product_id LIMIT ?
+        """, [ids[0], after_id, *ids[1:], limit])]
+
+
+# ---------- Maintenance ----------
+def rebuild_taxonomy(manager=None) -> Dict[str, int]:
+    """Recompute taxon_member and taxon_count from the links; returns rows per table."""
+    manager = manager or get_manager()
+    with manager.write() as c:
+        c.execute("DELETE FROM taxon_member")
+        c.execute(f"INSERT INTO taxon_member (taxon_id, product_id, refs) {_MEMBERS}")
+        c.execute("DELETE FROM taxon_count")
+        c.execute(f"INSERT INTO taxon_count (taxon_id, products, stock_qty) {_COUNTS}")
+        return {table: c.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("taxon_member", "taxon_count")}
+
+
+def check_taxonomy(fix: bool = False, manager=None) -> TaxonomyCheckReport:
+    """
+    Compare members and counts with a fresh computation from product_taxon.
+    With ``fix`` and any difference, both are rebuilt. Maintenance use only.
+    """
+    manager = manager or get_manager()
+    started = time.perf_counter()
+    report = TaxonomyCheckReport()
+    with manager.read() as c:
+        report.members_off = c.execute(f"""
+            SELECT (SELECT COUNT(*) FROM ({_MEMBERS} EXCEPT SELECT taxon_id, product_id, refs FROM taxon_member))
+                 + (SELECT COUNT(*) FROM (SELECT taxon_id, product_id, refs FROM taxon_member EXCEPT {_MEMBERS}))
+        """).fetchone()[0]
+        recorded = {r[0]: (r[1], r[2]) for r in c.execute("SELECT taxon_id, products, stock_qty FROM taxon_count")}
+        paths = dict(c.execute("SELECT id, path FROM taxon"))
+        for taxon_id, products, qty in c.execute(_COUNTS):
+            got = recorded.get(taxon_id, (0, 0))
+            if got != (products, qty):
+                report.drift.append(TaxonDrift(taxon_id, paths[taxon_id], got, (products, qty)))
+            report.nodes_checked += 1
+
+    if fix and (report.drift or report.members_off):
+        rebuild_taxonomy(manager)
+        report.fixed = True
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
@@ -0,0 +1,37 @@
+import re
+import unicodedata
+
+# Arabic letter variants folded to one form so "أحمد", "احمد" and "إحمد"
+# (and ى/ي, ة/ه) index and search the same way.
+_ARABIC_FOLD = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+    "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    "ـ": None,      # tatweel
+})
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def name_fold(text) -> str:
+    """
+    Normalize a person name for search: Arabic letter variants folded,
+    harakat/tatweel removed, Latin case and accents folded (É -> e).
+
+    Registered as the SQL function ``name_fold()`` on every pooled
+    connection; the fts_customers triggers call it.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text).translate(_ARABIC_FOLD).casefold())
+    # harakat (U+064B..U+0652) and Latin accents are combining marks after NFKD
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def name_tokens(text) -> list:
+    return _TOKEN_RE.findall(name_fold(text))
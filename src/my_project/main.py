@@ -7,29 +7,33 @@ import urllib.parse
 from datetime import datetime
 from socket import create_connection
 
-# Third-party libraries
-from PIL import Image, ImageTk
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from openpyxl import Workbook
+# Third-party libraries (PIL, reportlab, openpyxl) are imported inside the
+# export/imaging code that needs them, never at startup.
 
 # pySide6
 from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QFrame, QHBoxLayout,
                                QVBoxLayout, QWidget, QStackedWidget, QTableWidget, QTableWidgetItem,
                                QHeaderView, QSizePolicy)
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QSettings
 from PySide6.QtGui import (QKeySequence, QShortcut, QPixmap)
 
 # helpers
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from src.my_project.utils.helpers import get_screen_geometry, make_sidebar_button
-from src.tests.pages.dashboard import DashboardPage
-from src.tests.pages.customers import CustomersPage
-from src.tests.pages.payments import PaymentsPage
-from src.tests.pages.reports import ReportsPage
-from src.tests.pages.inventory import InventoryPage
-from src.tests.pages.settings import SettingsPage
-from src.tests.pages.contact import ContactPage
+# One import root (.../src) for db, my_project and the pages, so no module loads twice under two names
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+from my_project.utils.helpers import get_screen_geometry, make_sidebar_button
+from my_project.utils.lazy_stack import LazyStackedWidget, import_factory
+from my_project.utils.tasks import get_scheduler, MAINTENANCE
+
+# Pages in stack order; each module is imported the first time its page is shown
+PAGES = [
+    ("tests.pages.dashboard", "DashboardPage"),   # index 0
+    ("tests.pages.customers", "CustomersPage"),   # index 1
+    ("tests.pages.payments", "PaymentsPage"),     # index 2
+    ("tests.pages.reports", "ReportsPage"),       # index 3
+    ("tests.pages.inventory", "InventoryPage"),   # index 4
+    ("tests.pages.settings", "SettingsPage"),     # index 5
+    ("tests.pages.contact", "ContactPage"),       # index 6
+]
 # === home page ui ===
 
 
@@ -41,7 +45,7 @@ class HomePage(QMainWindow):
         self.showMaximized()
 
         # set geometry
-        geometry = get_screen_geometry(app)
+        geometry = get_screen_geometry(QApplication.instance())
         self.setGeometry(geometry)
 
         # shortcut
@@ -52,14 +56,54 @@ class HomePage(QMainWindow):
         self.setCentralWidget(central_widget)
         main_layout = QHBoxLayout(central_widget)
 
-        # Sidebar + Content
+        # Sidebar + Content (only the first page is built before the window shows)
         sidebar = self._build_sidebar()
         self.content_stack = self._build_content()
+        self.content_stack.show_page(0)
 
         # Layout assembly
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.content_stack, stretch=1)
 
+    # === Startup maintenance ===
+    def start_maintenance(self):
+        """
+        Submit the startup jobs, off the GUI thread. They all open the
+        database, so this is called once init_db() has run; building the
+        window alone never touches it.
+        """
+        from db.installments import refresh_statuses
+        from db.metrics import snapshot_receivables
+        from db.audit import archive as archive_audit
+        from db.backup import backup_if_due
+        self._submit_maintenance("Instalment status refresh", refresh_statuses, key="installment-status")
+        self._submit_maintenance("Receivables snapshot", snapshot_receivables, key="receivables-snapshot")
+        self._submit_maintenance("Audit archive", archive_audit, key="audit-archive")
+        # Same QSettings store as SettingsPage (Backup & Data tab)
+        settings = QSettings("YourCompany", "YourApp")
+        enabled = str(settings.value("auto_backup_daily", True)).lower() in ("1", "true", "yes")
+        self._submit_maintenance("Automatic backup", backup_if_due, settings.value("backup_dir", "") or None,
+                                 enabled=enabled, key="auto-backup")
+        self._watch_low_stock()
+
+    def _submit_maintenance(self, label, fn, *args, key, **kwargs):
+        handle = get_scheduler().submit(fn, *args, key=key, lane=MAINTENANCE, **kwargs)
+        handle.failed.connect(lambda error, label=label: self._maintenance_failed(label, error))
+        return handle
+
+    def _maintenance_failed(self, label, error):
+        print(f"{label} failed: {error!r}", file=sys.stderr)
+        self.statusBar().showMessage(f"{label} failed: {error}", 30_000)
+
+    def _watch_low_stock(self):
+        from my_project.utils.stock_alerts import get_low_stock_notifier
+        get_low_stock_notifier().alert.connect(self._show_low_stock)
+
+    def _show_low_stock(self, items):
+        shown = ", ".join(f"{i.name} ({i.qty} left)" for i in items[:5])
+        more = f" and {len(items) - 5} more" if len(items) > 5 else ""
+        self.statusBar().showMessage(f"Low stock: {shown}{more}", 30_000)
+
     # === Sidebar ===
     def _build_sidebar(self):
         sidebar = QFrame()
@@ -78,7 +122,7 @@ class HomePage(QMainWindow):
         ]
         for text, icon, index in top_buttons:
             btn = make_sidebar_button(text, icon)
-            btn.clicked.connect(lambda _, i=index: self.content_stack.setCurrentIndex(i))
+            btn.clicked.connect(lambda _, i=index: self.content_stack.show_page(i))
             layout.addWidget(btn)
 
         layout.addStretch()  # pushes next widgets down
@@ -90,26 +134,26 @@ class HomePage(QMainWindow):
         ]
         for text, icon, index in bottom_buttons:
             btn = make_sidebar_button(text, icon)
-            btn.clicked.connect(lambda _, i=index: self.content_stack.setCurrentIndex(i))
+            btn.clicked.connect(lambda _, i=index: self.content_stack.show_page(i))
             layout.addWidget(btn)
 
         return sidebar
 
     # === Content Area ===
     def _build_content(self):
-        stack = QStackedWidget()
-        stack.addWidget(DashboardPage())  # index 0
-        stack.addWidget(CustomersPage())  # index 1
-        stack.addWidget(PaymentsPage())   # index 2
-        stack.addWidget(ReportsPage())    # index 3
-        stack.addWidget(InventoryPage())  # index 4
-        stack.addWidget(SettingsPage())   # index 5
-        stack.addWidget(ContactPage())    # index 6
+        stack = LazyStackedWidget()
+        for module, class_name in PAGES:
+            stack.add_lazy_page(import_factory(module, class_name))
         return stack
 
 
 if __name__ == "__main__":
+    from db import init_db   # same module the pages use, so one shared pool
+    init_db()
     app = QApplication([])
+    from my_project.utils.scanner import install_scanner
+    install_scanner(app)
     home_page = HomePage()
     home_page.show()
+    home_page.start_maintenance()
     app.exec()
\ No newline at end of file
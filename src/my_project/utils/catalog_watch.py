@@ -0,0 +1,46 @@
+# Qt side of db.catalog: periodic refresh off the GUI thread, changes as a signal
+from typing import Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from db.catalog import Catalog, get_catalog
+from my_project.utils.tasks import MAINTENANCE, get_scheduler
+
+
+class CatalogWatcher(QObject):
+    """
+    Keeps the shared product catalog current for every open screen.
+
+    A timer submits ``catalog.refresh()`` to the maintenance lane (coalesced,
+    so a slow refresh never piles up); a refresh with no product changes is
+    one index lookup. ``changed`` carries the ``CatalogChange`` and is
+    delivered on the GUI thread, also for refreshes started elsewhere (e.g.
+    right after a product is saved).
+    """
+    changed = Signal(object)
+
+    def __init__(self, catalog: Optional[Catalog] = None, interval_ms: int = 5000,
+                 parent: QObject | None = None):
+        super().__init__(parent)
+        self.catalog = catalog or get_catalog()
+        # Emitted on the refreshing worker; Qt queues it to receivers on the GUI thread
+        self.catalog.subscribe(self.changed.emit)
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start()
+
+    def refresh(self):
+        get_scheduler().submit(self.catalog.refresh, key="catalog-refresh", lane=MAINTENANCE)
+
+
+_watcher: Optional[CatalogWatcher] = None
+
+
+def get_catalog_watcher() -> CatalogWatcher:
+    """App-wide watcher (create the QApplication first); the first call starts the initial load."""
+    global _watcher
+    if _watcher is None:
+        _watcher = CatalogWatcher()
+        _watcher.refresh()
+    return _watcher
@@ -0,0 +1,53 @@
+# Stacked widget whose pages are built the first time they are shown
+import importlib
+from typing import Callable, Dict
+
+from PySide6.QtWidgets import QStackedWidget, QWidget
+
+
+def import_factory(module: str, class_name: str) -> Callable[[], QWidget]:
+    """
+    Return a factory that imports ``module`` and instantiates ``class_name``
+    only when called, so a page's imports are paid on first use.
+    """
+    def factory() -> QWidget:
+        return getattr(importlib.import_module(module), class_name)()
+    return factory
+
+
+class LazyStackedWidget(QStackedWidget):
+    """
+    QStackedWidget that holds an empty placeholder in each slot until the
+    page is first requested with ``show_page()`` / ``ensure_built()``.
+    """
+
+    def __init__(self, parent: QWidget | None = None):
+        super().__init__(parent)
+        self._factories: Dict[int, Callable[[], QWidget]] = {}
+
+    def add_lazy_page(self, factory: Callable[[], QWidget]) -> int:
+        index = self.addWidget(QWidget())
+        self._factories[index] = factory
+        return index
+
+    def is_built(self, index: int) -> bool:
+        return index not in self._factories
+
+    def ensure_built(self, index: int) -> QWidget:
+        factory = self._factories.get(index)
+        if factory is not None:
+            page = factory()   # if this raises, the slot keeps its factory and can be retried
+            was_current = self.currentIndex() == index
+            placeholder = self.widget(index)
+            # insert first so indices of the other slots never shift
+            self.insertWidget(index, page)
+            self.removeWidget(placeholder)
+            placeholder.deleteLater()
+            del self._factories[index]
+            if was_current:
+                self.setCurrentIndex(index)
+        return self.widget(index)
+
+    def show_page(self, index: int) -> None:
+        self.ensure_built(index)
+        self.setCurrentIndex(index)
@@ -0,0 +1,70 @@
+# Qt table model over db.paging.KeysetPager (rows fetched as the view scrolls)
+from typing import Optional, Sequence
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class LazyTableModel(QAbstractTableModel):
+    """
+    Read-only QAbstractTableModel that loads rows block by block through
+    ``canFetchMore``/``fetchMore``. Memory stays bounded by the pager's
+    block cache however far the view scrolls. Header clicks sort on the
+    database side when the column is index-backed and are ignored otherwise.
+    """
+
+    def __init__(self, pager, headers: Optional[Sequence[str]] = None, parent=None):
+        super().__init__(parent)
+        self.pager = pager
+        self.headers = list(headers or pager.columns)
+
+    # ---------- Shape ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.pager.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.pager.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        row = self.pager.row(index.row())
+        if row is None:
+            return None
+        value = row[index.column()]
+        return "" if value is None else value
+
+    # ---------- Incremental loading ----------
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.pager.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        first = self.pager.loaded
+        # fetch first so an empty block inserts nothing
+        added = self.pager.fetch_next_block()
+        if added:
+            self.beginInsertRows(QModelIndex(), first, first + added - 1)
+            self.endInsertRows()
+
+    # ---------- Sorting ----------
+    def sort(self, column, order=Qt.AscendingOrder):
+        name = self.pager.columns[column]
+        if name not in self.pager.sortable_columns():
+            return
+        self.beginResetModel()
+        self.pager.set_sort(name, descending=(order == Qt.DescendingOrder))
+        self.endResetModel()
+
+    def refresh(self):
+        """Drop cached rows and reload from the start (e.g. after an insert)."""
+        self.beginResetModel()
+        self.pager.reset()
+        self.endResetModel()
@@ -0,0 +1,125 @@
+# Qt side of db.scan: tells barcode-scanner bursts from typing, app-wide
+import math
+import time
+from typing import List, Optional
+
+from PySide6.QtCore import QEvent, QMetaMethod, QObject, QSettings, QTimer, Signal
+from PySide6.QtGui import QKeyEvent
+from PySide6.QtWidgets import QApplication, QLineEdit
+
+from db.scan import BurstDetector
+
+
+class ScannerFilter(QObject):
+    """
+    Application event filter that turns scanner bursts into ``scanned(code)``.
+
+    Keys that continue a burst are held back instead of reaching the focused
+    widget; when the burst ends in a scan the held keys are dropped (and the
+    first character, which could not be told apart from typing, is removed
+    again from a line edit). A burst that turns out to be fast typing is
+    given back to the widget unchanged. Widgets with the ``scanPassthrough``
+    property (e.g. a barcode field) receive scanner input as plain typing,
+    and so does every widget while nothing is connected to ``scanned``.
+
+    Auto-repeated keys (a held key repeats faster than ``max_gap_ms``) and
+    control keys such as Backspace never start or continue a burst.
+    """
+    scanned = Signal(str)
+
+    def __init__(self, detector: Optional[BurstDetector] = None, parent: QObject | None = None):
+        super().__init__(parent)
+        self.detector = detector or BurstDetector()
+        self._held: List[QKeyEvent] = []
+        self._target = None
+        self._replaying = False
+        self._idle = QTimer(self)
+        self._idle.setSingleShot(True)
+        self._idle.setInterval(math.ceil(self.detector.max_gap_ms) + 5)
+        self._idle.timeout.connect(self._burst_ended)
+        self._scanned_signal = QMetaMethod.fromSignal(self.scanned)
+
+    def eventFilter(self, obj, event) -> bool:
+        if self._replaying or event.type() != QEvent.KeyPress:
+            return False
+        focus = QApplication.focusWidget()
+        # the same key is offered to the window and every parent; look at it once
+        if obj is not focus or focus.property("scanPassthrough"):
+            return False
+        text = event.text()
+        if not text:
+            return False
+        if (event.isAutoRepeat() or not (text.isprintable() or text in self.detector.terminators)
+                or not self.isSignalConnected(self._scanned_signal)):
+            # typing, whatever the timing: what was held goes first, then this key
+            self._idle.stop()
+            self.detector.reset()
+            self._replay()
+            return False
+        now = time.perf_counter() * 1000
+        fast = self.detector.in_burst(now)
+        code = self.detector.feed(text, now)
+        if code is not None:
+            self._idle.stop()
+            self._held = []
+            self._unleak(focus, code[0])
+            self.scanned.emit(code)
+            return True
+        if text in self.detector.terminators:
+            self._idle.stop()
+            self._replay()
+            return False
+        self._idle.start()
+        if fast:
+            self._held.append(QKeyEvent(event.type(), event.key(), event.modifiers(), text))
+            self._target = focus
+            return True
+        self._replay()
+        return False
+
+    def _burst_ended(self):
+        # scanners set up without a terminator: silence ends the code
+        code = self.detector.flush(math.inf)
+        if code is None:
+            self._replay()
+            return
+        self._held = []
+        self._unleak(self._target, code[0])
+        self.scanned.emit(code)
+
+    def _unleak(self, widget, first: str):
+        if isinstance(widget, QLineEdit) and widget.text()[:widget.cursorPosition()].endswith(first):
+            widget.backspace()
+
+    def _replay(self):
+        held, self._held = self._held, []
+        if not held or self._target is None:
+            return
+        self._replaying = True
+        try:
+            for event in held:
+                QApplication.sendEvent(self._target, event)
+        except RuntimeError:    # the widget was closed mid-burst
+            pass
+        finally:
+            self._replaying = False
+
+
+_filter: Optional[ScannerFilter] = None
+
+
+def install_scanner(app: QApplication) -> Optional[ScannerFilter]:
+    """Install the filter if barcode scanning is enabled in Settings > Inventory (read at startup)."""
+    global _filter
+    settings = QSettings("YourCompany", "YourApp")
+    if str(settings.value("barcode_enabled", False)).lower() not in ("1", "true", "yes"):
+        return None
+    if _filter is None:
+        _filter = ScannerFilter(parent=app)
+        app.installEventFilter(_filter)
+    return _filter
+
+
+def get_scanner() -> Optional[ScannerFilter]:
+    """The installed filter, or None when scanning is disabled; connect to its ``scanned`` signal."""
+    return _filter
@@ -0,0 +1,78 @@
+# Qt side of db.alerts: low-stock notifications in batches, off the GUI thread
+from typing import Optional
+
+from PySide6.QtCore import QObject, QSettings, QTimer, Signal
+
+from db.alerts import LowStockAlerts, set_low_stock_threshold
+from my_project.utils.tasks import MAINTENANCE, get_scheduler
+
+
+def _flag(settings: QSettings, key: str, default: bool) -> bool:
+    return str(settings.value(key, default)).lower() in ("1", "true", "yes")
+
+
+class LowStockNotifier(QObject):
+    """
+    Polls ``LowStockAlerts`` on the maintenance lane every ``interval_ms``
+    and emits ``alert(items)`` with what went low since the last poll, at
+    most once per interval. Follows Settings > Inventory ("Low-stock
+    alerts", threshold) and Notifications ("Low stock"): the threshold is
+    copied to the database, which keeps the low set current on every stock
+    write whatever the settings say.
+    """
+    alert = Signal(list)
+
+    def __init__(self, interval_ms: int = 60_000, parent: QObject | None = None):
+        super().__init__(parent)
+        self.alerts = LowStockAlerts()
+        self._pending = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.check)
+        self.apply_settings()
+
+    def apply_settings(self):
+        settings = QSettings("YourCompany", "YourApp")
+        try:
+            threshold = int(settings.value("low_stock_threshold", 5))
+        except (TypeError, ValueError):
+            threshold = 5
+        get_scheduler().submit(set_low_stock_threshold, threshold, key="low-stock-threshold", lane=MAINTENANCE)
+        self.enabled = _flag(settings, "low_stock_alerts", True) and _flag(settings, "notify_low_stock", True)
+        if self.enabled:
+            self._timer.start()
+            self.check()
+        else:
+            self._timer.stop()
+
+    def check(self):
+        if self._pending is not None:    # a poll is still running; its result covers this one
+            return
+        self._pending = get_scheduler().submit(self.alerts.poll, key="low-stock-alerts", lane=MAINTENANCE)
+        self._pending.finished.connect(self._on_polled)
+        self._pending.failed.connect(self._on_failed)
+
+    def _on_polled(self, items):
+        self._pending = None
+        if items and self.enabled:
+            self.alert.emit(items)
+
+    def _on_failed(self, _error):
+        self._pending = None
+
+
+_notifier: Optional[LowStockNotifier] = None
+
+
+def get_low_stock_notifier() -> LowStockNotifier:
+    """App-wide notifier (create the QApplication first)."""
+    global _notifier
+    if _notifier is None:
+        _notifier = LowStockNotifier()
+    return _notifier
+
+
+def apply_low_stock_settings():
+    """Call after Settings are saved; a no-op until the notifier exists."""
+    if _notifier is not None:
+        _notifier.apply_settings()
@@ -0,0 +1,150 @@
+# Background task scheduler: run DB work on QThreadPool, deliver results via signals
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal
+
+INTERACTIVE = "interactive"   # user is waiting: searches, page loads
+MAINTENANCE = "maintenance"   # status refresh, snapshots, backups, exports
+
+
+class TaskHandle(QObject):
+    """
+    Returned by ``TaskScheduler.submit``. Connect to ``finished(result)`` /
+    ``failed(exception)``; both are emitted on the scheduler's (GUI) thread,
+    and never after ``cancel()``. Long tasks can report ``progress(done, total)``
+    through ``current_task()``.
+    """
+    finished = Signal(object)
+    failed = Signal(object)
+    progress = Signal(int, int)
+
+    def __init__(self, key: Optional[Hashable] = None, parent: QObject | None = None):
+        super().__init__(parent)
+        self.key = key
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class _Task(QRunnable):
+    def __init__(self, scheduler, handle: TaskHandle, fn: Callable, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(True)
+        self.scheduler = scheduler
+        self.handle = handle
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+
+    def run(self):
+        handle = self.handle
+        if handle.is_cancelled():   # superseded before it started
+            self.scheduler._completed.emit(handle, None, None)
+            return
+        _current.handle = handle
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.scheduler._completed.emit(handle, False, e)
+        else:
+            self.scheduler._completed.emit(handle, True, result)
+        finally:
+            _current.handle = None
+
+
+_current = threading.local()
+
+
+def current_task() -> Optional[TaskHandle]:
+    """
+    Handle of the task running on this worker thread (None elsewhere), e.g.
+    ``export_report(..., progress=h.progress.emit, should_cancel=h.is_cancelled)``.
+    """
+    return getattr(_current, "handle", None)
+
+
+class TaskScheduler(QObject):
+    """
+    Small task framework on QThreadPool.
+
+    - Lanes: interactive and maintenance work run on separate pools, so a
+      long backup never holds the threads a search needs.
+    - Coalescing: submitting with a ``key`` that is already queued or running
+      returns the existing handle instead of running the work twice.
+    - Supersede: submitting on a ``channel`` cancels the previous task on it
+      (e.g. stale search keystrokes); its result is dropped.
+
+    Results are handed back through a queued signal and re-emitted on the
+    scheduler's thread, so a caller that connects right after ``submit()``
+    (even to a coalesced handle) never misses them.
+    """
+    _completed = Signal(object, object, object)   # handle, ok (None = cancelled), payload
+
+    def __init__(self, interactive_threads: int = 2, maintenance_threads: int = 1,
+                 parent: QObject | None = None):
+        super().__init__(parent)
+        self._pools = {INTERACTIVE: QThreadPool(self), MAINTENANCE: QThreadPool(self)}
+        self._pools[INTERACTIVE].setMaxThreadCount(max(1, interactive_threads))
+        self._pools[MAINTENANCE].setMaxThreadCount(max(1, maintenance_threads))
+        self._lock = threading.Lock()
+        self._by_key: Dict[Hashable, TaskHandle] = {}
+        self._channels: Dict[str, TaskHandle] = {}
+        self._completed.connect(self._deliver, Qt.QueuedConnection)
+
+    def submit(self, fn: Callable, *args, key: Optional[Hashable] = None, lane: str = INTERACTIVE,
+               channel: Optional[str] = None, priority: int = 0, **kwargs) -> TaskHandle:
+        with self._lock:
+            if key is not None:
+                existing = self._by_key.get(key)
+                if existing is not None and not existing.is_cancelled():
+                    if channel is not None:
+                        self._supersede(channel, existing)
+                    return existing
+            handle = TaskHandle(key, parent=self)
+            if key is not None:
+                self._by_key[key] = handle
+            if channel is not None:
+                self._supersede(channel, handle)
+        self._pools[lane].start(_Task(self, handle, fn, args, kwargs), priority)
+        return handle
+
+    def cancel_channel(self, channel: str):
+        with self._lock:
+            handle = self._channels.pop(channel, None)
+        if handle is not None:
+            handle.cancel()
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        return all(pool.waitForDone(msecs) for pool in self._pools.values())
+
+    # ---------- Internals ----------
+    def _supersede(self, channel: str, handle: TaskHandle):
+        previous = self._channels.get(channel)
+        if previous is not None and previous is not handle:
+            previous.cancel()
+        self._channels[channel] = handle
+
+    def _deliver(self, handle: TaskHandle, ok, payload):
+        with self._lock:
+            if handle.key is not None and self._by_key.get(handle.key) is handle:
+                del self._by_key[handle.key]
+            for channel, h in list(self._channels.items()):
+                if h is handle:
+                    del self._channels[channel]
+        if ok is not None and not handle.is_cancelled():
+            (handle.finished if ok else handle.failed).emit(payload)
+        handle.deleteLater()
+
+
+_scheduler: Optional[TaskScheduler] = None
+
+
+def get_scheduler() -> TaskScheduler:
+    """App-wide scheduler (create the QApplication first)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TaskScheduler()
+    return _scheduler
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+import db
+from db.migrate import migrate
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Fully migrated database, also installed as the shared db manager."""
+    mgr = db.configure(tmp_path / "app.db")
+    migrate(mgr)
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def make_product(store):
+    """Insert a product (name: the sku in title case, price 10.00) and return its id."""
+    def make(sku, brand=None, category=None, barcode=None, active=1):
+        now = db.now_ms()
+        with store.write() as c:
+            return c.execute("""
+                INSERT INTO product (sku, name, brand, category, barcode, price_ttc_cents, is_active,
+                                     created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 1000, ?, ?, ?)
+            """, (sku, sku.title(), brand, category, barcode, active, now, now)).lastrowid
+    return make
+
+
+@pytest.fixture
+def make_contract(store):
+    """
+    Insert sale -> offer -> contract -> schedule and return
+    (contract_id, schedule_id). Installments are left to the caller;
+    schedule_id is None when ``with_schedule`` is False.
+    """
+    def make(term_months=12, total_cents=120_000, branch_id=1, customer_id=None, with_schedule=True):
+        now = db.now_ms()
+        with store.write() as c:
+            sale_id = c.execute("""
+                INSERT INTO sale (branch_id, customer_id, type, status, total_cents, created_at, updated_at)
+                VALUES (?, ?, 'instalment', 'completed', ?, ?, ?)
+            """, (branch_id, customer_id, total_cents, now, now)).lastrowid
+            offer_id = c.execute("""
+                INSERT INTO offer (term_months, total_repay_cents, created_at, updated_at)
+                VALUES (?, ?, ?, ?)
+            """, (term_months, total_cents, now, now)).lastrowid
+            contract_id = c.execute("""
+                INSERT INTO contract (sale_id, offer_id, created_at, updated_at) VALUES (?, ?, ?, ?)
+            """, (sale_id, offer_id, now, now)).lastrowid
+            if not with_schedule:
+                return contract_id, None
+            schedule_id = c.execute("""
+                INSERT INTO schedule (contract_id, installments_count, start_date, generated_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (contract_id, term_months, now, now, now, now)).lastrowid
+        return contract_id, schedule_id
+    return make
@@ -1,9 +1,69 @@
-# src/my_project/pages/dashboard.py
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PySide6.QtCore import Qt
+# src/my_project/pages/customers.py
+import os
+import sys
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QLineEdit, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QIcon, QPixmap
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))  # points to .../src
+from db.attachments import customer_thumbnails
+from db.customers import CustomerSearch
+from my_project.utils.tasks import get_scheduler
+
+
+THUMB_SIZE = 48
+
 
 class CustomersPage(QWidget):
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
         layout.addWidget(QLabel("Customers Page", alignment=Qt.AlignCenter))
+
+        # Search-as-you-type (one cached searcher per page)
+        self.search = CustomerSearch()
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search customers (name / الاسم)")
+        self.search_box.textChanged.connect(self._on_search)
+
+        self.results = QTableWidget(0, 4)
+        self.results.setHorizontalHeaderLabels(["", "ID", "Name", "Arabic name"])
+        self.results.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.results.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.results.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.results.setEditTriggers(QAbstractItemView.NoEditTriggers)
+
+        layout.addWidget(self.search_box)
+        layout.addWidget(self.results)
+        self._shown = []
+
+    def _on_search(self, text: str):
+        # Off the GUI thread; a newer keystroke cancels the previous search
+        handle = get_scheduler().submit(self.search.search, text, key=("customer-search", text),
+                                        channel="customer-search")
+        handle.finished.connect(self._show_results)
+
+    def _show_results(self, page):
+        rows = page.rows
+        self.results.setRowCount(len(rows))
+        for r, (cid, name, arabic, _branch) in enumerate(rows):
+            self.results.setItem(r, 0, QTableWidgetItem())
+            self.results.setItem(r, 1, QTableWidgetItem(str(cid)))
+            self.results.setItem(r, 2, QTableWidgetItem(name))
+            self.results.setItem(r, 3, QTableWidgetItem(arabic or ""))
+        # Photos follow as cached thumbnails, never full-size images
+        self._shown = [row[0] for row in rows]
+        handle = get_scheduler().submit(customer_thumbnails, self._shown, THUMB_SIZE,
+                                        key=("customer-photos", tuple(self._shown)), channel="customer-photos")
+        handle.finished.connect(self._show_photos)
+
+    def _show_photos(self, thumbs):
+        for r, cid in enumerate(self._shown):
+            data = thumbs.get(cid)
+            if data is None:
+                continue
+            pixmap = QPixmap()
+            pixmap.loadFromData(data, "JPG")
+            self.results.item(r, 0).setIcon(QIcon(pixmap))
@@ -1,9 +1,114 @@
 # src/my_project/pages/dashboard.py
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PySide6.QtCore import Qt
+import os
+import sys
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QGridLayout
+from PySide6.QtCore import Qt, QSettings
+from PySide6.QtGui import QPainter, QColor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))  # points to .../src
+from my_project.utils.tasks import get_scheduler
+
+
+def _money(cents: int) -> str:
+    return f"{cents / 100:,.2f}"
+
+
+def _enabled(settings: QSettings, key: str) -> bool:
+    return str(settings.value(key, True)).lower() in ("1", "true", "yes")
+
+
+class MetricCard(QFrame):
+    def __init__(self, title: str):
+        super().__init__()
+        self.setFrameShape(QFrame.StyledPanel)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(title))
+        self.value = QLabel("—")
+        self.value.setStyleSheet("font-size: 20px; font-weight: bold;")
+        layout.addWidget(self.value)
+
+    def set_value(self, text: str):
+        self.value.setText(text)
+
+
+class TrendChart(QWidget):
+    """Daily bars for the sales trend (values are painted, not widgets)."""
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumHeight(160)
+        self.points = []
+
+    def set_points(self, points):
+        self.points = points
+        self.setToolTip(f"{points[0][0]} – {points[-1][0]}" if points else "")
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.points:
+            return
+        painter = QPainter(self)
+        peak = max(v for _, v in self.points) or 1
+        width = self.width() / len(self.points)
+        height = self.height() - 4
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#2c3e50"))
+        for i, (_, value) in enumerate(self.points):
+            h = height * value / peak
+            painter.drawRect(int(i * width) + 1, int(self.height() - h), max(1, int(width) - 2), int(h))
+        painter.end()
+
 
 class DashboardPage(QWidget):
     def __init__(self):
         super().__init__()
+        settings = QSettings("YourCompany", "YourApp")
+        self.show_outstanding = _enabled(settings, "show_outstanding_metric")
+        self.show_trend = _enabled(settings, "show_sales_trend")
+
         layout = QVBoxLayout(self)
-        layout.addWidget(QLabel("Dashboard Page", alignment=Qt.AlignCenter))
+        layout.addWidget(QLabel("Dashboard — last 30 days", alignment=Qt.AlignLeft))
+
+        grid = QGridLayout()
+        self.cards = {
+            "sales": MetricCard("Sales"),
+            "count": MetricCard("Completed sales"),
+            "collections": MetricCard("Collections"),
+        }
+        if self.show_outstanding:
+            self.cards["outstanding"] = MetricCard("Outstanding")
+            self.cards["overdue"] = MetricCard("Overdue installments")
+        for i, card in enumerate(self.cards.values()):
+            grid.addWidget(card, i // 3, i % 3)
+        layout.addLayout(grid)
+
+        self.chart = TrendChart()
+        self.chart.setVisible(self.show_trend)
+        layout.addWidget(self.chart)
+        footer = QHBoxLayout()
+        self.status = QLabel("")
+        footer.addWidget(self.status)
+        layout.addLayout(footer)
+        layout.addStretch()
+
+    def showEvent(self, event):
+        # Rollups are cheap to read, so refresh every time the page is shown
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        from db.metrics import dashboard_summary
+        handle = get_scheduler().submit(dashboard_summary, key="dashboard", channel="dashboard")
+        handle.finished.connect(self._show_summary)
+
+    def _show_summary(self, s):
+        self.cards["sales"].set_value(_money(s.sales_cents))
+        self.cards["count"].set_value(str(s.sales_count))
+        self.cards["collections"].set_value(_money(s.collections_cents))
+        if self.show_outstanding:
+            self.cards["outstanding"].set_value(_money(s.outstanding_cents))
+            self.cards["overdue"].set_value(f"{s.overdue_count} ({_money(s.overdue_cents)})")
+        if self.show_trend:
+            self.chart.set_points(s.sales_trend)
+        self.status.setText(f"{s.start} → {s.end} · loaded in {s.elapsed_ms:.1f} ms")
@@ -20,6 +20,10 @@ from PySide6.QtWidgets import (
     QWidget,QFileDialog,QLabel,QDoubleSpinBox, QFrame
 )
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))  # points to .../src
+from db.inventory import suppliers_pager
+from my_project.utils.lazy_table_model import LazyTableModel
+
 # ------------------------------
 # Supplier Management
 # ------------------------------
@@ -54,6 +58,17 @@ class SupplierManagementTab(QWidget):
         form.addRow("Social Media", sm_row)
         form.addRow("Address", self.supplier_address)
 
+        # Supplier list (rows are loaded from the DB as the view scrolls)
+        self.suppliers_model = LazyTableModel(
+            suppliers_pager(),
+            ["ID", "Name", "Email", "Phone 1", "Phone 2", "Social", "Address"],
+        )
+        self.suppliers_view = QTableView()
+        self.suppliers_view.setModel(self.suppliers_model)
+        self.suppliers_view.setSortingEnabled(True)
+        self.suppliers_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        form.addRow(self.suppliers_view)
+
     def _open_social_media(self):
         url = self.supplier_social_media.text().strip()
         if url and not url.startswith(("http://", "https://")):
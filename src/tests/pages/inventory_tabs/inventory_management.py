@@ -20,6 +20,10 @@ from PySide6.QtWidgets import (
     QWidget,QFileDialog,QLabel,QDoubleSpinBox, QFrame
 )
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))  # points to .../src
+from db import taxonomy
+from db.taxonomy import TaxonomyError
+
 # ------------------------------
 # Inventory Management     
 # ------------------------------
@@ -58,6 +62,7 @@ class InventoryManagementTab(QWidget):
         form.addRow(self._line())
 
         self.new_category = QLineEdit()
+        self.new_category.setPlaceholderText("e.g. Electronics > TV (missing parents are created)")
         self.add_category_btn = QPushButton("Add New Category")
         cat_add_row = QHBoxLayout()
         cat_add_row.addWidget(self.new_category)
@@ -95,6 +100,54 @@ class InventoryManagementTab(QWidget):
 
         form.addRow(self._line())
 
+        # Backed by db.taxonomy; each entry shows its product and stock counts
+        self._combos = {"brand": self.brand, "category": self.category, "tag": self.tag}
+        for kind, edit, add_btn, delete_btn in (
+            ("brand", self.new_brand, self.add_brand_btn, self.delete_brand_btn),
+            ("category", self.new_category, self.add_category_btn, self.delete_category_btn),
+            ("tag", self.new_tag, self.add_tag_btn, self.delete_tag_btn),
+        ):
+            add_btn.clicked.connect(lambda _=False, k=kind, e=edit: self._add(k, e))
+            edit.returnPressed.connect(lambda k=kind, e=edit: self._add(k, e))
+            delete_btn.clicked.connect(lambda _=False, k=kind: self._delete(k))
+        self._reload()
+
+    # --- taxonomy ---
+    def _reload(self, kind: str | None = None, select: int | None = None):
+        for k in ([kind] if kind else taxonomy.KINDS):
+            combo = self._combos[k]
+            combo.clear()
+            combo.addItem("", None)
+            for n in taxonomy.taxa(k):
+                combo.addItem(f"{n.path}  ({n.products} products, {n.stock_qty} in stock)", n.id)
+            if select is not None:
+                combo.setCurrentIndex(max(0, combo.findData(select)))
+
+    def _add(self, kind: str, edit: QLineEdit):
+        text = edit.text().strip()
+        if not text:
+            return
+        try:
+            taxon_id = taxonomy.add_taxon(kind, text)
+        except TaxonomyError as e:
+            QMessageBox.warning(self, "Inventory", str(e))
+            return
+        edit.clear()
+        self._reload(kind, select=taxon_id)
+
+    def _delete(self, kind: str):
+        combo = self._combos[kind]
+        taxon_id = combo.currentData()
+        if taxon_id is None:
+            return
+        below = " and everything below it" if kind == "category" else ""
+        answer = QMessageBox.question(
+            self, "Inventory", f"Delete {combo.currentText()}{below}? Its products are kept but unlinked.")
+        if answer != QMessageBox.Yes:
+            return
+        taxonomy.delete_taxon(taxon_id)
+        self._reload(kind)
+
     # --- helpers ---
     def _line(self):
         line = QFrame()
@@ -11,15 +11,19 @@ from dataclasses import dataclass, asdict
 from typing import List, Dict, Any
 
 
-from PySide6.QtCore import Qt, QSettings, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QSettings, QAbstractTableModel, QModelIndex, QStringListModel
 from PySide6.QtGui import QDoubleValidator
 from PySide6.QtWidgets import (
     QApplication,QCheckBox,QComboBox,QDialog,QDialogButtonBox,QFormLayout,QHBoxLayout,
     QHeaderView,QHeaderView,QInputDialog,QLineEdit,QMessageBox,QPushButton,QTextEdit,
     QPushButton,QSpinBox,QTabWidget,QTableView,QVBoxLayout,
-    QWidget,QFileDialog,QLabel,QDoubleSpinBox, QFrame
+    QWidget,QFileDialog,QLabel,QDoubleSpinBox, QFrame, QCompleter
 )
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))  # points to .../src
+from my_project.utils.catalog_watch import get_catalog_watcher
+from db import taxonomy
+
 # ------------------------------
 # New Product 
 # ------------------------------
@@ -39,7 +43,7 @@ class NewProductTab(QWidget):
         self.brand.addItems([""])
 
         self.categories = QLineEdit()
-        self.categories.setPlaceholderText("e.g. Electronics, TV")
+        self.categories.setPlaceholderText("e.g. Electronics > TV, Promotions")
 
         self.details = QLineEdit()
         self.details.setPlaceholderText("Type and press Enter to add more")
@@ -49,6 +53,10 @@ class NewProductTab(QWidget):
         self.sale_price.setDecimals(2)
 
         self.barcode = QLineEdit()
+        self.barcode.setProperty("scanPassthrough", True)   # a scan here fills the field
+        self.barcode_warning = QLabel()
+        self.barcode_warning.setStyleSheet("color: #c0392b;")
+        self.barcode_warning.hide()
         self.installment_allowed = QCheckBox("Installment allowed")
         self.installment_allowed.setChecked(True)
 
@@ -59,7 +67,49 @@ class NewProductTab(QWidget):
         form.addRow("Details", self.details)
         form.addRow("Sale price *", self.sale_price)
         form.addRow("Barcode", self.barcode)
+        form.addRow("", self.barcode_warning)
         form.addRow("", self.installment_allowed)
+
+        # Brands and categories come from db.taxonomy; the catalog cache signals product changes
+        self._category_names = QStringListModel(self)
+        completer = QCompleter(self._category_names, self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.categories.setCompleter(completer)
+        get_catalog_watcher().changed.connect(self._on_catalog_changed)
+        self._load_taxonomy()
+        self.barcode.textChanged.connect(self._check_barcode)
+
+    def _check_barcode(self, text):
+        # in-memory lookup, cheap enough for every keystroke; the unique index still guards the save
+        owner = get_catalog_watcher().catalog.by_barcode(text.strip()) if text.strip() else None
+        if owner is None:
+            self.barcode_warning.hide()
+            return
+        self.barcode_warning.setText(f"Barcode already used by {owner.sku} ({owner.name})")
+        self.barcode_warning.show()
+
+    def showEvent(self, event):
+        # brands and categories may have been added on the Inventory Management tab
+        self._load_taxonomy()
+        super().showEvent(event)
+
+    def _load_taxonomy(self):
+        self._fill_brands([n.path for n in taxonomy.taxa("brand")])
+        self._category_names.setStringList([n.path for n in taxonomy.taxa("category")])
+
+    def _on_catalog_changed(self, change):
+        if change.brands_changed or change.categories_changed:
+            self._load_taxonomy()
+        if change:
+            self._check_barcode(self.barcode.text())
+
+    def _fill_brands(self, brands):
+        current = self.brand.currentText()
+        self.brand.blockSignals(True)
+        self.brand.clear()
+        self.brand.addItems([""] + brands)
+        self.brand.setCurrentText(current)
+        self.brand.blockSignals(False)
 # ------------------------------
 # Demo launcher
 # ------------------------------
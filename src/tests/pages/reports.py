@@ -1,9 +1,97 @@
-# src/my_project/pages/dashboard.py
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PySide6.QtCore import Qt
+# src/my_project/pages/reports.py
+import os
+import sys
+from datetime import datetime
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QDateEdit,
+                               QPushButton, QProgressBar, QFileDialog)
+from PySide6.QtCore import Qt, QDate
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))  # points to .../src
+from db.export import REPORTS, available_formats, export_report
+from my_project.utils.tasks import get_scheduler, current_task, MAINTENANCE
+
+
+def _run_export(name, path, start_ms, end_ms):
+    handle = current_task()
+    return export_report(name, path, start_ms=start_ms, end_ms=end_ms,
+                         progress=handle.progress.emit, should_cancel=handle.is_cancelled)
+
 
 class ReportsPage(QWidget):
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
-        layout.addWidget(QLabel("Reports Page", alignment=Qt.AlignCenter))
+        layout.addWidget(QLabel("Reports", alignment=Qt.AlignLeft))
+
+        row = QHBoxLayout()
+        self.report = QComboBox()
+        for key, spec in REPORTS.items():
+            self.report.addItem(spec.title, key)
+        self.format = QComboBox()
+        self.format.addItems(available_formats())
+        today = QDate.currentDate()
+        self.start = QDateEdit(today.addYears(-1), calendarPopup=True)
+        self.end = QDateEdit(today, calendarPopup=True)
+        self.export_btn = QPushButton("Export…")
+        self.export_btn.clicked.connect(self._export)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self._cancel)
+        for w in (QLabel("Report"), self.report, QLabel("From"), self.start, QLabel("To"), self.end,
+                  QLabel("Format"), self.format, self.export_btn, self.cancel_btn):
+            row.addWidget(w)
+        layout.addLayout(row)
+
+        self.progress = QProgressBar()
+        self.progress.setVisible(False)
+        layout.addWidget(self.progress)
+        self.status = QLabel("")
+        layout.addWidget(self.status)
+        layout.addStretch()
+        self.handle = None
+
+    def _export(self):
+        fmt = self.format.currentText()
+        name = self.report.currentData()
+        path, _ = QFileDialog.getSaveFileName(self, "Export report", f"{name}.{fmt}", f"*.{fmt}")
+        if not path:
+            return
+        start = datetime.combine(self.start.date().toPython(), datetime.min.time())
+        end = datetime.combine(self.end.date().toPython(), datetime.max.time())
+        self.handle = get_scheduler().submit(
+            _run_export, name, path, int(start.timestamp() * 1000), int(end.timestamp() * 1000),
+            lane=MAINTENANCE, channel="report-export",
+        )
+        self.handle.progress.connect(self._on_progress)
+        self.handle.finished.connect(self._on_done)
+        self.handle.failed.connect(self._on_failed)
+        self._set_running(True)
+        self.status.setText("Counting rows…")
+
+    def _cancel(self):
+        if self.handle is not None:
+            self.handle.cancel()   # the export stops at the next chunk and removes its file
+        self._set_running(False)
+        self.status.setText("Export cancelled")
+
+    def _set_running(self, running: bool):
+        self.export_btn.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+        self.progress.setVisible(running)
+        if running:
+            self.progress.setRange(0, 0)
+
+    def _on_progress(self, done: int, total: int):
+        self.progress.setRange(0, max(total, 1))
+        self.progress.setValue(done)
+        self.status.setText(f"{done:,} / {total:,} rows")
+
+    def _on_done(self, report):
+        self._set_running(False)
+        self.status.setText(f"{report.rows:,} rows → {report.path} "
+                            f"({report.elapsed_ms / 1000:.1f} s, {report.rows_per_s:,.0f} rows/s)")
+
+    def _on_failed(self, error):
+        self._set_running(False)
+        self.status.setText(f"Export failed: {error}")
@@ -24,6 +24,7 @@ from tests.pages.settings_tabs.ui_tab import UITab
 from tests.pages.settings_tabs.backup_tab import BackupTab
 # Optional: if you have it
 # from tests.pages.settings_tabs.reports_tab import ReportsTab
+from my_project.utils.stock_alerts import apply_low_stock_settings
 
 
 class SettingsPage(QDialog):
@@ -135,6 +136,7 @@ class SettingsPage(QDialog):
             new_model = self._collect()
             self._save_settings(new_model)
             self.model = new_model
+            apply_low_stock_settings()
             self.accept()
         elif role == QDialogButtonBox.RejectRole:  # Cancel
             self.reject()
@@ -1,6 +1,7 @@
-from PySide6.QtWidgets import QWidget, QFormLayout, QCheckBox, QLineEdit, QPushButton, QHBoxLayout, QFileDialog
+from PySide6.QtWidgets import QWidget, QFormLayout, QCheckBox, QLineEdit, QPushButton, QHBoxLayout, QFileDialog, QLabel
 from tests.pages.settings_tabs.utils import hwrap
 from tests.pages.settings_tabs.settings_model import AppSettings
+from my_project.utils.tasks import get_scheduler, MAINTENANCE
 
 class BackupTab(QWidget):
     def __init__(self, model: AppSettings):
@@ -17,6 +18,39 @@ class BackupTab(QWidget):
         form.addRow("Daily auto-backup", self.auto_backup)
         form.addRow("Backup directory", hwrap(row))
 
+        self.backup_now = QPushButton("Back up now")
+        self.backup_now.clicked.connect(self._run_backup)
+        self.status = QLabel("")
+        form.addRow(self.backup_now, self.status)
+
+    def _run_backup(self):
+        from db.backup import backup, prune, verify_backup
+
+        def job(folder):
+            report = backup(folder)
+            check = verify_backup(report.manifest)
+            prune(report.manifest.parent.parent)
+            return report, check
+
+        self.backup_now.setEnabled(False)
+        self.status.setText("Backing up…")
+        handle = get_scheduler().submit(job, self.backup_dir.text() or None, key="manual-backup", lane=MAINTENANCE)
+        handle.finished.connect(self._backup_done)
+        handle.failed.connect(self._backup_failed)
+
+    def _backup_done(self, result):
+        report, check = result
+        self.backup_now.setEnabled(True)
+        self.status.setText(
+            f"{report.db_bytes / 1e6:.1f} MB in {report.elapsed_ms / 1000:.1f} s "
+            f"({report.throughput_mb_s:.0f} MB/s), {report.bytes_written / 1e6:.2f} MB written, "
+            f"integrity {check.integrity[0]}"
+        )
+
+    def _backup_failed(self, error):
+        self.backup_now.setEnabled(True)
+        self.status.setText(f"Backup failed: {error}")
+
     def _choose_backup_dir(self):
         path = QFileDialog.getExistingDirectory(self, "Choose backup directory")
         if path:
@@ -0,0 +1,82 @@
+import time
+
+import db
+from db import alerts, records
+from db.alerts import LowStockAlerts
+from db.stock import move_stock, receive_delivery, transfer
+
+
+def _low(branch_id=None):
+    return [(i.product_id, i.branch_id, i.qty, i.threshold) for i in alerts.low_stock(branch_id)]
+
+
+def test_stock_moves_keep_the_low_set_current(store, make_product):
+    tv, cable = make_product("tv"), make_product("cable")
+    assert alerts.get_low_stock_threshold() == 5
+    receive_delivery([(tv, 8), (cable, 3)])
+    assert _low() == [(cable, 1, 3, 5)]                            # low from the first delivery
+    move_stock(tv, "sell", 3)
+    assert _low() == [(cable, 1, 3, 5), (tv, 1, 5, 5)]            # at the threshold counts
+    since = {i.product_id: i.since for i in alerts.low_stock()}
+    move_stock(tv, "sell", 1)
+    assert {i.product_id: i.since for i in alerts.low_stock()} == since    # still the same episode
+    transfer(tv, 4, 1, 2)
+    assert _low(1) == [(tv, 1, 0, 5), (cable, 1, 3, 5)] and _low(2) == [(tv, 2, 4, 5)]
+    receive_delivery([(tv, 20)])
+    assert _low() == [(cable, 1, 3, 5), (tv, 2, 4, 5)]
+
+    # global setting and per-product overrides
+    assert alerts.set_low_stock_threshold(2) == 0
+    alerts.set_product_threshold(tv, 25)
+    assert _low() == [(tv, 2, 4, 25), (tv, 1, 20, 25)]
+    alerts.set_product_threshold(tv, -1)                           # never
+    alerts.set_product_threshold(cable, None)
+    assert _low() == []
+    records.update("product", cable, records.get("product", cable)["version"], is_active=0)
+    alerts.set_low_stock_threshold(10)
+    assert _low() == []
+    assert alerts.check_low_stock().missing == []
+
+
+def test_negative_threshold_never_alerts_even_below_zero(store, make_product):
+    tv, radio = make_product("tv"), make_product("radio")
+    receive_delivery([(tv, 2), (radio, 2)])
+    alerts.set_product_threshold(tv, -1)
+    move_stock(tv, "sell", 5, allow_negative=True)                 # -3 <= -1, still never
+    move_stock(radio, "sell", 5, allow_negative=True)
+    assert _low() == [(radio, 1, -3, 5)]
+    alerts.set_low_stock_threshold(-1)                             # globally off as well
+    assert _low() == []
+    report = alerts.check_low_stock()
+    assert report.missing == [] and report.extra == []
+
+
+def test_check_finds_and_fixes_drift(store, make_product):
+    tv = make_product("tv")
+    receive_delivery([(tv, 2)])
+    with store.write() as c:
+        c.execute("DELETE FROM stock_low")
+    report = alerts.check_low_stock(fix=True)
+    assert report.missing == [(tv, 1)] and report.fixed and _low() == [(tv, 1, 2, 5)]
+    assert alerts.check_low_stock().missing == []
+
+
+def test_alerts_are_batched_once_per_episode_with_cooldown(store, make_product):
+    tv, radio = make_product("tv"), make_product("radio")
+    receive_delivery([(tv, 3), (radio, 50)])
+    feed = LowStockAlerts(cooldown_ms=60_000)
+    now = db.now_ms()
+    assert [i.product_id for i in feed.poll(now)] == [tv]          # first poll: everything low
+    assert feed.poll(now + 1) == []
+    move_stock(tv, "sell", 1)                                      # still the same episode
+    move_stock(radio, "sell", 46)
+    assert [i.product_id for i in feed.poll(now + 2)] == [radio]
+
+    time.sleep(0.002)
+    receive_delivery([(tv, 10)])                                   # restocked, then low again
+    move_stock(tv, "sell", 10)
+    assert feed.poll(now + 3) == []                                # within the cooldown
+    time.sleep(0.002)                                              # episodes are told apart by since (ms)
+    receive_delivery([(tv, 10)])
+    move_stock(tv, "sell", 10)
+    assert [i.product_id for i in feed.poll(now + 120_000)] == [tv]
@@ -0,0 +1,87 @@
+import pytest
+
+import db
+from db.allocation import AllocationEngine
+
+
+@pytest.fixture
+def contract(store, make_contract):
+    contract_id, sched = make_contract()
+    now = db.now_ms()
+    with store.write() as c:
+        # due 1000 = fees 100 + interest 200 + principal 700
+        c.executemany("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, interest_cents, fees_cents,
+                                     due_cents, status, created_at, updated_at)
+            VALUES (?, ?, ?, 700, 200, 100, 1000, 'due', ?, ?)
+        """, [(sched, n, now + n, now, now) for n in (1, 2, 3)])
+    return contract_id
+
+
+def _paid(store, contract_id):
+    with store.read() as c:
+        return c.execute("""
+            SELECT i.paid_cents, i.status FROM installment i JOIN schedule sc ON sc.id = i.schedule_id
+            WHERE sc.contract_id = ? ORDER BY i.number
+        """, (contract_id,)).fetchall()
+
+
+def test_breakdown_fees_interest_principal(contract):
+    engine = AllocationEngine()
+    a = engine.apply(contract, 250)
+    assert [(l.fees_cents, l.interest_cents, l.principal_cents) for l in a.lines] == [(100, 150, 0)]
+    b = engine.apply(contract, 1_000)
+    assert [(l.number, l.fees_cents, l.interest_cents, l.principal_cents, l.status_after) for l in b.lines] == [
+        (1, 0, 50, 700, "paid"), (2, 100, 150, 0, "due")]
+    assert (b.applied_cents, b.carry_over_cents) == (1_000, 0)
+
+
+def test_overpayment_carries_over(store, contract):
+    a = AllocationEngine().apply(contract, 3_500)
+    assert a.applied_cents == 3_000 and a.carry_over_cents == 500
+    assert _paid(store, contract) == [(1_000, "paid")] * 3
+
+
+def test_repeated_payments_hit_cache(store, contract):
+    engine = AllocationEngine()
+    first = engine.apply(contract, 300)
+    second = engine.apply(contract, 300)
+    assert not first.from_cache and second.from_cache
+    assert engine.hits == 1 and engine.misses == 1
+    assert _paid(store, contract)[0] == (600, "due")
+
+
+def test_version_change_elsewhere_invalidates(store, contract):
+    engine = AllocationEngine()
+    engine.apply(contract, 300)
+    with store.write() as c:   # e.g. status refresh or another counter
+        c.execute("UPDATE installment SET paid_cents = paid_cents + 500, version = version + 1 WHERE number = 1")
+    a = engine.apply(contract, 300)
+    assert engine.stale == 1
+    assert [(l.number, l.paid_after) for l in a.lines] == [(1, 1_000), (2, 100)]
+    assert _paid(store, contract)[:2] == [(1_000, "paid"), (100, "due")]
+
+
+def test_idempotent_and_preview_writes_nothing(store, contract):
+    engine = AllocationEngine()
+    preview = engine.preview(contract, 1_200)
+    assert preview.applied_cents == 1_200 and _paid(store, contract)[0] == (0, "due")
+    assert engine.apply(contract, 1_200, idempotency_key="tpe-1").payment_id
+    assert engine.apply(contract, 1_200, idempotency_key="tpe-1").duplicate
+    assert _paid(store, contract)[:2] == [(1_000, "paid"), (200, "due")]
+
+
+def test_lru_eviction(store, make_contract, contract):
+    engine = AllocationEngine(capacity=1)
+    other, _ = make_contract()
+    engine.apply(contract, 100)
+    engine.apply(other, 100)           # evicts `contract`
+    assert not engine.apply(contract, 100).from_cache
+
+
+def test_rejects_bad_input(contract):
+    engine = AllocationEngine()
+    with pytest.raises(ValueError):
+        engine.apply(contract, 0)
+    with pytest.raises(ValueError):
+        engine.apply(contract, 100, channel="cheque")
@@ -0,0 +1,95 @@
+import io
+import os
+import sys
+import time
+
+import pytest
+
+import db
+from db.attachments import AttachmentError, AttachmentStore, customer_thumbnails, set_customer_photo
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def files(store, tmp_path):
+    return AttachmentStore(tmp_path / "att", manager=store, chunk_size=1000)
+
+
+def test_put_dedupes_and_shards_by_hash(files, tmp_path):
+    src = tmp_path / "contract.pdf"
+    src.write_bytes(PDF)
+    first = files.put(src)
+    again = files.put(io.BytesIO(PDF))
+    assert first.kind == "pdf" and first.size == len(PDF) and not first.deduplicated
+    assert again.id == first.id and again.deduplicated
+    blob = files.blob_path(first.sha256)
+    assert blob.read_bytes() == PDF and blob.parent.name == first.sha256[2:4]
+    assert files.read_bytes(first.id) == PDF
+    assert list((files.root / "tmp").iterdir()) == []
+
+
+def test_corruption_is_detected(files, tmp_path):
+    att = files.put(PDF)
+    blob = files.blob_path(att.sha256)
+    blob.write_bytes(PDF[:-1] + b"x")
+    assert not files.verify(att.id)
+    with pytest.raises(AttachmentError):
+        files.export(att.id, tmp_path / "out.pdf")
+    assert not (tmp_path / "out.pdf").exists()
+
+    blob.unlink()
+    assert files.put(PDF).id == att.id        # re-adding the content heals the lost blob
+    assert files.verify(att.id)
+
+
+def test_gc_removes_orphans_only(files):
+    keep = files.put(b"keep me")
+    orphan = files.blob_path("ab" * 32)
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"x")
+    (files.root / "tmp").mkdir(exist_ok=True)
+    running, crashed = files.root / "tmp" / "running", files.root / "tmp" / "crashed"
+    running.write_bytes(b"half a put")
+    crashed.write_bytes(b"left behind")
+    os.utime(crashed, (time.time() - 7200, time.time() - 7200))
+    assert files.gc() == 2
+    assert not orphan.exists() and not crashed.exists() and files.verify(keep.id)
+    assert running.exists()                   # a put() may still be writing it
+
+
+def test_encrypted_blobs(store, tmp_path):
+    pytest.importorskip("cryptography")
+    key = b"k" * 32
+    files = AttachmentStore(tmp_path / "enc", key=key, manager=store, chunk_size=1000)
+    att = files.put(PDF)
+    assert att.encrypted and PDF[:100] not in files.blob_path(att.sha256).read_bytes()
+    assert files.read_bytes(att.id) == PDF
+    with pytest.raises(AttachmentError):
+        AttachmentStore(tmp_path / "enc", manager=store).read_bytes(att.id)   # no key
+
+
+def test_cached_thumbnail_needs_no_decoding(files, store, monkeypatch):
+    att = files.put(b"\xff\xd8\xff" + b"\0" * 100)   # looks like a JPEG, is not decodable
+    cache = files.root / "thumbs" / att.sha256[:2] / f"{att.sha256}-64.jpg"
+    cache.parent.mkdir(parents=True)
+    cache.write_bytes(b"cached")
+    monkeypatch.setitem(sys.modules, "PIL", None)   # any import of PIL would fail
+    assert files.thumbnail(att, 64) == b"cached"
+    with pytest.raises(AttachmentError):
+        files.thumbnail(files.put(PDF), 64)
+
+
+def test_customer_photo_thumbnails(files, store):
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.new("RGB", (2000, 1500), "red").save(buf, "JPEG")
+    now = db.now_ms()
+    with store.write() as c:
+        ids = [c.execute("INSERT INTO customer (full_name, created_at, updated_at) VALUES (?, ?, ?)",
+                         (n, now, now)).lastrowid for n in ("A", "B")]
+    set_customer_photo(ids[0], buf.getvalue(), files)
+    thumbs = customer_thumbnails(ids, 64, files)
+    assert list(thumbs) == [ids[0]]
+    with Image.open(io.BytesIO(thumbs[ids[0]])) as thumb:
+        assert max(thumb.size) == 64
@@ -0,0 +1,144 @@
+import sqlite3
+import time
+
+import pytest
+
+import db
+from db import audit, records
+from db.audit import AuditWriter
+
+
+def _count(store, where="1"):
+    with store.read() as c:
+        return c.execute(f"SELECT COUNT(*) FROM audit_log WHERE {where}").fetchone()[0]
+
+
+def test_buffered_events_flush_on_size_and_timer(store):
+    writer = AuditWriter(store, flush_interval=0.05, max_batch=10)
+    for i in range(25):
+        writer.record("login", "user", i)
+    deadline = time.time() + 2
+    while writer.pending() and time.time() < deadline:
+        time.sleep(0.01)
+    assert writer.pending() == 0 and _count(store) == 25
+    assert writer.batches <= 5 and writer.inline == 0
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.record("login", "user", 1)
+
+
+def test_events_commit_with_their_transaction(store):
+    writer = AuditWriter(store, flush_interval=60)
+    with store.write():
+        writer.record("create", "customer", 1, {"name": "A"})
+        assert _count(store) == 0             # written just before COMMIT
+    assert _count(store) == 1 and writer.pending() == 0   # nothing left to lose in a buffer
+
+    with pytest.raises(ZeroDivisionError):
+        with store.write():
+            writer.record("create", "customer", 2)
+            1 / 0
+    with store.write():
+        with pytest.raises(ZeroDivisionError):
+            with store.write():               # savepoint rolled back, outer commits
+                writer.record("create", "customer", 3)
+                1 / 0
+        writer.record("create", "customer", 4)
+    assert writer.flush() == 0 and writer.inline == 2
+    with store.read() as c:
+        assert [r[0] for r in c.execute("SELECT entity_id FROM audit_log ORDER BY id")] == [1, 4]
+    writer.close()
+
+
+def test_failed_audit_write_rolls_back_the_mutation(store):
+    writer = AuditWriter(store, flush_interval=60)
+    now = db.now_ms()
+    with pytest.raises(sqlite3.IntegrityError):
+        with store.write() as c:
+            c.execute("INSERT INTO customer (full_name, created_at, updated_at) VALUES ('A', ?, ?)", (now, now))
+            writer.record(None, "customer", 1)    # action is NOT NULL
+    with store.read() as c:
+        assert c.execute("SELECT COUNT(*) FROM customer").fetchone()[0] == 0
+    writer.close()
+
+
+def test_durable_events_are_part_of_the_transaction(store):
+    writer = AuditWriter(store, flush_interval=60)
+    with store.write():
+        writer.record("refund", "payment", 1, durable=True)
+        assert _count(store) == 1             # visible inside the transaction already
+    with pytest.raises(ZeroDivisionError):
+        with store.write():
+            writer.record("refund", "payment", 2, durable=True)
+            1 / 0
+    assert _count(store) == 1 and writer.inline == 2 and writer.pending() == 0
+    writer.close()
+
+
+def test_versioned_updates_are_audited(store):
+    now = db.now_ms()
+    with store.write() as c:
+        cid = c.execute("INSERT INTO customer (full_name, created_at, updated_at) VALUES ('A', ?, ?)",
+                        (now, now)).lastrowid
+    records.update("customer", cid, 1, notes="vip")
+    audit.get_writer(store).flush()
+    [event] = audit.history("customer", cid)
+    assert event["action"] == "update" and event["details"] == {"version": 2, "changes": {"notes": "vip"}}
+
+
+def test_archive_moves_old_rows_into_monthly_partitions(store, tmp_path):
+    day = 86_400_000
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("INSERT INTO audit_log (action, entity, entity_id, at) VALUES ('update', 'sale', 7, ?)",
+                      [(now - d * day,) for d in (1, 10, 100, 130, 200, 400)])
+    report = audit.archive(keep_days=90, directory=tmp_path / "arch")
+    assert report.rows == 4 and _count(store) == 2
+    assert len(audit.partitions(tmp_path / "arch")) == len(report.partitions) >= 3
+    archived = 0
+    for part in report.partitions:
+        with sqlite3.connect(part) as conn:
+            archived += conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
+    assert archived == 4
+
+    assert audit.archive(keep_days=90, directory=tmp_path / "arch").rows == 0   # rerun is a no-op
+    events = audit.history("sale", 7, directory=tmp_path / "arch")
+    assert len(events) == 6
+    assert [e["at"] for e in events] == sorted(e["at"] for e in events)
+
+
+def test_stock_schedule_status_and_supplier_mutations_are_audited(store, make_contract):
+    from datetime import date, timedelta
+    from db.installments import refresh_statuses
+    from db.inventory import add_supplier
+    from db.schedules import regenerate_schedules
+    from db.stock import move_stock, receive_delivery, transfer
+
+    now = db.now_ms()
+    with store.write() as c:
+        product = c.execute("""
+            INSERT INTO product (sku, name, price_ttc_cents, created_at, updated_at) VALUES ('tv', 'TV', 1000, ?, ?)
+        """, (now, now)).lastrowid
+    receive_delivery([(product, 5)], ref_id=7)
+    move_stock(product, "sell", 2)
+    transfer(product, 1, 1, 2)
+    supplier = add_supplier("Acme", None, None, None, None, None)
+    contract_id, schedule_id = make_contract()
+    with store.write() as c:
+        c.execute("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents, status,
+                                     created_at, updated_at)
+            VALUES (?, 1, ?, 100, 100, 'upcoming', ?, ?)
+        """, (schedule_id, now - 86_400_000, now, now))
+    regenerate_schedules([contract_id])
+    with store.write() as c:
+        c.execute("UPDATE installment SET due_date = ?", (now - 3 * 86_400_000,))
+    refresh_statuses(date.today() + timedelta(days=1), force=True)
+
+    with store.read() as c:
+        events = c.execute("SELECT action, entity, entity_id, details_json FROM audit_log ORDER BY id").fetchall()
+    actions = [(a, e) for a, e, _, _ in events]
+    assert actions[:4] == [("receive", "stock"), ("sell", "stock"), ("transfer", "stock"), ("create", "suppliers")]
+    assert events[1][2] == product and '"qty_delta":-2' in events[1][3] and events[3][2] == supplier
+    assert ("regenerate", "schedule") in actions
+    assert ("transition", "installment") in actions
@@ -0,0 +1,79 @@
+import pytest
+
+import db
+from db import branches
+from db.branches import QUERIES, BranchRepository
+
+
+def _seed(store, make_contract, branch_id, n):
+    now = db.now_ms()
+    for k in range(n):
+        contract_id, schedule_id = make_contract(branch_id=branch_id)
+        with store.write() as c:
+            c.executemany("""
+                INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents, status,
+                                         created_at, updated_at)
+                VALUES (?, ?, ?, 100, 100, ?, ?, ?)
+            """, [(schedule_id, i, 1_000 * i + k, "overdue" if i <= 2 else "upcoming", now, now)
+                  for i in range(1, 5)])
+            c.execute("""
+                INSERT INTO payment (branch_id, contract_id, channel, amount_cents, received_at, created_at, updated_at)
+                VALUES (?, ?, 'cash', 100, ?, ?, ?)
+            """, (branch_id, contract_id, 5_000 + k, now, now))
+            c.execute("INSERT INTO customer (branch_id, full_name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                      (branch_id, f"Customer {k:03d}", now, now))
+
+
+@pytest.mark.parametrize("name", sorted(QUERIES))
+def test_every_query_is_branch_filtered_and_index_backed(store, name):
+    sql, indexes = QUERIES[name]
+    assert "branch_id = :branch" in sql
+    plan = branches.explain(name, store)
+    assert not [line for line in plan if branches._FULL_SCAN.match(line)], plan
+    for index in indexes:
+        assert any(index in line for line in plan), (index, plan)
+
+
+def test_plans_hold_when_other_branches_dominate(store, make_contract):
+    _seed(store, make_contract, 1, 3)
+    _seed(store, make_contract, 2, 60)
+    with store.write() as c:
+        c.execute("ANALYZE")
+    assert branches.check_plans(store) == {}
+
+
+def test_repository_sees_only_its_branch_and_pages(store, make_contract):
+    _seed(store, make_contract, 1, 5)
+    _seed(store, make_contract, 2, 7)
+    repo = BranchRepository(1)
+
+    overdue = repo.installments(limit=4)
+    assert len(overdue) == 4 and [r[4] for r in overdue] == sorted(r[4] for r in overdue)
+    rest = repo.installments(after=(overdue[-1][4], overdue[-1][0]), limit=100)
+    assert len(overdue) + len(rest) == 10 and not {r[0] for r in overdue} & {r[0] for r in rest}
+
+    payments = repo.payments(limit=3)
+    assert [r[5] for r in payments] == [5_004, 5_003, 5_002]
+    assert [r[5] for r in repo.payments(before=(payments[-1][5], payments[-1][0]))] == [5_001, 5_000]
+
+    names = [r[1] for r in repo.customers(limit=100)]
+    assert names == [f"Customer {k:03d}" for k in range(5)]
+    assert len(BranchRepository(2).customers()) == 7
+    assert BranchRepository(3).installments() == []
+    with pytest.raises(ValueError):
+        BranchRepository(None)
+
+
+def test_draft_and_void_sales_page_by_creation_time(store):
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO sale (branch_id, type, status, total_cents, completed_at, created_at, updated_at)
+            VALUES (1, 'cash', ?, 100, ?, ?, ?)
+        """, [("draft", None, 10, 10), ("draft", None, 20, 20), ("draft", None, 30, 30),
+              ("void", None, 40, 40), ("void", 55, 50, 55), ("completed", 65, 60, 65)])
+    repo = BranchRepository(1)
+    drafts = repo.sales("draft", limit=2)
+    assert [r[5] for r in drafts] == [30, 20]
+    assert [r[5] for r in repo.sales("draft", before=(drafts[-1][5], drafts[-1][0]))] == [10]
+    assert [r[5] for r in repo.sales("void")] == [50, 40]
+    assert [r[5] for r in repo.sales()] == [65]
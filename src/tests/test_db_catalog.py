@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from db import records
+from db.catalog import Catalog, ProductRecord
+
+
+def test_loads_active_products_into_slotted_records(store, make_product):
+    tv = make_product("tv-55", "Samsung", "TV", "6001234567890")
+    make_product("old", "Sony", "TV", active=0)
+    catalog = Catalog(store)
+    change = catalog.refresh()
+    assert change.full_reload and change.added == [tv] and len(catalog) == 1
+    rec = catalog.by_barcode("6001234567890")
+    assert rec is catalog.by_sku("tv-55") is catalog.get(tv)
+    assert not hasattr(rec, "__dict__") and isinstance(rec, ProductRecord)
+    assert catalog.brands() == ["Samsung"] and catalog.categories() == ["TV"]
+
+
+def test_refresh_applies_only_what_changed(store, make_product):
+    tv = make_product("tv-55", "Samsung", "TV")
+    cable = make_product("hdmi", "Generic", "Cables")
+    catalog = Catalog(store)
+    catalog.refresh()
+    seen = []
+    unsubscribe = catalog.subscribe(seen.append)
+
+    assert not catalog.refresh() and seen == []                  # nothing new: no event
+    radio = make_product("radio", "Samsung", "Audio", "123")
+    records.update("product", tv, 1, name="TV 55 inch")
+    records.update("product", cable, 1, is_active=0)
+    change = catalog.refresh()
+    assert (change.added, change.updated, change.removed) == ([radio], [tv], [cable])
+    assert change.categories_changed and change.brands_changed   # "Audio" appeared, "Generic" vanished
+    assert catalog.get(tv).name == "TV 55 inch" and catalog.by_barcode("123").id == radio
+    assert catalog.get(cable) is None and catalog.brands() == ["Samsung"]
+    assert seen == [change]
+
+    records.update("product", radio, 1, price_ttc_cents=900)
+    change = catalog.refresh()
+    assert change.updated == [radio] and not change.brands_changed and not change.categories_changed
+    unsubscribe()
+    with store.write() as c:
+        c.execute("DELETE FROM product WHERE id = ?", (radio,))
+    assert catalog.refresh().removed == [radio] and catalog.by_barcode("123") is None
+    assert len(seen) == 2
+
+
+def test_barcodes_are_unique(store, make_product):
+    make_product("a", barcode="111")
+    make_product("b")
+    make_product("c")                                     # many products without a barcode is fine
+    with pytest.raises(sqlite3.IntegrityError):
+        make_product("d", barcode="111")
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+import db
+from db import audit
+from db.checkout import CartLine, CheckoutError, Financing, checkout
+from db.stock import receive_delivery
+
+
+@pytest.fixture
+def products(store):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO product (id, sku, name, price_ttc_cents, tax_rate_bp, is_active, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 1900, ?, ?, ?)
+        """, [(1, "TV-55", "TV 55", 119_000, 1, now, now), (2, "CABLE", "HDMI cable", 1_190, 1, now, now),
+              (3, "OLD", "Discontinued", 500, 0, now, now)])
+    receive_delivery([(1, 5), (2, 50)])
+    return store
+
+
+def _qty(store, product_id):
+    with store.read() as c:
+        return c.execute("SELECT qty FROM stock WHERE product_id = ? AND branch_id = 1", (product_id,)).fetchone()[0]
+
+
+def test_cash_sale_writes_everything_in_one_commit(products):
+    result = checkout([CartLine(1, 1), CartLine(2, 3)], channel="tpe_card", discount_cents=570)
+    assert result.total_cents == 119_000 + 3 * 1_190 - 570 and result.contract_id is None
+    with products.read() as c:
+        assert c.execute("SELECT type, status, subtotal_cents, tax_cents, total_cents FROM sale WHERE id = ?",
+                         (result.sale_id,)).fetchone() == ("cash", "completed", 122_570, 19_570, 122_000)
+        assert c.execute("SELECT COUNT(*) FROM sale_item WHERE sale_id = ?", (result.sale_id,)).fetchone()[0] == 2
+        assert c.execute("SELECT amount_cents, channel FROM payment WHERE id = ?",
+                         (result.payment_id,)).fetchone() == (122_000, "tpe_card")
+        assert c.execute("SELECT SUM(qty_delta) FROM stock_ledger WHERE ref_entity = 'sale' AND ref_id = ?",
+                         (result.sale_id,)).fetchone()[0] == -4
+    assert (_qty(products, 1), _qty(products, 2)) == (4, 47)
+    audit.get_writer(products).flush()
+    assert [e["action"] for e in audit.history("sale", result.sale_id)] == ["create"]
+
+
+def test_instalment_sale_creates_contract_and_schedule(products):
+    result = checkout([CartLine(1, 1)], customer_id=None, down_payment_cents=19_000,
+                      financing=Financing(term_months=10, apr_bp=1200), idempotency_key="counter-1:0001")
+    with products.read() as c:
+        term, repay = c.execute("""SELECT o.term_months, o.total_repay_cents FROM contract k
+                                   JOIN offer o ON o.id = k.offer_id WHERE k.id = ?""",
+                                (result.contract_id,)).fetchone()
+        principal, due = c.execute("""SELECT SUM(i.principal_cents), SUM(i.due_cents) FROM installment i
+                                      JOIN schedule sc ON sc.id = i.schedule_id WHERE sc.contract_id = ?""",
+                                   (result.contract_id,)).fetchone()
+        assert c.execute("SELECT amount_cents, contract_id FROM payment WHERE id = ?",
+                         (result.payment_id,)).fetchone() == (19_000, None)
+    assert term == 10 and principal == 100_000 and due == repay > principal
+
+    again = checkout([CartLine(1, 1)], down_payment_cents=19_000, financing=Financing(10, 1200),
+                     idempotency_key="counter-1:0001")
+    assert again.replayed and (again.sale_id, again.contract_id) == (result.sale_id, result.contract_id)
+    assert _qty(products, 1) == 4
+
+
+def test_failures_write_nothing(products):
+    with pytest.raises(CheckoutError):
+        checkout([CartLine(2, 1), CartLine(1, 6)])         # only 5 TVs in stock
+    with pytest.raises(CheckoutError):
+        checkout([CartLine(3, 1)])                         # inactive
+    with pytest.raises(CheckoutError):
+        checkout([CartLine(1, 1)], financing=Financing(term_months=2))
+    with products.read() as c:
+        assert c.execute("SELECT COUNT(*) FROM sale").fetchone()[0] == 0
+    assert (_qty(products, 1), _qty(products, 2)) == (5, 50)
+
+
+def test_concurrent_counters_never_oversell(products):
+    sold, refused = [], []
+
+    def counter():
+        for _ in range(3):
+            try:
+                sold.append(checkout([CartLine(1, 1)]).sale_id)
+            except CheckoutError:
+                refused.append(1)
+
+    threads = [threading.Thread(target=counter) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(sold) == 5 and len(refused) == 7 and _qty(products, 1) == 0
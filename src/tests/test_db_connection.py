@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+from db.connection import ConnectionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    m = ConnectionManager(tmp_path / "pool.db", readers=2, checkout_timeout=0.5)
+    yield m
+    m.close()
+
+
+def _make_table(m):
+    with m.write() as c:
+        c.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+
+
+def _run_with_timeout(fn, seconds=5):
+    t = threading.Thread(target=fn, daemon=True)
+    t.start()
+    t.join(seconds)
+    assert not t.is_alive(), "call did not return (deadlock?)"
+
+
+def test_first_read_on_fresh_manager(manager):
+    result = []
+
+    def first_read():
+        with manager.read() as c:
+            result.append(c.execute("SELECT 1").fetchone()[0])
+
+    _run_with_timeout(first_read)
+    assert result == [1]
+
+
+def test_pragmas_applied(manager):
+    with manager.write() as c:
+        assert c.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert c.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert c.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+def test_read_inside_write_sees_uncommitted_rows(manager):
+    _make_table(manager)
+    with manager.write() as c:
+        c.execute("INSERT INTO t (v) VALUES ('a')")
+        with manager.read() as r:
+            assert r.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+
+def test_nested_write_rolls_back_to_savepoint(manager):
+    _make_table(manager)
+    with manager.write() as c:
+        c.execute("INSERT INTO t (v) VALUES ('outer')")
+        with pytest.raises(ValueError):
+            with manager.write() as c2:
+                c2.execute("INSERT INTO t (v) VALUES ('inner')")
+                raise ValueError
+    with manager.read() as r:
+        assert [row[0] for row in r.execute("SELECT v FROM t")] == ["outer"]
+
+
+def test_outer_write_error_rolls_back_everything(manager):
+    _make_table(manager)
+    with pytest.raises(RuntimeError):
+        with manager.write() as c:
+            c.execute("INSERT INTO t (v) VALUES ('x')")
+            raise RuntimeError
+    with manager.read() as r:
+        assert r.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_reader_rejects_writes(manager):
+    _make_table(manager)
+    with manager.read() as r:
+        with pytest.raises(sqlite3.OperationalError):
+            r.execute("INSERT INTO t (v) VALUES ('nope')")
+
+
+def test_concurrent_threads(manager):
+    _make_table(manager)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(25):
+                with manager.write() as c:
+                    c.execute("INSERT INTO t (v) VALUES (?)", (f"{n}-{i}",))
+                with manager.read() as r:
+                    r.execute("SELECT COUNT(*) FROM t").fetchone()
+        except Exception as e:  # surfaced below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert not errors
+    assert len(manager._readers) <= manager.max_readers
+    with manager.read() as r:
+        assert r.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 150
+
+
+def test_exhausted_pool_times_out(manager):
+    held = [threading.Event() for _ in range(manager.max_readers)]
+    release = threading.Event()
+
+    def hold(ev):
+        with manager.read():
+            ev.set()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold, args=(ev,)) for ev in held]
+    for t in threads:
+        t.start()
+    try:
+        for ev in held:
+            assert ev.wait(2)
+        with pytest.raises(TimeoutError):
+            with manager.read():
+                pass
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
+
+
+def test_close_while_reader_checked_out(manager):
+    _make_table(manager)
+    inside = threading.Event()
+    closed = threading.Event()
+    seen = []
+
+    def reader():
+        with manager.read() as r:
+            inside.set()
+            closed.wait(5)
+            seen.append(r.execute("SELECT COUNT(*) FROM t").fetchone()[0])
+
+    t = threading.Thread(target=reader)
+    t.start()
+    inside.wait(2)
+    manager.close()
+    closed.set()
+    t.join(5)
+    assert seen == [0]
+    assert manager._idle.empty()  # the orphaned reader was closed, not pooled
+
+    # The manager reopens cleanly after close()
+    with manager.read() as r:
+        assert r.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
@@ -0,0 +1,65 @@
+import db
+from db.customers import CustomerSearch
+from db.textnorm import name_fold
+
+
+def _add(store, *people, branch_id=1):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO customer (branch_id, full_name, arabic_full_name, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(branch_id, full, arabic, now, now) for full, arabic in people])
+
+
+def test_name_fold():
+    assert name_fold("أَحْمَد") == name_fold("احمد") == name_fold("إحمد")
+    assert name_fold("فاطمة") == name_fold("فاطمه")
+    assert name_fold("Hélène") == "helene"
+
+
+def test_prefix_search_and_arabic_variants(store):
+    _add(store, ("Mohamed Benali", "مُحَمَّد بن علي"), ("Mohand Said", None), ("Karim Haddad", "كريم"))
+    s = CustomerSearch(manager=store)
+    assert {r[1] for r in s.search("moh").rows} == {"Mohamed Benali", "Mohand Said"}
+    assert [r[1] for r in s.search("محمد").rows] == ["Mohamed Benali"]
+    assert [r[1] for r in s.search("moh ben").rows] == ["Mohamed Benali"]
+    assert s.search("zzz").rows == []
+    assert s.search("  ").rows == []
+
+
+def test_keystrokes_refine_from_cache(store):
+    _add(store, *[(f"Mohamed {i}", None) for i in range(5)], ("Mourad", None))
+    s = CustomerSearch(manager=store)
+    s.search("m")
+    assert s.misses == 1
+    assert len(s.search("mo").rows) == 6
+    assert len(s.search("moh").rows) == 5
+    assert s.misses == 1 and s.hits == 2
+
+
+def test_cache_invalidated_by_customer_writes(store):
+    _add(store, ("Yacine", None))
+    s = CustomerSearch(manager=store)
+    assert len(s.search("yac").rows) == 1
+    _add(store, ("Yacine Two", None))
+    assert len(s.search("yac").rows) == 2
+    with store.write() as c:
+        c.execute("UPDATE customer SET full_name = 'Zakaria' WHERE full_name = 'Yacine'")
+    assert [r[1] for r in s.search("yac").rows] == ["Yacine Two"]
+    assert [r[1] for r in s.search("zak").rows] == ["Zakaria"]
+    with store.write() as c:
+        c.execute("DELETE FROM customer WHERE full_name = 'Zakaria'")
+    assert s.search("zak").rows == []
+
+
+def test_paging_and_branch_filter(store):
+    _add(store, *[(f"Amine {i}", None) for i in range(12)])
+    _add(store, ("Amine Other", None), branch_id=2)
+    s = CustomerSearch(manager=store, page_size=5, scan_limit=5)
+    pages = [s.search("amine", p) for p in range(3)]
+    assert [len(p.rows) for p in pages] == [5, 5, 3]
+    assert [p.has_more for p in pages] == [True, True, False]
+    assert len({r[0] for p in pages for r in p.rows}) == 13
+    branch = CustomerSearch(manager=store, branch_id=2)
+    assert [r[1] for r in branch.search("amine").rows] == ["Amine Other"]
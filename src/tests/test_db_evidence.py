@@ -0,0 +1,95 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from db import evidence
+from db.attachments import AttachmentStore
+from db.schedules import generate_schedule
+
+
+@pytest.fixture
+def contracts(store, make_contract):
+    ids = []
+    for term in (6, 12, 24):
+        contract_id, _ = make_contract(term_months=term, with_schedule=False)
+        generate_schedule(contract_id)
+        ids.append(contract_id)
+    return ids
+
+
+@pytest.fixture
+def files(store, tmp_path):
+    return AttachmentStore(tmp_path / "att", manager=store)
+
+
+def _fake_pdf(payload, digest):
+    return b"%PDF-1.4\n" + digest.encode() + b"\n" + evidence.canonical_bytes(payload)
+
+
+def test_hash_covers_terms_but_not_payment_progress(store, contracts):
+    before = evidence.contract_hash(evidence.load_payload(contracts[0]))
+    with store.write() as c:
+        c.execute("UPDATE installment SET paid_cents = due_cents, status = 'paid' WHERE number = 1")
+        c.execute("UPDATE contract SET status = 'signed', signed_at = 1")
+    assert evidence.contract_hash(evidence.load_payload(contracts[0])) == before
+    with store.write() as c:
+        c.execute("""UPDATE installment SET due_cents = due_cents + 1
+                     WHERE number = 2 AND schedule_id = (SELECT id FROM schedule WHERE contract_id = ?)""",
+                  (contracts[0],))
+    assert evidence.contract_hash(evidence.load_payload(contracts[0])) != before
+
+
+def test_verify_flags_edited_contracts(store, contracts):
+    assert evidence.seal_contracts() == 3
+    assert evidence.seal_contracts() == 0
+    report = evidence.verify_contracts()
+    assert report.checked == 3 and report.ok and report.unsealed == 0
+    with store.write() as c:
+        c.execute("UPDATE offer SET apr_bp = 1999 WHERE id = (SELECT offer_id FROM contract WHERE id = ?)",
+                  (contracts[1],))
+    assert evidence.verify_contracts().mismatched == [contracts[1]]
+
+
+def test_pipeline_links_pack_and_is_deterministic(store, contracts, files, monkeypatch):
+    monkeypatch.setattr(evidence, "_render_pdf", _fake_pdf)
+    seen = []
+    report = evidence.generate_evidence(workers=0, store=files, progress=lambda done, total: seen.append(done))
+    assert report.generated == 3 and seen == [1, 2, 3] and len(report.timings) == 3
+    assert evidence.pending_contracts() == []
+    with store.read() as c:
+        digest, pdf_id, pack_id = c.execute(
+            "SELECT immutable_hash, pdf_attachment_id, evidence_pack_id FROM contract WHERE id = ?",
+            (contracts[0],)).fetchone()
+    with zipfile.ZipFile(io.BytesIO(files.read_bytes(pack_id))) as z:
+        manifest = json.loads(z.read("manifest.json"))
+        assert z.read("contract.pdf") == files.read_bytes(pdf_id)
+        assert json.loads(z.read("contract.json")) == evidence.load_payload(contracts[0])
+    assert manifest["immutable_hash"] == digest
+    assert evidence.verify_contracts(check_files=True, store=files).ok
+
+    again = evidence.generate_evidence([contracts[0]], workers=0, store=files)
+    with store.read() as c:
+        assert c.execute("SELECT evidence_pack_id FROM contract WHERE id = ?", (contracts[0],)).fetchone()[0] == pack_id
+    assert again.generated == 1
+
+
+def test_tampered_contract_keeps_its_evidence(store, contracts, files, monkeypatch):
+    monkeypatch.setattr(evidence, "_render_pdf", _fake_pdf)
+    evidence.seal_contracts()
+    with store.write() as c:
+        c.execute("UPDATE sale SET total_cents = 1 WHERE id = (SELECT sale_id FROM contract WHERE id = ?)",
+                  (contracts[2],))
+    report = evidence.generate_evidence(workers=0, store=files)
+    assert report.tampered == [contracts[2]] and report.generated == 2
+    assert evidence.pending_contracts() == [contracts[2]]
+
+
+def test_reportlab_render_in_process_pool(store, contracts, files):
+    pytest.importorskip("reportlab")
+    report = evidence.generate_evidence(workers=2, store=files)
+    assert report.generated == 3 and report.percentile_ms(0.5) > 0
+    with store.read() as c:
+        pdf_id = c.execute("SELECT pdf_attachment_id FROM contract WHERE id = ?", (contracts[0],)).fetchone()[0]
+    assert files.read_bytes(pdf_id).startswith(b"%PDF")
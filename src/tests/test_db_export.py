@@ -0,0 +1,74 @@
+import csv
+
+import pytest
+
+import db
+from db.export import ExportCancelled, export_report
+
+
+@pytest.fixture
+def payments(store):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO payment (branch_id, channel, amount_cents, received_at, created_at, updated_at)
+            VALUES (1, 'cash', ?, ?, ?, ?)
+        """, [(100 * i, now + i, now, now) for i in range(1, 1201)])
+    return now
+
+
+def test_csv_export_streams_all_rows(payments, tmp_path):
+    seen = []
+    report = export_report("payments", tmp_path / "p.csv", chunk_size=500,
+                           progress=lambda done, total: seen.append((done, total)))
+    assert report.rows == 1200 and report.bytes > 0
+    assert seen == [(500, 1200), (1000, 1200), (1200, 1200)]
+    with open(tmp_path / "p.csv", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][0] == "Payment #" and len(rows) == 1201
+    assert rows[1][6] == "1.0"   # cents -> currency units
+
+
+def test_date_range_filter(payments, tmp_path):
+    report = export_report("payments", tmp_path / "p.csv", start_ms=payments + 101, end_ms=payments + 200)
+    assert report.rows == 100
+
+
+def test_cancel_leaves_no_file_and_frees_reader(payments, store, tmp_path):
+    target = tmp_path / "p.csv"
+    with pytest.raises(ExportCancelled):
+        export_report("payments", target, chunk_size=100, should_cancel=lambda: True)
+    assert not target.exists() and not (tmp_path / "p.csv.partial").exists()
+    assert store._idle.qsize() == len(store._readers)   # every reader is back in the pool
+
+
+def test_rejects_unknown_report_and_format(store, tmp_path):
+    with pytest.raises(ValueError):
+        export_report("nope", tmp_path / "x.csv")
+    with pytest.raises(ValueError):
+        export_report("payments", tmp_path / "x.doc")
+
+
+def test_xlsx_export(payments, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    report = export_report("payments", tmp_path / "p.xlsx", chunk_size=300)
+    sheet = openpyxl.load_workbook(tmp_path / "p.xlsx", read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))   # read-only sheets report max_row as None
+    assert report.rows == 1200 and len(rows) == 1201 and rows[0][0] == "Payment #"
+
+
+def test_pdf_export(payments, tmp_path):
+    report = export_report("payments", tmp_path / "p.pdf", chunk_size=250)
+    data = (tmp_path / "p.pdf").read_bytes()
+    assert report.rows == 1200 and data.startswith(b"%PDF") and data.endswith(b"%%EOF\n")
+    # every xref entry points at its object, and every row made it onto a page
+    xref = int(data.rsplit(b"startxref\n", 1)[1].split()[0])
+    entries = data[xref:].split(b"\n")[3:]
+    offsets = [int(e[:10]) for e in entries if e.endswith(b" n ")]
+    assert all(data[o:].startswith(b"%d 0 obj" % (n + 1)) for n, o in enumerate(offsets))
+    assert b"/Count 27 " in data   # 45 rows per page
+
+
+def test_pdf_export_of_nothing_has_one_page(store, tmp_path):
+    report = export_report("sales", tmp_path / "s.pdf")
+    assert report.rows == 0 and b"/Count 1 " in (tmp_path / "s.pdf").read_bytes()
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import db
+from db.installments import _day_start_ms, refresh_statuses, DAY_MS, WATERMARK_KEY
+
+TODAY = date(2026, 3, 15)
+
+
+def _add_installments(store, schedule_id, due_dates, status="upcoming"):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents,
+                                     status, created_at, updated_at)
+            VALUES (?, ?, ?, 1000, 1000, ?, ?, ?)
+        """, [(schedule_id, n, d, status, now, now) for n, d in enumerate(due_dates, 1)])
+
+
+def _statuses(store):
+    with store.read() as c:
+        return [r[0] for r in c.execute("SELECT status FROM installment ORDER BY number")]
+
+
+def test_transitions_and_watermark(store, make_contract):
+    _, schedule_id = make_contract()
+    base = _day_start_ms(TODAY)
+    _add_installments(store, schedule_id, [
+        base - 3 * DAY_MS,   # long past -> overdue
+        base + 3600_000,     # today -> due
+        base + 2 * DAY_MS,   # future -> upcoming
+    ])
+    report = refresh_statuses(today=TODAY, manager=store)
+    assert _statuses(store) == ["overdue", "due", "upcoming"]
+    assert report.transitioned == {"upcoming->due": 2, "due->overdue": 1}
+    with store.read() as c:
+        assert int(c.execute("SELECT value FROM app_meta WHERE key = ?", (WATERMARK_KEY,)).fetchone()[0]) \
+            == _day_start_ms(TODAY + timedelta(days=1))
+
+    again = refresh_statuses(today=TODAY, manager=store)
+    assert again.skipped and again.total == 0
+
+    later = refresh_statuses(today=TODAY + timedelta(days=3), manager=store)
+    assert _statuses(store) == ["overdue", "overdue", "overdue"]
+    assert later.transitioned == {"upcoming->due": 1, "due->overdue": 2}
+
+
+def test_grace_days_and_terminal_statuses(store, make_contract):
+    _, schedule_id = make_contract()
+    base = _day_start_ms(TODAY)
+    _add_installments(store, schedule_id, [base - 2 * DAY_MS])
+    _add_installments(store, schedule_id, [base - 10 * DAY_MS], status="paid")
+    refresh_statuses(today=TODAY, grace_days=5, manager=store)
+    assert sorted(_statuses(store)) == ["due", "paid"]
+
+
+def test_batches_commit_separately(store, make_contract):
+    _, schedule_id = make_contract()
+    base = _day_start_ms(TODAY)
+    _add_installments(store, schedule_id, [base - DAY_MS] * 25)
+    report = refresh_statuses(today=TODAY, batch_size=10, manager=store)
+    assert report.transitioned["due->overdue"] == 25
+    assert report.batches >= 6
+    with store.read() as c:
+        assert c.execute("SELECT MIN(version) FROM installment").fetchone()[0] == 3
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+
+import db
+from db.metrics import (check_metrics, dashboard_summary, rebuild_metrics, receivables_trend,
+                        snapshot_receivables)
+
+TODAY = date(2025, 3, 31)
+
+
+def _ms(d: date) -> int:
+    return int(datetime(d.year, d.month, d.day, 12).timestamp() * 1000)
+
+
+def _sale(store, day, total, branch_id=1, type_="cash", status="completed"):
+    with store.write() as c:
+        return c.execute("""
+            INSERT INTO sale (branch_id, type, status, total_cents, completed_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (branch_id, type_, status, total, _ms(day), _ms(day), _ms(day))).lastrowid
+
+
+def _payment(store, day, amount, status="succeeded", branch_id=1):
+    with store.write() as c:
+        return c.execute("""
+            INSERT INTO payment (branch_id, channel, amount_cents, status, received_at, created_at, updated_at)
+            VALUES (?, 'cash', ?, ?, ?, ?, ?)
+        """, (branch_id, amount, status, _ms(day), _ms(day), _ms(day))).lastrowid
+
+
+def _installments(store, schedule_id, rows):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents, paid_cents,
+                                     status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(schedule_id, n, now, due, due, paid, status, now, now)
+              for n, (due, paid, status) in enumerate(rows, 1)])
+
+
+def test_rollups_follow_sales_and_payments(store):
+    _sale(store, TODAY, 10_000)
+    _sale(store, TODAY - timedelta(days=1), 5_000, type_="instalment")
+    _sale(store, TODAY, 999, status="draft")
+    old = _sale(store, TODAY - timedelta(days=40), 7_000)
+    _payment(store, TODAY, 2_000)
+    failed = _payment(store, TODAY, 3_000, status="failed")
+
+    s = dashboard_summary(days=30, today=TODAY)
+    assert (s.sales_cents, s.sales_count) == (15_000, 2)
+    assert s.sales_by_type == {"cash": 10_000, "instalment": 5_000}
+    assert s.collections_cents == 2_000
+    assert len(s.sales_trend) == 30 and s.sales_trend[-1] == (TODAY.isoformat(), 10_000)
+
+    with store.write() as c:
+        c.execute("UPDATE sale SET status = 'void' WHERE total_cents = 10000")
+        c.execute("UPDATE sale SET completed_at = ? WHERE id = ?", (_ms(TODAY), old))
+        c.execute("UPDATE payment SET status = 'succeeded' WHERE id = ?", (failed,))
+    s = dashboard_summary(days=30, today=TODAY)
+    assert s.sales_cents == 12_000 and s.collections_cents == 5_000
+    assert check_metrics().drift == []
+
+
+def test_receivables_track_installment_changes(store, make_contract):
+    _, sched = make_contract(branch_id=2)
+    _installments(store, sched, [(1_000, 0, "overdue"), (1_000, 400, "due"), (1_000, 1_000, "paid")])
+    s = dashboard_summary(today=TODAY)
+    assert (s.open_installments, s.outstanding_cents) == (2, 1_600)
+    assert (s.overdue_count, s.overdue_cents) == (1, 1_000)
+    assert dashboard_summary(today=TODAY, branch_id=1).open_installments == 0
+
+    with store.write() as c:
+        c.execute("UPDATE installment SET paid_cents = 1000, status = 'paid' WHERE status = 'overdue'")
+    s = dashboard_summary(today=TODAY)
+    assert (s.open_installments, s.outstanding_cents, s.overdue_count) == (1, 600, 0)
+
+    assert snapshot_receivables(TODAY) == 1
+    assert receivables_trend(today=TODAY) == [(TODAY.isoformat(), 600, 0)]
+    assert check_metrics().drift == []
+
+
+def test_check_detects_and_fixes_drift(store, make_contract):
+    _sale(store, TODAY, 10_000)
+    _, sched = make_contract()
+    _installments(store, sched, [(500, 0, "upcoming")])
+    with store.write() as c:
+        c.execute("UPDATE metric_sales_daily SET total_cents = 1")
+        c.execute("DELETE FROM metric_receivables")
+
+    report = check_metrics(fix=True)
+    assert {d.table for d in report.drift} == {"metric_sales_daily", "metric_receivables"}
+    assert report.fixed
+    assert check_metrics().drift == []
+
+
+def test_rebuild_matches_incremental(store, make_contract):
+    for k in range(20):
+        _sale(store, TODAY - timedelta(days=k % 5), 100 * k, branch_id=1 + k % 2)
+        _payment(store, TODAY - timedelta(days=k % 3), 10 * k)
+    _, sched = make_contract()
+    _installments(store, sched, [(1_000, 0, "upcoming")] * 6)
+    with store.read() as c:
+        before = {t: c.execute(f"SELECT * FROM {t} ORDER BY 1, 2").fetchall()
+                  for t in ("metric_sales_daily", "metric_collections_daily", "metric_receivables")}
+    counts = rebuild_metrics()
+    with store.read() as c:
+        after = {t: c.execute(f"SELECT * FROM {t} ORDER BY 1, 2").fetchall() for t in before}
+    assert after == before
+    assert counts["metric_receivables"] == 1
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+from db.connection import ConnectionManager
+from db import migrate as m
+
+
+@pytest.fixture
+def manager(tmp_path):
+    mgr = ConnectionManager(tmp_path / "app.db")
+    yield mgr
+    mgr.close()
+
+
+def _latest():
+    return m.available_migrations()[-1][0]
+
+
+def test_cold_migrate_applies_everything(manager):
+    applied = m.migrate(manager)
+    assert applied == [v for v, _, _ in m.available_migrations()]
+    with manager.read() as c:
+        assert m.current_version(c) == _latest()
+        tables = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        recorded = [r[0] for r in c.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert {"customer", "installment", "suppliers", "schema_migrations"} <= tables
+    assert recorded == applied
+
+
+def test_warm_migrate_runs_no_ddl(manager):
+    m.migrate(manager)
+    with manager.write() as c:
+        schema_before = c.execute("PRAGMA schema_version").fetchone()[0]
+    assert m.migrate(manager) == []
+    with manager.read() as c:
+        assert c.execute("PRAGMA schema_version").fetchone()[0] == schema_before
+
+
+def test_existing_version_one_database_only_gets_newer_migrations(manager):
+    # A database created by hand from sqlite_schema.sql, before the migrator existed
+    legacy = sqlite3.connect(manager.path)
+    legacy.executescript(m.BASE_SCHEMA.read_text(encoding="utf-8"))
+    legacy.close()
+    assert m.migrate(manager) == [v for v, _, _ in m.available_migrations() if v > 1]
+
+
+def test_failed_migration_rolls_back(manager, tmp_path, monkeypatch):
+    m.migrate(manager)
+    version = _latest()
+    bad = tmp_path / "migrations"
+    bad.mkdir()
+    (bad / f"{version + 1:04d}_broken.sql").write_text(
+        "CREATE TABLE half_done (id INTEGER);\nINSERT INTO no_such_table VALUES (1);\n"
+    )
+    monkeypatch.setattr(m, "MIGRATIONS_DIR", bad)
+    with pytest.raises(sqlite3.OperationalError):
+        m.migrate(manager)
+    with manager.read() as c:
+        assert c.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+        assert m.current_version(c) == version
+
+
+def test_verify_reports_checksum_drift(manager):
+    m.migrate(manager)
+    assert m.verify(manager) == []
+    with manager.write() as c:
+        c.execute("UPDATE schema_migrations SET checksum = 'tampered' WHERE version = 2")
+    assert m.verify(manager) == [(2, "suppliers")]
@@ -0,0 +1,85 @@
+import db
+from db.payments import PaymentIn, allocate, ingest_payments
+
+
+def _installments(store, schedule_id, dues):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents,
+                                     status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, 'due', ?, ?)
+        """, [(schedule_id, n, now + n, due, due, now, now) for n, due in enumerate(dues, 1)])
+
+
+def _state(store, schedule_id):
+    with store.read() as c:
+        return c.execute("SELECT paid_cents, status FROM installment WHERE schedule_id = ? ORDER BY number",
+                         (schedule_id,)).fetchall()
+
+
+def _pay(key, contract_id, amount, at=1_000, **kw):
+    return PaymentIn(idempotency_key=key, amount_cents=amount, channel="bank_transfer",
+                     received_at=at, contract_id=contract_id, **kw)
+
+
+def test_allocates_oldest_first_and_links_payment(store, make_contract):
+    contract, sched = make_contract()
+    _installments(store, sched, [1_000, 1_000, 1_000])
+    report = ingest_payments([_pay("bank-1", contract, 1_500)])
+    assert (report.inserted, report.allocated_cents, report.installments_updated) == (1, 1_500, 2)
+    assert _state(store, sched) == [(1_000, "paid"), (500, "due"), (0, "due")]
+    with store.read() as c:
+        first = c.execute("SELECT id FROM installment WHERE schedule_id = ? AND number = 1", (sched,)).fetchone()[0]
+        assert c.execute("SELECT installment_id FROM payment").fetchone()[0] == first
+
+
+def test_replay_is_idempotent(store, make_contract):
+    contract, sched = make_contract()
+    _installments(store, sched, [1_000, 1_000])
+    batch = [_pay("bank-1", contract, 700), _pay("bank-2", contract, 700), _pay("bank-1", contract, 700)]
+    first = ingest_payments(batch, batch_size=2)
+    assert (first.inserted, first.duplicates, first.batches) == (2, 1, 2)
+    again = ingest_payments(batch)
+    assert (again.inserted, again.duplicates, again.allocated_cents) == (0, 3, 0)
+    assert _state(store, sched) == [(1_000, "paid"), (400, "due")]
+
+
+def test_overpayment_and_non_succeeded_payments(store, make_contract):
+    contract, sched = make_contract()
+    _installments(store, sched, [1_000])
+    report = ingest_payments([
+        _pay("a", contract, 1_200),
+        _pay("b", contract, 500, status="pending"),
+        _pay("c", None, 300),
+    ])
+    assert report.inserted == 3
+    assert (report.allocated_cents, report.unallocated_cents) == (1_000, 200)
+    assert _state(store, sched) == [(1_000, "paid")]
+
+
+def test_invalid_records_are_rejected_not_written(store):
+    report = ingest_payments([
+        _pay("", 1, 100),
+        _pay("x", 1, -5),
+        PaymentIn("y", 100, "cheque", 1_000),
+        {"idempotency_key": "z", "amount_cents": 100, "channel": "cash", "received_at": 1_000},
+    ])
+    assert [i for i, _ in report.rejected] == [0, 1, 2]
+    assert report.inserted == 1
+
+
+def test_dashboard_rollups_follow_ingestion(store, make_contract):
+    from db.metrics import check_metrics
+    contract, sched = make_contract()
+    _installments(store, sched, [1_000, 1_000])
+    ingest_payments([_pay(f"k{i}", contract, 300, at=db.now_ms()) for i in range(5)])
+    assert check_metrics().drift == []
+
+
+def test_allocate_is_pure():
+    queues = {7: [[1, 100, 0, "due"], [2, 100, 0, "upcoming"]]}
+    updates, links, allocated, leftover = allocate(queues, [(10, 7, 150, 5), (11, 7, 100, 6), (12, 8, 40, 7)])
+    assert updates == {1: (100, "paid", 5), 2: (100, "paid", 6)}
+    assert links == [(1, 10), (2, 11)]
+    assert (allocated, leftover) == (200, 90)
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+import db
+from db import records
+from db.records import ConflictError
+
+
+@pytest.fixture
+def customer(store):
+    records.stats(reset=True)
+    now = db.now_ms()
+    with store.write() as c:
+        return c.execute("INSERT INTO customer (full_name, created_at, updated_at) VALUES ('A', ?, ?)",
+                         (now, now)).lastrowid
+
+
+def test_update_bumps_version_and_detects_conflict(customer):
+    row = records.get("customer", customer)
+    assert row["version"] == 1
+    assert records.update("customer", customer, 1, notes="vip") == 2
+    with pytest.raises(ConflictError) as e:
+        records.update("customer", customer, 1, notes="stale write")
+    assert (e.value.expected, e.value.actual) == (1, 2)
+    assert records.get("customer", customer)["notes"] == "vip"
+    s = records.stats().tables["customer"]
+    assert (s.updates, s.conflicts) == (1, 1) and s.conflict_rate == 0.5
+
+
+def test_deleted_row_and_protected_columns(customer):
+    with pytest.raises(ValueError):
+        records.update("customer", customer, 1, created_at=9)
+    with pytest.raises(ValueError):
+        records.update("customer", customer, 1, no_such_column=1)
+    with pytest.raises(ValueError):
+        records.get("app_meta", 1)   # no id/version
+    records.delete("customer", customer, 1)
+    with pytest.raises(ConflictError) as e:
+        records.update("customer", customer, 1, notes="x")
+    assert e.value.actual is None
+
+
+def test_modify_retries_through_conflicts(customer):
+    events = []
+    records.set_metrics_hook(lambda event, table, **info: events.append(event))
+    try:
+        calls = []
+
+        def change(row):
+            calls.append(row["version"])
+            if len(calls) == 1:   # someone else writes between our read and our update
+                records.update("customer", customer, row["version"], notes="other station")
+            return {"full_name": row["full_name"] + "!"}
+
+        assert records.modify("customer", customer, change, backoff=0) == 3
+    finally:
+        records.set_metrics_hook(None)
+    assert calls == [1, 2]
+    assert events == ["update", "conflict", "retry", "update"]
+    assert records.get("customer", customer)["full_name"] == "A!"
+
+
+def test_concurrent_increments_lose_nothing(store, customer):
+    def bump():
+        for _ in range(20):
+            records.modify("customer", customer,
+                           lambda row: {"net_income_cents": row["net_income_cents"] + 1}, attempts=200, backoff=0)
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    row = records.get("customer", customer)
+    assert row["net_income_cents"] == 80 and row["version"] == 81
+    assert records.stats().tables["customer"].gave_up == 0
+
+
+def test_versioned_tables_cover_business_tables(store):
+    tables = records.versioned_tables()
+    assert {"customer", "sale", "payment", "installment", "contract"} <= set(tables)
+    assert "app_meta" not in tables
@@ -0,0 +1,54 @@
+import db
+from db.catalog import Catalog
+from db.scan import BurstDetector, SaleCart
+from db.stock import receive_delivery
+
+
+def _type(detector, text, start, gap):
+    """Feed ``text`` one key every ``gap`` ms; returns every code completed."""
+    return [code for k, ch in enumerate(text) if (code := detector.feed(ch, start + k * gap)) is not None]
+
+
+def test_scanner_burst_is_a_scan_typing_is_not():
+    detector = BurstDetector(max_gap_ms=35, min_length=6)
+    assert _type(detector, "6001234567890\r", 0, 4) == ["6001234567890"]
+    assert _type(detector, "6001234567890\r", 1_000, 120) == []       # a person typing the same digits
+    assert _type(detector, "12\r", 5_000, 4) == []                      # too short to be a barcode
+    # a slow key followed by a scan: only the burst counts
+    detector.feed("x", 9_000)
+    assert _type(detector, "ABC-12345\n", 9_500, 6) == ["ABC-12345"]
+
+
+def test_flush_ends_a_burst_without_terminator():
+    detector = BurstDetector(max_gap_ms=35, min_length=6)
+    _type(detector, "4006381333931", 0, 3)
+    assert detector.in_burst(40) and detector.flush(40) is None          # still inside the gap
+    assert detector.flush(100) == "4006381333931" and detector.pending == ""
+    _type(detector, "abc", 200, 3)
+    assert detector.flush(500) is None
+
+
+def test_cart_resolves_from_cache_and_checks_out(store):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO product (id, sku, name, barcode, price_ttc_cents, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(1, "TV-55", "TV 55", "6001234567890", 119_000, now, now),
+              (2, "CABLE", "HDMI cable", None, 1_190, now, now)])
+    receive_delivery([(1, 5), (2, 50)])
+    catalog = Catalog(store)
+    catalog.refresh()
+    cart = SaleCart(catalog)
+
+    assert cart.scan("6001234567890").qty == 1
+    assert cart.scan("6001234567890").qty == 2
+    assert cart.scan("CABLE").product.id == 2                             # codes printed from the sku
+    assert cart.scan("0000000000000").product is None and cart.unknown == ["0000000000000"]
+    assert cart.remove(1) == 1 and len(cart) == 2
+    assert cart.total_cents == 119_000 + 1_190
+
+    result = cart.checkout(channel="cash")
+    assert result.total_cents == 120_190 and len(cart) == 0 and cart.unknown == []
+    with store.read() as c:
+        assert c.execute("SELECT qty FROM stock WHERE product_id = 1").fetchone()[0] == 4
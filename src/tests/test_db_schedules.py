@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from db import schedules
+from db.schedules import amortize, amortize_batch, fee_for, generate_schedule, regenerate_schedules
+
+
+def test_amortize_is_exact():
+    lines = amortize(1_000_000, 12, apr_bp=1899, fees_cents=15_001, insurance_cents=4_000)
+    assert len(lines) == 12
+    assert sum(p for p, _, _ in lines) == 1_000_000
+    assert sum(f for _, _, f in lines) == 19_001
+    assert [f for _, _, f in lines] == [1584] * 5 + [1583] * 7
+    payments = [p + i for p, i, _ in lines[:-1]]
+    assert max(payments) - min(payments) <= 1  # constant payment up to rounding
+
+
+def test_zero_apr_splits_evenly():
+    lines = amortize(100_001, 3)
+    assert [p for p, _, _ in lines] == [33_334, 33_334, 33_333]
+    assert all(i == 0 for _, i, _ in lines)
+
+
+def test_term_bounds():
+    with pytest.raises(ValueError):
+        amortize(1000, 2)
+
+
+def _check_batch_matches_scalar():
+    rnd = random.Random(7)
+    plans = [(rnd.randint(10_000, 50_000_000), rnd.randint(3, 60), rnd.choice([0, 950, 1899, 2400]),
+              rnd.randint(0, 90_000)) for _ in range(300)]
+    batch = amortize_batch(*zip(*plans))
+    assert batch == [amortize(p, n, a, e) for p, n, a, e in plans]
+
+
+def test_batch_matches_scalar_without_numpy(monkeypatch):
+    monkeypatch.setattr(schedules, "np", None)
+    _check_batch_matches_scalar()
+
+
+def test_batch_matches_scalar_with_numpy(monkeypatch):
+    monkeypatch.setattr(schedules, "np", pytest.importorskip("numpy"))
+    _check_batch_matches_scalar()
+
+
+def test_generate_and_regenerate(store, make_contract):
+    contract_a, _ = make_contract(term_months=6, total_cents=600_000, with_schedule=False)
+    contract_b, _ = make_contract(term_months=6, total_cents=600_000, with_schedule=False)
+    sched_a = generate_schedule(contract_a)
+    sched_b = generate_schedule(contract_b)
+    with pytest.raises(ValueError):
+        generate_schedule(contract_a)
+
+    with store.read() as c:
+        assert c.execute("SELECT COUNT(*), SUM(principal_cents) FROM installment WHERE schedule_id = ?",
+                         (sched_a,)).fetchone() == (6, 600_000)
+    with store.write() as c:
+        c.execute("UPDATE installment SET paid_cents = 100 WHERE schedule_id = ? AND number = 1", (sched_b,))
+
+    report = regenerate_schedules(fee_percent=15.0)
+    assert report.regenerated == 1 and report.skipped_with_payments == 1
+    with store.read() as c:
+        fees = c.execute("SELECT SUM(fees_cents) FROM installment WHERE schedule_id = ?", (sched_a,)).fetchone()[0]
+        offer = c.execute("""
+            SELECT o.fees_cents, o.total_repay_cents FROM offer o JOIN contract ct ON ct.offer_id = o.id
+            WHERE ct.id = ?
+        """, (contract_a,)).fetchone()
+        untouched = c.execute("SELECT SUM(fees_cents) FROM installment WHERE schedule_id = ?", (sched_b,)).fetchone()[0]
+    assert fees == fee_for(600_000, 15.0) == 90_000
+    assert offer == (90_000, 690_000)
+    assert untouched == 0
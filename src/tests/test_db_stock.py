@@ -0,0 +1,73 @@
+import pytest
+
+import db
+from db.stock import (move_stock, receive_delivery, stock_as_of, take_snapshot, transfer,
+                      verify_stock)
+
+
+@pytest.fixture
+def products(store):
+    now = db.now_ms()
+    with store.write() as c:
+        c.executemany("""
+            INSERT INTO product (sku, name, price_ttc_cents, created_at, updated_at) VALUES (?, ?, 100, ?, ?)
+        """, [(f"SKU{i}", f"P{i}", now, now) for i in range(3)])
+        return [r[0] for r in c.execute("SELECT id FROM product ORDER BY id")]
+
+
+def _qty(store, product_id, branch_id=1):
+    with store.read() as c:
+        row = c.execute("SELECT qty FROM stock WHERE product_id = ? AND branch_id = ?",
+                        (product_id, branch_id)).fetchone()
+    return row[0] if row else None
+
+
+def test_movements_keep_ledger_and_balance_together(store, products):
+    p = products[0]
+    assert move_stock(p, "receive", 10) == 10
+    assert move_stock(p, "sell", 3, ref_entity="sale", ref_id=1) == 7
+    assert move_stock(p, "return", 1) == 8
+    assert move_stock(p, "adjust", -2) == 6
+    with pytest.raises(ValueError):
+        move_stock(p, "sell", 7)
+    with pytest.raises(ValueError):
+        move_stock(p, "sell", -1)
+    assert _qty(store, p) == 6
+    with store.read() as c:
+        assert c.execute("SELECT COUNT(*), SUM(qty_delta) FROM stock_ledger").fetchone() == (4, 6)
+    assert verify_stock().balance_drift == []
+
+
+def test_delivery_and_transfer(store, products):
+    assert receive_delivery([(products[0], 5), (products[1], 2), (products[0], 5)], ref_id=42) == 3
+    assert _qty(store, products[0]) == 10 and _qty(store, products[1]) == 2
+    transfer(products[0], 4, from_branch=1, to_branch=2)
+    assert _qty(store, products[0]) == 6 and _qty(store, products[0], 2) == 4
+    with pytest.raises(ValueError):
+        transfer(products[1], 3, from_branch=1, to_branch=2)
+    assert _qty(store, products[1], 2) is None
+
+
+def test_snapshots_answer_as_of_queries(store, products):
+    p = products[0]
+    move_stock(p, "receive", 10, at=1_000)
+    move_stock(p, "sell", 4, at=2_000)
+    assert take_snapshot(at=2_500) == 1
+    move_stock(p, "receive", 7, at=3_000)
+    assert take_snapshot(at=3_500) == 1
+    move_stock(p, "sell", 1, at=4_000)
+    assert [stock_as_of(p, t) for t in (500, 1_500, 2_500, 3_200, 3_500, 5_000)] == [0, 10, 6, 13, 13, 12]
+    with store.read() as c:
+        assert c.execute("SELECT at, qty FROM stock_snapshot ORDER BY at").fetchall() == [(2_500, 6), (3_500, 13)]
+    assert verify_stock().snapshot_drift == []
+
+
+def test_verify_reports_and_fixes_drift(store, products):
+    move_stock(products[0], "receive", 5)
+    move_stock(products[1], "receive", 5)
+    with store.write() as c:
+        c.execute("UPDATE stock SET qty = 99 WHERE product_id = ?", (products[0],))
+    report = verify_stock(fix=True)
+    assert [(d.product_id, d.recorded, d.from_ledger) for d in report.balance_drift] == [(products[0], 99, 5)]
+    assert report.fixed == 1
+    assert verify_stock().balance_drift == []
@@ -0,0 +1,150 @@
+import pytest
+
+import db
+from db import sync
+from db.connection import ConnectionManager
+from db.migrate import migrate
+from db.sync import LocalPeer, SyncError
+
+
+@pytest.fixture
+def branch(tmp_path):
+    """A second, independent database (another branch's machine)."""
+    mgr = ConnectionManager(tmp_path / "branch.db")
+    migrate(mgr)
+    yield mgr
+    mgr.close()
+
+
+def _customer(mgr, name, branch_id=1):
+    now = db.now_ms()
+    with mgr.write() as c:
+        return c.execute("INSERT INTO customer (branch_id, full_name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                         (branch_id, name, now, now)).lastrowid
+
+
+def _names(mgr):
+    with mgr.read() as c:
+        return sorted(r[0] for r in c.execute("SELECT full_name FROM customer"))
+
+
+def test_rows_and_references_travel_both_ways(store, branch, make_contract):
+    contract_id, schedule_id = make_contract()
+    now = db.now_ms()
+    with store.write() as c:
+        c.execute("""
+            INSERT INTO installment (schedule_id, number, due_date, principal_cents, due_cents, created_at, updated_at)
+            VALUES (?, 1, ?, 10000, 10000, ?, ?)
+        """, (schedule_id, now, now, now))
+    _customer(branch, "Branch customer", branch_id=2)
+    _customer(branch, "Second", branch_id=2)
+
+    session = sync.sync(LocalPeer(branch))
+    assert session.pulled.inserted == 2 and session.pushed.inserted == 5   # sale, offer, contract, schedule, inst.
+    assert _names(store) == _names(branch) == ["Branch customer", "Second"]
+    with branch.read() as c:   # ids differ per device, the chain of references does not
+        assert c.execute("""
+            SELECT COUNT(*) FROM installment i JOIN schedule s ON s.id = i.schedule_id
+            JOIN contract k ON k.id = s.contract_id JOIN sale ON sale.id = k.sale_id
+        """).fetchone()[0] == 1
+
+    again = sync.sync(LocalPeer(branch))    # nothing new: only deltas travel
+    assert again.pulled.changes == 0 and again.pushed.changes == 0
+
+
+def test_last_writer_wins_and_deletes_propagate(store, branch):
+    cid = _customer(store, "Original")
+    sync.sync(LocalPeer(branch))
+    with branch.read() as c:
+        remote_id = c.execute("SELECT id FROM customer").fetchone()[0]
+
+    with store.write() as c:
+        c.execute("UPDATE customer SET full_name = 'Older edit', updated_at = 1000, version = 2 WHERE id = ?", (cid,))
+    with branch.write() as c:
+        c.execute("UPDATE customer SET full_name = 'Newer edit', updated_at = ?, version = 2 WHERE id = ?",
+                  (db.now_ms(), remote_id))
+    session = sync.sync(LocalPeer(branch))
+    assert session.pulled.updated == 1 and session.pushed.skipped == 0
+    assert _names(store) == _names(branch) == ["Newer edit"]
+
+    with branch.write() as c:
+        c.execute("DELETE FROM customer WHERE id = ?", (remote_id,))
+    assert sync.sync(LocalPeer(branch)).pulled.deleted == 1
+    assert _names(store) == []
+
+
+def test_products_with_the_same_sku_merge(store, branch):
+    now = db.now_ms()
+    for mgr, price in ((store, 100), (branch, 250)):
+        with mgr.write() as c:
+            c.execute("""INSERT INTO product (sku, name, price_ttc_cents, created_at, updated_at)
+                         VALUES ('SKU-1', 'Fridge', ?, ?, ?)""", (price, now + price, now + price))
+    sync.sync(LocalPeer(branch))
+    for mgr in (store, branch):
+        with mgr.read() as c:
+            assert c.execute("SELECT COUNT(*), MAX(price_ttc_cents) FROM product").fetchone() == (1, 250)
+
+
+def test_bundles_carry_deltas_and_acknowledgements(store, branch, tmp_path):
+    hq, shop = sync.device_id(store), sync.device_id(branch)
+    _customer(store, "A")
+    first = sync.export_bundle(tmp_path / "1.sync", to_device=shop)
+    assert sync.import_bundle(tmp_path / "1.sync", branch).inserted == 1
+
+    # The reply confirms bundle 1, so the next bundle from HQ only holds the new row
+    _customer(branch, "From shop")
+    sync.export_bundle(tmp_path / "reply.sync", to_device=hq, manager=branch)
+    assert sync.import_bundle(tmp_path / "reply.sync").inserted == 1
+    _customer(store, "B")
+    second = sync.export_bundle(tmp_path / "2.sync", to_device=shop)
+    report = sync.import_bundle(tmp_path / "2.sync", branch)
+    assert report.changes == 1 and second.bytes < first.bytes * 2
+    assert _names(branch) == ["A", "B", "From shop"]
+
+    with pytest.raises(SyncError):
+        sync.import_bundle(tmp_path / "2.sync")   # addressed to the shop
+
+
+def test_failed_change_set_keeps_nothing(store, branch):
+    _customer(store, "A")
+    frames = list(sync.changes_since({}))
+    with pytest.raises(Exception):
+        sync.apply_changes(frames + [b"not zlib"], "hq", branch)
+    assert _names(branch) == [] and sync.received_vector("hq", branch) == {}
+    with branch.read() as c:
+        assert c.execute("SELECT applying FROM sync_state").fetchone()[0] is None
+
+
+def _log(mgr):
+    with mgr.read() as c:
+        return c.execute("SELECT tbl, row_id, seq, op FROM sync_change WHERE tbl = 'customer' ORDER BY seq").fetchall()
+
+
+def test_change_log_keeps_the_latest_change_per_row(store):
+    a, b = _customer(store, "A"), _customer(store, "B")
+    with store.write() as c:
+        c.execute("UPDATE customer SET full_name = 'A2' WHERE id = ?", (a,))
+        c.execute("DELETE FROM customer WHERE id = ?", (b,))
+    log = _log(store)
+    assert [(r[1], r[3]) for r in log] == [(a, "upsert"), (b, "delete")]
+    assert log[0][2] > 2 and log[1][2] > log[0][2]        # both moved past their first entries
+
+
+def test_upgrade_keeps_the_log_and_never_reuses_seq(tmp_path, monkeypatch):
+    from db import migrate as m
+    everything = m.available_migrations
+    monkeypatch.setattr(m, "available_migrations", lambda: [x for x in everything() if x[0] < 14])
+    mgr = ConnectionManager(tmp_path / "old.db")
+    try:
+        migrate(mgr)
+        a = _customer(mgr, "A")
+        with mgr.write() as c:
+            c.execute("UPDATE customer SET full_name = 'A2' WHERE id = ?", (a,))
+        before = _log(mgr)
+        monkeypatch.setattr(m, "available_migrations", everything)
+        assert 14 in migrate(mgr)
+        assert _log(mgr) == before
+        b = _customer(mgr, "B")
+        assert _log(mgr)[-1][1:] == (b, 3, "upsert")       # old log: seq 1 (insert), then 2 (update)
+    finally:
+        mgr.close()
@@ -0,0 +1,87 @@
+import pytest
+
+from db import records, taxonomy
+from db.stock import move_stock, receive_delivery
+from db.taxonomy import TaxonomyError
+
+
+def _counts(path, kind="category"):
+    n = taxonomy.node(kind, path)
+    return n.products, n.stock_qty
+
+
+def test_links_roll_up_the_category_tree(store, make_product):
+    tv, radio = make_product("tv-55"), make_product("radio")
+    receive_delivery([(tv, 4), (radio, 10)])
+    links = taxonomy.set_product_taxonomy(tv, brand="Samsung", categories=["Electronics", "Electronics > TV"],
+                                          tags=["promo"])
+    assert links == {"brand": ["Samsung"], "category": ["Electronics > TV"], "tag": ["promo"]}
+    taxonomy.set_product_taxonomy(radio, brand="Sony", categories=["Electronics > Audio"])
+
+    assert _counts("Electronics") == (2, 14)          # each product counted once, from either branch
+    assert _counts("Electronics > TV") == (1, 4) and _counts("Samsung", "brand") == (1, 4)
+    assert [(n.path, n.depth) for n in taxonomy.taxa("category")] == [
+        ("Electronics", 0), ("Electronics > Audio", 1), ("Electronics > TV", 1)]
+    with store.read() as c:                                        # display text follows the links
+        assert c.execute("SELECT brand, category FROM product WHERE id = ?", (tv,)).fetchone() == (
+            "Samsung", "Electronics > TV")
+
+    # a bare name finds the subcategory; re-linking moves the counts
+    taxonomy.set_product_taxonomy(radio, brand="Sony", categories=["tv"])
+    assert _counts("Electronics > Audio") == (0, 0) and _counts("Electronics > TV") == (2, 14)
+    assert _counts("Electronics") == (2, 14)
+
+
+def test_counts_follow_stock_and_activation(store, make_product):
+    tv = make_product("tv-55")
+    taxonomy.set_product_taxonomy(tv, brand="LG", categories=["Electronics > TV"])
+    receive_delivery([(tv, 5)])
+    move_stock(tv, "sell", 2)
+    receive_delivery([(tv, 3)], branch_id=2)
+    assert _counts("Electronics") == (1, 6)
+    version = records.get("product", tv)["version"]
+    records.update("product", tv, version, is_active=0)
+    assert _counts("Electronics") == (0, 0) and _counts("LG", "brand") == (0, 0)
+    move_stock(tv, "sell", 1)                                   # inactive: no change
+    records.update("product", tv, version + 1, is_active=1)
+    assert _counts("Electronics > TV") == (1, 5)
+    assert taxonomy.check_taxonomy().drift == []
+
+
+def test_filter_is_an_intersection_of_nodes(store, make_product):
+    ids = {}
+    for sku, brand, category, tags in [("tv-a", "Samsung", "Electronics > TV", ["promo"]),
+                                       ("tv-b", "LG", "Electronics > TV", []),
+                                       ("sb", "Samsung", "Electronics > Audio", ["promo"]),
+                                       ("fridge", "Samsung", "Appliances", [])]:
+        ids[sku] = make_product(sku)
+        taxonomy.set_product_taxonomy(ids[sku], brand=brand, categories=[category], tags=tags)
+    assert taxonomy.filter_products("Electronics > TV > Samsung") == [ids["tv-a"]]
+    assert taxonomy.filter_products("Electronics", brand="Samsung") == [ids["tv-a"], ids["sb"]]
+    assert taxonomy.filter_products(brand="Samsung", tags=["promo"]) == [ids["tv-a"], ids["sb"]]
+    assert taxonomy.filter_products("Electronics", after_id=ids["tv-a"], limit=1) == [ids["tv-b"]]
+    assert taxonomy.filter_products("Garden") == []
+    with pytest.raises(TaxonomyError):
+        taxonomy.filter_products()
+
+
+def test_delete_subtree_unlinks_and_check_repairs(store, make_product):
+    tv = make_product("tv-55")
+    taxonomy.set_product_taxonomy(tv, brand="Samsung", categories=["Electronics > TV > OLED"])
+    receive_delivery([(tv, 2)])
+    assert taxonomy.delete_taxon(taxonomy.find_taxon("category", "electronics > tv")) == 1
+    assert [n.path for n in taxonomy.taxa("category")] == ["Electronics"]
+    assert _counts("Electronics") == (0, 0) and _counts("Samsung", "brand") == (1, 2)
+    assert taxonomy.product_taxa(tv)["category"] == []
+    with store.read() as c:
+        assert c.execute("SELECT category FROM product WHERE id = ?", (tv,)).fetchone()[0] is None
+
+    taxonomy.add_taxon("category", "Electronics > TV")
+    taxonomy.add_taxon("category", "Audio > TV")
+    with pytest.raises(TaxonomyError):
+        taxonomy.set_product_taxonomy(tv, categories=["TV"])          # two categories named TV
+    with store.write() as c:
+        c.execute("UPDATE taxon_count SET products = 7")
+    report = taxonomy.check_taxonomy(fix=True)
+    assert report.fixed and len(report.drift) == report.nodes_checked == 5
+    assert taxonomy.check_taxonomy().drift == [] and _counts("Samsung", "brand") == (1, 2)
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtWidgets import QApplication, QLabel
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+from my_project.utils.lazy_stack import LazyStackedWidget
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = QApplication.instance() or QApplication([])
+    if not isinstance(app, QApplication):
+        pytest.skip("a QCoreApplication already exists; widgets need a QApplication")
+    return app
+
+
+def test_pages_are_built_on_first_show(app):
+    built = []
+
+    def page(name):
+        def factory():
+            built.append(name)
+            return QLabel(name)
+        return factory
+
+    stack = LazyStackedWidget()
+    indices = [stack.add_lazy_page(page(n)) for n in ("a", "b", "c")]
+    assert indices == [0, 1, 2] and built == []
+    stack.show_page(1)
+    assert built == ["b"] and stack.currentIndex() == 1 and stack.widget(1).text() == "b"
+    assert stack.is_built(1) and not stack.is_built(0) and not stack.is_built(2)
+    stack.show_page(1)
+    assert built == ["b"]                                          # built once
+    assert stack.ensure_built(2).text() == "c" and stack.count() == 3
+    assert stack.currentIndex() == 1
+
+
+def test_failed_factory_can_be_retried(app):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database locked")
+        return QLabel("ok")
+
+    stack = LazyStackedWidget()
+    stack.add_lazy_page(lambda: QLabel("home"))
+    stack.add_lazy_page(flaky)
+    stack.show_page(0)
+    with pytest.raises(RuntimeError):
+        stack.show_page(1)
+    assert not stack.is_built(1) and stack.count() == 2 and stack.currentIndex() == 0
+    stack.show_page(1)
+    assert stack.is_built(1) and stack.widget(1).text() == "ok" and stack.currentIndex() == 1
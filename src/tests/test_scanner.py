@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtCore import QEvent, Qt
+from PySide6.QtGui import QKeyEvent
+from PySide6.QtWidgets import QApplication, QLineEdit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+from my_project.utils.scanner import ScannerFilter
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = QApplication.instance() or QApplication([])
+    if not isinstance(app, QApplication):
+        pytest.skip("a QCoreApplication already exists; widgets need a QApplication")
+    return app
+
+
+@pytest.fixture
+def field(app):
+    scanner = ScannerFilter()
+    app.installEventFilter(scanner)
+    line = QLineEdit()
+    line.show()
+    line.activateWindow()
+    line.setFocus()
+    app.processEvents()
+    if QApplication.focusWidget() is not line:
+        pytest.skip("the platform plugin gives no keyboard focus")
+    yield line, scanner
+    app.removeEventFilter(scanner)
+    line.close()
+
+
+def _keys(line, keys, gap_s=0.0, autorep=False):
+    for key in keys:
+        text = {"\b": "\x08"}.get(key, key)
+        code = {"\r": Qt.Key_Return, "\b": Qt.Key_Backspace}.get(key, Qt.Key_unknown)
+        QApplication.sendEvent(line, QKeyEvent(QEvent.KeyPress, code, Qt.NoModifier, text, autorep))
+        if gap_s:
+            time.sleep(gap_s)
+
+
+def test_burst_becomes_a_scan_only_with_a_receiver(app, field):
+    line, scanner = field
+    _keys(line, "6130001\r")
+    assert line.text() == "6130001"              # nobody listens: the keys are plain typing
+    line.clear()
+
+    codes = []
+    scanner.scanned.connect(codes.append)
+    _keys(line, "ab")
+    time.sleep(0.06)
+    _keys(line, "6130001\r")
+    assert codes == ["6130001"] and line.text() == "ab"
+
+
+def test_held_keys_are_never_a_scan(app, field):
+    line, scanner = field
+    codes = []
+    scanner.scanned.connect(codes.append)
+    _keys(line, "x")
+    _keys(line, "xxxxxxx", autorep=True)         # key held down: repeats every few ms
+    _keys(line, "\r")
+    assert codes == [] and line.text() == "x" * 8
+    time.sleep(0.06)
+    _keys(line, "\b" * 7)                         # Backspace spree, e.g. with a fast repeat rate
+    _keys(line, "\r")
+    assert codes == [] and line.text() == "x"
+
+
+def test_slow_typing_reaches_the_widget(app, field):
+    line, scanner = field
+    codes = []
+    scanner.scanned.connect(codes.append)
+    _keys(line, "abcdefg", gap_s=0.06)
+    _keys(line, "\r")
+    assert codes == [] and line.text() == "abcdefg"
@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+from PySide6.QtCore import QCoreApplication
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))  # points to .../src
+from my_project.utils.tasks import MAINTENANCE, TaskScheduler
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def _drain(app, scheduler, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    scheduler.wait_for_done(int(timeout * 1000))
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if not scheduler._by_key and not scheduler._channels:
+            break
+    app.processEvents()
+
+
+def test_result_delivered_on_gui_thread(app):
+    s = TaskScheduler()
+    got = []
+    h = s.submit(lambda x: x * 2, 21)
+    h.finished.connect(lambda r: got.append((r, threading.current_thread() is threading.main_thread())))
+    _drain(app, s)
+    assert got == [(42, True)]
+
+
+def test_failure_signal(app):
+    s = TaskScheduler()
+    errors = []
+    s.submit(lambda: 1 / 0, lane=MAINTENANCE).failed.connect(errors.append)
+    _drain(app, s)
+    assert len(errors) == 1 and isinstance(errors[0], ZeroDivisionError)
+
+
+def test_coalesces_duplicate_keys(app):
+    s = TaskScheduler()
+    gate = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        gate.wait(2)
+        return "done"
+
+    h1 = s.submit(work, key=("q", "moh"))
+    h2 = s.submit(work, key=("q", "moh"))
+    assert h1 is h2
+    got = []
+    h2.finished.connect(got.append)
+    gate.set()
+    _drain(app, s)
+    assert calls == [1] and got == ["done"]
+
+
+def test_channel_supersedes_stale_requests(app):
+    s = TaskScheduler(interactive_threads=1)
+    gate = threading.Event()
+    got = []
+    first = s.submit(lambda: gate.wait(2) and "first", channel="search")
+    second = s.submit(lambda: "second", channel="search")
+    first.finished.connect(got.append)
+    second.finished.connect(got.append)
+    assert first.is_cancelled()
+    gate.set()
+    _drain(app, s)
+    assert got == ["second"]